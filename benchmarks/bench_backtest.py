@@ -0,0 +1,55 @@
+"""Timings for backtesting the squeeze strategy over a full universe.
+
+Run from the repository root:
+
+.. code-block:: bash
+
+    python benchmarks/bench_backtest.py
+"""
+import os
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from wsbtrading import backtest
+from wsbtrading.data_io import ohlcv_panel
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def make_fields(n_tickers: int, n_dates: int, dtype: str = 'float32', seed: int = 0):
+    """Yields random-walk Open, High, Low and Close arrays of shape (dates, tickers)."""
+    rng = np.random.default_rng(seed)
+    close = (100 * np.exp(rng.normal(scale=0.02, size=(n_dates, n_tickers)).cumsum(axis=0))).astype(dtype)
+    spread = rng.uniform(0.005, 0.03, size=(n_dates, n_tickers)).astype(dtype) * close
+    yield 'High', close + spread
+    yield 'Low', close - spread
+    yield 'Open', close * np.exp(rng.normal(scale=0.005, size=(n_dates, n_tickers))).astype(dtype)
+    yield 'Close', close
+
+
+def bench_backtest(n_tickers: int = 8_000, years: int = 20, dtype: str = 'float32') -> None:
+    n_dates = years * TRADING_DAYS_PER_YEAR
+    tickers = [f'T{i:04d}' for i in range(n_tickers)]
+    dates = pd.bdate_range(end='2021-02-10', periods=n_dates)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'panel')
+        ohlcv_panel.write_panel(path=path, fields=dict(make_fields(n_tickers=n_tickers, n_dates=n_dates, dtype=dtype)),
+                                tickers=tickers, dates=dates, dtype=dtype)
+        panel = ohlcv_panel.open_panel(path=path)
+
+        start = timeit.default_timer()
+        result = backtest.run_backtest(panel=panel, signals=[backtest.squeeze_signal(rolling_window=20)],
+                                       commission_bps=1.0, slippage_bps=5.0)
+        seconds = timeit.default_timer() - start
+
+    stats = result.stats
+    print(f'run_backtest, squeeze signal, {n_tickers:,} tickers x {years} years ({dtype}): {seconds:.1f}s; '
+          f'annual turnover {stats["annual_turnover"]:.0f}, max drawdown {stats["max_drawdown"]:.1%}')
+
+
+if __name__ == '__main__':
+    bench_backtest()
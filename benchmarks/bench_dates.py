@@ -0,0 +1,65 @@
+"""Timings for the date utilities and the trading calendar in ``wsbtrading.utils.dates``.
+
+Run from the repository root:
+
+.. code-block:: bash
+
+    python benchmarks/bench_dates.py
+"""
+import timeit
+from datetime import date
+
+import numpy as np
+
+from wsbtrading.utils import dates
+
+
+def per_call_ns(stmt: str, number: int = 1_000_000, repeat: int = 5, **names) -> float:
+    """Returns the best time per call of ``stmt`` in nanoseconds."""
+    return min(timeit.repeat(stmt, number=number, repeat=repeat, globals={'dates': dates, **names})) / number * 1e9
+
+
+def bench_calendar() -> None:
+    now = 1612969200.0
+    for label, stmt in [('is_business_day(str)', "dates.is_business_day('2021-02-13')"),
+                        ('is_business_day(date)', 'dates.is_business_day(day)'),
+                        ('is_market_open', 'dates.is_market_open(now)'),
+                        ('next_market_open', 'dates.next_market_open(now)'),
+                        ('next_market_close', 'dates.next_market_close(now)'),
+                        ('seconds_to_market_close', 'dates.seconds_to_market_close(now)')]:
+        print(f'{label}: {per_call_ns(stmt, day=date(2021, 2, 13), now=now):.0f} ns')
+
+
+def rate(func, n_values: int, repeat: int = 3) -> float:
+    """Returns the best throughput of ``func`` in values per second."""
+    return n_values / min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def bench_arrays(n_values: int = 10_000_000, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    timestamps = rng.integers(946_684_800_000, 1_640_995_200_000, size=n_values)
+    days = dates.convert_unix_timestamps_to_dates(timestamps)
+    sample = timestamps[:100_000]
+
+    per_row = rate(lambda: [dates.convert_unix_timestamp_to_date_kernel(timestamp=int(timestamp))
+                            for timestamp in sample], n_values=len(sample), repeat=1)
+    print(f'convert_unix_timestamp_to_date_kernel, per row: {per_row:,.0f}/sec')
+    for label, func in [
+        ('convert_unix_timestamps_to_dates', lambda: dates.convert_unix_timestamps_to_dates(timestamps)),
+        ('convert_unix_timestamps_to_dates, strings',
+         lambda: dates.convert_unix_timestamps_to_dates(timestamps, as_strings=True)),
+        ('convert_unix_timestamps_to_dates, strings with time',
+         lambda: dates.convert_unix_timestamps_to_dates(timestamps, output_time=True, as_strings=True)),
+        ('slide_dates', lambda: dates.slide_dates(days, days_to_add=-7)),
+        ('slide_dates, trading days', lambda: dates.slide_dates(days, days_to_add=-5, trading_days=True)),
+    ]:
+        print(f'{label}: {rate(func, n_values=n_values):,.0f}/sec')
+
+    partitions = dates.build_date_range_array(start_date='1990-01-01', end_date='2020-12-31', trading_days=True)
+    seconds = min(timeit.repeat(lambda: dates.date_range_to_unix_range(partitions), number=1, repeat=5))
+    print(f'date_range_to_unix_range, {len(partitions):,} partitions: {seconds * 1e3:.1f} ms')
+
+
+if __name__ == '__main__':
+    bench_calendar()
+    bench_arrays()
@@ -0,0 +1,102 @@
+"""Timings for loading ``fundamentals_daily`` with TEXT versus DOUBLE PRECISION columns.
+
+The coercion stage is timed on its own, client-side. Table size and scan speed need a Postgres server reachable with
+the default :func:`wsbtrading.data_io.configure_pool` settings; the benchmark loads the same synthetic rows into a TEXT
+and a typed copy of the table (as temporary tables, so nothing is left behind) and compares them.
+
+Run from the repository root:
+
+.. code-block:: bash
+
+    python benchmarks/bench_fundamentals_schema.py
+"""
+import io
+import timeit
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from wsbtrading import data_io
+
+NUMERIC_COLUMNS = ['ev', 'evebit', 'evebitda', 'marketcap', 'pbook', 'pearnings', 'psales']
+
+
+def make_fundamentals(n_rows: int, blank_share: float = 0.05, seed: int = 0) -> pd.DataFrame:
+    """Builds ``fundamentals_daily`` rows as the text a CSV export holds, with a share of blank values."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'ticker': rng.choice(['GME', 'AMC', 'BB', 'NOK', 'PLTR'], size=n_rows),
+        'date': pd.Timestamp('2000-01-03', tz='UTC') + pd.to_timedelta(np.arange(n_rows) % 5000, unit='D'),
+        'lastupdated': pd.Timestamp('2021-02-10', tz='UTC'),
+    })
+    for column in NUMERIC_COLUMNS:
+        values = pd.Series(np.round(rng.lognormal(mean=8, sigma=3, size=n_rows), 4)).astype(str)
+        df[column] = values.mask(rng.random(n_rows) < blank_share, '')
+
+    return df.astype(str)
+
+
+def bench_coerce_nulls(n_rows: int = 1_000_000) -> None:
+    chunk = make_fundamentals(n_rows=n_rows)
+    positions = [chunk.columns.get_loc(column) for column in NUMERIC_COLUMNS]
+
+    seconds = min(timeit.repeat(lambda: data_io.coerce_nulls(chunk=chunk.copy(), columns=positions), number=1,
+                                repeat=3))
+    copy_seconds = min(timeit.repeat(lambda: chunk.copy(), number=1, repeat=3))
+    seconds -= copy_seconds
+
+    print(f'coerce_nulls, {n_rows:,} rows x {len(positions)} columns: {seconds * 1e3:.0f} ms '
+          f'({n_rows / seconds:,.0f} rows/sec)')
+
+
+def _load(cur, table_name: str, column_type: str, csv_text: str) -> None:
+    cur.execute(f"""
+        CREATE TEMPORARY TABLE {table_name}
+        (
+            ticker	    TEXT,
+            date	    TIMESTAMP WITH TIME ZONE    NOT NULL,
+            lastupdated	TIMESTAMP WITH TIME ZONE,
+            {', '.join(f'{column} {column_type}' for column in NUMERIC_COLUMNS)}
+        )
+    """)
+    force_null = '' if column_type == 'TEXT' else f', FORCE_NULL ({", ".join(NUMERIC_COLUMNS)})'
+    cur.copy_expert(f'COPY {table_name} FROM STDIN WITH (FORMAT csv{force_null})', io.StringIO(csv_text))
+    cur.execute(f'ANALYZE {table_name}')
+
+
+def _scan_ms(cur, query: str, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        cur.execute(query)
+        cur.fetchall()
+        timings.append(timeit.default_timer() - start)
+
+    return min(timings) * 1e3
+
+
+def bench_table(n_rows: int = 1_000_000) -> None:
+    df = make_fundamentals(n_rows=n_rows)
+    data_io.coerce_nulls(chunk=df, columns=[df.columns.get_loc(column) for column in NUMERIC_COLUMNS])
+    csv_text = df.to_csv(header=False, index=False, na_rep='')
+
+    try:
+        with data_io.pooled_connection() as (_, cur):
+            _load(cur, table_name='fundamentals_text', column_type='TEXT', csv_text=csv_text)
+            _load(cur, table_name='fundamentals_typed', column_type='DOUBLE PRECISION', csv_text=csv_text)
+
+            for table_name, marketcap in [('fundamentals_text', "NULLIF(marketcap, '')::DOUBLE PRECISION"),
+                                          ('fundamentals_typed', 'marketcap')]:
+                cur.execute(f"SELECT pg_total_relation_size('{table_name}')")
+                size_mb = cur.fetchone()[0] / 1024 ** 2
+                scan = _scan_ms(cur, f'SELECT ticker, avg({marketcap}) FROM {table_name} '
+                                     f'WHERE {marketcap} > 1e6 GROUP BY ticker')
+                print(f'{table_name}, {n_rows:,} rows: {size_mb:.1f} MB, range scan {scan:.0f} ms')
+    except psycopg2.OperationalError as e:
+        print(f'Skipping the table benchmark, no Postgres server: {e}')
+
+
+if __name__ == '__main__':
+    bench_coerce_nulls()
+    bench_table()
@@ -0,0 +1,74 @@
+"""Ad-hoc timings for the ``wsbtrading.maths`` indicators.
+
+Run from the repository root:
+
+.. code-block:: bash
+
+    python benchmarks/bench_maths.py
+"""
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from wsbtrading import maths
+from wsbtrading.maths import kernels
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def make_ohlc(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Builds a random-walk OHLC frame with ``n_rows`` bars."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(size=n_rows))
+    spread = rng.uniform(0.5, 3, size=n_rows)
+
+    return pd.DataFrame({'Close': close, 'High': close + spread, 'Low': close - spread})
+
+
+def chained_is_in_squeeze(df: pd.DataFrame, look_back_period: int = -3, rolling_window: int = 20) -> bool:
+    """The squeeze check built by chaining the dataframe indicator functions, as ``is_in_squeeze`` used to do."""
+    df = maths.lower_band(df=df, metric_col='Close', rolling_window=rolling_window)
+    df = maths.upper_band(df=df, metric_col='Close', rolling_window=rolling_window)
+    df = maths.lower_keltner(df=df, metric_col='Close', low_col='Low', high_col='High', rolling_window=rolling_window)
+    df = maths.upper_keltner(df=df, metric_col='Close', low_col='Low', high_col='High', rolling_window=rolling_window)
+
+    return df['lower_band'].iloc[look_back_period] > df['lower_keltner'].iloc[look_back_period] \
+        and df['upper_band'].iloc[look_back_period] < df['upper_keltner'].iloc[look_back_period]
+
+
+def best_of(func, number: int = 50, repeat: int = 5) -> float:
+    """Returns the best per-call wall time in milliseconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e3
+
+
+def bench_is_in_squeeze(years: int = 20) -> None:
+    df = make_ohlc(n_rows=years * TRADING_DAYS_PER_YEAR)
+
+    chained = best_of(lambda: chained_is_in_squeeze(df=df))
+    fused = best_of(lambda: maths.is_in_squeeze(df=df, metric_col='Close', low_col='Low', high_col='High'))
+
+    print(f'is_in_squeeze, {years} years of daily bars: chained {chained:.3f} ms, fused {fused:.3f} ms '
+          f'({chained / fused:.1f}x)')
+
+
+def bench_ema(n_rows: int = 10_000_000, n_columns: int = 4) -> None:
+    rng = np.random.default_rng(0)
+    close = pd.Series(100 + np.cumsum(rng.normal(size=n_rows)))
+    panel = 100 + rng.normal(size=(n_rows // n_columns, n_columns)).cumsum(axis=0)
+    alpha = kernels.smoothing_factor(span=20)
+    out = np.empty(n_rows)
+
+    pandas_ewm = best_of(lambda: close.ewm(span=20, adjust=False).mean(), number=1)
+    kernel = best_of(lambda: kernels.ema_kernel(values=close.to_numpy(), alpha=alpha, out=out), number=1)
+    pandas_panel = best_of(lambda: pd.DataFrame(panel).ewm(span=20, adjust=False).mean(), number=1)
+    kernel_panel = best_of(lambda: kernels.ema_kernel(values=panel, alpha=alpha), number=1)
+
+    print(f'ema, {n_rows:,} rows: pandas ewm {pandas_ewm:.1f} ms, ema_kernel {kernel:.1f} ms')
+    print(f'ema, {n_columns} columns x {n_rows // n_columns:,} rows: pandas ewm {pandas_panel:.1f} ms, '
+          f'ema_kernel {kernel_panel:.1f} ms')
+
+
+if __name__ == '__main__':
+    bench_is_in_squeeze()
+    bench_ema()
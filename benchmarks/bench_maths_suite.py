@@ -0,0 +1,429 @@
+"""A regression-gated benchmark suite covering every public function in ``wsbtrading.maths``.
+
+Each case calls one function on synthetic OHLCV data, 1K, 100K and 10M rows of a single ticker or 1 to 10,000-ticker
+panels, and records its best wall time and its peak traced memory. The results are compared against the baseline
+stored in ``benchmarks/baselines/maths.json``, and the run exits with status 1 if any case got slower, or used more
+memory, than the threshold allows. A public function without a case fails the run as well, so the suite keeps up with
+the module.
+
+The baseline is only meaningful on the machine it was recorded on; after an intended change, or on a new machine,
+record it again with ``--save-baseline``. Saving merges into the stored baseline, so a quick run at the small sizes
+keeps the entries of the large ones.
+
+Run from the repository root:
+
+.. code-block:: bash
+
+    # the full suite
+    python benchmarks/bench_maths_suite.py
+    # a quick pass over the small sizes
+    python benchmarks/bench_maths_suite.py --rows 1000 100000 --tickers 1 100
+    # the squeeze functions only, failing on a 10% slowdown
+    python benchmarks/bench_maths_suite.py -k squeeze --threshold 0.1
+    # record a new baseline
+    python benchmarks/bench_maths_suite.py --save-baseline
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from wsbtrading import maths
+from wsbtrading.maths import kernels
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'maths.json')
+ROW_COUNTS = (1_000, 100_000, 10_000_000)
+TICKER_COUNTS = (1, 100, 10_000)
+TRADING_DAYS_PER_YEAR = 252
+PANEL_DATES = 2 * TRADING_DAYS_PER_YEAR
+# Streaming indicators are fed one bar at a time from Python, so 10M bars would take minutes per case
+STREAMING_MAX_ROWS = 100_000
+# Differences smaller than this are allocator noise, not a regression
+MIN_BYTES_CHANGE = 64 * 1024
+
+
+class Case(NamedTuple):
+    """One benchmark.
+
+    Args:
+        name: how the case is reported, e.g. 'maths.sma'
+        targets: the public functions and classes of ``wsbtrading.maths`` the case exercises
+        data: what the case runs on: 'rows' for a dataframe of bars, 'panel' for an ndarray of shape
+              (3, dates, tickers) holding the close, low and high prices, or 'scalar' for nothing
+        prepare: takes the data and returns the call to time, doing any untimed setup first
+        max_size: the most rows or tickers to run the case at
+    """
+    name: str
+    targets: tuple
+    data: str
+    prepare: Callable[[Any], Callable[[], Any]]
+    max_size: Optional[int] = None
+
+
+def make_ohlcv(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """Builds a random-walk OHLCV frame with ``n_rows`` bars."""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(size=n_rows))
+    spread = rng.uniform(0.5, 3, size=n_rows)
+
+    return pd.DataFrame({
+        'Open': close + rng.uniform(-1, 1, size=n_rows),
+        'High': close + spread,
+        'Low': close - spread,
+        'Close': close,
+        'Volume': rng.integers(1_000, 1_000_000, size=n_rows).astype(np.float64),
+    })
+
+
+def make_panel(n_tickers: int, n_dates: int = PANEL_DATES, seed: int = 0) -> np.ndarray:
+    """Builds random-walk close, low and high prices for ``n_tickers`` tickers, as an array of shape (3, dates,
+    tickers)."""
+    rng = np.random.default_rng(seed)
+    panel = np.empty((3, n_dates, n_tickers))
+    panel[0] = 100 + rng.normal(size=(n_dates, n_tickers)).cumsum(axis=0)
+    spread = rng.uniform(0.5, 3, size=(n_dates, n_tickers))
+    np.subtract(panel[0], spread, out=panel[1])
+    np.add(panel[0], spread, out=panel[2])
+
+    return panel
+
+
+def _feature_store(df: pd.DataFrame, hit: bool) -> Callable[[], Any]:
+    """Times ``FeatureStore.compute`` of ``sma``, either served from the cache or computed and written to it."""
+    temp_dir = tempfile.TemporaryDirectory()
+    store = maths.FeatureStore(root_path=temp_dir.name, max_bytes=16 * 1024 ** 3)
+
+    def compute():
+        if not hit:
+            store.clear()
+        return store.compute(maths.sma, df=df, ticker='BENCH', metric_col='Close', rolling_window=20)
+
+    compute()
+    # The directory is removed once the case drops the closure holding it
+    compute.temp_dir = temp_dir
+
+    return compute
+
+
+def _stream(indicator_class: type, df: pd.DataFrame, **params) -> Callable[[], Any]:
+    """Times feeding every bar of ``df`` to a fresh streaming indicator."""
+    bars = df.to_dict('records')
+
+    def stream():
+        indicator = indicator_class(**params)
+        for bar in bars:
+            indicator.update(bar)
+        return indicator
+
+    return stream
+
+
+def _push(df: pd.DataFrame) -> Callable[[], Any]:
+    closes = df['Close'].tolist()
+
+    def push():
+        window = maths.RollingWindow(rolling_window=20)
+        for value in closes:
+            window.push(value)
+        return window
+
+    return push
+
+
+BANDS = dict(metric_col='Close', rolling_window=20)
+KELTNER = dict(metric_col='Close', low_col='Low', high_col='High', rolling_window=20)
+ALPHA = kernels.smoothing_factor(span=20)
+WINDOWS = (10, 20, 50)
+
+CASES = [
+    Case('maths.divide_kernel', (maths.divide_kernel,), 'scalar',
+         lambda _: lambda: maths.divide_kernel(numerator=3.0, denominator=4.0)),
+    Case('kernels.smoothing_factor', (kernels.smoothing_factor,), 'scalar',
+         lambda _: lambda: kernels.smoothing_factor(span=20)),
+
+    Case('maths.divide', (maths.divide,), 'rows',
+         lambda df: lambda: maths.divide(df=df, numerator_col='Close', denominator_col='Open')),
+    Case('maths.sma', (maths.sma,), 'rows', lambda df: lambda: maths.sma(df=df, **BANDS)),
+    Case('maths.ema', (maths.ema,), 'rows', lambda df: lambda: maths.ema(df=df, **BANDS)),
+    Case('maths.rolling_stddev', (maths.rolling_stddev,), 'rows',
+         lambda df: lambda: maths.rolling_stddev(df=df, **BANDS)),
+    Case('maths.lower_band', (maths.lower_band,), 'rows', lambda df: lambda: maths.lower_band(df=df, **BANDS)),
+    Case('maths.upper_band', (maths.upper_band,), 'rows', lambda df: lambda: maths.upper_band(df=df, **BANDS)),
+    Case('maths.bollinger_bands', (maths.bollinger_bands,), 'rows',
+         lambda df: lambda: maths.bollinger_bands(df=df, metric_col='Close', rolling_windows=WINDOWS,
+                                                  band_multipliers=(1.5, 2.0))),
+    Case('maths.true_range', (maths.true_range,), 'rows',
+         lambda df: lambda: maths.true_range(df=df, low_col='Low', high_col='High')),
+    Case('maths.avg_true_range', (maths.avg_true_range,), 'rows',
+         lambda df: lambda: maths.avg_true_range(df=df, low_col='Low', high_col='High', rolling_window=20)),
+    Case('maths.lower_keltner', (maths.lower_keltner,), 'rows',
+         lambda df: lambda: maths.lower_keltner(df=df, **KELTNER)),
+    Case('maths.upper_keltner', (maths.upper_keltner,), 'rows',
+         lambda df: lambda: maths.upper_keltner(df=df, **KELTNER)),
+    Case('maths.keltner_channels', (maths.keltner_channels,), 'rows',
+         lambda df: lambda: maths.keltner_channels(df=df, metric_col='Close', low_col='Low', high_col='High',
+                                                   rolling_windows=WINDOWS, keltner_multipliers=(1.0, 1.5))),
+    Case('maths.squeeze_indicators', (maths.squeeze_indicators,), 'rows',
+         lambda df: lambda: maths.squeeze_indicators(df=df, **KELTNER)),
+    Case('maths.is_in_squeeze', (maths.is_in_squeeze,), 'rows',
+         lambda df: lambda: maths.is_in_squeeze(df=df, **KELTNER)),
+
+    Case('kernels.rolling_mean', (kernels.rolling_mean,), 'rows',
+         lambda df: lambda: kernels.rolling_mean(values=df['Close'].to_numpy(), rolling_window=20)),
+    Case('kernels.rolling_stddev', (kernels.rolling_stddev,), 'rows',
+         lambda df: lambda: kernels.rolling_stddev(values=df['Close'].to_numpy(), rolling_window=20)),
+    Case('kernels.rolling_means', (kernels.rolling_means,), 'rows',
+         lambda df: lambda: kernels.rolling_means(values=df['Close'].to_numpy(), rolling_windows=WINDOWS)),
+    Case('kernels.rolling_stddevs', (kernels.rolling_stddevs,), 'rows',
+         lambda df: lambda: kernels.rolling_stddevs(values=df['Close'].to_numpy(), rolling_windows=WINDOWS)),
+    Case('kernels.true_range', (kernels.true_range,), 'rows',
+         lambda df: lambda: kernels.true_range(low=df['Low'].to_numpy(), high=df['High'].to_numpy())),
+    Case('kernels.ema_kernel', (kernels.ema_kernel,), 'rows',
+         lambda df: lambda: kernels.ema_kernel(values=df['Close'].to_numpy(), alpha=ALPHA)),
+    Case('kernels.squeeze_kernel', (kernels.squeeze_kernel,), 'rows',
+         lambda df: lambda: kernels.squeeze_kernel(close=df['Close'].to_numpy(), low=df['Low'].to_numpy(),
+                                                   high=df['High'].to_numpy(), rolling_window=20)),
+
+    Case('FeatureStore.compute[hit]', (maths.FeatureStore,), 'rows', lambda df: _feature_store(df=df, hit=True)),
+    Case('FeatureStore.compute[miss]', (maths.FeatureStore,), 'rows', lambda df: _feature_store(df=df, hit=False)),
+
+    Case('RollingWindow.push', (maths.RollingWindow,), 'rows', _push, STREAMING_MAX_ROWS),
+    Case('StreamingSma.update', (maths.StreamingSma,), 'rows',
+         lambda df: _stream(maths.StreamingSma, df=df, **BANDS), STREAMING_MAX_ROWS),
+    Case('StreamingStddev.update', (maths.StreamingStddev,), 'rows',
+         lambda df: _stream(maths.StreamingStddev, df=df, **BANDS), STREAMING_MAX_ROWS),
+    Case('StreamingEma.update', (maths.StreamingEma,), 'rows',
+         lambda df: _stream(maths.StreamingEma, df=df, **BANDS), STREAMING_MAX_ROWS),
+    Case('StreamingAvgTrueRange.update', (maths.StreamingAvgTrueRange,), 'rows',
+         lambda df: _stream(maths.StreamingAvgTrueRange, df=df, low_col='Low', high_col='High', rolling_window=20),
+         STREAMING_MAX_ROWS),
+    Case('StreamingBollingerBands.update', (maths.StreamingBollingerBands,), 'rows',
+         lambda df: _stream(maths.StreamingBollingerBands, df=df, **BANDS), STREAMING_MAX_ROWS),
+    Case('StreamingKeltnerChannels.update', (maths.StreamingKeltnerChannels,), 'rows',
+         lambda df: _stream(maths.StreamingKeltnerChannels, df=df, **KELTNER), STREAMING_MAX_ROWS),
+
+    Case('maths.squeeze_panel', (maths.squeeze_panel,), 'panel',
+         lambda panel: lambda: maths.squeeze_panel(panel=panel, rolling_window=20)),
+    Case('maths.is_in_squeeze_panel', (maths.is_in_squeeze_panel,), 'panel',
+         lambda panel: lambda: maths.is_in_squeeze_panel(panel=panel, rolling_window=20)),
+    Case('kernels.rolling_mean', (kernels.rolling_mean,), 'panel',
+         lambda panel: lambda: kernels.rolling_mean(values=panel[0], rolling_window=20)),
+    Case('kernels.rolling_stddev', (kernels.rolling_stddev,), 'panel',
+         lambda panel: lambda: kernels.rolling_stddev(values=panel[0], rolling_window=20)),
+    Case('kernels.rolling_means', (kernels.rolling_means,), 'panel',
+         lambda panel: lambda: kernels.rolling_means(values=panel[0], rolling_windows=WINDOWS)),
+    Case('kernels.rolling_stddevs', (kernels.rolling_stddevs,), 'panel',
+         lambda panel: lambda: kernels.rolling_stddevs(values=panel[0], rolling_windows=WINDOWS)),
+    Case('kernels.true_range', (kernels.true_range,), 'panel',
+         lambda panel: lambda: kernels.true_range(low=panel[1], high=panel[2])),
+    Case('kernels.ema_kernel', (kernels.ema_kernel,), 'panel',
+         lambda panel: lambda: kernels.ema_kernel(values=panel[0], alpha=ALPHA)),
+    Case('kernels.squeeze_kernel', (kernels.squeeze_kernel,), 'panel',
+         lambda panel: lambda: kernels.squeeze_kernel(close=panel[0], low=panel[1], high=panel[2],
+                                                      rolling_window=20)),
+]
+
+
+def uncovered(cases: Sequence[Case] = CASES) -> List[str]:
+    """Returns the public functions and classes no case exercises."""
+    covered = {id(target) for case in cases for target in case.targets}
+    seen = set()
+    missing = []
+    for prefix, module in [('maths', maths), ('kernels', kernels)]:
+        for name, obj in vars(module).items():
+            if name.startswith('_') or not callable(obj) or id(obj) in seen \
+                    or not getattr(obj, '__module__', '').startswith('wsbtrading.maths'):
+                continue
+            seen.add(id(obj))
+            if id(obj) not in covered:
+                missing.append(f'{prefix}.{name}')
+
+    return missing
+
+
+def best_time(func: Callable[[], Any], repeat: int = 5) -> float:
+    """Returns the best wall time of one call in seconds, looping fast calls so each timing lasts at least 0.2s."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """Returns the most memory a call had allocated at once, in bytes, its result included."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def case_key(case: Case, size: int) -> str:
+    """Names a case at a size in the results, e.g. 'maths.sma/rows=100000'."""
+    return case.name if case.data == 'scalar' else f'{case.name}/{case.data}={size}'
+
+
+def run_cases(cases: Sequence[Case], rows: Sequence[int], tickers: Sequence[int], repeat: int = 5,
+              report: Callable[[str, Dict[str, float]], None] = lambda key, result: None) \
+        -> Dict[str, Dict[str, float]]:
+    """Runs every case at every size it supports, building the data for one size at a time.
+
+    Returns:
+        the best wall time in seconds and the peak memory in bytes of each case, keyed by :func:`case_key`
+    """
+    results = {}
+    sizes = [('scalar', None)] + [('rows', n_rows) for n_rows in rows] + [('panel', n) for n in tickers]
+    for data_kind, size in sizes:
+        selected = [case for case in cases if case.data == data_kind
+                    and (size is None or case.max_size is None or size <= case.max_size)]
+        if not selected:
+            continue
+        data = make_ohlcv(n_rows=size) if data_kind == 'rows' else make_panel(n_tickers=size) \
+            if data_kind == 'panel' else None
+        for case in selected:
+            func = case.prepare(data)
+            key = case_key(case=case, size=size)
+            results[key] = {'peak_bytes': peak_memory(func), 'seconds': best_time(func, repeat=repeat)}
+            report(key, results[key])
+            del func
+        del data
+        gc.collect()
+
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float = 0.25,
+            memory_threshold: float = 0.25) -> List[str]:
+    """Finds the cases that got slower, or used more memory, than the baseline allows.
+
+    Args:
+        results: the results of this run, see :func:`run_cases`
+        baseline: the stored results to compare against
+        threshold: the largest slowdown tolerated, as a fraction of the baseline time, e.g. 0.25 for 25%
+        memory_threshold: the largest growth in peak memory tolerated, as a fraction of the baseline
+
+    Returns:
+        a description of each regression; cases missing from the baseline are not regressions
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        base_seconds, seconds = baseline[key]['seconds'], result['seconds']
+        if seconds > base_seconds * (1 + threshold):
+            regressions.append(f'{key}: {_format_seconds(seconds)} vs {_format_seconds(base_seconds)} '
+                               f'(x{seconds / base_seconds:.2f})')
+        base_bytes, peak_bytes = baseline[key]['peak_bytes'], result['peak_bytes']
+        if peak_bytes > base_bytes * (1 + memory_threshold) and peak_bytes - base_bytes > MIN_BYTES_CHANGE:
+            regressions.append(f'{key}: peak memory {_format_bytes(peak_bytes)} vs {_format_bytes(base_bytes)}')
+
+    return regressions
+
+
+def environment() -> Dict[str, str]:
+    """Describes the machine and library versions results were recorded with."""
+    return {
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': str(os.cpu_count()),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {'environment': {}, 'results': {}}
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]]) -> None:
+    """Merges results into the baseline at ``path``, keeping the entries of cases that were not run."""
+    baseline = load_baseline(path=path)
+    baseline['environment'] = environment()
+    baseline['recorded_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    baseline['results'] = dict(sorted({**baseline['results'], **results}.items()))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2)
+        baseline_file.write('\n')
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f'{seconds:.2f} s'
+    if seconds >= 1e-3:
+        return f'{seconds * 1e3:.2f} ms'
+    return f'{seconds * 1e6:.2f} us'
+
+
+def _format_bytes(n_bytes: float) -> str:
+    return f'{n_bytes / 1024 ** 2:.1f} MB' if n_bytes >= 1024 ** 2 else f'{n_bytes / 1024:.1f} KB'
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='*', default=list(ROW_COUNTS),
+                        help='the row counts to run the single-ticker cases at')
+    parser.add_argument('--tickers', type=int, nargs='*', default=list(TICKER_COUNTS),
+                        help=f'the ticker counts to run the panel cases at, over {PANEL_DATES} dates')
+    parser.add_argument('-k', '--filter', default='', help='only run the cases whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5, help='the number of timings to take the best of')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='the stored results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='the largest slowdown tolerated, as a fraction of the baseline time')
+    parser.add_argument('--memory-threshold', type=float, default=0.25,
+                        help='the largest growth in peak memory tolerated, as a fraction of the baseline')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    missing = uncovered()
+    if missing:
+        print(f'No benchmark covers {", ".join(missing)}; add a case to CASES.')
+        return 2
+
+    baseline = load_baseline(path=args.baseline)
+    if baseline['results'] and baseline['environment'] != environment():
+        print(f'Warning: the baseline was recorded on {baseline["environment"]}, not {environment()}; '
+              f'timings may not be comparable.')
+
+    def report(key: str, result: Dict[str, float]) -> None:
+        base = baseline['results'].get(key)
+        change = f'x{result["seconds"] / base["seconds"]:.2f}' if base else 'new'
+        print(f'{key:<52} {_format_seconds(result["seconds"]):>10} {_format_bytes(result["peak_bytes"]):>10} '
+              f'{change:>7}', flush=True)
+
+    cases = [case for case in CASES if args.filter in case.name]
+    results = run_cases(cases=cases, rows=args.rows, tickers=args.tickers, repeat=args.repeat, report=report)
+
+    if args.save_baseline:
+        save_baseline(path=args.baseline, results=results)
+        print(f'Saved {len(results)} results to {args.baseline}')
+        return 0
+
+    regressions = compare(results=results, baseline=baseline['results'], threshold=args.threshold,
+                          memory_threshold=args.memory_threshold)
+    if regressions:
+        print(f'{len(regressions)} regressions:')
+        print('\n'.join(f'  {regression}' for regression in regressions))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
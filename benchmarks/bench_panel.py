@@ -0,0 +1,48 @@
+"""Timings for opening and scanning a memory-mapped OHLCV panel of a full universe.
+
+Run from the repository root:
+
+.. code-block:: bash
+
+    python benchmarks/bench_panel.py
+"""
+import os
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from wsbtrading import maths
+from wsbtrading.data_io import ohlcv_panel
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def bench_panel(n_tickers: int = 8_000, years: int = 20, dtype: str = 'float32') -> None:
+    n_dates = years * TRADING_DAYS_PER_YEAR
+    rng = np.random.default_rng(0)
+    close = (100 + rng.normal(size=(n_dates, n_tickers)).cumsum(axis=0, dtype=np.float32)).astype(dtype)
+    spread = rng.uniform(0.5, 3, size=(n_dates, n_tickers)).astype(dtype)
+    fields = {'Close': close, 'High': close + spread, 'Low': close - spread}
+    tickers = [f'T{i:04d}' for i in range(n_tickers)]
+    dates = pd.bdate_range(end='2021-02-10', periods=n_dates)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'panel')
+        start = timeit.default_timer()
+        ohlcv_panel.write_panel(path=path, fields=fields, tickers=tickers, dates=dates, dtype=dtype)
+        write_seconds = timeit.default_timer() - start
+        size_mb = sum(entry.stat().st_size for entry in os.scandir(path)) / 1024 ** 2
+        del fields, close, spread
+
+        open_ms = min(timeit.repeat(lambda: ohlcv_panel.open_panel(path=path), number=1, repeat=5)) * 1e3
+        panel = ohlcv_panel.open_panel(path=path)
+        scan_ms = min(timeit.repeat(lambda: maths.is_in_squeeze_panel(panel=panel), number=1, repeat=5)) * 1e3
+
+    print(f'panel, {n_tickers:,} tickers x {years} years ({dtype}, {size_mb:,.0f} MB): written in {write_seconds:.1f}s, '
+          f'opened in {open_ms:.2f} ms, is_in_squeeze_panel in {scan_ms:.2f} ms')
+
+
+if __name__ == '__main__':
+    bench_panel()
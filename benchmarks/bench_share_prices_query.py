@@ -0,0 +1,98 @@
+"""Query latency of per-ticker time-range reads from a heap ``share_prices_daily`` versus the partitioned one.
+
+Needs a Postgres server reachable with the default :func:`wsbtrading.data_io.configure_pool` settings. The same
+synthetic prices are loaded into a plain heap table and into a copy partitioned by year with a ``(ticker, date)``
+primary key, and then read back with :func:`wsbtrading.data_io.read_table`. Both live in a schema of their own that is
+never committed, so nothing is left behind.
+
+Run from the repository root:
+
+.. code-block:: bash
+
+    python benchmarks/bench_share_prices_query.py
+"""
+import io
+import timeit
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from wsbtrading import data_io
+
+COLUMNS = """
+    ticker	    TEXT                        NOT NULL,
+    date	    TIMESTAMP WITH TIME ZONE    NOT NULL,
+    open	    DECIMAL(40,4),
+    high	    DECIMAL(40,4),
+    low         DECIMAL(40,4),
+    close	    DECIMAL(40,4),
+    volume	    DECIMAL(40,4)
+"""
+
+
+def make_share_prices(n_tickers: int, n_years: int, seed: int = 0) -> pd.DataFrame:
+    """Builds random-walk daily bars for ``n_tickers`` tickers over ``n_years`` years of business days."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2021-02-10', periods=n_years * 252, tz='UTC')
+    tickers = [f'T{i:04d}' for i in range(n_tickers)]
+    close = np.round(100 + rng.normal(size=(len(dates), n_tickers)).cumsum(axis=0), 4)
+
+    return pd.DataFrame({
+        'ticker': np.tile(tickers, len(dates)),
+        'date': np.repeat(dates, n_tickers),
+        'open': close.ravel(),
+        'high': close.ravel() + 1,
+        'low': close.ravel() - 1,
+        'close': close.ravel(),
+        'volume': rng.integers(1_000, 1_000_000, size=close.size),
+    })
+
+
+def _create_tables(cur, first_year: int, last_year: int) -> None:
+    cur.execute('CREATE SCHEMA bench_share_prices')
+    cur.execute('SET LOCAL search_path TO bench_share_prices')
+    cur.execute(f'CREATE TABLE share_prices_heap ({COLUMNS})')
+    cur.execute(f'CREATE TABLE share_prices_partitioned ({COLUMNS}, PRIMARY KEY (ticker, date)) '
+                f'PARTITION BY RANGE (date)')
+    for year in range(first_year, last_year + 1):
+        cur.execute(f"CREATE TABLE share_prices_partitioned_{year} PARTITION OF share_prices_partitioned "
+                    f"FOR VALUES FROM ('{year}-01-01 00:00:00+00') TO ('{year + 1}-01-01 00:00:00+00')")
+    data_io.invalidate_table_schemas()
+
+
+def _latency_ms(func, repeat: int = 20) -> float:
+    """Returns the median wall time of ``func`` in milliseconds."""
+    return float(np.median(timeit.repeat(func, number=1, repeat=repeat))) * 1e3
+
+
+def bench_read_table(n_tickers: int = 500, n_years: int = 20) -> None:
+    df = make_share_prices(n_tickers=n_tickers, n_years=n_years)
+    csv_text = df.to_csv(header=False, index=False)
+
+    try:
+        with data_io.pooled_connection() as (_, cur):
+            _create_tables(cur, first_year=df['date'].min().year, last_year=df['date'].max().year)
+            for table_name in ['share_prices_heap', 'share_prices_partitioned']:
+                cur.copy_expert(f'COPY {table_name} FROM STDIN WITH (FORMAT csv)', io.StringIO(csv_text))
+                cur.execute(f'ANALYZE {table_name}')
+
+            print(f'{len(df):,} rows, {n_tickers} tickers over {n_years} years')
+            for label, kwargs in [('1 ticker, 1 year', {'tickers': ['T0042'], 'start_date': '2020-01-01',
+                                                        'end_date': '2020-12-31'}),
+                                  ('1 ticker, all years', {'tickers': ['T0042']}),
+                                  ('50 tickers, 3 months', {'tickers': [f'T{i:04d}' for i in range(50)],
+                                                            'start_date': '2020-10-01', 'end_date': '2020-12-31'})]:
+                timings = {table_name: _latency_ms(lambda: data_io.read_table(table_name=table_name, cur=cur,
+                                                                               **kwargs))
+                           for table_name in ['share_prices_heap', 'share_prices_partitioned']}
+                print(f'{label}: heap {timings["share_prices_heap"]:.1f} ms, '
+                      f'partitioned {timings["share_prices_partitioned"]:.1f} ms')
+    except psycopg2.OperationalError as e:
+        print(f'Skipping the query benchmark, no Postgres server: {e}')
+    finally:
+        data_io.invalidate_table_schemas()
+
+
+if __name__ == '__main__':
+    bench_read_table()
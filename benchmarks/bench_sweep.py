@@ -0,0 +1,44 @@
+"""Timings for a walk-forward sweep of the squeeze strategy's parameters over a universe.
+
+Run from the repository root:
+
+.. code-block:: bash
+
+    python benchmarks/bench_sweep.py
+"""
+import os
+import tempfile
+import timeit
+
+import pandas as pd
+
+from bench_backtest import TRADING_DAYS_PER_YEAR, make_fields
+from wsbtrading.backtest import sweep
+from wsbtrading.data_io import ohlcv_panel
+
+
+def bench_sweep(n_tickers: int = 1_000, years: int = 10, dtype: str = 'float32') -> None:
+    n_dates = years * TRADING_DAYS_PER_YEAR
+    tickers = [f'T{i:04d}' for i in range(n_tickers)]
+    dates = pd.bdate_range(end='2021-02-10', periods=n_dates)
+    params = sweep.grid({'rolling_window': [10, 20, 40], 'look_back_period': [-1, -3],
+                         'band_multiplier': [1.5, 2.0, 2.5], 'keltner_multiplier': [1.0, 1.5, 2.0]})
+    splits = sweep.walk_forward_splits(dates=dates, train_days=3 * TRADING_DAYS_PER_YEAR, test_days=63)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, 'panel')
+        ohlcv_panel.write_panel(path=path, fields=dict(make_fields(n_tickers=n_tickers, n_dates=n_dates, dtype=dtype)),
+                                tickers=tickers, dates=dates, dtype=dtype)
+
+        start = timeit.default_timer()
+        result = sweep.run_sweep(path=path, params=params, splits=splits, max_workers=os.cpu_count(),
+                                 commission_bps=1.0, slippage_bps=5.0)
+        seconds = timeit.default_timer() - start
+
+    print(f'run_sweep, {len(params)} combinations x {len(splits)} splits, {n_tickers:,} tickers x {years} years '
+          f'({dtype}), {os.cpu_count()} workers: {seconds:.1f}s ({seconds / len(params):.2f}s per combination); '
+          f'out-of-sample Sharpe ratio {result.stats["sharpe_ratio"]:.2f}')
+
+
+if __name__ == '__main__':
+    bench_sweep()
@@ -1,7 +1,9 @@
 import psycopg2
+from psycopg2 import sql
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
 from utilities.user_dir import user_dir
+from wsbtrading.data_io import data_io
 
 __author__ = 'bordumb'
 __copyright__ = 'Copyright (C) 2018 Josh Schertz'
@@ -84,6 +86,142 @@ def create_database(admin_user='postgres', admin_password='postgres',
         raise SystemError('Error: An unknown issue occurred in create_database')
 
 
+FIRST_PARTITION_YEAR = 1990
+LAST_PARTITION_YEAR = 2040
+
+
+def yearly_partitions(cur, table_name, first_year=FIRST_PARTITION_YEAR,
+                      last_year=LAST_PARTITION_YEAR):
+    """ Create one partition per calendar year (UTC) of a table partitioned by
+    RANGE (date), a default partition for dates outside those years, and a
+    BRIN index on date for scans across every ticker. The (ticker, date)
+    primary key gives each partition a B-tree for per-ticker ranges. Existing
+    partitions are left alone. A table that already exists unpartitioned, from
+    before the partitioned layout, is skipped with a pointer to
+    migrate_to_partitioned, rather than failing the transaction it runs in.
+
+    :param cur: Cursor to execute the statements with
+    :param table_name: String of the partitioned table
+    :param first_year: Integer of the first year to create a partition for
+    :param last_year: Integer of the last year to create a partition for
+    """
+
+    cur.execute("""SELECT 1 FROM pg_catalog.pg_partitioned_table
+                WHERE partrelid = to_regclass(%s)""", (table_name,))
+    if cur.fetchone() is None:
+        print('%s is not partitioned, so its partitions were not created. Run '
+              'migrate_to_partitioned(%r) to move it into the partitioned layout.' % (table_name, table_name))
+        return
+
+    table = sql.Identifier(table_name)
+    for year in range(first_year, last_year + 1):
+        cur.execute(sql.SQL("""
+            CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table}
+            FOR VALUES FROM ({start}) TO ({end})
+        """).format(partition=sql.Identifier('%s_%d' % (table_name, year)), table=table,
+                    start=sql.Literal('%d-01-01 00:00:00+00' % year),
+                    end=sql.Literal('%d-01-01 00:00:00+00' % (year + 1))))
+
+    cur.execute(sql.SQL('CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table} DEFAULT').format(
+        partition=sql.Identifier('%s_default' % table_name), table=table))
+    cur.execute(sql.SQL('CREATE INDEX IF NOT EXISTS {index} ON {table} USING BRIN (date)').format(
+        index=sql.Identifier('%s_date_brin' % table_name), table=table))
+
+
+def fundamentals_daily(c):
+    """ Create the partitioned fundamentals_daily table and its partitions, if it doesn't exist.
+
+    :param c: Cursor to execute the statements with
+    """
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS fundamentals_daily
+        (
+            ticker	    TEXT                        NOT NULL,
+            date	    TIMESTAMP WITH TIME ZONE    NOT NULL,
+            lastupdated	TIMESTAMP WITH TIME ZONE,
+            ev	        DOUBLE PRECISION,
+            evebit	    DOUBLE PRECISION,
+            evebitda    DOUBLE PRECISION,
+            marketcap	DOUBLE PRECISION,
+            pbook	    DOUBLE PRECISION,
+            pearnings   DOUBLE PRECISION,
+            psales      DOUBLE PRECISION,
+            PRIMARY KEY (ticker, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    yearly_partitions(c, 'fundamentals_daily')
+
+
+def share_prices_daily(c):
+    """ Create the partitioned share_prices_daily table and its partitions, if it doesn't exist.
+
+    :param c: Cursor to execute the statements with
+    """
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS share_prices_daily
+        (
+            ticker	    TEXT                        NOT NULL,
+            date	    TIMESTAMP WITH TIME ZONE    NOT NULL,
+            open	    DECIMAL(40,4),
+            high	    DECIMAL(40,4),
+            low         DECIMAL(40,4),
+            close	    DECIMAL(40,4),
+            volume	    DECIMAL(40,4),
+            dividends	DECIMAL(40,4),
+            closeunadj  DECIMAL(40,4),
+            lastupdated	TIMESTAMP WITH TIME ZONE,
+            PRIMARY KEY (ticker, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    yearly_partitions(c, 'share_prices_daily')
+
+
+def stock_tickers(c):
+    """ Create the stock_tickers table, if it doesn't exist.
+
+    :param c: Cursor to execute the statements with
+    """
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS stock_tickers
+        (
+            table_nickname	    TEXT,
+            permaticker         INTEGER,
+            ticker	            TEXT,
+            company_name	    TEXT,
+            exchange	        TEXT,
+            isdelisted	        TEXT,
+            category	        TEXT,
+            cusips	            TEXT,
+            siccode	            TEXT,
+            sicsector	        TEXT,
+            sicindustry	        TEXT,
+            famasector	        TEXT,
+            famaindustry	    TEXT,
+            sector	            TEXT,
+            industry	        TEXT,
+            scalemarketcap	    TEXT,
+            scalerevenue	    TEXT,
+            relatedtickers	    TEXT,
+            currency	        TEXT,
+            location	        TEXT,
+            lastupdated	        TEXT,
+            firstadded	        TEXT,
+            firstpricedate	    DATE,
+            lastpricedate	    DATE,
+            firstquarter	    DATE,
+            lastquarter	        DATE,
+            secfilings	        TEXT,
+            companysite         TEXT
+        )
+    """)
+
+
+PARTITIONED_TABLES = {'fundamentals_daily': fundamentals_daily, 'share_prices_daily': share_prices_daily}
+
+
 def data_tables(database='wsbtrading', user='postgres',
                 password='postgres', host='localhost', port=5432):
 
@@ -93,98 +231,13 @@ def data_tables(database='wsbtrading', user='postgres',
         with conn:
             cur = conn.cursor()
 
-            def fundamentals_daily(c):
-                c.execute("""
-                    CREATE TABLE IF NOT EXISTS fundamentals_daily
-                    (
-                        ticker	    TEXT,
-                        date	    TIMESTAMP WITH TIME ZONE    NOT NULL,
-                        lastupdated	TIMESTAMP WITH TIME ZONE,
-                        ev	        TEXT,
-                        evebit	    TEXT,
-                        evebitda    TEXT,
-                        marketcap	TEXT,
-                        pbook	    TEXT,
-                        pearnings   TEXT,
-                        psales      TEXT
-                    )
-                """)
-                # This is ideal, but breaks on import ERROR: COPY fundamentals_daily, line 2, column ps: ""
-                # c.execute("""
-                #     CREATE TABLE IF NOT EXISTS fundamentals_daily
-                #     (
-                #         ticker	    TEXT,
-                #         date	    TIMESTAMP WITH TIME ZONE    NOT NULL,
-                #         lastupdated	TIMESTAMP WITH TIME ZONE,
-                #         ev	        DECIMAL(40,4),
-                #         evebit	    DECIMAL(40,4),
-                #         evebitda    DECIMAL(40,4),
-                #         marketcap	DECIMAL(40,4),
-                #         pbook	    DECIMAL(40,4),
-                #         pearnings   DECIMAL(40,4),
-                #         psales      DECIMAL(40,4)
-                #     )
-                # """)
-
-            def share_prices_daily(c):
-                c.execute("""
-                    CREATE TABLE IF NOT EXISTS share_prices_daily
-                    (
-                        ticker	    TEXT,
-                        date	    TIMESTAMP WITH TIME ZONE    NOT NULL,
-                        open	    DECIMAL(40,4),
-                        high	    DECIMAL(40,4),
-                        low         DECIMAL(40,4),
-                        close	    DECIMAL(40,4),
-                        volume	    DECIMAL(40,4),
-                        dividends	DECIMAL(40,4),
-                        closeunadj  DECIMAL(40,4),
-                        lastupdated	TIMESTAMP WITH TIME ZONE
-                    )
-                """)
-
-
-            def stock_tickers(c):
-                c.execute("""
-                    CREATE TABLE IF NOT EXISTS stock_tickers
-                    (
-                        table_nickname	    TEXT,
-                        permaticker         INTEGER,
-                        ticker	            TEXT,
-                        company_name	    TEXT,
-                        exchange	        TEXT,
-                        isdelisted	        TEXT,
-                        category	        TEXT,
-                        cusips	            TEXT,
-                        siccode	            TEXT,
-                        sicsector	        TEXT,
-                        sicindustry	        TEXT,
-                        famasector	        TEXT,
-                        famaindustry	    TEXT,
-                        sector	            TEXT,
-                        industry	        TEXT,
-                        scalemarketcap	    TEXT,
-                        scalerevenue	    TEXT,
-                        relatedtickers	    TEXT,
-                        currency	        TEXT,
-                        location	        TEXT,
-                        lastupdated	        TEXT,
-                        firstadded	        TEXT,
-                        firstpricedate	    DATE,
-                        lastpricedate	    DATE,
-                        firstquarter	    DATE,
-                        lastquarter	        DATE,
-                        secfilings	        TEXT,
-                        companysite         TEXT
-                    )
-                """)
-
             fundamentals_daily(cur)
             share_prices_daily(cur)
             stock_tickers(cur)
 
             conn.commit()
             cur.close()
+            data_io.invalidate_table_schemas()
 
             print('All tables in data_tables are created')
 
@@ -202,6 +255,135 @@ def data_tables(database='wsbtrading', user='postgres',
         raise SystemError('Error: An unknown issue occurred in data_tables')
 
 
+def migrate_to_partitioned(table_name, database='wsbtrading', user='postgres',
+                           password='postgres', host='localhost', port=5432):
+    """ Move an existing heap share_prices_daily or fundamentals_daily table
+    into the partitioned layout built by data_tables. The heap table is
+    renamed to <table_name>_heap, the partitioned table is created in its
+    place and the rows are copied over, keeping the most recently updated row
+    of any duplicated (ticker, date). All of it runs in one transaction, so
+    any error rolls the database back to the heap table. The heap table is
+    kept so it can be checked before it is dropped by hand. Run
+    migrate_fundamentals_daily first, so the fundamentals columns already have
+    the types of the partitioned table.
+
+    :param table_name: String of the table to migrate
+    :param database: String of the database holding the table
+    :param user: String of the user to connect as
+    :param password: String of the user's password
+    :param host: String of the database host
+    :param port: Integer of the database port
+    """
+
+    if table_name not in PARTITIONED_TABLES:
+        print('%s has no partitioned layout, nothing to migrate.' % table_name)
+        return
+
+    conn = psycopg2.connect(database=database, user=user, password=password, host=host, port=port)
+
+    try:
+        with conn:
+            cur = conn.cursor()
+
+            cur.execute("""SELECT relkind FROM pg_catalog.pg_class
+                        WHERE oid = to_regclass(%s)""", (table_name,))
+            relkind = cur.fetchone()
+            if relkind is None or relkind[0] != 'r':
+                print('%s is not a heap table, nothing to migrate.' % table_name)
+                cur.close()
+                return
+
+            heap = '%s_heap' % table_name
+            cur.execute(sql.SQL('ALTER TABLE {table} RENAME TO {heap}').format(
+                table=sql.Identifier(table_name), heap=sql.Identifier(heap)))
+            PARTITIONED_TABLES[table_name](cur)
+
+            cur.execute(sql.SQL("""
+                INSERT INTO {table}
+                SELECT DISTINCT ON (ticker, date) * FROM {heap}
+                WHERE ticker IS NOT NULL AND date IS NOT NULL
+                ORDER BY ticker, date, lastupdated DESC NULLS LAST
+            """).format(table=sql.Identifier(table_name), heap=sql.Identifier(heap)))
+            print('Copied %d rows from %s into the partitioned %s' % (cur.rowcount, heap, table_name))
+            cur.execute(sql.SQL('ANALYZE {table}').format(table=sql.Identifier(table_name)))
+
+            conn.commit()
+            cur.close()
+            data_io.invalidate_table_schemas(table_name=table_name)
+
+    except psycopg2.Error as e:
+        conn.rollback()
+        print('Failed to migrate the %s table, nothing was changed' % table_name)
+        print(e)
+        return
+    except conn.OperationalError:
+        print('Unable to connect to the SQL Database in migrate_to_partitioned. '
+              'Make sure the database address/name are correct.')
+        return
+    except Exception as e:
+        conn.rollback()
+        print(e)
+        raise SystemError('Error: An unknown issue occurred in migrate_to_partitioned')
+
+
+FUNDAMENTALS_NUMERIC_COLUMNS = ['ev', 'evebit', 'evebitda', 'marketcap', 'pbook', 'pearnings', 'psales']
+
+
+def migrate_fundamentals_daily(database='wsbtrading', user='postgres',
+                               password='postgres', host='localhost', port=5432):
+    """ Convert the numeric columns of a fundamentals_daily table created
+    before they were typed from TEXT to DOUBLE PRECISION. Blank strings become
+    NULL. All columns are converted in a single ALTER TABLE, so the table is
+    rewritten once, and columns that are already typed are left alone, so this
+    is safe to run more than once.
+
+    :param database: String of the database holding the table
+    :param user: String of the user to connect as
+    :param password: String of the user's password
+    :param host: String of the database host
+    :param port: Integer of the database port
+    """
+
+    conn = psycopg2.connect(database=database, user=user, password=password, host=host, port=port)
+
+    try:
+        with conn:
+            cur = conn.cursor()
+
+            cur.execute("""SELECT column_name FROM information_schema.columns
+                        WHERE table_schema = current_schema()
+                        AND table_name = 'fundamentals_daily'
+                        AND data_type = 'text'""")
+            text_columns = [row[0] for row in cur.fetchall() if row[0] in FUNDAMENTALS_NUMERIC_COLUMNS]
+
+            if text_columns:
+                cur.execute(sql.SQL('ALTER TABLE fundamentals_daily {}').format(sql.SQL(', ').join(
+                    sql.SQL("ALTER COLUMN {column} TYPE DOUBLE PRECISION "
+                            "USING NULLIF(trim({column}), '')::DOUBLE PRECISION").format(column=sql.Identifier(column))
+                    for column in text_columns)))
+                cur.execute('ANALYZE fundamentals_daily')
+                print('Converted %s in fundamentals_daily' % ', '.join(text_columns))
+            else:
+                print('fundamentals_daily is already migrated.')
+
+            conn.commit()
+            cur.close()
+            data_io.invalidate_table_schemas(table_name='fundamentals_daily')
+
+    except psycopg2.Error as e:
+        conn.rollback()
+        print('Failed to migrate the fundamentals_daily table')
+        print(e)
+        return
+    except conn.OperationalError:
+        print('Unable to connect to the SQL Database in migrate_fundamentals_daily. '
+              'Make sure the database address/name are correct.')
+        return
+    except Exception as e:
+        print(e)
+        raise SystemError('Error: An unknown issue occurred in migrate_fundamentals_daily')
+
+
 if __name__ == '__main__':
 
     create_database()
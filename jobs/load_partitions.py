@@ -0,0 +1,29 @@
+"""
+This job loads every partition file matching a glob into Postgres, several files at a time.
+Partitions loaded by an earlier run are skipped, so it can be rerun after a failure.
+
+    python load_partitions.py '../data/prod/*/daily/date=*/file.csv' --workers 8 --limit share_prices_daily=4
+"""
+import argparse
+
+from wsbtrading.data_io import ingest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load partition files into Postgres in parallel.')
+    parser.add_argument('pattern', help='a glob of partition files, e.g. data/prod/*/daily/date=*/file.csv')
+    parser.add_argument('--workers', type=int, default=4, help='the number of worker processes')
+    parser.add_argument('--limit', action='append', default=[], metavar='TABLE=N',
+                        help='load at most N partitions of TABLE at once; may be repeated')
+    args = parser.parse_args()
+
+    table_limits = {}
+    for limit in args.limit:
+        table_name, _, count = limit.partition('=')
+        table_limits[table_name] = int(count)
+
+    ingest.ingest_partitions(pattern=args.pattern, max_workers=args.workers, table_limits=table_limits)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,42 +1,36 @@
-import os
-import pandas as pd
+import argparse
 from datetime import datetime
+from typing import Iterator
+
+import pandas as pd
 
-from wsbtrading.data_io import data_io
+from wsbtrading.data_io import columnar_store, data_io, listing_status
 from wsbtrading.instrumentation import AlphaAdvantage as iAlphaAdvantage
 
 today_date = datetime.today().strftime('%Y-%m-%d')
-CSV = data_io.CSV
 
 
-def pull_company_listing_status() -> 'pd.DataFrame':
-    """Pulls a list of de-listed companies from Alpha Advantage (www.alphavantage.co/documentation/)
+def pull_company_listing_status(chunk_size: int = 10_000) -> Iterator['pd.DataFrame']:
+    """Pulls the de-listed and listed companies from Alpha Advantage (www.alphavantage.co/documentation/), in chunks
 
-    The company listing schema is:
+    Both lists are downloaded at once, see :func:`wsbtrading.data_io.listing_status.iter_listing_chunks`. The company
+    listing schema is:
 
     .. code-block::
 
         root
         |-- symbol: string (nullable = true)
         |-- name: string (nullable = true)
-        |-- assetType: string (nullable = true)
+        |-- exchange: category (nullable = true)
+        |-- assetType: category (nullable = true)
         |-- ipoDate: date (nullable = true)
         |-- delistingDate: date (nullable = true)
-        |-- status: string (nullable = true); values are ``Delisted`` or ``Active``
+        |-- status: category (nullable = true); values are ``Delisted`` or ``Active``
         |-- date_created: date (nullable = true)
     """
-    api_key = iAlphaAdvantage.api_key
-    appended_data = []
-
-    for state in ['delisted', 'listed']:
-        api_url = f'https://www.alphavantage.co/query?function=LISTING_STATUS&state={state}&apikey={api_key}'
-        df = pd.read_csv(f'{api_url}')
-        appended_data.append(df)
-
-    df = pd.concat(appended_data)
-    df['date_created'] = today_date
-
-    return df
+    for chunk in listing_status.iter_listing_chunks(api_key=iAlphaAdvantage.api_key, chunk_size=chunk_size):
+        chunk['date_created'] = today_date
+        yield chunk
 
 
 # TODO: create enhanced metadata, such as days it took to be delisted, age of companies in days, etc.
@@ -45,21 +39,26 @@ def pull_company_listing_status() -> 'pd.DataFrame':
 
 
 def main():
-    # -------
-    # Read  |
-    # -------
-    pandas_df = pull_company_listing_status()
-
-    # --------
-    # Write  |
-    # --------
-    pandas_df.to_csv(f'../../data/prod/stock_tickers/daily/date={today_date}/file.csv')
-
-    # path_to_write = data_io.generate_path_to_write(environment='prod',
-    #                                                granularity='daily',
-    #                                                dataset_name='stock_ticker_list')
-    #
-    # aggregate_raw.repartition(10).write.mode('overwrite').parquet(path_to_write)
+    parser = argparse.ArgumentParser(description='Pull the listing status of every ticker from Alpha Advantage.')
+    parser.add_argument('--sink', choices=['columnar_store', 'postgres'], default='columnar_store',
+                        help='write a stock_ticker_list snapshot, or load the company_listing_status table')
+    args = parser.parse_args()
+
+    # --------------------
+    # Read and write     |
+    # --------------------
+    chunks = pull_company_listing_status()
+    if args.sink == 'columnar_store':
+        columnar_store.write_dataset(df=chunks,
+                                     environment='prod',
+                                     granularity='daily',
+                                     dataset_name='stock_ticker_list',
+                                     partition_cols=['date_created'])
+    else:
+        with data_io.pooled_connection() as (conn, cur):
+            rows = data_io.copy_frames(cur=cur, table_name='company_listing_status', frames=chunks, index=True)
+            conn.commit()
+        print(f'Loaded {rows} rows into company_listing_status')
 
 
 if __name__ == '__main__':
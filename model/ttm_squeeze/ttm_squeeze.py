@@ -1,28 +1,36 @@
-from wsbtrading.data_io import snapshot_daily
-from wsbtrading.maths import is_in_squeeze
-from wsbtrading.order import order
+import os
 
-dict_of_df = snapshot_daily.read_snapshot()
-stock_ticker_list = dict_of_df.values()
+from wsbtrading.data_io import ohlcv_panel, snapshot_daily
+from wsbtrading.maths import is_in_squeeze_panel
+from wsbtrading.order import order_client
 
-# TODO: differentiate between a positive squeeze or negative squeeze to determine if buying or selling is a good idea
-for stock_ticker in stock_ticker_list:
-    df = dict_of_df[stock_ticker]
-    is_in_squeeze = is_in_squeeze(df=df,
-                                  metric_col='Close',
-                                  low_col='Low',
-                                  high_col='High',
-                                  rolling_window=20)
+PANEL_PATH = os.path.join(os.path.expanduser('~'), '.wsbtrading', 'panels', 'daily')
+
+# The universe is kept as a memory-mapped panel, so opening it is instant and only the last few weeks of bars the scan
+# needs are read off disk. It is rebuilt whenever the daily snapshot changes: new bars, new tickers or revised bars.
+panel = ohlcv_panel.refresh_panel(path=PANEL_PATH, frames=snapshot_daily.read_snapshot())
+squeeze_flags = is_in_squeeze_panel(panel=panel,
+                                    metric_col='Close',
+                                    low_col='Low',
+                                    high_col='High',
+                                    rolling_window=20)
 
+# TODO: differentiate between a positive squeeze or negative squeeze to determine if buying or selling is a good idea
+orders = []
+for stock_ticker, is_in_squeeze in squeeze_flags.items():
     if is_in_squeeze:
         print('value will print money!')
-        order.execute_order(symbol=stock_ticker,
-                            qty=100,
-                            side='buy',
-                            type='market',
-                            time_in_force='gtc',
-                            trading_type='paper_trading')
+        orders.append(order_client.build_order(stock_ticker=stock_ticker,
+                                               qty=100,
+                                               side='buy',
+                                               type='market',
+                                               time_in_force='gtc'))
 
     else:
         print('This stock is junk!')
         print('Not touching it with a 10-foot stick.')
+
+# All the orders go out together, over one connection pool, instead of one blocking request per ticker
+for result in order_client.submit_orders(orders=orders, trading_type='paper_trading'):
+    if not result.ok:
+        print(f'Order for {result.order["symbol"]} failed: {result.error}')
@@ -0,0 +1,2 @@
+from wsbtrading.backtest.backtest import *
+from wsbtrading.backtest.sweep import *
@@ -0,0 +1,379 @@
+"""A vectorized backtester for strategies built from the :mod:`wsbtrading.maths` indicators.
+
+A strategy is one or more signal functions. Each takes an :class:`~wsbtrading.data_io.ohlcv_panel.OhlcvPanel` and
+returns an array of shape (dates, tickers) holding the position it wants in every ticker at every close: ``1`` for
+long, ``-1`` for short, ``0`` or ``NaN`` for flat, or anything in between. Positions worked out beforehand, e.g. by
+:func:`wsbtrading.backtest.sweep.run_sweep`, can be passed as that array instead of a function.
+:func:`run_backtest` sizes those positions into portfolio weights, fills them at the next open (or at the same close),
+charges commissions and slippage on what was traded, and reports the daily returns, PnL, drawdown and turnover.
+
+Everything is computed with array operations over blocks of tickers, all dates at once, so there is no loop over bars
+and memory stays at a few arrays of one block's size plus one (dates, tickers) array of positions.
+
+The simulation assumes:
+
+- positions are held as weights of the portfolio's value, and are only traded when their target weight changes;
+- fills are for the full size at the fill price, plus ``slippage_bps`` of what was traded;
+- a ticker can only be held on dates it has both a fill price and a close; a position whose prices stop, e.g. on a
+  delisting, is closed at its last close.
+"""
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from wsbtrading import maths
+from wsbtrading.instrumentation import profiling
+from wsbtrading.maths import kernels
+
+TRADING_DAYS_PER_YEAR = 252
+FILLS = ('next_open', 'close')
+SIZINGS = ('equal', 'fixed')
+STATS = ('total_return', 'annualized_return', 'annualized_volatility', 'sharpe_ratio', 'max_drawdown',
+         'annual_turnover', 'total_costs')
+
+Signal = Callable[['OhlcvPanel'], np.ndarray]
+
+
+def squeeze_signal(rolling_window: int = 20, metric_col: str = 'Close', low_col: str = 'Low',
+                   high_col: str = 'High', look_back_period: int = -1,
+                   band_multiplier: float = kernels.BAND_MULTIPLIER,
+                   keltner_multiplier: float = kernels.KELTNER_MULTIPLIER) -> Signal:
+    """Goes long every ticker while it is in a squeeze, as the ttm_squeeze model does.
+
+    Args:
+        rolling_window: the time window to calculate over
+        metric_col: the field to calculate over (usually the 'Close' price)
+        low_col: the field with the low price
+        high_col: the field with the high price
+        look_back_period: which day's squeeze to trade on, as in :func:`wsbtrading.maths.is_in_squeeze`: -1 for the
+                          latest close, -3 for two closes before it
+        band_multiplier: the width of the Bollinger bands, in moving standard deviations
+        keltner_multiplier: the width of the Keltner channels, in average true ranges
+
+    Returns:
+        the signal function
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import backtest
+        result = backtest.run_backtest(panel=panel, signals=[backtest.squeeze_signal(rolling_window=20)])
+    """
+    if look_back_period >= 0:
+        raise ValueError(f'look_back_period must be negative, got {look_back_period}.')
+
+    def signal(panel: 'OhlcvPanel') -> np.ndarray:
+        flags = maths.squeeze_panel(panel=panel, metric_col=metric_col, low_col=low_col, high_col=high_col,
+                                    rolling_window=rolling_window, band_multiplier=band_multiplier,
+                                    keltner_multiplier=keltner_multiplier)
+
+        return lag(flags, periods=-1 - look_back_period)
+
+    return signal
+
+
+def lag(positions: np.ndarray, periods: int) -> np.ndarray:
+    """Delays positions by a number of dates, wanting none before the first.
+
+    Args:
+        positions: an array of shape (dates, tickers)
+        periods: the number of dates to delay by
+
+    Returns:
+        an array of the same shape and type, or ``positions`` itself when ``periods`` is 0
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import backtest, maths
+        positions = backtest.lag(maths.squeeze_panel(panel=panel), periods=2)
+    """
+    if periods == 0:
+        return positions
+    lagged = np.zeros_like(positions)
+    lagged[periods:] = positions[:-periods]
+
+    return lagged
+
+
+def trend_signal(rolling_window: int = 50, metric_col: str = 'Close', short: bool = False) -> Signal:
+    """Goes long every ticker trading above its simple moving average, and short or flat below it.
+
+    Args:
+        rolling_window: the time window of the moving average
+        metric_col: the field to calculate over (usually the 'Close' price)
+        short: whether to go short below the moving average, rather than flat
+
+    Returns:
+        the signal function
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import backtest
+        result = backtest.run_backtest(panel=panel, signals=[backtest.trend_signal(rolling_window=200)])
+    """
+    def signal(panel: 'OhlcvPanel') -> np.ndarray:
+        prices = np.asarray(panel[metric_col], dtype=np.float64)
+        average = kernels.rolling_mean(values=prices, rolling_window=rolling_window)
+        with np.errstate(invalid='ignore'):
+            positions = (prices > average).astype(np.float64)
+            if short:
+                positions -= prices < average
+
+        return positions
+
+    return signal
+
+
+class BacktestResult(NamedTuple):
+    """What a backtest made and traded, per date.
+
+    Args:
+        returns: the portfolio's return on each date, after costs
+        equity: the portfolio's value at each close
+        pnl: the change in the portfolio's value on each date
+        drawdown: how far the portfolio's value is below its running peak, as a fraction (0 at a new high)
+        turnover: the sum of the absolute weight changes traded on each date, so 2.0 is selling the whole portfolio
+                  and buying a new one
+        costs: the commissions and slippage paid on each date, as a fraction of the portfolio's value
+        exposure: the gross weight held at each close, e.g. 1.0 for fully invested
+        ticker_returns: each ticker's summed contribution to the portfolio's returns, before costs
+        initial_capital: the portfolio's value before the first date
+    """
+    returns: pd.Series
+    equity: pd.Series
+    pnl: pd.Series
+    drawdown: pd.Series
+    turnover: pd.Series
+    costs: pd.Series
+    exposure: pd.Series
+    ticker_returns: pd.Series
+    initial_capital: float
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Summarizes the backtest: total and annualized return, volatility, Sharpe ratio (without a risk-free rate),
+        maximum drawdown, annual turnover and the total paid in costs."""
+        return summarize(returns=self.returns.to_numpy(), turnover=self.turnover.to_numpy(),
+                         costs=self.costs.to_numpy(), initial_capital=self.initial_capital)
+
+
+def summarize(returns: np.ndarray, turnover: np.ndarray, costs: np.ndarray, initial_capital: float) -> Dict[str, float]:
+    """Summarizes daily returns after costs, turnover and costs, as :attr:`BacktestResult.stats` does.
+
+    Args:
+        returns: the portfolio's return on each date, after costs
+        turnover: the sum of the absolute weight changes traded on each date
+        costs: the commissions and slippage paid on each date, as a fraction of the portfolio's value
+        initial_capital: the portfolio's value before the first date
+
+    Returns:
+        the total and annualized return, annualized volatility, Sharpe ratio, maximum drawdown, annual turnover and
+        the total paid in costs
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import backtest
+        result = backtest.run_backtest(panel=panel, signals=backtest.trend_signal())
+        backtest.summarize(returns=result.returns[-252:], turnover=result.turnover[-252:], costs=result.costs[-252:],
+                           initial_capital=100_000)['sharpe_ratio']
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    n_dates = len(returns)
+    equity = initial_capital * np.cumprod(1 + returns)
+    total_return = equity[-1] / initial_capital - 1 if n_dates else 0.0
+    volatility = returns.std(ddof=1) if n_dates > 1 else float('nan')
+    starting_equity = np.concatenate([[initial_capital], equity[:-1]])
+    peak = np.maximum.accumulate(np.concatenate([[initial_capital], equity]))[1:]
+
+    return {
+        'total_return': float(total_return),
+        'annualized_return': float((1 + total_return) ** (TRADING_DAYS_PER_YEAR / n_dates) - 1)
+        if n_dates and total_return > -1 else float('nan'),
+        'annualized_volatility': float(volatility * np.sqrt(TRADING_DAYS_PER_YEAR)),
+        'sharpe_ratio': float(returns.mean() / volatility * np.sqrt(TRADING_DAYS_PER_YEAR))
+        if volatility else float('nan'),
+        'max_drawdown': float((equity / peak - 1).min()) if n_dates else 0.0,
+        'annual_turnover': float(np.mean(turnover) * TRADING_DAYS_PER_YEAR) if n_dates else 0.0,
+        'total_costs': float((np.asarray(costs) * starting_equity).sum()),
+    }
+
+
+def _blend(signals: Sequence[Union[Signal, np.ndarray]], panel: 'OhlcvPanel', columns: slice) -> np.ndarray:
+    """Averages the positions the signals want in a block of the panel's columns, counting NaN as flat."""
+    block = panel.column_slice(start=columns.start, stop=columns.stop)
+    blended = np.zeros(block.shape, dtype=np.float64)
+    for signal in signals:
+        if callable(signal):
+            positions = np.asarray(signal(block), dtype=np.float64)
+        else:
+            positions = np.asarray(signal[:len(panel.dates), columns], dtype=np.float64)
+        if positions.shape != block.shape:
+            raise ValueError(f'A signal returned shape {positions.shape} for a panel of shape {block.shape}.')
+        blended += np.nan_to_num(positions, nan=0.0, posinf=0.0, neginf=0.0)
+
+    return blended / len(signals)
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """``numerator / denominator - 1``, with 0 wherever either price is missing."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = numerator / denominator - 1
+
+    return np.nan_to_num(ratio, nan=0.0, posinf=0.0, neginf=0.0, copy=False)
+
+
+@profiling.instrument(rows=lambda result, *args, **kwargs: len(result.returns))
+def run_backtest(panel: 'OhlcvPanel',
+                 signals: Union[Signal, np.ndarray, Sequence[Union[Signal, np.ndarray]]],
+                 fill: str = 'next_open',
+                 sizing: str = 'equal',
+                 position_weight: float = 0.01,
+                 max_gross: float = 1.0,
+                 commission_bps: float = 0.0,
+                 commission_per_share: float = 0.0,
+                 slippage_bps: float = 0.0,
+                 initial_capital: float = 100_000.0,
+                 start_date: Optional[Union[str, 'pd.Timestamp']] = None,
+                 end_date: Optional[Union[str, 'pd.Timestamp']] = None,
+                 block_size: int = 512) -> BacktestResult:
+    """Simulates trading the positions the signals want, across the whole panel.
+
+    Signals see every bar up to ``end_date``, so indicators are warmed up on the history before ``start_date``; only
+    the dates from ``start_date`` on are traded and reported, starting flat.
+
+    Args:
+        panel: the prices to trade, with at least a 'Close' field, and an 'Open' field for ``fill='next_open'``
+        signals: one or more functions returning the wanted position per (date, ticker), or arrays of those positions
+                 for the whole panel; several are averaged
+        fill: 'next_open' trades a close's signal at the next day's open, 'close' trades it at the same close
+        sizing: 'equal' spreads ``max_gross`` across the wanted positions in proportion to their size, 'fixed' gives
+                each a weight of ``position_weight`` times its size, scaled down on dates they would exceed
+                ``max_gross``
+        position_weight: the weight of a full position with ``sizing='fixed'``, e.g. 0.01 for 1% of the portfolio
+        max_gross: the most gross weight to hold, e.g. 1.0 for fully invested without leverage
+        commission_bps: commission per trade, in basis points of the value traded
+        commission_per_share: commission per share traded, in the panel's price currency
+        slippage_bps: how far fills are assumed to land from the fill price, in basis points
+        initial_capital: the portfolio's value before the first date
+        start_date: the first date to trade; by default the panel's first
+        end_date: the last date to trade; by default the panel's last
+        block_size: the number of tickers to compute at once, trading memory for fewer passes
+
+    Returns:
+        the daily returns, equity, PnL, drawdown, turnover, costs and exposure, see :class:`BacktestResult`
+
+    Raises:
+        ValueError: if ``fill`` or ``sizing`` is unknown, or the panel lacks a field the fill needs
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import backtest
+        from wsbtrading.data_io import ohlcv_panel
+
+        panel = ohlcv_panel.open_panel(path='/group/wsbtrading/prod/daily/share_prices_panel')
+        result = backtest.run_backtest(panel=panel, signals=[backtest.squeeze_signal(rolling_window=20)],
+                                       commission_bps=1.0, slippage_bps=5.0, start_date='2010-01-01')
+        result.stats['sharpe_ratio'], result.stats['max_drawdown']
+    """
+    if fill not in FILLS:
+        raise ValueError(f'fill must be one of {FILLS}, got {fill!r}.')
+    if sizing not in SIZINGS:
+        raise ValueError(f'sizing must be one of {SIZINGS}, got {sizing!r}.')
+    required = ['Close', 'Open'] if fill == 'next_open' else ['Close']
+    missing = [field for field in required if field not in panel]
+    if missing:
+        raise ValueError(f'The panel has no {", ".join(missing)} field, which fill={fill!r} needs.')
+    signals = [signals] if callable(signals) or isinstance(signals, np.ndarray) else list(signals)
+    for signal in signals:
+        if not callable(signal) and np.shape(signal) != panel.shape:
+            raise ValueError(f'A positions array has shape {np.shape(signal)} for a panel of shape {panel.shape}.')
+
+    panel = panel.date_slice(end_date=end_date)
+    start = 0 if start_date is None else int(panel.dates.searchsorted(pd.Timestamp(start_date), side='left'))
+    n_dates, n_tickers = panel.shape
+    dates = panel.dates[start:]
+    blocks = [(column, min(column + block_size, n_tickers)) for column in range(0, n_tickers, block_size)]
+
+    # Pass 1: the position wanted in each ticker at each fill, with the ticker's prices there, and their gross size
+    wanted = np.zeros((n_dates - start, n_tickers), dtype=np.float32)
+    gross = np.zeros(n_dates - start)
+    for first, last in blocks:
+        block = panel.column_slice(start=first, stop=last)
+        positions = _blend(signals=signals, panel=panel, columns=slice(first, last))
+        if fill == 'next_open':
+            # A close's signal is filled at the next open, so the first date traded fills the signal before it
+            positions = np.concatenate([np.zeros((1, last - first)), positions[:-1]])[start:]
+            prices = np.asarray(block['Open'][start:], dtype=np.float64)
+        else:
+            positions = positions[start:]
+            prices = np.asarray(block['Close'][start:], dtype=np.float64)
+        tradable = np.isfinite(prices) & np.isfinite(np.asarray(block['Close'][start:], dtype=np.float64))
+        np.multiply(positions, tradable, out=positions)
+        wanted[:, first:last] = positions
+        gross += np.abs(positions).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if sizing == 'equal':
+            scale = np.where(gross > 0, max_gross / gross, 0.0)
+        else:
+            scale = position_weight * np.where(gross * position_weight > max_gross,
+                                               max_gross / (gross * position_weight), 1.0)
+
+    # Pass 2: what the sized weights earned and what trading into them cost
+    returns = np.zeros(n_dates - start)
+    turnover = np.zeros(n_dates - start)
+    costs = np.zeros(n_dates - start)
+    exposure = np.zeros(n_dates - start)
+    ticker_returns = np.zeros(n_tickers)
+    cost_rate = (commission_bps + slippage_bps) / 1e4
+    for first, last in blocks:
+        weights = wanted[:, first:last] * scale[:, np.newaxis]
+        held = np.concatenate([np.zeros((1, last - first)), weights[:-1]])
+        close = np.asarray(panel['Close'][start:, first:last], dtype=np.float64)
+        previous_close = np.asarray(panel['Close'][start - 1:n_dates - 1, first:last], dtype=np.float64) if start \
+            else np.concatenate([close[:1], close[:-1]])
+        if fill == 'next_open':
+            fill_price = np.asarray(panel['Open'][start:, first:last], dtype=np.float64)
+            # Overnight on the weights held into the open, then the rest of the day on the weights traded into
+            earned = held * _ratio(fill_price, previous_close) + weights * _ratio(close, fill_price)
+        else:
+            fill_price = close
+            earned = held * _ratio(close, previous_close)
+        traded = np.abs(weights - held)
+
+        returns += earned.sum(axis=1)
+        ticker_returns[first:last] = earned.sum(axis=0)
+        turnover += traded.sum(axis=1)
+        exposure += np.abs(weights).sum(axis=1)
+        costs += traded.sum(axis=1) * cost_rate
+        if commission_per_share:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                per_share = np.nan_to_num(commission_per_share / fill_price, nan=0.0, posinf=0.0)
+            costs += (traded * per_share).sum(axis=1)
+
+    net_returns = returns - costs
+    equity = initial_capital * np.cumprod(1 + net_returns)
+    pnl = np.diff(equity, prepend=initial_capital)
+    peak = np.maximum.accumulate(np.concatenate([[initial_capital], equity]))[1:]
+
+    return BacktestResult(
+        returns=pd.Series(net_returns, index=dates, name='returns'),
+        equity=pd.Series(equity, index=dates, name='equity'),
+        pnl=pd.Series(pnl, index=dates, name='pnl'),
+        drawdown=pd.Series(equity / peak - 1, index=dates, name='drawdown'),
+        turnover=pd.Series(turnover, index=dates, name='turnover'),
+        costs=pd.Series(costs, index=dates, name='costs'),
+        exposure=pd.Series(exposure, index=dates, name='exposure'),
+        ticker_returns=pd.Series(ticker_returns, index=panel.tickers, name='ticker_returns'),
+        initial_capital=float(initial_capital),
+    )
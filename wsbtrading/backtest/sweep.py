@@ -0,0 +1,414 @@
+"""Walk-forward parameter sweeps of the squeeze strategy over a whole universe.
+
+:func:`run_sweep` backtests every combination of squeeze parameters from a search space (see :func:`grid` and
+:func:`random_search`) over a price panel, scores each on the training dates of every walk-forward split (see
+:func:`walk_forward_splits`), and trades the best on the split's test dates, so the test dates of consecutive splits
+stitch into one out-of-sample history.
+
+The combinations are grouped by rolling window, and a window with more combinations than its share of the workers is
+split into chunks, so a sweep over few windows still keeps every worker busy. Every worker maps the same on-disk panel
+(see :mod:`wsbtrading.data_io.ohlcv_panel`), so the prices are held once in the page cache however many workers read
+them, and works out the moving average, standard deviation and average true range of its chunk's window once, deriving
+the squeeze of every band multiplier, Keltner multiplier and look-back from them.
+"""
+import functools
+import itertools
+import operator
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from wsbtrading.backtest import backtest
+from wsbtrading.data_io import ohlcv_panel
+from wsbtrading.instrumentation import profiling
+from wsbtrading.maths import kernels
+
+# The parameters a sweep searches over, with the values the ttm_squeeze model trades on
+DEFAULT_PARAMETERS = {
+    'rolling_window': 20,
+    'look_back_period': -1,
+    'band_multiplier': kernels.BAND_MULTIPLIER,
+    'keltner_multiplier': kernels.KELTNER_MULTIPLIER,
+}
+
+# run_backtest arguments a sweep sets itself
+_RESERVED = ('panel', 'signals', 'start_date', 'end_date', 'block_size', 'initial_capital')
+
+
+def _options(space: Mapping[str, Sequence]) -> Dict[str, list]:
+    """Lists the values to try of every parameter, in the order of :data:`DEFAULT_PARAMETERS`."""
+    unknown = sorted(set(space) - set(DEFAULT_PARAMETERS))
+    if unknown:
+        raise ValueError(f'Unknown parameters {unknown}, expected some of {list(DEFAULT_PARAMETERS)}.')
+    options = {name: list(space.get(name, [default])) for name, default in DEFAULT_PARAMETERS.items()}
+    empty = [name for name, values in options.items() if not values]
+    if empty:
+        raise ValueError(f'No values to try for {empty}.')
+
+    return options
+
+
+def grid(space: Mapping[str, Sequence]) -> List[Dict[str, float]]:
+    """Lists every combination of parameter values.
+
+    Args:
+        space: the values to try, by parameter name; parameters left out keep their :data:`DEFAULT_PARAMETERS` value
+
+    Returns:
+        one dictionary of all four parameters per combination
+
+    Raises:
+        ValueError: if a parameter is unknown or has no values
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.backtest import sweep
+        sweep.grid({'rolling_window': [10, 20], 'band_multiplier': [1.5, 2.0]})
+        # [{'rolling_window': 10, 'look_back_period': -1, 'band_multiplier': 1.5, 'keltner_multiplier': 1.5}, ...]
+    """
+    options = _options(space)
+
+    return [dict(zip(options, values)) for values in itertools.product(*options.values())]
+
+
+def random_search(space: Mapping[str, Sequence], n_samples: int, seed: Optional[int] = None) \
+        -> List[Dict[str, float]]:
+    """Samples distinct combinations of parameter values, without listing the whole grid.
+
+    Args:
+        space: the values to try, by parameter name; parameters left out keep their :data:`DEFAULT_PARAMETERS` value
+        n_samples: the number of combinations to sample; the whole grid if it is smaller
+        seed: seeds the sampling, for a repeatable search
+
+    Returns:
+        one dictionary of all four parameters per combination, in grid order
+
+    Raises:
+        ValueError: if a parameter is unknown or has no values
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.backtest import sweep
+        sweep.random_search({'rolling_window': range(10, 61), 'band_multiplier': np.arange(1.0, 3.01, 0.1)},
+                            n_samples=200, seed=0)
+    """
+    options = _options(space)
+    sizes = [len(values) for values in options.values()]
+    n_combinations = functools.reduce(operator.mul, sizes, 1)
+    picks = np.random.default_rng(seed).choice(n_combinations, size=min(n_samples, n_combinations), replace=False)
+
+    return [{name: values[index] for (name, values), index in zip(options.items(), np.unravel_index(pick, sizes))}
+            for pick in np.sort(picks)]
+
+
+class Split(NamedTuple):
+    """The dates one walk-forward split trains and tests on, both ends included."""
+    train_start: pd.Timestamp
+    train_end: pd.Timestamp
+    test_start: pd.Timestamp
+    test_end: pd.Timestamp
+
+
+def walk_forward_splits(dates: Sequence, train_days: int, test_days: int, step_days: Optional[int] = None,
+                        anchored: bool = False) -> List[Split]:
+    """Splits a history into training windows, each followed by the test window it is scored out of sample on.
+
+    Args:
+        dates: the dates to split, in increasing order, e.g. a panel's ``dates``
+        train_days: the number of dates to train on
+        test_days: the number of dates to test on after each training window; the last may be shorter
+        step_days: how far each split moves on from the one before; by default ``test_days``, so the test windows
+                   follow one another
+        anchored: whether every training window starts at the first date and grows, rather than rolling forward
+
+    Returns:
+        the splits, in date order
+
+    Raises:
+        ValueError: if a window length is below 1
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.backtest import sweep
+        splits = sweep.walk_forward_splits(dates=panel.dates, train_days=3 * 252, test_days=63)
+    """
+    step_days = step_days or test_days
+    if min(train_days, test_days, step_days) < 1:
+        raise ValueError(f'Expected window lengths of at least 1, got train_days={train_days}, '
+                         f'test_days={test_days} and step_days={step_days}.')
+    dates = pd.DatetimeIndex(dates)
+
+    splits = []
+    for test_start in range(train_days, len(dates), step_days):
+        test_stop = min(test_start + test_days, len(dates))
+        train_start = 0 if anchored else test_start - train_days
+        splits.append(Split(train_start=dates[train_start], train_end=dates[test_start - 1],
+                            test_start=dates[test_start], test_end=dates[test_stop - 1]))
+
+    return splits
+
+
+class SweepResult(NamedTuple):
+    """What a walk-forward sweep tried, what it picked, and how the picks traded out of sample.
+
+    Args:
+        trials: one row per split and parameter combination, holding the parameters and the
+                :attr:`~wsbtrading.backtest.backtest.BacktestResult.stats` of their training and test dates,
+                prefixed with ``train_`` and ``test_``
+        selected: the trial picked on each split, indexed by split, with the split's dates
+        returns: the daily returns of the picked combinations on the test dates, after costs
+        turnover: the turnover of the picked combinations on the test dates
+        costs: the costs paid by the picked combinations on the test dates
+        initial_capital: the portfolio's value before each window
+    """
+    trials: pd.DataFrame
+    selected: pd.DataFrame
+    returns: pd.Series
+    turnover: pd.Series
+    costs: pd.Series
+    initial_capital: float
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """Summarizes the out-of-sample returns, as :attr:`~wsbtrading.backtest.backtest.BacktestResult.stats`."""
+        return backtest.summarize(returns=self.returns.to_numpy(), turnover=self.turnover.to_numpy(),
+                                  costs=self.costs.to_numpy(), initial_capital=self.initial_capital)
+
+
+class _WorkerState:
+    """The panel a worker process has mapped, reused by every task it runs until the panel is rewritten."""
+    key: Optional[Tuple[str, int]] = None
+    panel: Optional[ohlcv_panel.OhlcvPanel] = None
+
+
+def _worker_panel(path: str) -> ohlcv_panel.OhlcvPanel:
+    """Maps the panel at ``path``, or returns the one already mapped if it hasn't been replaced since."""
+    key = (path, os.stat(path).st_ino)
+    if _WorkerState.key != key:
+        _WorkerState.panel = ohlcv_panel.open_panel(path=path)
+        _WorkerState.key = key
+
+    return _WorkerState.panel
+
+
+def _sweep_window(panel: Union[str, ohlcv_panel.OhlcvPanel], rolling_window: int,
+                  trials: Sequence[Tuple[int, Dict[str, float]]], fields: Tuple[str, str, str], block_size: int,
+                  backtest_kwargs: Dict) -> List[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]:
+    """Backtests every combination sharing one rolling window over the whole panel.
+
+    The window's indicators are computed once per block of tickers and every (band, Keltner) multiplier pair's squeeze
+    is derived from them, exactly as :func:`wsbtrading.maths.kernels.squeeze_kernel` would.
+
+    Returns:
+        the index of each combination with its daily returns, turnover and costs
+    """
+    if isinstance(panel, str):
+        panel = _worker_panel(path=panel)
+    metric_col, low_col, high_col = fields
+    multipliers = sorted({(params['band_multiplier'], params['keltner_multiplier']) for _, params in trials})
+    flags = {pair: np.empty(panel.shape, dtype=bool) for pair in multipliers}
+
+    n_tickers = panel.shape[1]
+    for first in range(0, n_tickers, block_size):
+        columns = slice(first, min(first + block_size, n_tickers))
+        close = panel[metric_col][:, columns]
+        moving_average = kernels.rolling_mean(values=close, rolling_window=rolling_window)
+        stddev = kernels.rolling_stddev(values=close, rolling_window=rolling_window)
+        tr = kernels.true_range(low=panel[low_col][:, columns], high=panel[high_col][:, columns])
+        atr = kernels.rolling_mean(values=tr, rolling_window=rolling_window)
+        for band_multiplier, keltner_multiplier in multipliers:
+            band_width = band_multiplier * stddev
+            keltner_width = atr * keltner_multiplier
+            flags[band_multiplier, keltner_multiplier][:, columns] = \
+                (moving_average - band_width > moving_average - keltner_width) \
+                & (moving_average + band_width < moving_average + keltner_width)
+
+    results = []
+    for index, params in trials:
+        positions = backtest.lag(flags[params['band_multiplier'], params['keltner_multiplier']],
+                                 periods=-1 - params['look_back_period'])
+        result = backtest.run_backtest(panel=panel, signals=positions, block_size=block_size, **backtest_kwargs)
+        results.append((index, result.returns.to_numpy(), result.turnover.to_numpy(), result.costs.to_numpy()))
+
+    return results
+
+
+def _window_tasks(by_window: Mapping[int, Sequence[Tuple[int, Dict[str, float]]]],
+                  n_workers: int) -> List[Tuple[int, List[Tuple[int, Dict[str, float]]]]]:
+    """Splits each window's combinations into chunks of about an even share of all of them per worker.
+
+    A chunk repeats its window's indicators, so windows are only split when there are fewer of them than workers to
+    go round, and a chunk keeps combinations with the same multipliers together, so it derives as few squeezes as it
+    can.
+    """
+    chunk_size = max(1, -(-sum(len(trials) for trials in by_window.values()) // max(n_workers, 1)))
+    tasks = []
+    for rolling_window, trials in by_window.items():
+        trials = sorted(trials, key=lambda trial: (trial[1]['band_multiplier'], trial[1]['keltner_multiplier']))
+        tasks.extend((rolling_window, trials[start:start + chunk_size]) for start in range(0, len(trials), chunk_size))
+
+    return tasks
+
+
+def _window_stats(outcome: Tuple[np.ndarray, np.ndarray, np.ndarray], rows: slice, prefix: str,
+                  initial_capital: float) -> Dict[str, float]:
+    returns, turnover, costs = (values[rows] for values in outcome)
+    stats = backtest.summarize(returns=returns, turnover=turnover, costs=costs, initial_capital=initial_capital)
+
+    return {f'{prefix}{name}': value for name, value in stats.items()}
+
+
+@profiling.instrument(rows=lambda result, *args, **kwargs: len(result.trials))
+def run_sweep(path: str,
+              params: Sequence[Mapping[str, float]],
+              splits: Sequence[Split],
+              objective: str = 'sharpe_ratio',
+              maximize: bool = True,
+              metric_col: str = 'Close',
+              low_col: str = 'Low',
+              high_col: str = 'High',
+              initial_capital: float = 100_000.0,
+              block_size: int = 512,
+              max_workers: int = 4,
+              executor: Optional[Executor] = None,
+              **backtest_kwargs) -> SweepResult:
+    """Backtests parameter combinations of the squeeze strategy across a universe and picks one per walk-forward split.
+
+    Each combination is backtested once over the whole panel, as
+    :func:`~wsbtrading.backtest.backtest.squeeze_signal` with those parameters would trade it, and its stats on a
+    split's dates are those of that backtest's returns, from ``initial_capital``. Positions taken before a window are
+    carried into it, so every window is traded warmed up rather than starting flat.
+
+    Args:
+        path: the directory of an :mod:`~wsbtrading.data_io.ohlcv_panel` panel, mapped by every worker
+        params: the combinations to try, e.g. from :func:`grid` or :func:`random_search`; parameters left out keep
+                their :data:`DEFAULT_PARAMETERS` value
+        splits: the walk-forward splits to score the combinations on, e.g. from :func:`walk_forward_splits`
+        objective: the stat to pick each split's combination by, e.g. 'sharpe_ratio' or 'total_return'
+        maximize: whether the highest ``objective`` is best, rather than the lowest
+        metric_col: the field to calculate over (usually the 'Close' price)
+        low_col: the field with the low price
+        high_col: the field with the high price
+        initial_capital: the portfolio's value before each window
+        block_size: the number of tickers to compute at once, trading memory for fewer passes
+        max_workers: the number of worker processes, which the combinations are split into shares for (also with
+                     ``executor``); 1 runs every combination in this process
+        executor: runs the combinations instead of a new process pool; it is not shut down afterwards
+        backtest_kwargs: passed on to :func:`~wsbtrading.backtest.backtest.run_backtest`, e.g. ``fill``, ``sizing``
+                         or ``slippage_bps``
+
+    Returns:
+        every trial, the pick of each split and the picks' out-of-sample returns, see :class:`SweepResult`
+
+    Raises:
+        ValueError: if a parameter is unknown or out of range, ``objective`` is not a stat, or ``backtest_kwargs``
+                    sets something the sweep sets itself
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.backtest import sweep
+        from wsbtrading.data_io import ohlcv_panel
+
+        path = '/group/wsbtrading/prod/daily/share_prices_panel'
+        splits = sweep.walk_forward_splits(dates=ohlcv_panel.open_panel(path=path).dates, train_days=756,
+                                           test_days=63)
+        result = sweep.run_sweep(path=path, splits=splits, max_workers=8, slippage_bps=5.0,
+                                 params=sweep.grid({'rolling_window': [10, 20, 40], 'look_back_period': [-1, -3],
+                                                    'band_multiplier': [1.5, 2.0, 2.5],
+                                                    'keltner_multiplier': [1.0, 1.5, 2.0]}))
+        result.selected[['test_start', 'rolling_window', 'band_multiplier', 'test_sharpe_ratio']]
+        result.stats['sharpe_ratio']
+    """
+    reserved = sorted(set(backtest_kwargs) & set(_RESERVED))
+    if reserved:
+        raise ValueError(f'run_sweep sets {reserved} itself.')
+    params = [{**DEFAULT_PARAMETERS, **combination} for combination in params]
+    for combination in params:
+        _options({name: [value] for name, value in combination.items()})
+        if combination['rolling_window'] < 1 or combination['look_back_period'] >= 0:
+            raise ValueError(f'Expected a positive rolling_window and a negative look_back_period, got {combination}.')
+    if objective not in backtest.STATS:
+        raise ValueError(f'objective must be one of {backtest.STATS}, got {objective!r}.')
+
+    panel = ohlcv_panel.open_panel(path=path)
+    by_window: Dict[int, List[Tuple[int, Dict[str, float]]]] = {}
+    for index, combination in enumerate(params):
+        by_window.setdefault(combination['rolling_window'], []).append((index, combination))
+    task_kwargs = dict(fields=(metric_col, low_col, high_col), block_size=block_size,
+                       backtest_kwargs={**backtest_kwargs, 'initial_capital': initial_capital})
+
+    outcomes = {}
+    if executor is None and max_workers <= 1:
+        for rolling_window, trials in by_window.items():
+            for index, *outcome in _sweep_window(panel=panel, rolling_window=rolling_window, trials=trials,
+                                                 **task_kwargs):
+                outcomes[index] = outcome
+    else:
+        own_executor = executor is None
+        tasks = _window_tasks(by_window=by_window, n_workers=max_workers)
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=min(max_workers, len(tasks)))
+        futures = []
+        try:
+            for rolling_window, trials in tasks:
+                futures.append(executor.submit(_sweep_window, path, rolling_window, trials, **task_kwargs))
+            for future in futures:
+                for index, *outcome in future.result():
+                    outcomes[index] = outcome
+        finally:
+            # Windows no worker has picked up yet are dropped if one fails; shutdown() waits for the rest
+            for future in futures:
+                future.cancel()
+            if own_executor:
+                executor.shutdown()
+
+    # Score every combination on every split, and trade each split's best on its test dates up to the next split's
+    dates = panel.dates
+    records = []
+    picked = []
+    oos_rows = []
+    oos_outcomes = []
+    for number, split in enumerate(splits):
+        train = slice(dates.searchsorted(split.train_start), dates.searchsorted(split.train_end, side='right'))
+        test = slice(dates.searchsorted(split.test_start), dates.searchsorted(split.test_end, side='right'))
+        split_records = [{'split': number, **combination,
+                          **_window_stats(outcome=outcomes[index], rows=train, prefix='train_',
+                                          initial_capital=initial_capital),
+                          **_window_stats(outcome=outcomes[index], rows=test, prefix='test_',
+                                          initial_capital=initial_capital)}
+                         for index, combination in enumerate(params)]
+        scores = np.array([record[f'train_{objective}'] for record in split_records], dtype=np.float64)
+        best = int(np.argmax(np.nan_to_num(scores if maximize else -scores, nan=-np.inf)))
+        records.extend(split_records)
+        picked.append({**split._asdict(), **split_records[best]})
+
+        stop = test.stop if number + 1 == len(splits) \
+            else min(test.stop, dates.searchsorted(splits[number + 1].test_start))
+        oos_rows.append(np.arange(test.start, stop))
+        oos_outcomes.append([values[test.start:stop] for values in outcomes[best]])
+
+    oos_dates = dates[np.concatenate(oos_rows)] if oos_rows else dates[:0]
+
+    def stitch(field: int, name: str) -> pd.Series:
+        values = np.concatenate([outcome[field] for outcome in oos_outcomes]) if oos_outcomes else np.zeros(0)
+        return pd.Series(values, index=oos_dates, name=name)
+
+    return SweepResult(
+        trials=pd.DataFrame.from_records(records),
+        selected=pd.DataFrame.from_records(picked, index='split'),
+        returns=stitch(field=0, name='returns'),
+        turnover=stitch(field=1, name='turnover'),
+        costs=stitch(field=2, name='costs'),
+        initial_capital=float(initial_capital),
+    )
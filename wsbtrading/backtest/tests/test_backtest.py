@@ -0,0 +1,176 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from wsbtrading import backtest, maths
+from wsbtrading.data_io.ohlcv_panel import OhlcvPanel
+
+
+def _fixed(positions) -> backtest.Signal:
+    """A signal that wants the same positions whatever the prices."""
+    return lambda panel: np.asarray(positions, dtype=np.float64)
+
+
+def _random_panel(n_dates: int = 300, n_tickers: int = 7, seed: int = 11) -> OhlcvPanel:
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(rng.normal(scale=0.02, size=(n_dates, n_tickers)).cumsum(axis=0))
+    open_ = close * np.exp(rng.normal(scale=0.005, size=close.shape))
+    spread = rng.uniform(0.1, 1.5, size=close.shape)
+    close[:40, 2] = np.nan
+    open_[:40, 2] = np.nan
+    close[250:, 5] = np.nan
+    open_[250:, 5] = np.nan
+
+    return OhlcvPanel(fields={'Open': open_, 'High': close + spread, 'Low': close - spread, 'Close': close},
+                      tickers=[f'T{i}' for i in range(n_tickers)],
+                      dates=pd.bdate_range('2019-01-01', periods=n_dates))
+
+
+class TestRunBacktest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dates = pd.bdate_range('2021-02-01', periods=4)
+        self.close = np.array([[10, 20], [11, 20], [12.1, 22], [12.1, 11]], dtype=np.float64)
+        self.panel = OhlcvPanel(fields={'Close': self.close}, tickers=['AMC', 'GME'], dates=self.dates)
+        self.positions = [[1, 0], [1, 1], [0, 1], [0, 0]]
+
+    def test_fill_at_close(self):
+        """Ensures the weights traded at a close earn the next day's return, worked out by hand."""
+        result = backtest.run_backtest(panel=self.panel, signals=_fixed(self.positions), fill='close',
+                                       initial_capital=100)
+
+        np.testing.assert_allclose(result.returns, [0, 0.1, 0.1, -0.5])
+        np.testing.assert_allclose(result.equity, [100, 110, 121, 60.5])
+        np.testing.assert_allclose(result.pnl, [0, 10, 11, -60.5])
+        np.testing.assert_allclose(result.drawdown, [0, 0, 0, -0.5])
+        np.testing.assert_allclose(result.turnover, [1, 1, 1, 1])
+        np.testing.assert_allclose(result.exposure, [1, 1, 1, 0])
+        np.testing.assert_allclose(result.ticker_returns, [0.15, -0.45])
+        assert result.returns.index.equals(self.dates)
+
+    def test_fill_at_next_open(self):
+        """Ensures a close's signal is traded at the next open, earning overnight on the old weights."""
+        open_ = np.array([10, 11, 11, 13], dtype=np.float64)
+        close = np.array([10, 10, 12, 12], dtype=np.float64)
+        panel = OhlcvPanel(fields={'Open': open_[:, None], 'Close': close[:, None]}, tickers=['GME'],
+                           dates=self.dates)
+
+        result = backtest.run_backtest(panel=panel, signals=_fixed(np.ones((4, 1))))
+
+        np.testing.assert_allclose(result.returns, [0, 10 / 11 - 1, (11 / 10 - 1) + (12 / 11 - 1),
+                                                    (13 / 12 - 1) + (12 / 13 - 1)])
+        np.testing.assert_allclose(result.turnover, [0, 1, 0, 0])
+
+    def test_costs(self):
+        """Ensures commissions and slippage are charged on the value traded."""
+        result = backtest.run_backtest(panel=self.panel, signals=_fixed(self.positions), fill='close',
+                                       commission_bps=5, slippage_bps=5, commission_per_share=0.01)
+        per_share = np.array([0.01 / 10, 0.5 * 0.01 / 11 + 0.5 * 0.01 / 20, 0.5 * 0.01 / 12.1 + 0.5 * 0.01 / 22,
+                              0.01 / 11])
+
+        np.testing.assert_allclose(result.costs, 0.001 + per_share)
+        np.testing.assert_allclose(result.returns, np.array([0, 0.1, 0.1, -0.5]) - 0.001 - per_share)
+        stats = result.stats
+        assert stats['total_costs'] == (result.costs * result.equity.shift(1, fill_value=100_000)).sum()
+
+    def test_fixed_sizing(self):
+        """Ensures fixed-size positions are scaled down on dates they would exceed max_gross."""
+        panel = OhlcvPanel(fields={'Close': np.full((5, 3), 10.0)}, tickers=['AMC', 'BB', 'GME'],
+                           dates=pd.bdate_range('2021-02-01', periods=5))
+        positions = [[1, 0, 0], [1, 1, 1], [1, -1, 0], [0, 0, 0], [0, 0, 0]]
+
+        result = backtest.run_backtest(panel=panel, signals=_fixed(positions), fill='close', sizing='fixed',
+                                       position_weight=0.4, max_gross=1.0)
+
+        np.testing.assert_allclose(result.exposure, [0.4, 1.0, 0.8, 0, 0])
+
+    def test_blocks(self):
+        """Ensures the results don't depend on how many tickers are computed at once."""
+        panel = _random_panel()
+        signals = [backtest.squeeze_signal(rolling_window=20), backtest.trend_signal(rolling_window=30, short=True)]
+
+        whole = backtest.run_backtest(panel=panel, signals=signals, slippage_bps=3)
+        blocked = backtest.run_backtest(panel=panel, signals=signals, slippage_bps=3, block_size=2)
+
+        for field in ['returns', 'equity', 'turnover', 'costs', 'exposure', 'ticker_returns']:
+            np.testing.assert_allclose(getattr(blocked, field), getattr(whole, field), rtol=1e-12, err_msg=field)
+        assert whole.turnover.sum() > 0
+
+    def test_missing_prices(self):
+        """Ensures a ticker is only held while it has prices, and is sold when they stop."""
+        panel = _random_panel()
+
+        result = backtest.run_backtest(panel=panel, signals=_fixed(np.ones(panel.shape)), fill='close',
+                                       sizing='fixed', position_weight=0.1)
+
+        assert np.isfinite(result.equity).all()
+        np.testing.assert_allclose(result.exposure.iloc[:40], 0.6)
+        np.testing.assert_allclose(result.exposure.iloc[40:250], 0.7)
+        np.testing.assert_allclose(result.exposure.iloc[250:], 0.6)
+        assert result.turnover.iloc[250] == 0.1
+
+    def test_dates(self):
+        """Ensures only the dates between start_date and end_date are traded, starting flat."""
+        panel = _random_panel()
+        signal = backtest.trend_signal(rolling_window=50)
+
+        full = backtest.run_backtest(panel=panel, signals=signal, fill='close')
+        window = backtest.run_backtest(panel=panel, signals=signal, fill='close', start_date=panel.dates[100],
+                                       end_date=panel.dates[199])
+
+        assert window.returns.index.equals(panel.dates[100:200])
+        assert window.returns.iloc[0] == 0
+        np.testing.assert_allclose(window.returns.iloc[1:], full.returns.iloc[101:200])
+
+    def test_squeeze_signal(self):
+        """Ensures the squeeze signal wants a position exactly where maths.squeeze_panel flags a squeeze."""
+        panel = _random_panel()
+
+        positions = backtest.squeeze_signal(rolling_window=20)(panel)
+
+        np.testing.assert_array_equal(positions, maths.squeeze_panel(panel=panel, rolling_window=20))
+
+    def test_squeeze_signal_parameters(self):
+        """Ensures the squeeze signal trades the squeeze of a past close, with bands and channels as wide as asked."""
+        panel = _random_panel()
+
+        positions = backtest.squeeze_signal(rolling_window=10, look_back_period=-3, band_multiplier=1.5,
+                                            keltner_multiplier=2.0)(panel)
+
+        flags = maths.squeeze_panel(panel=panel, rolling_window=10, band_multiplier=1.5, keltner_multiplier=2.0)
+        np.testing.assert_array_equal(positions[2:], flags[:-2])
+        assert not positions[:2].any()
+        with self.assertRaises(ValueError):
+            backtest.squeeze_signal(look_back_period=0)
+
+    def test_positions_array(self):
+        """Ensures positions worked out beforehand trade the same as the signal that works them out."""
+        panel = _random_panel()
+        signal = backtest.trend_signal(rolling_window=30)
+
+        expected = backtest.run_backtest(panel=panel, signals=signal, end_date=panel.dates[-20])
+        actual = backtest.run_backtest(panel=panel, signals=signal(panel), end_date=panel.dates[-20], block_size=3)
+
+        np.testing.assert_allclose(actual.returns, expected.returns, rtol=1e-12)
+        with self.assertRaises(ValueError):
+            backtest.run_backtest(panel=panel, signals=signal(panel)[1:])
+
+    def test_stats(self):
+        """Ensures the summary agrees with the daily series."""
+        result = backtest.run_backtest(panel=_random_panel(), signals=backtest.trend_signal(rolling_window=20))
+        stats = result.stats
+
+        assert stats['total_return'] == result.equity.iloc[-1] / 100_000 - 1
+        assert stats['max_drawdown'] == result.drawdown.min() <= 0
+        assert stats['annual_turnover'] == result.turnover.mean() * 252
+        assert np.isfinite(stats['sharpe_ratio'])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            backtest.run_backtest(panel=self.panel, signals=_fixed(self.positions), fill='vwap')
+        with self.assertRaises(ValueError):
+            backtest.run_backtest(panel=self.panel, signals=_fixed(self.positions), sizing='kelly')
+        with self.assertRaises(ValueError):
+            backtest.run_backtest(panel=self.panel, signals=_fixed(self.positions), fill='next_open')
+        with self.assertRaises(ValueError):
+            backtest.run_backtest(panel=self.panel, signals=_fixed([[1, 0]]), fill='close')
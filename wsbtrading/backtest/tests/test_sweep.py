@@ -0,0 +1,172 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from wsbtrading import backtest
+from wsbtrading.backtest import sweep
+from wsbtrading.data_io import ohlcv_panel
+
+
+class TestSearchSpaces(unittest.TestCase):
+    def test_grid(self):
+        """Ensures every combination is listed, with the parameters left out at their defaults."""
+        params = sweep.grid({'rolling_window': [10, 20], 'band_multiplier': [1.5, 2.0, 2.5]})
+
+        assert len(params) == 6
+        assert params[0] == {'rolling_window': 10, 'look_back_period': -1, 'band_multiplier': 1.5,
+                             'keltner_multiplier': 1.5}
+        assert {(p['rolling_window'], p['band_multiplier']) for p in params} == \
+            {(w, b) for w in [10, 20] for b in [1.5, 2.0, 2.5]}
+
+    def test_random_search(self):
+        """Ensures samples are distinct combinations from the grid, repeatable with a seed."""
+        space = {'rolling_window': range(5, 50), 'band_multiplier': [1.5, 2.0, 2.5], 'look_back_period': [-1, -3]}
+        whole_grid = sweep.grid(space)
+
+        params = sweep.random_search(space, n_samples=20, seed=3)
+
+        assert len(params) == 20
+        assert len({tuple(p.values()) for p in params}) == 20
+        assert all(p in whole_grid for p in params)
+        assert params == sweep.random_search(space, n_samples=20, seed=3)
+        assert len(sweep.random_search({'rolling_window': [10, 20]}, n_samples=5)) == 2
+
+    def test_unknown_parameter(self):
+        with pytest.raises(ValueError):
+            sweep.grid({'rolling_windows': [10]})
+        with pytest.raises(ValueError):
+            sweep.random_search({'rolling_window': []}, n_samples=1)
+
+
+class TestWalkForwardSplits(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dates = pd.bdate_range('2021-01-04', periods=10)
+
+    def test_rolling(self):
+        """Ensures each training window rolls forward by the test window, the last test window cut short."""
+        splits = sweep.walk_forward_splits(dates=self.dates, train_days=4, test_days=4)
+
+        assert splits == [
+            sweep.Split(self.dates[0], self.dates[3], self.dates[4], self.dates[7]),
+            sweep.Split(self.dates[4], self.dates[7], self.dates[8], self.dates[9]),
+        ]
+
+    def test_anchored(self):
+        """Ensures anchored training windows all start at the first date."""
+        splits = sweep.walk_forward_splits(dates=self.dates, train_days=3, test_days=2, step_days=3, anchored=True)
+
+        assert [split.train_start for split in splits] == [self.dates[0]] * 3
+        assert [split.test_start for split in splits] == [self.dates[3], self.dates[6], self.dates[9]]
+        assert [split.test_end for split in splits] == [self.dates[4], self.dates[7], self.dates[9]]
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            sweep.walk_forward_splits(dates=self.dates, train_days=0, test_days=2)
+
+
+class TestRunSweep(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'panel')
+        rng = np.random.default_rng(5)
+        n_dates, n_tickers = 320, 6
+        close = 50 * np.exp(rng.normal(scale=0.02, size=(n_dates, n_tickers)).cumsum(axis=0))
+        spread = rng.uniform(0.1, 1.5, size=close.shape)
+        close[:30, 1] = np.nan
+        fields = {'Open': close * np.exp(rng.normal(scale=0.005, size=close.shape)), 'High': close + spread,
+                  'Low': close - spread, 'Close': close}
+        ohlcv_panel.write_panel(path=self.path, fields=fields, tickers=[f'T{i}' for i in range(n_tickers)],
+                                dates=pd.bdate_range('2019-01-01', periods=n_dates))
+        self.panel = ohlcv_panel.open_panel(path=self.path)
+        self.splits = sweep.walk_forward_splits(dates=self.panel.dates, train_days=120, test_days=60)
+        self.params = sweep.grid({'rolling_window': [10, 20], 'look_back_period': [-1, -3],
+                                  'band_multiplier': [1.5, 2.0], 'keltner_multiplier': [1.5, 2.5]})
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_trials(self):
+        """Ensures each trial scores the backtest of the squeeze signal with its parameters on the split's dates."""
+        result = sweep.run_sweep(path=self.path, params=self.params, splits=self.splits, max_workers=1,
+                                 slippage_bps=5, block_size=4)
+
+        assert len(result.trials) == len(self.params) * len(self.splits) == 64
+        trial = result.trials.iloc[len(self.params) + 13]
+        params = self.params[13]
+        expected = backtest.run_backtest(panel=self.panel, signals=backtest.squeeze_signal(**params), slippage_bps=5)
+        split = self.splits[1]
+        test = expected.returns.index.slice_indexer(split.test_start, split.test_end)
+        stats = backtest.summarize(returns=expected.returns[test], turnover=expected.turnover[test],
+                                   costs=expected.costs[test], initial_capital=100_000)
+
+        assert trial['split'] == 1
+        assert all(trial[name] == value for name, value in params.items())
+        for name, value in stats.items():
+            np.testing.assert_allclose(trial[f'test_{name}'], value, rtol=1e-12, err_msg=name)
+        assert result.trials['train_annual_turnover'].gt(0).all()
+
+    def test_selection(self):
+        """Ensures each split picks its best training score, and the picks' test returns are stitched together."""
+        result = sweep.run_sweep(path=self.path, params=self.params, splits=self.splits, max_workers=1,
+                                 objective='max_drawdown')
+
+        for number, split in enumerate(self.splits):
+            trials = result.trials[result.trials['split'] == number]
+            best = trials.loc[trials['train_max_drawdown'].idxmax()]
+            assert result.selected.loc[number, 'rolling_window'] == best['rolling_window']
+            assert result.selected.loc[number, 'test_total_return'] == best['test_total_return']
+            assert result.selected.loc[number, 'test_start'] == split.test_start
+
+        assert result.returns.index.equals(self.panel.dates[120:])
+        total_return = np.prod([1 + result.selected.loc[number, 'test_total_return']
+                                for number in range(len(self.splits))]) - 1
+        np.testing.assert_allclose(result.stats['total_return'], total_return, rtol=1e-12)
+
+    def test_executor(self):
+        """Ensures the combinations give the same results spread across workers as run in one process."""
+        params = self.params[:4] + self.params[-4:]
+
+        in_process = sweep.run_sweep(path=self.path, params=params, splits=self.splits, max_workers=1)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            threaded = sweep.run_sweep(path=self.path, params=params, splits=self.splits, executor=executor)
+        pooled = sweep.run_sweep(path=self.path, params=params, splits=self.splits, max_workers=2)
+
+        for result in [threaded, pooled]:
+            pd.testing.assert_frame_equal(result.trials, in_process.trials)
+            pd.testing.assert_frame_equal(result.selected, in_process.selected)
+            pd.testing.assert_series_equal(result.returns, in_process.returns)
+
+    def test_one_window(self):
+        """Ensures a sweep over one rolling window is split across the workers and gives the in-process results."""
+        params = [combination for combination in self.params if combination['rolling_window'] == 20]
+
+        tasks = sweep._window_tasks(by_window={20: list(enumerate(params))}, n_workers=4)
+        in_process = sweep.run_sweep(path=self.path, params=params, splits=self.splits, max_workers=1)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            threaded = sweep.run_sweep(path=self.path, params=params, splits=self.splits, executor=executor)
+
+        assert len(tasks) == 4
+        assert sorted(index for _, trials in tasks for index, _ in trials) == list(range(len(params)))
+        pd.testing.assert_frame_equal(threaded.trials, in_process.trials)
+        pd.testing.assert_series_equal(threaded.returns, in_process.returns)
+
+    def test_window_tasks(self):
+        """Ensures windows are only split when there are fewer of them than workers."""
+        by_window = {window: [(window * 10 + number, {'band_multiplier': 2.0, 'keltner_multiplier': 1.5})
+                              for number in range(3)] for window in [10, 20, 30, 40]}
+
+        assert [len(trials) for _, trials in sweep._window_tasks(by_window=by_window, n_workers=4)] == [3, 3, 3, 3]
+        assert [len(trials) for _, trials in sweep._window_tasks(by_window=by_window, n_workers=8)] == [2, 1] * 4
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            sweep.run_sweep(path=self.path, params=self.params, splits=self.splits, objective='alpha')
+        with pytest.raises(ValueError):
+            sweep.run_sweep(path=self.path, params=[{'look_back_period': 0}], splits=self.splits)
+        with pytest.raises(ValueError):
+            sweep.run_sweep(path=self.path, params=self.params, splits=self.splits, start_date='2020-01-01')
@@ -0,0 +1,315 @@
+"""A local columnar store for datasets such as daily share prices, as Hive-partitioned Parquet.
+
+Every write is a snapshot under :func:`wsbtrading.data_io.generate_path_to_write`, i.e.
+``ROOT_PATH/ENVIRONMENT/GRANULARITY/DATASET_NAME/TIMESTAMP``, split into one directory per partition value, e.g.
+``.../share_prices/2021-02-10_21-30-00/date_part=2021-02-10/part-0.parquet``. A timestamp column is split by a
+derived ``<column>_part`` holding its UTC date, so each day gets one directory while the files keep the full
+timestamps. Rows are sorted by ticker and date within each file, so the Parquet row-group statistics let a ticker filter
+skip most of a file as well as whole directories.
+
+A snapshot also holds a ``_common_metadata`` file with its schema and partition columns, and is only renamed into
+place once complete, so readers never see half a write and don't need to be told how it was partitioned.
+
+Needs ``pyarrow``.
+"""
+import json
+import os
+import shutil
+from datetime import date, datetime
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from wsbtrading.data_io import data_io
+from wsbtrading.instrumentation import profiling
+
+DEFAULT_ROOT_PATH = '/group/wsbtrading'
+METADATA_FILE = '_common_metadata'
+_PARTITION_COLS_KEY = b'wsbtrading.partition_cols'
+_DATE_PARTITION_SUFFIX = '_part'
+
+
+def _to_date_partitions(table: pa.Table, partition_cols: Sequence[str]) -> Tuple[pa.Table, List[str]]:
+    """Adds the (UTC) date of each timestamp partition column as ``<column>_part``, to partition by instead.
+
+    Each day then gets one directory rather than one per time, and the timestamps themselves are kept in the files.
+    Returns the table and the columns to partition it by.
+    """
+    directory_cols = []
+    for name in partition_cols:
+        field = table.schema.field(name) if name in table.column_names else None
+        if field is None:
+            raise ValueError(f'There is no column named {name} to partition by.')
+        if pa.types.is_timestamp(field.type):
+            # Dropping the time zone keeps the UTC instants, so the date doesn't depend on the zone
+            utc = pc.cast(table[name], pa.timestamp(field.type.unit))
+            table = table.append_column(name + _DATE_PARTITION_SUFFIX, pc.cast(utc, pa.date32()))
+            name += _DATE_PARTITION_SUFFIX
+        directory_cols.append(name)
+
+    return table, directory_cols
+
+
+def _to_arrow(df: Union['pd.DataFrame', pa.Table]) -> pa.Table:
+    return df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _stream_batches(frames: Iterable[Union['pd.DataFrame', pa.Table]],
+                    partition_cols: Sequence[str]) -> Tuple[pa.Schema, List[str], Iterator[pa.RecordBatch]]:
+    """Converts chunks to record batches one at a time, taking the schema of the whole stream from its first chunk."""
+    chunks = iter(frames)
+    first = next(chunks, None)
+    if first is None:
+        raise ValueError('There are no chunks to write.')
+    first, directory_cols = _to_date_partitions(table=_to_arrow(first), partition_cols=partition_cols)
+    schema = first.schema
+
+    def batches() -> Iterator[pa.RecordBatch]:
+        yield from first.to_batches()
+        for chunk in chunks:
+            table, _ = _to_date_partitions(table=_to_arrow(chunk), partition_cols=partition_cols)
+            yield from table.select(schema.names).cast(schema).to_batches()
+
+    return schema, directory_cols, batches()
+
+
+@profiling.instrument
+def write_dataset(df: Union['pd.DataFrame', pa.Table, Iterable[Union['pd.DataFrame', pa.Table]]],
+                  environment: str,
+                  granularity: str,
+                  dataset_name: str,
+                  partition_cols: Sequence[str] = ('date',),
+                  root_path: str = DEFAULT_ROOT_PATH,
+                  timestamp: Optional[str] = None,
+                  rows_per_group: int = 64 * 1024) -> str:
+    """Writes a snapshot of a dataset as Parquet, one directory per value of the partition columns.
+
+    ``df`` can also be an iterable of chunks, e.g. ``pd.read_csv(..., chunksize=...)``, which are written as they come
+    so the dataset is never held in memory whole. Every chunk must have the columns of the first; rows are then kept in
+    the order they arrive instead of being sorted by ticker and date.
+
+    Args:
+        df: the rows to write, as pandas or Arrow, or an iterable of chunks of either
+        environment: possible values are 'dev' or 'prod'
+        granularity: possible values are 'stream', 'minute', 'daily', 'weekly', 'monthly'
+        dataset_name: the name of the dataset, with no spaces e.g. share_prices
+        partition_cols: the columns to split directories by; timestamps are split by their UTC date, under
+                        ``<column>_part`` directories
+        root_path: the root for your dataset path, e.g. ``/user/your_user`` or ``/group/wsbtrading``
+        timestamp: the name of the snapshot, by default the time in UTC now; see :func:`generate_path_to_write`
+        rows_per_group: the most rows per Parquet row group, the unit a ticker filter can skip
+
+    Returns:
+        the path the snapshot was written to
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.data_io import columnar_store
+        columnar_store.write_dataset(df=prices_df, environment='prod', granularity='daily', dataset_name='share_prices')
+        # /group/wsbtrading/prod/daily/share_prices/2021-02-10_21-30-00
+    """
+    path = data_io.generate_path_to_write(environment=environment, granularity=granularity,
+                                          dataset_name=dataset_name, root_path=root_path, timestamp=timestamp)
+    if isinstance(df, (pd.DataFrame, pa.Table)):
+        data, directory_cols = _to_date_partitions(table=_to_arrow(df), partition_cols=partition_cols)
+        sort_keys = [(name, 'ascending') for name in ['ticker', 'date'] if name in data.column_names]
+        if sort_keys:
+            data = data.sort_by(sort_keys)
+        schema = data.schema
+    else:
+        schema, directory_cols, data = _stream_batches(frames=df, partition_cols=partition_cols)
+
+    partition_schema = pa.schema([schema.field(name) for name in directory_cols])
+    staging_path = os.path.join(os.path.dirname(path), f'.{os.path.basename(path)}.tmp')
+    shutil.rmtree(staging_path, ignore_errors=True)
+    ds.write_dataset(data, schema=schema, base_dir=staging_path, format='parquet',
+                     basename_template='part-{i}.parquet',
+                     partitioning=ds.partitioning(partition_schema, flavor='hive'),
+                     max_rows_per_group=rows_per_group, min_rows_per_group=min(rows_per_group, 1024))
+    schema = schema.with_metadata({**(schema.metadata or {}),
+                                   _PARTITION_COLS_KEY: json.dumps(directory_cols).encode()})
+    pq.write_metadata(schema, os.path.join(staging_path, METADATA_FILE))
+    os.replace(staging_path, path)
+
+    return path
+
+
+def list_snapshots(environment: str, granularity: str, dataset_name: str,
+                   root_path: str = DEFAULT_ROOT_PATH) -> List[str]:
+    """Lists the complete snapshots of a dataset, oldest first.
+
+    Args:
+        environment: possible values are 'dev' or 'prod'
+        granularity: possible values are 'stream', 'minute', 'daily', 'weekly', 'monthly'
+        dataset_name: the name of the dataset, with no spaces e.g. share_prices
+        root_path: the root for your dataset path
+
+    Returns:
+        the snapshot names, i.e. the ``timestamp`` each was written with
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.data_io import columnar_store
+        columnar_store.list_snapshots(environment='prod', granularity='daily', dataset_name='share_prices')
+        # ['2021-02-09_21-30-00', '2021-02-10_21-30-00']
+    """
+    # The parent of any snapshot path is the dataset's directory
+    dataset_path = os.path.dirname(data_io.generate_path_to_write(environment=environment, granularity=granularity,
+                                                                  dataset_name=dataset_name, root_path=root_path,
+                                                                  timestamp='_'))
+    if not os.path.isdir(dataset_path):
+        return []
+
+    return sorted(name for name in os.listdir(dataset_path)
+                  if os.path.exists(os.path.join(dataset_path, name, METADATA_FILE)))
+
+
+def _date_filter(field: pa.Field, start_date: Optional[Union[str, date, datetime]],
+                 end_date: Optional[Union[str, date, datetime]]) -> List['ds.Expression']:
+    """Bounds a date or timestamp column by whole days, ``end_date`` included."""
+    conditions = []
+    if pa.types.is_timestamp(field.type):
+        if start_date is not None:
+            conditions.append(ds.field(field.name) >= pa.scalar(pd.Timestamp(start_date, tz=field.type.tz),
+                                                                type=field.type))
+        if end_date is not None:
+            next_day = pd.Timestamp(end_date, tz=field.type.tz).normalize() + pd.Timedelta(days=1)
+            conditions.append(ds.field(field.name) < pa.scalar(next_day, type=field.type))
+    else:
+        if start_date is not None:
+            conditions.append(ds.field(field.name) >= pa.scalar(pd.Timestamp(start_date).date(), type=field.type))
+        if end_date is not None:
+            conditions.append(ds.field(field.name) <= pa.scalar(pd.Timestamp(end_date).date(), type=field.type))
+
+    return conditions
+
+
+def _date_partition_filter(field: pa.Field, start_date: Optional[Union[str, date, datetime]],
+                           end_date: Optional[Union[str, date, datetime]]) -> List['ds.Expression']:
+    """Bounds the ``<column>_part`` directories of a timestamp column by the UTC dates its bounds fall on."""
+    def utc_date(timestamp: pd.Timestamp) -> date:
+        return (timestamp.tz_convert('UTC') if timestamp.tz is not None else timestamp).date()
+
+    name = field.name + _DATE_PARTITION_SUFFIX
+    conditions = []
+    if start_date is not None:
+        conditions.append(ds.field(name) >= pa.scalar(utc_date(pd.Timestamp(start_date, tz=field.type.tz)),
+                                                      type=pa.date32()))
+    if end_date is not None:
+        next_day = pd.Timestamp(end_date, tz=field.type.tz).normalize() + pd.Timedelta(days=1)
+        conditions.append(ds.field(name) <= pa.scalar(utc_date(next_day - pd.Timedelta(1, unit='ns')),
+                                                      type=pa.date32()))
+
+    return conditions
+
+
+def _open_snapshot(path: str) -> ds.Dataset:
+    """Opens a snapshot with the schema and partitioning recorded when it was written."""
+    schema = pq.read_schema(os.path.join(path, METADATA_FILE))
+    partition_cols = json.loads(schema.metadata[_PARTITION_COLS_KEY])
+    partitioning = ds.partitioning(pa.schema([schema.field(name) for name in partition_cols]), flavor='hive')
+
+    return ds.dataset(path, schema=schema, format='parquet', partitioning=partitioning)
+
+
+def _row_filter(schema: pa.Schema, tickers: Optional[Sequence[str]],
+                start_date: Optional[Union[str, date, datetime]],
+                end_date: Optional[Union[str, date, datetime]]) -> Optional['ds.Expression']:
+    """Combines the ticker and date bounds into one filter, or None to read every row."""
+    conditions = []
+    if tickers is not None:
+        conditions.append(ds.field('ticker').isin(list(tickers)))
+    if start_date is not None or end_date is not None:
+        conditions.extend(_date_filter(field=schema.field('date'), start_date=start_date, end_date=end_date))
+        # The filter on the timestamps alone can't tell which directories to skip
+        if 'date' + _DATE_PARTITION_SUFFIX in schema.names:
+            conditions.extend(_date_partition_filter(field=schema.field('date'), start_date=start_date,
+                                                     end_date=end_date))
+
+    row_filter = None
+    for condition in conditions:
+        row_filter = condition if row_filter is None else row_filter & condition
+
+    return row_filter
+
+
+@profiling.instrument
+def read_dataset(environment: str,
+                 granularity: str,
+                 dataset_name: str,
+                 columns: Optional[List[str]] = None,
+                 tickers: Optional[Sequence[str]] = None,
+                 start_date: Optional[Union[str, date, datetime]] = None,
+                 end_date: Optional[Union[str, date, datetime]] = None,
+                 root_path: str = DEFAULT_ROOT_PATH,
+                 timestamp: Optional[str] = None,
+                 as_arrow: bool = False) -> Union['pd.DataFrame', pa.Table]:
+    """Reads a snapshot of a dataset, opening only the partitions and columns needed.
+
+    Date bounds skip whole ``date=`` directories, a ticker filter skips directories or row groups, and only the
+    requested columns are read off disk. The pandas conversion splits columns into their own blocks and frees the
+    Arrow buffers as it goes, so numeric columns without nulls are not copied a second time.
+
+    Args:
+        environment: possible values are 'dev' or 'prod'
+        granularity: possible values are 'stream', 'minute', 'daily', 'weekly', 'monthly'
+        dataset_name: the name of the dataset, with no spaces e.g. share_prices
+        columns: the columns to read; by default every column
+        tickers: the tickers to read; by default every ticker
+        start_date: the first date to read, inclusive; by default the earliest
+        end_date: the last date to read, inclusive; by default the latest
+        root_path: the root for your dataset path
+        timestamp: the snapshot to read; by default the latest complete one
+        as_arrow: whether to return a ``pyarrow.Table`` instead of a dataframe
+
+    Returns:
+        the matching rows, ordered by ticker and date when both are read
+
+    Raises:
+        FileNotFoundError: if the dataset has no complete snapshot, or not the one asked for
+        ValueError: if ``tickers`` or a date bound is given for a dataset without a ``ticker`` or ``date`` column
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.data_io import columnar_store
+        columnar_store.read_dataset(environment='prod', granularity='daily', dataset_name='share_prices',
+                                    columns=['ticker', 'date', 'close'], tickers=['GME'], start_date='2021-01-01')
+    """
+    snapshots = list_snapshots(environment=environment, granularity=granularity, dataset_name=dataset_name,
+                               root_path=root_path)
+    timestamp = timestamp or (snapshots[-1] if snapshots else None)
+    if timestamp not in snapshots:
+        raise FileNotFoundError(f'There is no snapshot {timestamp or ""} of {environment}/{granularity}/{dataset_name} '
+                                f'under {root_path}.')
+    path = data_io.generate_path_to_write(environment=environment, granularity=granularity,
+                                          dataset_name=dataset_name, root_path=root_path, timestamp=timestamp)
+
+    dataset = _open_snapshot(path)
+    for name, bound in [('ticker', tickers), ('date', start_date if start_date is not None else end_date)]:
+        if bound is not None and name not in dataset.schema.names:
+            raise ValueError(f'{environment}/{granularity}/{dataset_name} has no {name} column to filter by.')
+    row_filter = _row_filter(schema=dataset.schema, tickers=tickers, start_date=start_date, end_date=end_date)
+
+    if columns is None:
+        # Leave out the dates derived to partition timestamps by, which the timestamps already hold
+        columns = [name for name in dataset.schema.names
+                   if not (name.endswith(_DATE_PARTITION_SUFFIX)
+                           and name[:-len(_DATE_PARTITION_SUFFIX)] in dataset.schema.names)]
+    table = dataset.to_table(columns=columns, filter=row_filter)
+    # Rows come back partition by partition; put them in the order a ``(ticker, date)`` query would return them
+    if 'ticker' in table.column_names and 'date' in table.column_names:
+        table = table.sort_by([('ticker', 'ascending'), ('date', 'ascending')])
+    if as_arrow:
+        return table
+
+    return table.to_pandas(split_blocks=True, self_destruct=True, date_as_object=False)
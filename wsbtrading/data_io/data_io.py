@@ -1,9 +1,15 @@
+import io
 import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, List, Sequence, Tuple, Union
 from abc import abstractmethod
 import csv
 import psycopg2
+import psycopg2.pool
+from psycopg2 import sql
 import quandl
 import numpy as np
 import pandas as pd
@@ -12,6 +18,7 @@ import alpaca_trade_api as tradeapi
 
 from wsbtrading.instrumentation import Alpaca as iAlpaca
 from wsbtrading.instrumentation import Quandl as iQuandl
+from wsbtrading.instrumentation import profiling
 
 
 class CSV:
@@ -50,8 +57,29 @@ def quandl_api():
     quandl.ApiConfig.api_key = iQuandl.api_key
 
 
+class _AlpacaState:
+    """The process-wide Alpaca clients behind :func:`alpaca_rest_api_conn`, and the responses cached from them."""
+    lock = threading.Lock()
+    pid = None
+    clients = {}
+    # trading_type -> (time.monotonic() when fetched, value)
+    clocks = {}
+    accounts = {}
+
+
+class MarketClock(NamedTuple):
+    """The market clock, as of ``timestamp``."""
+    timestamp: 'pd.Timestamp'
+    is_open: bool
+    next_open: 'pd.Timestamp'
+    next_close: 'pd.Timestamp'
+
+
 def alpaca_rest_api_conn(trading_type: str):
-    """Creates the initial connection to Alpaca API.
+    """Returns the connection to Alpaca API for a trading type, creating it on first use.
+
+    The client is kept for the life of the process and shared by every caller, so its HTTP session, and the keep-alive
+    connections it pools, are reused rather than set up again per call. A forked child creates its own.
 
     Args:
         trading_type: denotes live versus paper trading
@@ -66,11 +94,104 @@ def alpaca_rest_api_conn(trading_type: str):
         from wsbtrading import data_io
         alpaca_api = data_io.alpaca_rest_api_conn(trading_type='paper_trading')
     """
-    api_key = iAlpaca.api_key
-    secret_key = iAlpaca.secret_key
-    base_url = iAlpaca.api_call[trading_type]['base_url']
+    with _AlpacaState.lock:
+        if _AlpacaState.pid != os.getpid():
+            _AlpacaState.pid = os.getpid()
+            _AlpacaState.clients = {}
+        client = _AlpacaState.clients.get(trading_type)
+        if client is None:
+            base_url = iAlpaca.api_call[trading_type]['base_url']
+            client = tradeapi.REST(iAlpaca.api_key, iAlpaca.secret_key, base_url=base_url, api_version='v2')
+            _AlpacaState.clients[trading_type] = client
+
+    return client
+
+
+def reset_alpaca_clients() -> None:
+    """Drops the shared Alpaca clients and everything cached from them, e.g. after the API keys change.
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        data_io.reset_alpaca_clients()
+    """
+    with _AlpacaState.lock:
+        _AlpacaState.clients = {}
+        _AlpacaState.clocks = {}
+        _AlpacaState.accounts = {}
+
+
+def market_clock(trading_type: str = 'live_trading', max_age: float = 3600.0) -> MarketClock:
+    """Returns the market clock, asking Alpaca only when the cached one may be out of date.
+
+    Whether the market is open only changes at ``next_open`` or ``next_close``, so until the next of those the cached
+    clock is returned with its ``timestamp`` moved on by the time since it was fetched. It is fetched again once that
+    moment has passed, or once it is ``max_age`` seconds old, in case of an unscheduled closure.
+
+    Args:
+        trading_type: denotes live versus paper trading
+        max_age: the most seconds to trust a fetched clock for
+
+    Returns:
+        the clock
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        clock = data_io.market_clock()
+        clock.next_close - clock.timestamp
+    """
+    now = time.monotonic()
+    with _AlpacaState.lock:
+        cached = _AlpacaState.clocks.get(trading_type)
+    if cached is not None:
+        fetched_at, clock = cached
+        elapsed = now - fetched_at
+        timestamp = clock.timestamp + pd.Timedelta(seconds=elapsed)
+        if elapsed < max_age and timestamp < (clock.next_close if clock.is_open else clock.next_open):
+            return clock._replace(timestamp=timestamp)
+
+    clock = alpaca_rest_api_conn(trading_type=trading_type).get_clock()
+    clock = MarketClock(timestamp=clock.timestamp, is_open=clock.is_open, next_open=clock.next_open,
+                        next_close=clock.next_close)
+    with _AlpacaState.lock:
+        _AlpacaState.clocks[trading_type] = (now, clock)
+
+    return clock
+
+
+def alpaca_account(trading_type: str, max_age: float = 5.0):
+    """Returns the account, as fetched from Alpaca at most ``max_age`` seconds ago.
+
+    Args:
+        trading_type: denotes live versus paper trading
+        max_age: the most seconds to reuse a fetched account for; 0 always fetches it
+
+    Returns:
+        the account, see :func:`wsbtrading.order.account.get_account`
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        data_io.alpaca_account(trading_type='paper_trading').buying_power
+    """
+    now = time.monotonic()
+    with _AlpacaState.lock:
+        cached = _AlpacaState.accounts.get(trading_type)
+    if cached is not None and now - cached[0] < max_age:
+        return cached[1]
 
-    return tradeapi.REST(api_key, secret_key, base_url=base_url)
+    account = alpaca_rest_api_conn(trading_type=trading_type).get_account()
+    with _AlpacaState.lock:
+        _AlpacaState.accounts[trading_type] = (now, account)
+
+    return account
 
 
 def postgres_conn(database: str = 'wsbtrading',
@@ -103,6 +224,201 @@ def postgres_conn(database: str = 'wsbtrading',
     return conn, cur
 
 
+class _PoolState:
+    """The process-wide connection pool behind :func:`pooled_connection`, and what it has been doing."""
+    lock = threading.Lock()
+    pool = None
+    pid = None
+    slots = None
+    settings = {
+        'minconn': 1,
+        'maxconn': 10,
+        'health_check_interval': 30.0,
+        'connection_kwargs': {'database': 'wsbtrading', 'user': 'postgres', 'password': 'postgres',
+                              'host': '127.0.0.1', 'port': '5432'},
+    }
+    last_used = {}
+    metrics = {}
+    # Pools inherited from a parent process; kept referenced so their connections, which belong to the parent, are
+    # never closed from the child
+    inherited = []
+
+    @classmethod
+    def reset_metrics(cls):
+        cls.metrics = {'checkouts': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0, 'in_use': 0,
+                       'replaced_connections': 0}
+
+
+_PoolState.reset_metrics()
+
+
+def configure_pool(minconn: int = 1,
+                   maxconn: int = 10,
+                   health_check_interval: float = 30.0,
+                   database: str = 'wsbtrading',
+                   user: str = 'postgres',
+                   password: str = 'postgres',
+                   host: str = '127.0.0.1',
+                   port: str = '5432'):
+    """Configures the process-wide Postgres connection pool used by :func:`pooled_connection`.
+
+    The pool is created lazily on first use. Calling this again closes the current pool, so the next checkout opens
+    connections with the new settings, and forgets the cached table schemas.
+
+    Args:
+        minconn: the number of connections to keep open
+        maxconn: the most connections this process will open; further checkouts wait for one to be returned
+        health_check_interval: connections idle for longer than this many seconds are pinged before being handed out
+        database: the database to connect to
+        user: the user to sign in as
+        password: the password to sign in with
+        host: the host URL
+        port: the port number
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        data_io.configure_pool(maxconn=4)
+    """
+    if not 0 < minconn <= maxconn:
+        raise ValueError(f'Expected 0 < minconn <= maxconn, got minconn={minconn} and maxconn={maxconn}.')
+
+    with _PoolState.lock:
+        if _PoolState.pool is not None and _PoolState.pid == os.getpid():
+            _PoolState.pool.closeall()
+        elif _PoolState.pool is not None:
+            _PoolState.inherited.append(_PoolState.pool)
+        _PoolState.pool = None
+        invalidate_table_schemas()
+        _PoolState.settings = {
+            'minconn': minconn,
+            'maxconn': maxconn,
+            'health_check_interval': health_check_interval,
+            'connection_kwargs': {'database': database, 'user': user, 'password': password, 'host': host,
+                                  'port': port},
+        }
+
+
+def _get_pool() -> Tuple['psycopg2.pool.ThreadedConnectionPool', threading.BoundedSemaphore]:
+    """Returns this process's pool, opening it on first use or after a fork (connections can't cross processes)."""
+    with _PoolState.lock:
+        if _PoolState.pool is None or _PoolState.pid != os.getpid():
+            if _PoolState.pool is not None:
+                _PoolState.inherited.append(_PoolState.pool)
+            settings = _PoolState.settings
+            _PoolState.pool = psycopg2.pool.ThreadedConnectionPool(settings['minconn'], settings['maxconn'],
+                                                                   **settings['connection_kwargs'])
+            _PoolState.pid = os.getpid()
+            _PoolState.slots = threading.BoundedSemaphore(settings['maxconn'])
+            _PoolState.last_used = {}
+            _PoolState.reset_metrics()
+
+        return _PoolState.pool, _PoolState.slots
+
+
+def _is_healthy(conn: 'psycopg2.extensions.connection') -> bool:
+    """Checks a pooled connection, pinging the server only if it has sat idle for a while."""
+    if conn.closed:
+        return False
+    idle_seconds = time.monotonic() - _PoolState.last_used.get(id(conn), time.monotonic())
+    if idle_seconds <= _PoolState.settings['health_check_interval']:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SELECT 1')
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+@contextmanager
+def pooled_connection(timeout: Optional[float] = None) \
+        -> Iterator[Tuple['psycopg2.extensions.connection', 'psycopg2.extensions.cursor']]:
+    """Checks a connection out of the process-wide pool for the duration of a ``with`` block.
+
+    Anything not committed when the block exits is rolled back before the connection goes back to the pool.
+
+    Args:
+        timeout: the most seconds to wait for a free connection, or None to wait as long as it takes
+
+    Returns:
+        a Postgres connection and a cursor on it
+
+    Raises:
+        psycopg2.pool.PoolError: if no connection was free within ``timeout``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        with data_io.pooled_connection() as (conn, cur):
+            cur.execute('SELECT count(*) FROM share_prices_daily')
+    """
+    pool, slots = _get_pool()
+
+    start = time.perf_counter()
+    if not slots.acquire(timeout=timeout):
+        raise psycopg2.pool.PoolError(f'No Postgres connection became free within {timeout} seconds.')
+    waited = time.perf_counter() - start
+
+    try:
+        conn = pool.getconn()
+        if not _is_healthy(conn):
+            pool.putconn(conn, close=True)
+            _PoolState.metrics['replaced_connections'] += 1
+            conn = pool.getconn()
+    except BaseException:
+        slots.release()
+        raise
+
+    with _PoolState.lock:
+        metrics = _PoolState.metrics
+        metrics['checkouts'] += 1
+        metrics['wait_seconds_total'] += waited
+        metrics['wait_seconds_max'] = max(metrics['wait_seconds_max'], waited)
+        metrics['in_use'] += 1
+
+    cur = conn.cursor()
+    try:
+        yield conn, cur
+    finally:
+        try:
+            cur.close()
+            if not conn.closed:
+                conn.rollback()
+        except psycopg2.Error:
+            pass
+        _PoolState.last_used[id(conn)] = time.monotonic()
+        with _PoolState.lock:
+            _PoolState.metrics['in_use'] -= 1
+        pool.putconn(conn, close=bool(conn.closed))
+        slots.release()
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """Reports how the process-wide connection pool has been used since it was opened.
+
+    Returns:
+        a dictionary with the number of ``checkouts``, the ``wait_seconds_total`` and ``wait_seconds_max`` spent
+        waiting for a free connection, the connections ``in_use`` right now, and the ``replaced_connections`` that
+        failed their health check
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        data_io.pool_metrics()
+        # {'checkouts': 12, 'wait_seconds_total': 0.41, 'wait_seconds_max': 0.2, 'in_use': 1, 'replaced_connections': 0}
+    """
+    with _PoolState.lock:
+        return dict(_PoolState.metrics)
+
+
 def generate_path_to_write(environment: str,
                            granularity: str,
                            dataset_name: str,
@@ -147,30 +463,192 @@ def generate_path_to_write(environment: str,
     return os.path.join(root_path, environment, granularity, dataset_name, timestamp)
 
 
-def _get_table_field_names(table_name: str) -> List[str]:
-    """Queries the field names of a given table.
+class Column(NamedTuple):
+    """A table column, as listed in ``information_schema.columns``."""
+    name: str
+    data_type: str
+
+
+# Column types COPY should load an empty quoted field into as an empty string; every other type gets NULL
+_TEXT_TYPES = frozenset(['text', 'character varying', 'character'])
+
+
+class _SchemaCache:
+    """The process-wide catalog of table schemas behind :func:`table_schema`, and the COPY statements built from it."""
+    lock = threading.Lock()
+    tables = {}
+    copy_statements = {}
+
+
+def _load_table_schemas(cur: 'psycopg2.extensions.cursor') -> Dict[str, List[Column]]:
+    """Reads the columns of every table in the current schema in a single query."""
+    cur.execute("""
+        SELECT table_name, column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        ORDER BY table_name, ordinal_position
+    """)
+    tables = {}
+    for table_name, column_name, data_type in cur.fetchall():
+        tables.setdefault(table_name, []).append(Column(name=column_name, data_type=data_type))
+
+    return tables
+
+
+def _cached_table_schema(table_name: str, cur: Optional['psycopg2.extensions.cursor'] = None) \
+        -> Optional[List[Column]]:
+    """Looks a table up in the schema cache, refreshing the whole cache from the server once on a miss."""
+    schema = _SchemaCache.tables.get(table_name)
+    if schema is not None:
+        return schema
+
+    if cur is None:
+        with pooled_connection() as (_, pooled_cur):
+            return _cached_table_schema(table_name=table_name, cur=pooled_cur)
+
+    tables = _load_table_schemas(cur)
+    with _SchemaCache.lock:
+        _SchemaCache.tables = tables
+        _SchemaCache.copy_statements = {}
+
+    return tables.get(table_name)
+
+
+def table_schema(table_name: str, cur: Optional['psycopg2.extensions.cursor'] = None) -> List[Column]:
+    """Lists the columns of a table, with their types.
+
+    Schemas are cached for the life of the process: the first lookup, or the first for a table the cache has not
+    seen, reads every table in the current schema from ``information_schema`` in one query. Run
+    :func:`invalidate_table_schemas` after changing a table from outside ``data_base/create_tables.py``.
 
     Args:
-        table_name: the name of the table to query
+        table_name: the name of the table to describe
+        cur: the cursor to query with on a cache miss; by default one is checked out of the connection pool
 
     Returns:
-        a list of column names
+        the table's columns in order, or an empty list if there is no such table
 
     **Example**
 
     .. code-block:: python
 
-        from phobos import data_io
-        column_list = data_io._get_table_field_names(table_name='company_listing_status')
+        from wsbtrading import data_io
+        data_io.table_schema(table_name='share_prices_daily')
+        # [Column(name='ticker', data_type='text'), Column(name='date', data_type='timestamp with time zone'), ...]
     """
-    conn, cur = postgres_conn()
     try:
-        cur.execute(f'Select * FROM {table_name} LIMIT 0')
-        col_names = [desc[0] for desc in cur.description]
+        schema = _cached_table_schema(table_name=table_name, cur=cur)
     except psycopg2.Error as e:
         print(f'error: {e}')
+        return []
+    if schema is None:
+        print(f'error: there is no table named {table_name}')
+        return []
+
+    return list(schema)
+
+
+def invalidate_table_schemas(table_name: Optional[str] = None):
+    """Forgets cached table schemas, so the next lookup reads them from the server again.
+
+    Args:
+        table_name: the table whose schema changed; by default every table is forgotten
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        cur.execute('ALTER TABLE share_prices_daily ADD COLUMN split_ratio DECIMAL(40,4)')
+        data_io.invalidate_table_schemas(table_name='share_prices_daily')
+    """
+    with _SchemaCache.lock:
+        if table_name is None:
+            _SchemaCache.tables = {}
+            _SchemaCache.copy_statements = {}
+        else:
+            _SchemaCache.tables.pop(table_name, None)
+            _SchemaCache.copy_statements = {key: statement for key, statement in _SchemaCache.copy_statements.items()
+                                            if key[0] != table_name}
+
+
+def _non_text_columns(schema: List[Column], columns: List[str]) -> List[str]:
+    """Picks the columns whose type is known and is not text, in the order given."""
+    data_types = {column.name: column.data_type for column in schema}
+    return [column for column in columns if column in data_types and data_types[column] not in _TEXT_TYPES]
 
-    return col_names
+
+def copy_statement(table_name: str, columns: Optional[List[str]] = None,
+                   cur: Optional['psycopg2.extensions.cursor'] = None) -> 'sql.Composed':
+    """Builds the ``COPY ... FROM STDIN`` statement that loads CSV text into a table, using its cached schema.
+
+    Empty fields load as NULL. Columns that are not text also load quoted empty fields (``""``) as NULL, which they
+    could not otherwise parse. Statements are cached alongside the schema they were built from.
+
+    Args:
+        table_name: the name of the table to load
+        columns: the table columns, in the same order as the file; defaults to every column of the table
+        cur: the cursor to query with on a cache miss; by default one is checked out of the connection pool
+
+    Returns:
+        a statement ready for ``cursor.copy_expert``
+
+    Raises:
+        ValueError: if ``columns`` is not given and there is no such table
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        statement = data_io.copy_statement(table_name='fundamentals_daily')
+        print(statement.as_string(cur))
+        # COPY "fundamentals_daily" ("ticker", "date", ...) FROM STDIN WITH (FORMAT csv, FORCE_NULL ("date", ...))
+    """
+    key = (table_name, None if columns is None else tuple(columns))
+    statement = _SchemaCache.copy_statements.get(key)
+    if statement is not None:
+        return statement
+
+    schema = _cached_table_schema(table_name=table_name, cur=cur) or []
+    if columns is None:
+        if not schema:
+            raise ValueError(f'There is no table named {table_name}.')
+        columns = [column.name for column in schema]
+    force_null = _non_text_columns(schema=schema, columns=columns)
+
+    options = sql.SQL('FORMAT csv')
+    if force_null:
+        options = sql.SQL('FORMAT csv, FORCE_NULL ({columns})').format(
+            columns=sql.SQL(', ').join(sql.Identifier(column) for column in force_null))
+    statement = sql.SQL('COPY {table} ({columns}) FROM STDIN WITH ({options})').format(
+        table=sql.Identifier(table_name),
+        columns=sql.SQL(', ').join(sql.Identifier(column) for column in columns),
+        options=options)
+    with _SchemaCache.lock:
+        _SchemaCache.copy_statements[key] = statement
+
+    return statement
+
+
+def _get_table_field_names(table_name: str, cur: Optional['psycopg2.extensions.cursor'] = None) -> List[str]:
+    """Queries the field names of a given table, from the schema cache when possible.
+
+    Args:
+        table_name: the name of the table to query
+        cur: the cursor to query with on a cache miss; by default one is checked out of the connection pool
+
+    Returns:
+        a list of column names
+
+    **Example**
+
+    .. code-block:: python
+
+        from phobos import data_io
+        column_list = data_io._get_table_field_names(table_name='company_listing_status')
+    """
+    return [column.name for column in table_schema(table_name=table_name, cur=cur)]
 
 
 def _convert_empty_strings_to_null(df: 'pd.DataFrame') -> 'pd.DataFrame':
@@ -189,13 +667,220 @@ def _convert_empty_strings_to_null(df: 'pd.DataFrame') -> 'pd.DataFrame':
     return df.replace({np.nan: None})
 
 
-def insert_csv_to_sql(table_name: str, csv_path: str, delimiter: str = ','):
-    """Given a SQL table.
+class LoadStats(NamedTuple):
+    """What a bulk load wrote, and how fast."""
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else float('inf')
+
+
+class IteratorFile(io.TextIOBase):
+    """A read-only text file over an iterator of strings, so COPY can stream data that never sits in memory at once.
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        data_io.IteratorFile(chunks=iter(['1,GME\\n', '2,AMC\\n'])).read()
+        # '1,GME\\n2,AMC\\n'
+    """
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = chunks
+        self._current = io.StringIO()
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        size = -1 if size is None else size
+        parts = []
+        remaining = size
+        while size < 0 or remaining > 0:
+            data = self._current.read(remaining)
+            if data:
+                parts.append(data)
+                remaining -= len(data)
+                continue
+            try:
+                self._current = io.StringIO(next(self._chunks))
+            except StopIteration:
+                break
+
+        return ''.join(parts)
+
+
+def coerce_nulls(chunk: 'pd.DataFrame', columns: List[int]) -> 'pd.DataFrame':
+    """Blanks out the values a typed column can't parse as anything but NULL, in place.
+
+    Surrounding whitespace is stripped from the given columns, and values left empty become NaN, which is written out
+    as NULL. Each column is handled in one vectorized pass, with no per-value Python code.
+
+    Args:
+        chunk: text values, as read with ``dtype=str``
+        columns: the positions of the columns to coerce, e.g. the numeric ones
+
+    Returns:
+        ``chunk`` itself
+
+    **Example**
+
+    .. code-block:: python
+
+        import pandas as pd
+        from wsbtrading import data_io
+
+        chunk = pd.DataFrame({'ticker': ['GME', 'AMC'], 'marketcap': [' 1.5e9', ' ']})
+        data_io.coerce_nulls(chunk=chunk, columns=[1])
+        # marketcap: ['1.5e9', NaN]
+    """
+    for label in chunk.columns[columns]:
+        values = chunk[label].str.strip()
+        chunk[label] = values.mask(values == '')
+
+    return chunk
+
+
+def _clean_chunks(chunks: Iterable['pd.DataFrame'], counter: List[int], null_columns: Optional[List[int]] = None,
+                  index: bool = False) -> Iterator[str]:
+    """Re-emits dataframe chunks as CSV text, with every missing value left unquoted and empty.
+
+    Args:
+        chunks: the rows to emit
+        counter: a one-element list that is incremented by the number of rows emitted
+        null_columns: the positions of the columns to run through :func:`coerce_nulls`
+        index: whether to emit each chunk's index as the first column
+    """
+    for chunk in chunks:
+        if null_columns:
+            coerce_nulls(chunk=chunk, columns=null_columns)
+        counter[0] += len(chunk)
+        yield chunk.to_csv(header=False, index=index, na_rep='')
+
+
+def _clean_csv_chunks(csv_path: str, delimiter: str, chunk_size: int, counter: List[int],
+                      null_columns: Optional[List[int]] = None) -> Iterator[str]:
+    """Reads a CSV chunk by chunk and re-emits each chunk as CSV text, with every missing value left unquoted and empty.
+
+    Values are read as text, so everything but the missing values reaches the database exactly as written in the file.
+
+    Args:
+        csv_path: the path to the data file to import
+        delimiter: the type of delimiter for the file
+        chunk_size: the number of rows per chunk
+        counter: a one-element list that is incremented by the number of rows emitted
+        null_columns: the positions of the columns to run through :func:`coerce_nulls`
+    """
+    return _clean_chunks(chunks=pd.read_csv(csv_path, sep=delimiter, chunksize=chunk_size, dtype=str),
+                         counter=counter, null_columns=null_columns)
+
+
+def _copy_chunks(cur: 'psycopg2.extensions.cursor', table_name: str, columns: Optional[List[str]],
+                 clean_chunks: Callable[[List[int], List[int]], Iterator[str]]) -> int:
+    """Runs ``COPY`` over the CSV text ``clean_chunks(counter, null_columns)`` emits, and returns the rows loaded."""
+    statement = copy_statement(table_name=table_name, columns=columns, cur=cur)
+    schema = _cached_table_schema(table_name=table_name, cur=cur) or []
+    columns = columns or [column.name for column in schema]
+    typed_columns = set(_non_text_columns(schema=schema, columns=columns))
+    null_columns = [position for position, column in enumerate(columns) if column in typed_columns]
+
+    counter = [0]
+    cur.copy_expert(sql=statement, file=IteratorFile(clean_chunks(counter, null_columns)), size=1 << 16)
+
+    return counter[0]
+
+
+@profiling.instrument
+def copy_csv(cur: 'psycopg2.extensions.cursor', table_name: str, csv_path: str, columns: Optional[List[str]] = None,
+             delimiter: str = ',', chunk_size: int = 100_000) -> int:
+    """Streams a CSV into a table with ``COPY ... FROM STDIN``, without committing.
+
+    The file is read ``chunk_size`` rows at a time, so it can be larger than memory. Empty fields are loaded as NULL,
+    and so are blank fields in columns that are not text (see :func:`coerce_nulls`). The statement comes from
+    :func:`copy_statement`, so it is built once per table and columns.
+
+    Args:
+        cur: the cursor to run the COPY on
+        table_name: the name of the table to load
+        csv_path: the path to the data file to import; its first column is loaded too, into the first of ``columns``
+        columns: the table columns, in the same order as the file; defaults to every column of the table
+        delimiter: the type of delimiter for the file
+        chunk_size: the number of rows to hold in memory at a time
+
+    Returns:
+        the number of rows loaded
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        conn, cur = data_io.postgres_conn()
+        data_io.copy_csv(cur=cur, table_name='share_prices_daily', csv_path='../file.csv',
+                         columns=['ticker', 'date', 'open', 'high', 'low', 'close'])
+        conn.commit()
+    """
+    return _copy_chunks(cur=cur, table_name=table_name, columns=columns,
+                        clean_chunks=lambda counter, null_columns: _clean_csv_chunks(
+                            csv_path=csv_path, delimiter=delimiter, chunk_size=chunk_size, counter=counter,
+                            null_columns=null_columns))
+
+
+@profiling.instrument
+def copy_frames(cur: 'psycopg2.extensions.cursor', table_name: str, frames: Iterable['pd.DataFrame'],
+                columns: Optional[List[str]] = None, index: bool = False) -> int:
+    """Streams dataframe chunks into a table with ``COPY ... FROM STDIN``, without committing.
+
+    Each chunk is turned into CSV text only when ``COPY`` asks for more, so a generator of chunks, e.g. from
+    ``pd.read_csv(..., chunksize=...)`` or a download, is loaded without ever being held in memory whole. Missing values
+    are loaded as NULL. Unlike :func:`copy_csv`, values are written as the chunks type them, so text columns are not
+    stripped of whitespace.
+
+    Args:
+        cur: the cursor to run the COPY on
+        table_name: the name of the table to load
+        frames: the chunks to load, all with the same columns
+        columns: the table columns, in the same order as the chunks' (index first, if ``index``); defaults to every
+            column of the table
+        index: whether to load each chunk's index too, into the first of ``columns``
+
+    Returns:
+        the number of rows loaded
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        with data_io.pooled_connection() as (conn, cur):
+            data_io.copy_frames(cur=cur, table_name='company_listing_status', frames=chunks, index=True)
+            conn.commit()
+    """
+    return _copy_chunks(cur=cur, table_name=table_name, columns=columns,
+                        clean_chunks=lambda counter, null_columns: _clean_chunks(chunks=frames, counter=counter,
+                                                                                 index=index))
+
+
+@profiling.instrument(rows=lambda stats, *args, **kwargs: stats.rows if stats else None)
+def insert_csv_to_sql(table_name: str, csv_path: str, delimiter: str = ',', chunk_size: int = 100_000) \
+        -> Optional[LoadStats]:
+    """Bulk loads a CSV into a SQL table.
+
+    The file is cleaned and streamed into ``COPY`` chunk by chunk, straight from memory, so nothing is written to disk
+    and files larger than memory can be loaded. The load runs on one connection from :func:`pooled_connection`, and
+    the table's columns come from the schema cache, so a repeat load goes straight to ``COPY``.
 
     Args:
         table_name: the name of the table to query
         csv_path: the path to the data file to import
         delimiter: the type of delimiter for the file
+        chunk_size: the number of rows to hold in memory at a time
+
+    Returns:
+        the number of rows loaded and how long it took, or None if the load failed
 
     **Example**
 
@@ -204,26 +889,94 @@ def insert_csv_to_sql(table_name: str, csv_path: str, delimiter: str = ','):
         from phobos import data_io
         data_io.insert_csv_to_sql(table_name='company_listing_status', csv_path='../file.csv')
     """
-    col_names = _get_table_field_names(table_name=table_name)
-    conn, cur = postgres_conn()
+    with pooled_connection() as (conn, cur):
+        if not table_schema(table_name=table_name, cur=cur):
+            return None
+        try:
+            start = time.perf_counter()
+            rows = copy_csv(cur=cur, table_name=table_name, csv_path=csv_path, delimiter=delimiter,
+                            chunk_size=chunk_size)
+            conn.commit()
+            stats = LoadStats(rows=rows, seconds=time.perf_counter() - start)
+            print(f'Success! Loaded {stats.rows:,} rows into {table_name} in {stats.seconds:.1f}s '
+                  f'({stats.rows_per_sec:,.0f} rows/sec)')
+            return stats
+        except psycopg2.Error as e:
+            conn.rollback()
+            # The table may have changed under the cache; look it up afresh next time
+            invalidate_table_schemas(table_name=table_name)
+            print(f'error: {e}')
+
+
+@profiling.instrument
+def read_table(table_name: str,
+               tickers: Optional[Sequence[str]] = None,
+               start_date: Optional[Union[str, datetime]] = None,
+               end_date: Optional[Union[str, datetime]] = None,
+               columns: Optional[List[str]] = None,
+               cur: Optional['psycopg2.extensions.cursor'] = None) -> 'pd.DataFrame':
+    """Reads the rows of a ``(ticker, date)`` table, e.g. ``share_prices_daily``, for some tickers and dates.
+
+    The ticker and date filters are sent to the database as part of the query, so it only reads the yearly partitions
+    covering the dates, through the ``(ticker, date)`` primary key, instead of scanning the whole table.
 
-    try:
-        df = pd.read_csv(csv_path, index_col=0)
-        df = _convert_empty_strings_to_null(df=df)
-        df.to_csv('clean_csv.csv')
-        csv_contents = open('clean_csv.csv', 'r')
-        next(csv_contents)
-    except psycopg2.Error as e:
-        print(f'error: {e}')
+    Args:
+        table_name: the name of the table to read
+        tickers: the tickers to read; by default every ticker
+        start_date: the first date to read, inclusive; by default the earliest
+        end_date: the last date to read, inclusive; by default the latest
+        columns: the columns to read; by default every column of the table
+        cur: the cursor to query with; by default one is checked out of the connection pool
 
-    try:
-        cur.copy_from(file=csv_contents,
-                      table=table_name,
-                      columns=col_names,
-                      sep=delimiter)
-        conn.commit()
-        cur.close()
-        conn.close()
-        print("Success!")
-    except psycopg2.Error as e:
-        print(f'error: {e}')
+    Returns:
+        the rows ordered by ticker and date, with ``DECIMAL`` columns as floats
+
+    Raises:
+        ValueError: if there is no such table, or ``columns`` names a column the table doesn't have
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import data_io
+        data_io.read_table(table_name='share_prices_daily', tickers=['GME', 'AMC'], start_date='2021-01-01',
+                           end_date='2021-02-10', columns=['ticker', 'date', 'close'])
+    """
+    if cur is None:
+        with pooled_connection() as (_, pooled_cur):
+            return read_table(table_name=table_name, tickers=tickers, start_date=start_date, end_date=end_date,
+                              columns=columns, cur=pooled_cur)
+
+    data_types = {column.name: column.data_type for column in table_schema(table_name=table_name, cur=cur)}
+    if not data_types:
+        raise ValueError(f'There is no table named {table_name}.')
+    columns = columns or list(data_types)
+    unknown_columns = [column for column in columns if column not in data_types]
+    if unknown_columns:
+        raise ValueError(f'{table_name} has no columns named {unknown_columns}.')
+
+    conditions = []
+    params = []
+    if tickers is not None:
+        conditions.append(sql.SQL('ticker = ANY(%s)'))
+        params.append(list(tickers))
+    if start_date is not None:
+        conditions.append(sql.SQL('date >= %s'))
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append(sql.SQL('date <= %s'))
+        params.append(end_date)
+    where = sql.SQL(' WHERE ') + sql.SQL(' AND ').join(conditions) if conditions else sql.SQL('')
+
+    query = sql.SQL('SELECT {columns} FROM {table}{where} ORDER BY ticker, date').format(
+        columns=sql.SQL(', ').join(sql.Identifier(column) for column in columns),
+        table=sql.Identifier(table_name),
+        where=where)
+    cur.execute(query, params)
+
+    df = pd.DataFrame(cur.fetchall(), columns=columns)
+    for column in columns:
+        if data_types[column] == 'numeric':
+            df[column] = df[column].astype(float)
+
+    return df
@@ -0,0 +1,231 @@
+"""Loads many partition files into Postgres at once.
+
+Partition files follow the layout of ``data/``, i.e. ``ENVIRONMENT/DATASET/GRANULARITY/PARTITION/FILE``, e.g.
+``data/prod/share_prices/daily/date=2021-02-10/file.csv``. Each file is streamed into its table by a worker process
+holding its own pooled connection. Every loaded partition is recorded in the ``ingested_partitions`` table in the same
+transaction as its rows, so a rerun skips what already made it in and retries only what failed.
+"""
+import glob
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from typing import Dict, List, NamedTuple, Optional
+
+import psycopg2
+
+from wsbtrading.data_io import data_io
+
+MANIFEST_TABLE = 'ingested_partitions'
+
+# Dataset directory names whose table is named differently; any other dataset loads into the table of the same name
+DEFAULT_TABLES = {
+    'share_prices': 'share_prices_daily',
+    'fundamentals': 'fundamentals_daily',
+}
+
+
+class Partition(NamedTuple):
+    """A partition file, the table it loads into, and the key it is recorded under once loaded."""
+    table_name: str
+    key: str
+    path: str
+
+
+class PartitionResult(NamedTuple):
+    """How loading one partition went: ``status`` is 'loaded', 'skipped' (loaded before) or 'failed'."""
+    partition: Partition
+    status: str
+    rows: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def find_partitions(pattern: str, tables: Optional[Dict[str, str]] = None) -> List[Partition]:
+    """Lists the partition files matching a glob, in path order.
+
+    Args:
+        pattern: a glob of partition files, e.g. ``data/prod/*/daily/date=*/file.csv``
+        tables: maps dataset directory names to table names; defaults to :data:`DEFAULT_TABLES`
+
+    Returns:
+        one partition per file, keyed by its last five path components, e.g.
+        ``prod/share_prices/daily/date=2021-02-10/file.csv``, so the same partition from each environment is recorded
+        on its own
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.data_io import ingest
+        ingest.find_partitions(pattern='data/prod/*/daily/date=*/file.csv')
+        # [Partition(table_name='share_prices_daily', key='prod/share_prices/daily/date=2021-02-10/file.csv', ...)]
+    """
+    tables = DEFAULT_TABLES if tables is None else tables
+    partitions = []
+    for path in sorted(glob.glob(pattern)):
+        parts = os.path.normpath(path).split(os.sep)
+        if len(parts) < 5:
+            raise ValueError(f'Expected {path} to end in ENVIRONMENT/DATASET/GRANULARITY/PARTITION/FILE.')
+        dataset = parts[-4]
+        partitions.append(Partition(table_name=tables.get(dataset, dataset), key='/'.join(parts[-5:]), path=path))
+
+    return partitions
+
+
+def create_manifest_table(cur: 'psycopg2.extensions.cursor'):
+    """Creates the table that records loaded partitions, if it does not exist yet; the caller commits."""
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE}
+        (
+            table_name	TEXT,
+            partition	TEXT,
+            rows	    BIGINT,
+            loaded_at	TIMESTAMP WITH TIME ZONE    DEFAULT now(),
+            PRIMARY KEY (table_name, partition)
+        )
+    """)
+
+
+def _loaded_partition_keys(cur: 'psycopg2.extensions.cursor') -> set:
+    """Reads the (table, partition key) pairs already recorded as loaded."""
+    cur.execute(f'SELECT table_name, partition FROM {MANIFEST_TABLE} WHERE rows IS NOT NULL')
+    return set(cur.fetchall())
+
+
+def _init_worker(connection_kwargs: Dict[str, str]):
+    """Gives each worker process a pool of its own, holding the single connection it loads with."""
+    data_io.configure_pool(minconn=1, maxconn=1, **connection_kwargs)
+
+
+def _load_partition(partition: Partition, chunk_size: int) -> PartitionResult:
+    """Loads one partition and records it in the manifest, in a single transaction.
+
+    The manifest row is claimed before the COPY, so if another run is loading the same partition this one waits for it
+    and then skips the partition rather than loading it twice.
+    """
+    start = time.perf_counter()
+    try:
+        with data_io.pooled_connection() as (conn, cur):
+            cur.execute(f'INSERT INTO {MANIFEST_TABLE} (table_name, partition) VALUES (%s, %s) '
+                        f'ON CONFLICT DO NOTHING', (partition.table_name, partition.key))
+            if cur.rowcount == 0:
+                return PartitionResult(partition=partition, status='skipped')
+            rows = data_io.copy_csv(cur=cur, table_name=partition.table_name, csv_path=partition.path,
+                                    chunk_size=chunk_size)
+            cur.execute(f'UPDATE {MANIFEST_TABLE} SET rows = %s, loaded_at = now() '
+                        f'WHERE table_name = %s AND partition = %s', (rows, partition.table_name, partition.key))
+            conn.commit()
+    except (psycopg2.Error, OSError, ValueError) as e:
+        return PartitionResult(partition=partition, status='failed', seconds=time.perf_counter() - start,
+                               error=str(e).strip())
+
+    return PartitionResult(partition=partition, status='loaded', rows=rows, seconds=time.perf_counter() - start)
+
+
+def ingest_partitions(pattern: str,
+                      max_workers: int = 4,
+                      table_limits: Optional[Dict[str, int]] = None,
+                      tables: Optional[Dict[str, str]] = None,
+                      chunk_size: int = 100_000,
+                      executor: Optional[Executor] = None) -> List[PartitionResult]:
+    """Loads every partition file matching a glob into Postgres, several at a time, and prints a throughput summary.
+
+    Partitions already recorded in ``ingested_partitions`` are skipped, so an interrupted or partly failed run can
+    simply be rerun.
+
+    Args:
+        pattern: a glob of partition files, e.g. ``data/prod/*/daily/date=*/file.csv``
+        max_workers: the number of worker processes, each with its own connection
+        table_limits: the most partitions of a table to load at once, by table name; tables not listed are only
+                      limited by ``max_workers``
+        tables: maps dataset directory names to table names; defaults to :data:`DEFAULT_TABLES`
+        chunk_size: the number of rows each worker holds in memory at a time
+        executor: runs the loads instead of a new process pool; it is not shut down afterwards
+
+    Returns:
+        the outcome of every matching partition, in the order they finished
+
+    Raises:
+        ValueError: if a table limit is below 1, or a matching path is too short to be a partition
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.data_io import ingest
+        ingest.ingest_partitions(pattern='data/prod/*/daily/date=*/file.csv', max_workers=8,
+                                 table_limits={'share_prices_daily': 4})
+        # share_prices_daily: 250 loaded, 0 skipped, 0 failed, 1,930,000 rows (38,120 rows/sec)
+    """
+    start = time.perf_counter()
+    table_limits = table_limits or {}
+    if any(limit < 1 for limit in table_limits.values()):
+        raise ValueError(f'Expected every table limit to be at least 1, got {table_limits}.')
+    partitions = find_partitions(pattern=pattern, tables=tables)
+
+    with data_io.pooled_connection() as (conn, cur):
+        create_manifest_table(cur)
+        conn.commit()
+        loaded = _loaded_partition_keys(cur)
+
+    results = [PartitionResult(partition=partition, status='skipped') for partition in partitions
+               if (partition.table_name, partition.key) in loaded]
+    pending = deque(partition for partition in partitions if (partition.table_name, partition.key) not in loaded)
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                       initargs=(data_io._PoolState.settings['connection_kwargs'],))
+    in_flight = {}
+    running = {}
+    try:
+        while pending or running:
+            # Start as many partitions as there are free workers, passing over tables already at their limit
+            deferred = deque()
+            while pending and len(running) < max_workers:
+                partition = pending.popleft()
+                table_name = partition.table_name
+                if in_flight.get(table_name, 0) >= table_limits.get(table_name, max_workers):
+                    deferred.append(partition)
+                    continue
+                in_flight[table_name] = in_flight.get(table_name, 0) + 1
+                running[executor.submit(_load_partition, partition, chunk_size)] = partition
+            pending.extendleft(reversed(deferred))
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                partition = running.pop(future)
+                in_flight[partition.table_name] -= 1
+                result = future.result()
+                if result.status == 'failed':
+                    print(f'error: failed to load {partition.path}: {result.error}')
+                results.append(result)
+    finally:
+        # Only partitions still waiting for a worker can be cancelled; shutdown() then waits for the running ones
+        for future in running:
+            future.cancel()
+        if own_executor:
+            executor.shutdown()
+
+    _print_summary(results=results, seconds=time.perf_counter() - start)
+
+    return results
+
+
+def _print_summary(results: List[PartitionResult], seconds: float):
+    """Prints partitions and rows per table, with the rate rows went in over the whole run."""
+    by_table = {}
+    for result in results:
+        by_table.setdefault(result.partition.table_name, []).append(result)
+
+    for table_name, table_results in sorted(by_table.items()):
+        counts = {status: sum(result.status == status for result in table_results)
+                  for status in ('loaded', 'skipped', 'failed')}
+        stats = data_io.LoadStats(rows=sum(result.rows for result in table_results), seconds=seconds)
+        print(f'{table_name}: {counts["loaded"]} loaded, {counts["skipped"]} skipped, {counts["failed"]} failed, '
+              f'{stats.rows:,} rows ({stats.rows_per_sec:,.0f} rows/sec)')
+
+    stats = data_io.LoadStats(rows=sum(result.rows for result in results), seconds=seconds)
+    print(f'Loaded {stats.rows:,} rows from {sum(result.status == "loaded" for result in results)} partitions in '
+          f'{stats.seconds:.1f}s ({stats.rows_per_sec:,.0f} rows/sec)')
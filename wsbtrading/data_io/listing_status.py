@@ -0,0 +1,154 @@
+"""Pulls the listing status of US tickers from Alpha Vantage (www.alphavantage.co/documentation/#listing-status).
+
+The delisted and the listed tickers are two separate CSV downloads. :func:`iter_listing_chunks` fetches both at once,
+parses each as it downloads, a chunk of rows at a time, and hands the chunks over as soon as they are parsed, so the
+result can be streamed into :func:`wsbtrading.data_io.columnar_store.write_dataset` or
+:func:`wsbtrading.data_io.copy_frames` without the whole listing ever being in memory.
+
+Downloads go through a fetcher, any callable that takes a URL and returns a binary file object usable as a context
+manager (``urllib.request.urlopen`` by default), so tests and mirrors can point it somewhere else.
+"""
+import queue
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, ContextManager, Iterator, Sequence
+
+import pandas as pd
+
+LISTING_URL = 'https://www.alphavantage.co/query'
+STATES = ('delisted', 'listed')
+LISTING_DTYPES = {
+    'symbol': str,
+    'name': str,
+    'exchange': 'category',
+    'assetType': 'category',
+    'ipoDate': str,
+    'delistingDate': str,
+    'status': 'category',
+}
+
+Fetcher = Callable[[str], ContextManager[BinaryIO]]
+
+_DONE = object()
+
+
+def http_fetcher(url: str, timeout: float = 60.0) -> ContextManager[BinaryIO]:
+    """Opens a URL for streaming, the default fetcher.
+
+    Args:
+        url: the URL to download
+        timeout: the most seconds to wait for the server to connect or send more data
+
+    Returns:
+        the response, which reads the body as it arrives
+    """
+    return urllib.request.urlopen(url, timeout=timeout)
+
+
+def listing_url(state: str, api_key: str, base_url: str = LISTING_URL) -> str:
+    """Builds the URL of one state's listing CSV.
+
+    Args:
+        state: possible values are 'delisted' or 'listed'
+        api_key: the Alpha Vantage API key
+        base_url: the query endpoint
+
+    Returns:
+        the URL
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.data_io import listing_status
+        listing_status.listing_url(state='delisted', api_key='demo')
+        # 'https://www.alphavantage.co/query?function=LISTING_STATUS&state=delisted&apikey=demo'
+    """
+    return f'{base_url}?{urllib.parse.urlencode({"function": "LISTING_STATUS", "state": state, "apikey": api_key})}'
+
+
+def _put(chunks: queue.Queue, item, stop: threading.Event) -> bool:
+    """Queues an item, giving up once the reader has stopped; returns whether it was queued."""
+    while not stop.is_set():
+        try:
+            chunks.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+
+    return False
+
+
+def _fetch_state(url: str, fetcher: Fetcher, chunk_size: int, chunks: queue.Queue, stop: threading.Event) -> None:
+    """Parses one download into the queue chunk by chunk, then queues ``_DONE``, or the error it failed with."""
+    try:
+        with fetcher(url) as response:
+            for chunk in pd.read_csv(response, chunksize=chunk_size, dtype=LISTING_DTYPES):
+                if not _put(chunks, chunk, stop):
+                    return
+    except Exception as e:
+        _put(chunks, e, stop)
+    else:
+        _put(chunks, _DONE, stop)
+
+
+def iter_listing_chunks(api_key: str,
+                        states: Sequence[str] = STATES,
+                        chunk_size: int = 10_000,
+                        fetcher: Fetcher = http_fetcher,
+                        base_url: str = LISTING_URL,
+                        max_queued: int = 4) -> Iterator['pd.DataFrame']:
+    """Downloads the listing of every state at once and yields it in chunks, in whichever order they are parsed.
+
+    Columns are parsed with :data:`LISTING_DTYPES`, so ``exchange``, ``assetType`` and ``status`` are categoricals
+    rather than one Python string per row. Chunks are numbered across states by their index, which makes it usable as
+    a row id. At most ``max_queued`` parsed chunks wait to be consumed; downloads pause while the queue is full.
+
+    Args:
+        api_key: the Alpha Vantage API key
+        states: the listings to download; possible values are 'delisted' or 'listed'
+        chunk_size: the most rows per chunk
+        fetcher: opens a URL and returns its body as a binary file, see :func:`http_fetcher`
+        base_url: the query endpoint
+        max_queued: the most chunks to hold in memory ahead of the consumer
+
+    Returns:
+        the chunks, with columns ``symbol, name, exchange, assetType, ipoDate, delistingDate, status``
+
+    Raises:
+        Exception: whatever a download or its parsing failed with, once the chunks before it have been yielded
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.data_io import columnar_store, listing_status
+        columnar_store.write_dataset(df=listing_status.iter_listing_chunks(api_key='demo'), environment='prod',
+                                     granularity='daily', dataset_name='stock_ticker_list', partition_cols=['status'])
+    """
+    chunks = queue.Queue(maxsize=max_queued)
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(states), thread_name_prefix='listing_status')
+    for state in states:
+        executor.submit(_fetch_state, url=listing_url(state=state, api_key=api_key, base_url=base_url),
+                        fetcher=fetcher, chunk_size=chunk_size, chunks=chunks, stop=stop)
+
+    try:
+        rows = 0
+        remaining = len(states)
+        while remaining:
+            item = chunks.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            if isinstance(item, Exception):
+                raise item
+            item.index = pd.RangeIndex(rows, rows + len(item))
+            rows += len(item)
+            yield item
+    finally:
+        # Unblocks any download still waiting on the queue, e.g. when the consumer stops early or one failed
+        stop.set()
+        executor.shutdown(wait=True)
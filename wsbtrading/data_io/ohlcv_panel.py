@@ -0,0 +1,321 @@
+"""A compact on-disk format for the daily bars of a whole universe, opened memory-mapped.
+
+A panel is a directory holding one ``(dates, tickers)`` array per field (``Open.npy``, ``High.npy``, ...), the ticker
+and date indexes labelling their columns and rows, and a ``meta.json``. Opening it maps the field arrays instead of
+reading them, so it takes milliseconds whatever the size of the universe, only the rows a calculation touches are
+ever read off disk, and every process that opens the same panel shares one copy in the page cache.
+
+The arrays are laid out with dates along the first axis, the layout :func:`wsbtrading.maths.squeeze_panel` and the
+rolling kernels in :mod:`wsbtrading.maths.kernels` work in, so an :class:`OhlcvPanel` can be passed to them directly.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from wsbtrading.instrumentation import profiling
+
+FIELDS = ('Open', 'High', 'Low', 'Close', 'Volume')
+FORMAT_VERSION = 1
+
+
+class OhlcvPanel:
+    """The fields of a price panel as ``(dates, tickers)`` arrays, labelled by a date and a ticker index.
+
+    Args:
+        fields: one array of shape (dates, tickers) per field name, typically memory-mapped
+        tickers: the ticker of each column
+        dates: the date of each row, in increasing order
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.data_io import ohlcv_panel
+        panel = ohlcv_panel.open_panel(path='/group/wsbtrading/prod/daily/share_prices_panel')
+        panel['Close'][-1]
+        # the latest close of every ticker
+    """
+    def __init__(self, fields: Mapping[str, np.ndarray], tickers: Sequence[str], dates: Sequence):
+        self.tickers = pd.Index(tickers)
+        self.dates = pd.DatetimeIndex(dates)
+        shape = (len(self.dates), len(self.tickers))
+        for name, values in fields.items():
+            if values.shape != shape:
+                raise ValueError(f'Expected {name} to have shape {shape}, got {values.shape}.')
+        self._fields = dict(fields)
+
+    @property
+    def field_names(self) -> List[str]:
+        return list(self._fields)
+
+    @property
+    def shape(self) -> tuple:
+        return len(self.dates), len(self.tickers)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self._fields[field]
+
+    def __contains__(self, field: str) -> bool:
+        return field in self._fields
+
+    def _timestamp(self, value: Union[str, date, datetime]) -> pd.Timestamp:
+        """Reads a date in the panel's timezone, if it has one."""
+        timestamp = pd.Timestamp(value)
+        if self.dates.tz is not None and timestamp.tz is None:
+            timestamp = timestamp.tz_localize(self.dates.tz)
+
+        return timestamp
+
+    def date_slice(self, start_date: Optional[Union[str, date, datetime]] = None,
+                   end_date: Optional[Union[str, date, datetime]] = None) -> 'OhlcvPanel':
+        """Narrows the panel to a range of dates, both ends included, without copying or reading any prices.
+
+        Args:
+            start_date: the first date to keep; by default the earliest
+            end_date: the last date to keep; by default the latest
+
+        Returns:
+            a panel whose arrays are views on this one's
+        """
+        start = 0 if start_date is None else self.dates.searchsorted(self._timestamp(start_date), side='left')
+        stop = len(self.dates) if end_date is None \
+            else self.dates.searchsorted(self._timestamp(end_date), side='right')
+        rows = slice(start, stop)
+
+        return OhlcvPanel(fields={name: values[rows] for name, values in self._fields.items()}, tickers=self.tickers,
+                          dates=self.dates[rows])
+
+    def column_slice(self, start: int, stop: int) -> 'OhlcvPanel':
+        """Narrows the panel to a block of neighbouring tickers, by position, without copying or reading any prices.
+
+        Args:
+            start: the position of the first ticker to keep
+            stop: the position after the last ticker to keep
+
+        Returns:
+            a panel whose arrays are views on this one's
+        """
+        columns = slice(start, stop)
+
+        return OhlcvPanel(fields={name: values[:, columns] for name, values in self._fields.items()},
+                          tickers=self.tickers[columns], dates=self.dates)
+
+    def ticker_frame(self, ticker: str) -> 'pd.DataFrame':
+        """Copies out one ticker's bars as a dataframe, for the single-ticker functions in :mod:`wsbtrading.maths`.
+
+        Args:
+            ticker: the ticker to copy out
+
+        Returns:
+            a dataframe indexed by date with one column per field, without the dates the ticker has no bars for
+        """
+        column = self.tickers.get_loc(ticker)
+        df = pd.DataFrame({name: np.asarray(values[:, column], dtype=np.float64)
+                           for name, values in self._fields.items()}, index=self.dates)
+
+        return df.dropna(how='all')
+
+
+def _frames_fingerprint(frames: Mapping[str, 'pd.DataFrame'], fields: Sequence[str], dtype: 'np.dtype') -> str:
+    """Hashes the tickers, dates and prices a panel would be built from, and how it would store them."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(json.dumps([list(fields), np.dtype(dtype).name]).encode())
+    for ticker, frame in frames.items():
+        digest.update(f'{ticker}:{len(frame)}:'.encode())
+        digest.update(np.ascontiguousarray(pd.DatetimeIndex(frame.index).asi8).tobytes())
+        for name in fields:
+            values = np.ascontiguousarray(frame[name].to_numpy())
+            digest.update(f'{name}:{values.dtype.str}:'.encode())
+            digest.update(values.tobytes() if values.dtype != object else repr(values.tolist()).encode())
+
+    return digest.hexdigest()
+
+
+def _write_panel(path: str, field_arrays: Iterable[Tuple[str, np.ndarray]], tickers: Sequence[str], dates: Sequence,
+                 dtype: 'np.dtype', fingerprint: Optional[str] = None) -> str:
+    """Writes each (name, array) pair as it comes, so the caller can build one field at a time.
+
+    A ``fingerprint`` of what the panel was built from is kept in its ``meta.json``, see :func:`refresh_panel`.
+    """
+    dtype = np.dtype(dtype)
+    tickers = np.asarray(tickers, dtype=str)
+    dates = pd.DatetimeIndex(dates)
+    if not dates.is_monotonic_increasing:
+        raise ValueError('Panel dates must be in increasing order.')
+
+    staging_path = f'{path}.tmp'
+    shutil.rmtree(staging_path, ignore_errors=True)
+    os.makedirs(staging_path)
+    field_names = []
+    for name, values in field_arrays:
+        field_names.append(name)
+        values = np.asarray(values)
+        if values.shape != (len(dates), len(tickers)):
+            raise ValueError(f'Expected {name} to have shape {(len(dates), len(tickers))}, got {values.shape}.')
+        np.save(os.path.join(staging_path, f'{name}.npy'), np.ascontiguousarray(values, dtype=dtype))
+    np.save(os.path.join(staging_path, 'tickers.npy'), tickers)
+    np.save(os.path.join(staging_path, 'dates.npy'), dates.tz_localize(None).to_numpy(dtype='datetime64[ns]'))
+    with open(os.path.join(staging_path, 'meta.json'), 'w') as meta_file:
+        json.dump({'version': FORMAT_VERSION, 'fields': field_names, 'dtype': dtype.name,
+                   'timezone': str(dates.tz) if dates.tz is not None else None, 'fingerprint': fingerprint},
+                  meta_file)
+
+    if os.path.exists(path):
+        old_path = f'{path}.old'
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.replace(path, old_path)
+        os.replace(staging_path, path)
+        shutil.rmtree(old_path)
+    else:
+        os.replace(staging_path, path)
+
+    return path
+
+
+@profiling.instrument
+def write_panel(path: str, fields: Mapping[str, np.ndarray], tickers: Sequence[str], dates: Sequence,
+                dtype: 'np.dtype' = np.float64) -> str:
+    """Writes field arrays as a panel, replacing any panel already at ``path``.
+
+    The panel is written next to ``path`` and renamed into place once complete. Processes that have the old panel open
+    keep reading it until they open it again.
+
+    Args:
+        path: the directory to write the panel to
+        fields: one array of shape (dates, tickers) per field name
+        tickers: the ticker of each column
+        dates: the date of each row, in increasing order
+        dtype: float32 halves the size of float64, at the cost of prices above ~10,000 losing their fourth decimal
+
+    Returns:
+        ``path``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.data_io import ohlcv_panel
+        ohlcv_panel.write_panel(path='panel', fields={'Close': closes, 'High': highs, 'Low': lows},
+                                tickers=['AMC', 'GME'], dates=dates, dtype='float32')
+    """
+    return _write_panel(path=path, field_arrays=fields.items(), tickers=tickers, dates=dates, dtype=dtype)
+
+
+@profiling.instrument
+def write_panel_from_frames(path: str, frames: Mapping[str, 'pd.DataFrame'], fields: Sequence[str] = FIELDS,
+                            dtype: 'np.dtype' = np.float64) -> str:
+    """Writes per-ticker dataframes of bars as one panel, aligned on the union of their dates.
+
+    Each field is assembled in memory one at a time, so building the panel needs about one field's worth of memory.
+
+    Args:
+        path: the directory to write the panel to
+        frames: the bars of each ticker, indexed by date, with one column per field
+        fields: the columns to keep
+        dtype: the type to store prices as, float64 or float32
+
+    Returns:
+        ``path``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.data_io import ohlcv_panel
+        ohlcv_panel.write_panel_from_frames(path='panel', frames={'AMC': amc_df, 'GME': gme_df})
+    """
+    tickers = list(frames)
+    dates = pd.DatetimeIndex(sorted(set().union(*(frame.index for frame in frames.values()))))
+    rows = {ticker: dates.get_indexer(frame.index) for ticker, frame in frames.items()}
+
+    def assemble(name: str) -> np.ndarray:
+        values = np.full((len(dates), len(tickers)), np.nan, dtype=dtype)
+        for column, ticker in enumerate(tickers):
+            values[rows[ticker], column] = frames[ticker][name].to_numpy(dtype=dtype)
+        return values
+
+    return _write_panel(path=path, field_arrays=((name, assemble(name)) for name in fields), tickers=tickers,
+                        dates=dates, dtype=dtype, fingerprint=_frames_fingerprint(frames=frames, fields=fields,
+                                                                                  dtype=dtype))
+
+
+@profiling.instrument
+def open_panel(path: str, fields: Optional[Sequence[str]] = None) -> OhlcvPanel:
+    """Opens a panel with its field arrays memory-mapped read-only.
+
+    Args:
+        path: the directory the panel was written to
+        fields: the fields to map; by default all of them
+
+    Returns:
+        the panel
+
+    Raises:
+        FileNotFoundError: if there is no panel at ``path``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        from wsbtrading.data_io import ohlcv_panel
+
+        panel = ohlcv_panel.open_panel(path='/group/wsbtrading/prod/daily/share_prices_panel')
+        maths.is_in_squeeze_panel(panel=panel, rolling_window=20)
+    """
+    with open(os.path.join(path, 'meta.json')) as meta_file:
+        meta = json.load(meta_file)
+    if meta['version'] != FORMAT_VERSION:
+        raise ValueError(f'Unsupported panel format version {meta["version"]} at {path}.')
+
+    tickers = np.load(os.path.join(path, 'tickers.npy'))
+    dates = pd.DatetimeIndex(np.load(os.path.join(path, 'dates.npy')))
+    if meta['timezone'] is not None:
+        dates = dates.tz_localize(meta['timezone'])
+    arrays: Dict[str, np.ndarray] = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                                     for name in (fields or meta['fields'])}
+
+    return OhlcvPanel(fields=arrays, tickers=tickers, dates=dates)
+
+
+@profiling.instrument
+def refresh_panel(path: str, frames: Mapping[str, 'pd.DataFrame'], fields: Sequence[str] = FIELDS,
+                  dtype: 'np.dtype' = np.float64) -> OhlcvPanel:
+    """Opens the panel at ``path``, first rebuilding it from ``frames`` if it is missing or was built from other bars.
+
+    The panel keeps a fingerprint of the frames it was built from, and is rebuilt whenever ``frames`` differ from them:
+    new dates, but also tickers added to or dropped from the snapshot and revised bars. So a scan run after each new
+    daily snapshot always sees the snapshot's tickers and latest bars.
+
+    Args:
+        path: the directory of the panel
+        frames: the bars of each ticker, indexed by date, with one column per field
+        fields: the columns to keep
+        dtype: the type to store prices as, float64 or float32
+
+    Returns:
+        the panel, up to date with ``frames``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.data_io import ohlcv_panel
+        panel = ohlcv_panel.refresh_panel(path='panel', frames={'AMC': amc_df, 'GME': gme_df})
+    """
+    fingerprint = _frames_fingerprint(frames=frames, fields=fields, dtype=dtype)
+    try:
+        with open(os.path.join(path, 'meta.json')) as meta_file:
+            built_from = json.load(meta_file).get('fingerprint')
+    except (OSError, ValueError):
+        built_from = None
+
+    if built_from != fingerprint:
+        write_panel_from_frames(path=path, frames=frames, fields=fields, dtype=dtype)
+    return open_panel(path=path)
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from wsbtrading.data_io import columnar_store
+
+
+class TestColumnarStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root_path = self.temp_dir.name
+        dates = pd.bdate_range('2021-02-01', '2021-02-12', tz='UTC')
+        tickers = ['AMC', 'BB', 'GME']
+        self.df = pd.DataFrame({
+            'date': np.repeat(dates, len(tickers)),
+            'ticker': np.tile(tickers, len(dates)),
+            'close': np.arange(len(dates) * len(tickers), dtype=float),
+            'volume': np.arange(len(dates) * len(tickers)) * 100,
+        })
+        self.location = {'environment': 'prod', 'granularity': 'daily', 'dataset_name': 'share_prices',
+                         'root_path': self.root_path}
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_write_dataset(self):
+        """Ensures a snapshot lands at the generated path, with one directory per day."""
+        path = columnar_store.write_dataset(df=self.df, timestamp='v1', **self.location)
+
+        assert path == os.path.join(self.root_path, 'prod', 'daily', 'share_prices', 'v1')
+        assert sorted(os.listdir(path))[:3] == ['_common_metadata', 'date_part=2021-02-01', 'date_part=2021-02-02']
+        assert len(os.listdir(path)) == 11
+        assert columnar_store.list_snapshots(**self.location) == ['v1']
+
+    def test_round_trip(self):
+        """Ensures every row and column comes back, sorted by ticker and date."""
+        columnar_store.write_dataset(df=self.df, timestamp='v1', **self.location)
+
+        result = columnar_store.read_dataset(**self.location)
+
+        expected = self.df.sort_values(['ticker', 'date'], ignore_index=True)
+        assert result['ticker'].tolist() == expected['ticker'].tolist()
+        assert result['close'].tolist() == expected['close'].tolist()
+        assert result['volume'].tolist() == expected['volume'].tolist()
+        assert (result['date'].dt.date == expected['date'].dt.date).all()
+
+    def test_intraday_round_trip(self):
+        """Ensures intraday timestamps keep their time of day, one directory per UTC day, and filter by whole days."""
+        times = pd.DatetimeIndex([time for day in ['2021-02-01', '2021-02-02', '2021-02-03']
+                                  for time in pd.date_range(f'{day} 09:30', f'{day} 15:30', freq='30min',
+                                                            tz='America/New_York')])
+        df = pd.DataFrame({'date': times, 'ticker': 'GME', 'close': np.arange(len(times), dtype=float)})
+        location = {**self.location, 'granularity': 'minute'}
+
+        path = columnar_store.write_dataset(df=df, timestamp='v1', **location)
+        result = columnar_store.read_dataset(**location)
+        filtered = columnar_store.read_dataset(start_date='2021-02-02', end_date='2021-02-02', **location)
+
+        assert sorted(name for name in os.listdir(path) if name.startswith('date_part=')) == [
+            'date_part=2021-02-01', 'date_part=2021-02-02', 'date_part=2021-02-03']
+        assert list(result.columns) == ['date', 'ticker', 'close']
+        assert result['date'].tolist() == df['date'].tolist()
+        assert filtered['date'].tolist() == df.loc[df['date'].dt.day == 2, 'date'].tolist()
+
+    def test_read_dataset_filters(self):
+        """Ensures ticker and inclusive date bounds select the right rows and only the requested columns."""
+        columnar_store.write_dataset(df=self.df, timestamp='v1', **self.location)
+
+        result = columnar_store.read_dataset(columns=['ticker', 'date', 'close'], tickers=['GME', 'BB'],
+                                             start_date='2021-02-04', end_date='2021-02-08', **self.location)
+
+        expected = self.df[self.df['ticker'].isin(['GME', 'BB'])
+                           & self.df['date'].between('2021-02-04', '2021-02-08')]
+        assert list(result.columns) == ['ticker', 'date', 'close']
+        assert sorted(result['close']) == sorted(expected['close'])
+
+    def test_partition_pruning(self):
+        """Ensures date bounds open only the matching directories, and a ticker skips row groups within them."""
+        path = columnar_store.write_dataset(df=self.df, timestamp='v1', rows_per_group=1, **self.location)
+        dataset = columnar_store._open_snapshot(path)
+
+        row_filter = columnar_store._row_filter(schema=dataset.schema, tickers=['GME'], start_date='2021-02-04',
+                                                end_date='2021-02-05')
+        fragments = list(dataset.get_fragments(filter=row_filter))
+        row_groups = [row_group for fragment in fragments
+                      for row_group in fragment.split_by_row_group(row_filter, schema=dataset.schema)]
+
+        assert sorted(os.path.basename(os.path.dirname(fragment.path)) for fragment in fragments) == [
+            'date_part=2021-02-04', 'date_part=2021-02-05']
+        assert len(row_groups) == 2
+
+    def test_latest_snapshot(self):
+        """Ensures the newest complete snapshot is read by default, and older ones can still be asked for."""
+        columnar_store.write_dataset(df=self.df, timestamp='2021-02-12_21-00-00', **self.location)
+        columnar_store.write_dataset(df=self.df.head(3), timestamp='2021-02-13_21-00-00', **self.location)
+        os.makedirs(os.path.join(self.root_path, 'prod', 'daily', 'share_prices', '2021-02-14_21-00-00'))
+
+        assert len(columnar_store.read_dataset(**self.location)) == 3
+        assert len(columnar_store.read_dataset(timestamp='2021-02-12_21-00-00', **self.location)) == len(self.df)
+
+    def test_as_arrow(self):
+        """Ensures an Arrow table can be returned instead of a dataframe."""
+        columnar_store.write_dataset(df=pa.Table.from_pandas(self.df), timestamp='v1', **self.location)
+
+        result = columnar_store.read_dataset(columns=['ticker', 'close'], as_arrow=True, **self.location)
+
+        assert isinstance(result, pa.Table)
+        assert result.column_names == ['ticker', 'close']
+
+    def test_write_chunks(self):
+        """Ensures an iterable of chunks is written as it comes and reads back like the whole frame."""
+        chunks = (self.df.iloc[start:start + 7] for start in range(0, len(self.df), 7))
+
+        columnar_store.write_dataset(df=chunks, timestamp='v1', **self.location)
+
+        result = columnar_store.read_dataset(**self.location)
+        expected = self.df.sort_values(['ticker', 'date'], ignore_index=True)
+        assert result['close'].tolist() == expected['close'].tolist()
+
+    def test_write_no_chunks(self):
+        """Ensures an empty iterable of chunks fails instead of writing a snapshot without a schema."""
+        with pytest.raises(ValueError):
+            columnar_store.write_dataset(df=iter([]), timestamp='v1', **self.location)
+
+    def test_filter_missing_column(self):
+        """Ensures filtering a dataset by a column it doesn't have fails naming the dataset."""
+        listing = pd.DataFrame({'symbol': ['AMC', 'GME'], 'exchange': ['NYSE', 'NYSE']})
+        location = {**self.location, 'dataset_name': 'listing_status'}
+        columnar_store.write_dataset(df=listing, partition_cols=['exchange'], timestamp='v1', **location)
+
+        with self.assertRaisesRegex(ValueError, 'prod/daily/listing_status has no date column'):
+            columnar_store.read_dataset(start_date='2021-02-01', **location)
+        with self.assertRaisesRegex(ValueError, 'listing_status has no ticker column'):
+            columnar_store.read_dataset(tickers=['GME'], **location)
+
+    def test_missing_snapshot(self):
+        """Ensures reading a dataset that was never written fails clearly."""
+        with pytest.raises(FileNotFoundError):
+            columnar_store.read_dataset(**self.location)
@@ -1,6 +1,16 @@
+import os
+import tempfile
+import threading
+import time
 import unittest
-from unittest.mock import Mock, patch
+from contextlib import contextmanager
+from decimal import Decimal
+from unittest.mock import MagicMock, Mock, patch
 
+import pandas as pd
+import psycopg2
+import psycopg2.pool
+from psycopg2 import sql
 import pytest
 
 from wsbtrading.data_io import data_io
@@ -17,6 +27,86 @@ class TestAlpacaApiConnection(unittest.TestCase):
         AlpacaApiConnMock.assert_called_with(trading_type='paper_trading')
 
 
+class TestAlpacaClients(unittest.TestCase):
+    def setUp(self) -> None:
+        data_io.reset_alpaca_clients()
+        self.rest_patch = patch.object(data_io.tradeapi, 'REST', side_effect=lambda *args, **kwargs: MagicMock())
+        self.RestMock = self.rest_patch.start()
+        self.now = 1000.0
+        self.clock_patch = patch.object(data_io.time, 'monotonic', side_effect=lambda: self.now)
+        self.clock_patch.start()
+
+    def tearDown(self) -> None:
+        self.rest_patch.stop()
+        self.clock_patch.stop()
+        data_io.reset_alpaca_clients()
+
+    def test_alpaca_rest_api_conn(self):
+        """Ensures one client is created per trading type and shared by every caller."""
+        paper = data_io.alpaca_rest_api_conn(trading_type='paper_trading')
+
+        assert data_io.alpaca_rest_api_conn(trading_type='paper_trading') is paper
+        assert data_io.alpaca_rest_api_conn(trading_type='live_trading') is not paper
+        assert self.RestMock.call_count == 2
+
+    def test_fork(self):
+        """Ensures a forked child doesn't reuse its parent's client, and so its parent's HTTP connections."""
+        paper = data_io.alpaca_rest_api_conn(trading_type='paper_trading')
+
+        with patch.object(data_io.os, 'getpid', return_value=-1):
+            assert data_io.alpaca_rest_api_conn(trading_type='paper_trading') is not paper
+
+    def test_market_clock(self):
+        """Ensures the clock is fetched once, then moved on locally until the market next opens or closes."""
+        client = data_io.alpaca_rest_api_conn(trading_type='live_trading')
+        client.get_clock.return_value = Mock(timestamp=pd.Timestamp('2021-02-10 15:00', tz='US/Eastern'),
+                                             is_open=True,
+                                             next_open=pd.Timestamp('2021-02-11 09:30', tz='US/Eastern'),
+                                             next_close=pd.Timestamp('2021-02-10 16:00', tz='US/Eastern'))
+
+        data_io.market_clock()
+        self.now += 1800
+        clock = data_io.market_clock()
+
+        assert client.get_clock.call_count == 1
+        assert clock.is_open
+        assert clock.timestamp == pd.Timestamp('2021-02-10 15:30', tz='US/Eastern')
+
+        self.now += 3600
+        data_io.market_clock(max_age=24 * 3600)
+
+        assert client.get_clock.call_count == 2
+
+    def test_market_clock_max_age(self):
+        """Ensures a clock is fetched again once it is max_age old, whatever it said."""
+        client = data_io.alpaca_rest_api_conn(trading_type='live_trading')
+        client.get_clock.return_value = Mock(timestamp=pd.Timestamp('2021-02-13 12:00', tz='US/Eastern'),
+                                             is_open=False,
+                                             next_open=pd.Timestamp('2021-02-16 09:30', tz='US/Eastern'),
+                                             next_close=pd.Timestamp('2021-02-16 16:00', tz='US/Eastern'))
+
+        data_io.market_clock(max_age=60)
+        self.now += 59
+        data_io.market_clock(max_age=60)
+        self.now += 1
+        data_io.market_clock(max_age=60)
+
+        assert client.get_clock.call_count == 2
+
+    def test_alpaca_account(self):
+        """Ensures the account is reused for max_age seconds."""
+        client = data_io.alpaca_rest_api_conn(trading_type='paper_trading')
+
+        account = data_io.alpaca_account(trading_type='paper_trading')
+        self.now += 4
+        assert data_io.alpaca_account(trading_type='paper_trading') is account
+        self.now += 1
+        data_io.alpaca_account(trading_type='paper_trading')
+        data_io.alpaca_account(trading_type='paper_trading', max_age=0)
+
+        assert client.get_account.call_count == 3
+
+
 class TestPostgresConnection(unittest.TestCase):
     @patch.object(data_io, 'postgres_conn')
     def test_postgres_conn(self, PostgresConnMock: Mock):
@@ -66,3 +156,356 @@ class TestGeneratePathToWrite(unittest.TestCase):
                                                 dataset_name='My DaTASET Name',
                                                 timestamp='job_run_v4')
         assert actual == '/group/wsbtrading/prod/daily/my_dataset_name/job_run_v4'
+
+
+class TestIteratorFile(unittest.TestCase):
+    def test_read(self):
+        """Ensures reads of any size stitch the chunks back together."""
+        chunks = ['ticker,close\n', 'GME,', '', '420.69\nAMC,13.37\n']
+
+        for size in [1, 3, 7, 1000]:
+            iterator_file = data_io.IteratorFile(chunks=iter(chunks))
+            parts = []
+            while True:
+                data = iterator_file.read(size)
+                if not data:
+                    break
+                assert len(data) <= size
+                parts.append(data)
+
+            assert ''.join(parts) == ''.join(chunks)
+
+        assert data_io.IteratorFile(chunks=iter(chunks)).read() == ''.join(chunks)
+
+
+class TestInsertCsvToSql(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.temp_dir.name, 'file.csv')
+        with open(self.csv_path, 'w') as csv_file:
+            csv_file.write('id,symbol,name,exchange,ipoDate,delistingDate\n'
+                           '0,GME,"GameStop, Corp.",NYSE,2002-02-13,\n'
+                           '1,AMC,AMC Entertainment,NYSE,,\n'
+                           '2,BB,BlackBerry,,1999-02-04,\n')
+        self.columns = ['id', 'symbol', 'name', 'exchange', 'ipodate', 'delistingdate']
+
+        data_io.invalidate_table_schemas()
+        self.cursor = MagicMock()
+        self.cursor.fetchall.return_value = [('company_listing_status', column, 'text') for column in self.columns]
+        self.copied = []
+        self.cursor.copy_expert.side_effect = self._copy_expert
+
+    def _copy_expert(self, sql, file, size):
+        self.statement = sql
+        while True:
+            data = file.read(size)
+            if not data:
+                break
+            self.copied.append(data)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        data_io.invalidate_table_schemas()
+
+    def test_copy_csv(self):
+        """Ensures the file is streamed chunk by chunk, with blanks loaded as NULL."""
+        rows = data_io.copy_csv(cur=self.cursor, table_name='company_listing_status', csv_path=self.csv_path,
+                                columns=self.columns, chunk_size=2)
+
+        assert rows == 3
+        assert self.statement == data_io.copy_statement(table_name='company_listing_status')
+        assert ''.join(self.copied) == ('0,GME,"GameStop, Corp.",NYSE,2002-02-13,\n'
+                                        '1,AMC,AMC Entertainment,NYSE,,\n'
+                                        '2,BB,BlackBerry,,1999-02-04,\n')
+
+    def test_copy_csv_typed_columns(self):
+        """Ensures blank values in columns that are not text are loaded as NULL, and text is loaded as written."""
+        with open(self.csv_path, 'w') as csv_file:
+            csv_file.write(',ticker,marketcap,pbook\n'
+                           '0,GME , 1.5e9,\n'
+                           '1, , ,2.25\n')
+        self.cursor.fetchall.return_value = [('fundamentals_daily', 'id', 'integer'),
+                                             ('fundamentals_daily', 'ticker', 'text'),
+                                             ('fundamentals_daily', 'marketcap', 'double precision'),
+                                             ('fundamentals_daily', 'pbook', 'double precision')]
+
+        rows = data_io.copy_csv(cur=self.cursor, table_name='fundamentals_daily', csv_path=self.csv_path)
+
+        assert rows == 2
+        assert ''.join(self.copied) == ('0,GME ,1.5e9,\n'
+                                        '1, ,,2.25\n')
+
+    def _pooled_connection(self, conn: Mock):
+        @contextmanager
+        def pooled_connection(timeout=None):
+            yield conn, self.cursor
+            self.returned = True
+        self.returned = False
+
+        return pooled_connection
+
+    def test_copy_frames(self):
+        """Ensures dataframe chunks are streamed with their index, and missing values loaded as NULL."""
+        frames = [pd.DataFrame({'symbol': ['GME', 'AMC'], 'exchange': pd.Categorical(['NYSE', None])}, index=[0, 1]),
+                  pd.DataFrame({'symbol': ['BB'], 'exchange': pd.Categorical(['NYSE'])}, index=[2])]
+
+        rows = data_io.copy_frames(cur=self.cursor, table_name='company_listing_status', frames=iter(frames),
+                                   columns=['id', 'symbol', 'exchange'], index=True)
+
+        assert rows == 3
+        assert self.statement == data_io.copy_statement(table_name='company_listing_status',
+                                                        columns=['id', 'symbol', 'exchange'])
+        assert ''.join(self.copied) == '0,GME,NYSE\n1,AMC,\n2,BB,NYSE\n'
+
+    def test_insert_csv_to_sql(self):
+        """Ensures the load commits on one pooled connection, looks the table up once, and leaves no temp file."""
+        conn = MagicMock()
+
+        with patch.object(data_io, 'pooled_connection', self._pooled_connection(conn)):
+            stats = data_io.insert_csv_to_sql(table_name='company_listing_status', csv_path=self.csv_path)
+            data_io.insert_csv_to_sql(table_name='company_listing_status', csv_path=self.csv_path)
+
+        assert stats.rows == 3
+        assert conn.commit.call_count == 2
+        self.cursor.execute.assert_called_once()
+        assert self.returned
+        assert os.listdir(self.temp_dir.name) == ['file.csv']
+        assert not os.path.exists('clean_csv.csv')
+
+    def test_insert_csv_to_sql_error(self):
+        """Ensures a failed load is rolled back and its connection still goes back to the pool."""
+        conn = MagicMock()
+        self.cursor.copy_expert.side_effect = psycopg2.Error('boom')
+
+        with patch.object(data_io, 'pooled_connection', self._pooled_connection(conn)):
+            stats = data_io.insert_csv_to_sql(table_name='company_listing_status', csv_path=self.csv_path)
+
+        assert stats is None
+        conn.rollback.assert_called_once_with()
+        assert self.returned
+
+
+class TestCoerceNulls(unittest.TestCase):
+    def test_coerce_nulls(self):
+        """Ensures blank values become NaN and padded values are stripped, in the given columns only."""
+        chunk = pd.DataFrame({'ticker': ['GME', ' ', 'BB'], 'marketcap': [' 1.5e9 ', '  ', None],
+                              'pbook': ['', '2.25', '3']})
+
+        result = data_io.coerce_nulls(chunk=chunk, columns=[1, 2])
+
+        assert result is chunk
+        assert chunk['ticker'].tolist() == ['GME', ' ', 'BB']
+        assert chunk['marketcap'].iloc[0] == '1.5e9'
+        assert chunk['marketcap'].iloc[1:].isna().all()
+        assert chunk['pbook'].isna().tolist() == [True, False, False]
+
+
+class TestTableSchema(unittest.TestCase):
+    def setUp(self) -> None:
+        data_io.invalidate_table_schemas()
+        self.cursor = MagicMock()
+        self.cursor.fetchall.return_value = [
+            ('fundamentals_daily', 'ticker', 'text'),
+            ('fundamentals_daily', 'date', 'timestamp with time zone'),
+            ('fundamentals_daily', 'marketcap', 'numeric'),
+            ('stock_tickers', 'ticker', 'text'),
+        ]
+
+    def tearDown(self) -> None:
+        data_io.invalidate_table_schemas()
+
+    def test_table_schema(self):
+        """Ensures every table is read in one query and later lookups skip the server."""
+        schema = data_io.table_schema(table_name='fundamentals_daily', cur=self.cursor)
+        field_names = data_io._get_table_field_names(table_name='stock_tickers', cur=self.cursor)
+
+        assert schema == [data_io.Column('ticker', 'text'), data_io.Column('date', 'timestamp with time zone'),
+                          data_io.Column('marketcap', 'numeric')]
+        assert field_names == ['ticker']
+        self.cursor.execute.assert_called_once()
+
+    def test_missing_table(self):
+        """Ensures an unknown table refreshes the cache, then comes back empty."""
+        data_io.table_schema(table_name='fundamentals_daily', cur=self.cursor)
+
+        assert data_io.table_schema(table_name='company_listing_status', cur=self.cursor) == []
+        assert self.cursor.execute.call_count == 2
+
+    def test_invalidate_table_schemas(self):
+        """Ensures an invalidated table is read from the server again."""
+        data_io.table_schema(table_name='fundamentals_daily', cur=self.cursor)
+        data_io.invalidate_table_schemas(table_name='stock_tickers')
+        data_io.table_schema(table_name='fundamentals_daily', cur=self.cursor)
+        assert self.cursor.execute.call_count == 1
+
+        data_io.invalidate_table_schemas(table_name='fundamentals_daily')
+        data_io.table_schema(table_name='fundamentals_daily', cur=self.cursor)
+        assert self.cursor.execute.call_count == 2
+
+    def test_copy_statement(self):
+        """Ensures COPY turns quoted blanks into NULL only for columns that are not text, and is built once."""
+        statement = data_io.copy_statement(table_name='fundamentals_daily', cur=self.cursor)
+
+        expected = sql.SQL('COPY {table} ({columns}) FROM STDIN WITH ({options})').format(
+            table=sql.Identifier('fundamentals_daily'),
+            columns=sql.SQL(', ').join([sql.Identifier('ticker'), sql.Identifier('date'),
+                                        sql.Identifier('marketcap')]),
+            options=sql.SQL('FORMAT csv, FORCE_NULL ({columns})').format(
+                columns=sql.SQL(', ').join([sql.Identifier('date'), sql.Identifier('marketcap')])))
+        assert statement == expected
+        assert data_io.copy_statement(table_name='fundamentals_daily', cur=self.cursor) is statement
+
+    def test_copy_statement_missing_table(self):
+        """Ensures a statement can't be built for a table that doesn't exist."""
+        with self.assertRaises(ValueError):
+            data_io.copy_statement(table_name='company_listing_status', cur=self.cursor)
+
+
+class TestReadTable(unittest.TestCase):
+    def setUp(self) -> None:
+        data_io.invalidate_table_schemas()
+        self.cursor = MagicMock()
+        self.cursor.fetchall.side_effect = [
+            [('share_prices_daily', 'ticker', 'text'), ('share_prices_daily', 'date', 'timestamp with time zone'),
+             ('share_prices_daily', 'close', 'numeric'), ('share_prices_daily', 'volume', 'numeric')],
+            [('GME', '2021-01-27', Decimal('347.5100'), None), ('GME', '2021-01-28', Decimal('193.6000'), None)],
+        ]
+
+    def tearDown(self) -> None:
+        data_io.invalidate_table_schemas()
+
+    def test_read_table(self):
+        """Ensures ticker and date filters go into the query, and decimals come back as floats."""
+        df = data_io.read_table(table_name='share_prices_daily', tickers=['GME'], start_date='2021-01-27',
+                                end_date='2021-01-28', columns=['ticker', 'date', 'close', 'volume'],
+                                cur=self.cursor)
+
+        query, params = self.cursor.execute.call_args[0]
+        expected = sql.SQL('SELECT {columns} FROM {table}{where} ORDER BY ticker, date').format(
+            columns=sql.SQL(', ').join([sql.Identifier('ticker'), sql.Identifier('date'), sql.Identifier('close'),
+                                        sql.Identifier('volume')]),
+            table=sql.Identifier('share_prices_daily'),
+            where=sql.SQL(' WHERE ') + sql.SQL(' AND ').join([sql.SQL('ticker = ANY(%s)'), sql.SQL('date >= %s'),
+                                                              sql.SQL('date <= %s')]))
+        assert query == expected
+        assert params == [['GME'], '2021-01-27', '2021-01-28']
+        assert df['close'].tolist() == [347.51, 193.6]
+        assert df['volume'].isna().all()
+
+    def test_read_whole_table(self):
+        """Ensures no filter reads every column of every row."""
+        data_io.table_schema(table_name='share_prices_daily', cur=self.cursor)
+        self.cursor.fetchall.side_effect = [[]]
+
+        data_io.read_table(table_name='share_prices_daily', cur=self.cursor)
+
+        query, params = self.cursor.execute.call_args[0]
+        assert query == sql.SQL('SELECT {columns} FROM {table}{where} ORDER BY ticker, date').format(
+            columns=sql.SQL(', ').join([sql.Identifier('ticker'), sql.Identifier('date'), sql.Identifier('close'),
+                                        sql.Identifier('volume')]),
+            table=sql.Identifier('share_prices_daily'),
+            where=sql.SQL(''))
+        assert params == []
+
+    def test_unknown_column(self):
+        """Ensures only columns the table has can be read."""
+        with self.assertRaises(ValueError):
+            data_io.read_table(table_name='share_prices_daily', columns=['ticker', 'close; DROP TABLE x'],
+                               cur=self.cursor)
+
+    def test_missing_table(self):
+        """Ensures reading a table that doesn't exist fails naming it, instead of building a query with no columns."""
+        with self.assertRaisesRegex(ValueError, 'company_listing_status'):
+            data_io.read_table(table_name='company_listing_status', cur=self.cursor)
+
+        assert self.cursor.execute.call_count == 1
+
+
+class TestPooledConnection(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pool_patch = patch('psycopg2.pool.ThreadedConnectionPool')
+        self.PoolMock = self.pool_patch.start()
+        self.pool = self.PoolMock.return_value
+        self.pool.getconn.side_effect = lambda: MagicMock(closed=0)
+        data_io.configure_pool(minconn=1, maxconn=2, health_check_interval=30, host='db.local')
+
+    def tearDown(self) -> None:
+        data_io.configure_pool()
+        self.pool_patch.stop()
+
+    def test_pooled_connection(self):
+        """Ensures connections come from one lazily created pool and are returned after use."""
+        with data_io.pooled_connection() as (conn, cur):
+            assert data_io.pool_metrics()['in_use'] == 1
+        with data_io.pooled_connection():
+            pass
+
+        self.PoolMock.assert_called_once_with(1, 2, database='wsbtrading', user='postgres', password='postgres',
+                                              host='db.local', port='5432')
+        cur.close.assert_called_once_with()
+        conn.rollback.assert_called_once_with()
+        self.pool.putconn.assert_any_call(conn, close=False)
+        metrics = data_io.pool_metrics()
+        assert metrics['checkouts'] == 2
+        assert metrics['in_use'] == 0
+
+    def test_connection_returned_on_error(self):
+        """Ensures an exception inside the block still hands the connection back."""
+        with self.assertRaises(RuntimeError):
+            with data_io.pooled_connection() as (conn, _):
+                raise RuntimeError('boom')
+
+        self.pool.putconn.assert_called_once_with(conn, close=False)
+        assert data_io.pool_metrics()['in_use'] == 0
+
+    def test_health_check(self):
+        """Ensures a dead connection is swapped for a fresh one before it is handed out."""
+        dead = MagicMock(closed=1)
+        fresh = MagicMock(closed=0)
+        self.pool.getconn.side_effect = [dead, fresh]
+
+        with data_io.pooled_connection() as (conn, _):
+            assert conn is fresh
+
+        self.pool.putconn.assert_any_call(dead, close=True)
+        assert data_io.pool_metrics()['replaced_connections'] == 1
+
+    def test_wait_metrics(self):
+        """Ensures time spent waiting for a free connection is measured, and a timeout is enforced."""
+        release = threading.Event()
+
+        def hold():
+            with data_io.pooled_connection():
+                release.wait()
+
+        holders = [threading.Thread(target=hold) for _ in range(2)]
+        for holder in holders:
+            holder.start()
+        while data_io.pool_metrics()['in_use'] < 2:
+            time.sleep(0.001)
+
+        with self.assertRaises(psycopg2.pool.PoolError):
+            with data_io.pooled_connection(timeout=0.01):
+                pass
+
+        threading.Timer(0.05, release.set).start()
+        with data_io.pooled_connection():
+            pass
+        for holder in holders:
+            holder.join()
+
+        metrics = data_io.pool_metrics()
+        assert metrics['checkouts'] == 3
+        assert metrics['wait_seconds_max'] >= 0.04
+
+    def test_fork(self):
+        """Ensures a forked process opens its own pool instead of sharing the parent's connections."""
+        with data_io.pooled_connection():
+            pass
+
+        with patch('os.getpid', return_value=-1):
+            with data_io.pooled_connection():
+                pass
+
+        assert self.PoolMock.call_count == 2
+        self.pool.closeall.assert_not_called()
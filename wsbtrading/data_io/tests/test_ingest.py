@@ -0,0 +1,167 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from unittest.mock import MagicMock, Mock, patch
+
+import psycopg2
+
+from wsbtrading.data_io import data_io, ingest
+
+
+class TestFindPartitions(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        for dataset, date in [('share_prices', '2021-02-10'), ('share_prices', '2021-02-09'),
+                              ('stock_tickers', '2021-02-07')]:
+            partition_dir = os.path.join(self.temp_dir.name, 'prod', dataset, 'daily', f'date={date}')
+            os.makedirs(partition_dir)
+            open(os.path.join(partition_dir, 'file.csv'), 'w').close()
+        self.pattern = os.path.join(self.temp_dir.name, 'prod', '*', 'daily', 'date=*', 'file.csv')
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_find_partitions(self):
+        """Ensures partitions come back in path order, keyed by environment and dataset and mapped to their tables."""
+        partitions = ingest.find_partitions(pattern=self.pattern)
+
+        assert [(partition.table_name, partition.key) for partition in partitions] == [
+            ('share_prices_daily', 'prod/share_prices/daily/date=2021-02-09/file.csv'),
+            ('share_prices_daily', 'prod/share_prices/daily/date=2021-02-10/file.csv'),
+            ('stock_tickers', 'prod/stock_tickers/daily/date=2021-02-07/file.csv'),
+        ]
+        assert all(os.path.exists(partition.path) for partition in partitions)
+
+    def test_environments(self):
+        """Ensures the same partition from dev and prod is recorded under keys of its own."""
+        partition_dir = os.path.join(self.temp_dir.name, 'dev', 'share_prices', 'daily', 'date=2021-02-10')
+        os.makedirs(partition_dir)
+        open(os.path.join(partition_dir, 'file.csv'), 'w').close()
+
+        partitions = ingest.find_partitions(pattern=os.path.join(self.temp_dir.name, '*', 'share_prices', 'daily',
+                                                                 'date=2021-02-10', 'file.csv'))
+
+        assert [partition.key for partition in partitions] == ['dev/share_prices/daily/date=2021-02-10/file.csv',
+                                                               'prod/share_prices/daily/date=2021-02-10/file.csv']
+
+    def test_tables(self):
+        """Ensures dataset names can be mapped to other tables."""
+        partitions = ingest.find_partitions(pattern=self.pattern, tables={'stock_tickers': 'company_listing_status'})
+
+        assert [partition.table_name for partition in partitions] == ['share_prices', 'share_prices',
+                                                                      'company_listing_status']
+
+
+class TestLoadPartition(unittest.TestCase):
+    def setUp(self) -> None:
+        self.partition = ingest.Partition(table_name='share_prices_daily',
+                                          key='prod/share_prices/daily/date=2021-02-10/file.csv', path='file.csv')
+        self.conn = MagicMock()
+        self.cursor = MagicMock(rowcount=1)
+
+        @contextmanager
+        def pooled_connection(timeout=None):
+            yield self.conn, self.cursor
+
+        self.pool_patch = patch.object(data_io, 'pooled_connection', pooled_connection)
+        self.pool_patch.start()
+
+    def tearDown(self) -> None:
+        self.pool_patch.stop()
+
+    @patch.object(data_io, 'copy_csv')
+    def test_load_partition(self, CopyCsvMock: Mock):
+        """Ensures the rows and their manifest entry are committed together."""
+        CopyCsvMock.return_value = 250
+
+        result = ingest._load_partition(partition=self.partition, chunk_size=10)
+
+        assert result.status == 'loaded'
+        assert result.rows == 250
+        assert self.cursor.execute.call_count == 2
+        self.conn.commit.assert_called_once_with()
+
+    @patch.object(data_io, 'copy_csv')
+    def test_already_claimed(self, CopyCsvMock: Mock):
+        """Ensures a partition another run has recorded is not loaded again."""
+        self.cursor.rowcount = 0
+
+        result = ingest._load_partition(partition=self.partition, chunk_size=10)
+
+        assert result.status == 'skipped'
+        CopyCsvMock.assert_not_called()
+        self.conn.commit.assert_not_called()
+
+    @patch.object(data_io, 'copy_csv')
+    def test_failed(self, CopyCsvMock: Mock):
+        """Ensures a failed COPY reports the error and commits nothing, so a rerun retries the partition."""
+        CopyCsvMock.side_effect = psycopg2.Error('bad row')
+
+        result = ingest._load_partition(partition=self.partition, chunk_size=10)
+
+        assert result.status == 'failed'
+        assert result.error == 'bad row'
+        self.conn.commit.assert_not_called()
+
+
+class TestIngestPartitions(unittest.TestCase):
+    def setUp(self) -> None:
+        self.partitions = [ingest.Partition(table_name=table_name, key=f'{table_name}/{day}', path=f'{day}.csv')
+                           for table_name in ['share_prices_daily', 'fundamentals_daily'] for day in range(6)]
+        self.cursor = MagicMock()
+        self.cursor.fetchall.return_value = [('share_prices_daily', 'share_prices_daily/0')]
+
+        @contextmanager
+        def pooled_connection(timeout=None):
+            yield MagicMock(), self.cursor
+
+        self.patches = [patch.object(data_io, 'pooled_connection', pooled_connection),
+                        patch.object(ingest, 'find_partitions', return_value=self.partitions),
+                        patch.object(ingest, '_load_partition', side_effect=self._load_partition)]
+        for patcher in self.patches:
+            patcher.start()
+        self.lock = threading.Lock()
+        self.running = {}
+        self.max_running = {}
+
+    def tearDown(self) -> None:
+        for patcher in self.patches:
+            patcher.stop()
+
+    def _load_partition(self, partition, chunk_size):
+        table_name = partition.table_name
+        with self.lock:
+            self.running[table_name] = self.running.get(table_name, 0) + 1
+            self.max_running[table_name] = max(self.max_running.get(table_name, 0), self.running[table_name])
+        time.sleep(0.01)
+        with self.lock:
+            self.running[table_name] -= 1
+        if partition.key == 'fundamentals_daily/3':
+            return ingest.PartitionResult(partition=partition, status='failed', error='bad row')
+
+        return ingest.PartitionResult(partition=partition, status='loaded', rows=10, seconds=0.01)
+
+    def test_ingest_partitions(self):
+        """Ensures loaded partitions are skipped, per-table limits hold, and every partition is accounted for."""
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = ingest.ingest_partitions(pattern='data/prod/*/daily/date=*/file.csv', max_workers=4,
+                                               table_limits={'share_prices_daily': 1}, executor=executor)
+
+        statuses = {result.partition.key: result.status for result in results}
+        assert len(results) == len(self.partitions)
+        assert statuses['share_prices_daily/0'] == 'skipped'
+        assert statuses['fundamentals_daily/3'] == 'failed'
+        assert sum(status == 'loaded' for status in statuses.values()) == 10
+        assert ingest._load_partition.call_count == 11
+        assert self.max_running['share_prices_daily'] == 1
+        assert self.max_running['fundamentals_daily'] > 1
+
+    def test_invalid_limit(self):
+        """Ensures a table can't be limited to no loads at all."""
+        with self.assertRaises(ValueError):
+            ingest.ingest_partitions(pattern='data/prod/*/daily/date=*/file.csv',
+                                     table_limits={'share_prices_daily': 0})
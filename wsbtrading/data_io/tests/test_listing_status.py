@@ -0,0 +1,149 @@
+import tempfile
+import threading
+import time
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+from wsbtrading.data_io import columnar_store, data_io, listing_status
+# http.server's own ThreadingHTTPServer is new in Python 3.7; profiling falls back to building it on 3.6
+from wsbtrading.instrumentation.profiling import ThreadingHTTPServer
+
+HEADER = 'symbol,name,exchange,assetType,ipoDate,delistingDate,status\n'
+LISTINGS = {
+    'delisted': [f'D{i:03d},Delisted {i},NYSE,Stock,1999-01-04,2020-06-01,Delisted\n' for i in range(25)],
+    'listed': [f'L{i:03d},Listed {i},{"NASDAQ" if i % 2 else "NYSE ARCA"},{"ETF" if i % 3 else "Stock"},2010-05-03,'
+               f'null,Active\n' for i in range(40)],
+}
+
+
+class _ListingHandler(BaseHTTPRequestHandler):
+    """Serves the fixture listings the way Alpha Vantage does, streaming rows with a short pause between them."""
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        state = query['state'][0]
+        if query['apikey'][0] != 'demo':
+            self.send_error(403)
+            return
+        with self.lock:
+            type(self).active += 1
+            type(self).max_active = max(type(self).max_active, type(self).active)
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/csv')
+            self.end_headers()
+            self.wfile.write(HEADER.encode())
+            for row in LISTINGS[state]:
+                self.wfile.write(row.encode())
+                self.wfile.flush()
+                time.sleep(0.002)
+        finally:
+            with self.lock:
+                type(self).active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestListingStatus(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _ListingHandler)
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}/query'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        _ListingHandler.max_active = 0
+
+    def test_listing_url(self):
+        """Ensures the state and key are passed as query parameters."""
+        assert listing_status.listing_url(state='listed', api_key='demo') == \
+            'https://www.alphavantage.co/query?function=LISTING_STATUS&state=listed&apikey=demo'
+
+    def test_iter_listing_chunks(self):
+        """Ensures both states are downloaded at once and come back whole, typed and numbered across chunks."""
+        chunks = list(listing_status.iter_listing_chunks(api_key='demo', chunk_size=10, base_url=self.base_url))
+        df = pd.concat(chunks)
+
+        assert _ListingHandler.max_active == 2
+        assert all(len(chunk) <= 10 for chunk in chunks)
+        assert sorted(df['symbol']) == sorted(row.split(',')[0] for rows in LISTINGS.values() for row in rows)
+        assert list(df.index) == list(range(65))
+        for column in ['exchange', 'assetType', 'status']:
+            assert all(isinstance(chunk[column].dtype, pd.CategoricalDtype) for chunk in chunks)
+        assert df.loc[df['status'] == 'Active', 'delistingDate'].isna().all()
+        assert set(df['exchange'].astype(str)) == {'NYSE', 'NASDAQ', 'NYSE ARCA'}
+
+    def test_fetcher(self):
+        """Ensures downloads go through the fetcher given."""
+        fetcher = MagicMock(side_effect=listing_status.http_fetcher)
+
+        chunks = list(listing_status.iter_listing_chunks(api_key='demo', states=['delisted'], fetcher=fetcher,
+                                                         base_url=self.base_url))
+
+        fetcher.assert_called_once_with(listing_status.listing_url(state='delisted', api_key='demo',
+                                                                   base_url=self.base_url))
+        assert sum(len(chunk) for chunk in chunks) == 25
+
+    def test_failed_download(self):
+        """Ensures a failed download is raised to the consumer."""
+        with self.assertRaises(Exception):
+            list(listing_status.iter_listing_chunks(api_key='wrong', base_url=self.base_url))
+
+    def test_stop_early(self):
+        """Ensures the downloads are abandoned, not left blocked, when the consumer stops early."""
+        chunks = listing_status.iter_listing_chunks(api_key='demo', chunk_size=5, base_url=self.base_url,
+                                                    max_queued=1)
+        next(chunks)
+        chunks.close()
+
+        assert not [thread for thread in threading.enumerate() if thread.name.startswith('listing_status')]
+
+    def test_columnar_store(self):
+        """Ensures the chunks stream into the columnar store, categoricals and all."""
+        with tempfile.TemporaryDirectory() as root_path:
+            chunks = listing_status.iter_listing_chunks(api_key='demo', chunk_size=10, base_url=self.base_url)
+            columnar_store.write_dataset(df=(chunk.assign(date_created='2021-02-10') for chunk in chunks),
+                                         environment='prod', granularity='daily', dataset_name='stock_ticker_list',
+                                         partition_cols=['date_created'], root_path=root_path)
+
+            df = columnar_store.read_dataset(environment='prod', granularity='daily',
+                                             dataset_name='stock_ticker_list', root_path=root_path)
+
+        assert len(df) == 65
+        assert sorted(df['status'].astype(str).unique()) == ['Active', 'Delisted']
+
+    def test_copy_frames(self):
+        """Ensures the chunks stream into COPY with their row ids."""
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [('company_listing_status', name, 'text') for name in
+                                        ['id', 'symbol', 'name', 'exchange', 'assettype', 'ipodate', 'delistingdate',
+                                         'status']]
+        loaded = []
+        cursor.copy_expert.side_effect = lambda sql, file, size: loaded.append(file.read())
+        data_io.invalidate_table_schemas()
+
+        try:
+            rows = data_io.copy_frames(cur=cursor, table_name='company_listing_status', index=True,
+                                       frames=listing_status.iter_listing_chunks(api_key='demo', chunk_size=10,
+                                                                                 base_url=self.base_url))
+        finally:
+            data_io.invalidate_table_schemas()
+
+        lines = loaded[0].splitlines()
+        assert rows == 65
+        assert len(lines) == 65
+        assert sorted(int(line.split(',')[0]) for line in lines) == list(range(65))
+        assert any(line.endswith('2010-05-03,,Active') for line in lines)
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from wsbtrading import maths
+from wsbtrading.data_io import ohlcv_panel
+
+
+class TestOhlcvPanel(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'panel')
+        rng = np.random.default_rng(0)
+        self.dates = pd.bdate_range('2021-01-04', periods=60)
+        self.tickers = ['AMC', 'BB', 'GME', 'NOK']
+        close = 20 + rng.normal(size=(60, 4)).cumsum(axis=0)
+        spread = rng.uniform(0.5, 2, size=(60, 4))
+        self.fields = {'Close': close, 'High': close + spread, 'Low': close - spread}
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Ensures a panel opens memory-mapped, with its labels and prices as written."""
+        ohlcv_panel.write_panel(path=self.path, fields=self.fields, tickers=self.tickers, dates=self.dates)
+
+        panel = ohlcv_panel.open_panel(path=self.path)
+
+        assert isinstance(panel['Close'], np.memmap)
+        assert not panel['Close'].flags.writeable
+        assert panel.field_names == ['Close', 'High', 'Low']
+        assert panel.shape == (60, 4)
+        assert panel.tickers.tolist() == self.tickers
+        assert panel.dates.equals(self.dates)
+        np.testing.assert_array_equal(panel['High'], self.fields['High'])
+
+    def test_float32(self):
+        """Ensures prices can be stored at half the size."""
+        ohlcv_panel.write_panel(path=self.path, fields=self.fields, tickers=self.tickers, dates=self.dates,
+                                dtype='float32')
+
+        panel = ohlcv_panel.open_panel(path=self.path, fields=['Close'])
+
+        assert panel['Close'].dtype == np.float32
+        assert panel.field_names == ['Close']
+        np.testing.assert_allclose(panel['Close'], self.fields['Close'], rtol=1e-6)
+
+    def test_write_panel_from_frames(self):
+        """Ensures per-ticker frames are aligned on the union of their dates, with gaps left as NaN."""
+        frames = {
+            'GME': pd.DataFrame({'Close': [1.0, 2.0, 3.0], 'Volume': [10, 20, 30]}, index=self.dates[:3]),
+            'AMC': pd.DataFrame({'Close': [5.0, 6.0], 'Volume': [50, 60]}, index=self.dates[2:4]),
+        }
+
+        ohlcv_panel.write_panel_from_frames(path=self.path, frames=frames, fields=['Close', 'Volume'])
+        panel = ohlcv_panel.open_panel(path=self.path)
+
+        assert panel.tickers.tolist() == ['GME', 'AMC']
+        assert panel.dates.equals(self.dates[:4])
+        np.testing.assert_array_equal(panel['Close'], [[1, np.nan], [2, np.nan], [3, 5], [np.nan, 6]])
+        pd.testing.assert_frame_equal(panel.ticker_frame('AMC'), frames['AMC'].astype(float), check_freq=False,
+                                      check_index_type=False)
+
+    def test_refresh_panel(self):
+        """Ensures a panel is built on the first run, reused while current, and rebuilt for new bars or tickers."""
+        frames = {ticker: pd.DataFrame({'Close': self.fields['Close'][:50, column]}, index=self.dates[:50])
+                  for column, ticker in enumerate(self.tickers[:3])}
+        meta_path = os.path.join(self.path, 'meta.json')
+
+        first = ohlcv_panel.refresh_panel(path=self.path, frames=frames, fields=['Close'])
+        first_built_at = os.stat(meta_path).st_mtime_ns
+        again = ohlcv_panel.refresh_panel(path=self.path, frames=dict(frames), fields=['Close'])
+        assert os.stat(meta_path).st_mtime_ns == first_built_at
+
+        added = {**frames, 'NOK': pd.DataFrame({'Close': self.fields['Close'][:50, 3]}, index=self.dates[:50])}
+        with_ticker = ohlcv_panel.refresh_panel(path=self.path, frames=added, fields=['Close'])
+        revised = {**added, 'AMC': added['AMC'].assign(Close=added['AMC']['Close'] + 1)}
+        with_revision = ohlcv_panel.refresh_panel(path=self.path, frames=revised, fields=['Close'])
+        newer = {ticker: pd.DataFrame({'Close': self.fields['Close'][:, column]}, index=self.dates)
+                 for column, ticker in enumerate(self.tickers)}
+        refreshed = ohlcv_panel.refresh_panel(path=self.path, frames=newer, fields=['Close'])
+
+        assert first.dates.equals(self.dates[:50])
+        assert again.shape == (50, 3)
+        assert list(with_ticker.tickers) == self.tickers
+        np.testing.assert_array_equal(with_revision['Close'][:, 0], self.fields['Close'][:50, 0] + 1)
+        assert refreshed.dates.equals(self.dates)
+        np.testing.assert_array_equal(refreshed['Close'], self.fields['Close'])
+
+    def test_date_slice(self):
+        """Ensures a date range is a view on the mapped arrays, both ends included."""
+        ohlcv_panel.write_panel(path=self.path, fields=self.fields, tickers=self.tickers, dates=self.dates)
+        panel = ohlcv_panel.open_panel(path=self.path)
+
+        window = panel.date_slice(start_date='2021-01-05', end_date='2021-01-08')
+
+        assert window.dates.equals(self.dates[1:5])
+        assert np.shares_memory(window['Close'], panel['Close'])
+        np.testing.assert_array_equal(window['Low'], self.fields['Low'][1:5])
+
+    def test_column_slice(self):
+        """Ensures a block of tickers is a view on the mapped arrays."""
+        ohlcv_panel.write_panel(path=self.path, fields=self.fields, tickers=self.tickers, dates=self.dates)
+        panel = ohlcv_panel.open_panel(path=self.path)
+
+        block = panel.column_slice(start=1, stop=3)
+
+        assert list(block.tickers) == self.tickers[1:3]
+        assert block.dates.equals(panel.dates)
+        assert np.shares_memory(block['Close'], panel['Close'])
+        np.testing.assert_array_equal(block['High'], self.fields['High'][:, 1:3])
+
+    def test_replace_open_panel(self):
+        """Ensures rewriting a panel leaves processes that have the old one open reading the old prices."""
+        ohlcv_panel.write_panel(path=self.path, fields=self.fields, tickers=self.tickers, dates=self.dates)
+        old_panel = ohlcv_panel.open_panel(path=self.path)
+
+        ohlcv_panel.write_panel(path=self.path, fields={name: values + 1 for name, values in self.fields.items()},
+                                tickers=self.tickers, dates=self.dates)
+
+        np.testing.assert_array_equal(old_panel['Close'], self.fields['Close'])
+        np.testing.assert_array_equal(ohlcv_panel.open_panel(path=self.path)['Close'], self.fields['Close'] + 1)
+        assert sorted(os.listdir(self.temp_dir.name)) == ['panel']
+
+    def test_shape_mismatch(self):
+        """Ensures a field that doesn't match the indexes is refused."""
+        with pytest.raises(ValueError):
+            ohlcv_panel.write_panel(path=self.path, fields={'Close': self.fields['Close'][:, :3]},
+                                    tickers=self.tickers, dates=self.dates)
+
+    def test_maths(self):
+        """Ensures the panel scans give the same answer on a mapped panel as on the arrays it was written from."""
+        ohlcv_panel.write_panel(path=self.path, fields=self.fields, tickers=self.tickers, dates=self.dates)
+        panel = ohlcv_panel.open_panel(path=self.path)
+        stacked = np.stack([self.fields['Close'], self.fields['Low'], self.fields['High']])
+
+        np.testing.assert_array_equal(maths.squeeze_panel(panel=panel),
+                                      maths.squeeze_panel(panel=stacked))
+        pd.testing.assert_series_equal(maths.is_in_squeeze_panel(panel=panel),
+                                       maths.is_in_squeeze_panel(panel=stacked, tickers=self.tickers))
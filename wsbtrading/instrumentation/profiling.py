@@ -0,0 +1,508 @@
+"""Timing and throughput instrumentation for the hot paths of ``wsbtrading``.
+
+Functions decorated with :func:`instrument`, and blocks wrapped in :func:`timed`, record their wall time, CPU time,
+the rows they processed and the bytes they moved into in-process histograms, one per name. Recording is off by
+default, which adds a fraction of a microsecond to a call; switch it on with :func:`enable` or by setting the
+``WSBTRADING_INSTRUMENTATION`` environment variable to ``1``. With a ``sample_rate`` below 1 only that fraction of
+calls is recorded, which keeps the overhead of a hot loop down while still showing where its time goes.
+
+What has been recorded can be read with :func:`snapshot`, written to a JSON file with :func:`export_json`, rendered in
+the Prometheus text format with :func:`prometheus_text`, or served to a Prometheus scraper with
+:func:`serve_prometheus`.
+
+The ``maths`` indicators, the ``data_io`` loads and the ``order`` calls are instrumented already.
+"""
+import bisect
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+try:
+    from http.server import ThreadingHTTPServer
+except ImportError:
+    # Python 3.6
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+# Seconds, from a microsecond to ten minutes, in steps of 1, 2.5 and 5 per decade
+SECONDS_BUCKETS = tuple(round(step * 10.0 ** exponent, 9) for exponent in range(-6, 3) for step in (1, 2.5, 5)) \
+    + (1_000.0,)
+PROMETHEUS_PREFIX = 'wsbtrading'
+
+# The CPU time of the calling thread; Python 3.6 can only count the whole process's
+_cpu_time = getattr(time, 'thread_time', time.process_time)
+
+
+class Histogram:
+    """Counts observations into fixed buckets, the way Prometheus histograms do.
+
+    Args:
+        buckets: the upper bound of each bucket, in increasing order; larger observations land in an implicit +Inf
+                 bucket
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.instrumentation import profiling
+        histogram = profiling.Histogram(buckets=[0.01, 0.1, 1.0])
+        histogram.observe(0.05)
+        histogram.quantile(0.5)
+        # 0.1
+    """
+    def __init__(self, buckets: Sequence[float] = SECONDS_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def cumulative_counts(self) -> List[Tuple[float, int]]:
+        """Returns (upper bound, observations at or below it) per bucket, ending with +Inf."""
+        total = 0
+        cumulative = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            cumulative.append((bound, total))
+
+        return cumulative
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile as the upper bound of the bucket it falls in, or the largest observation if above
+        them all."""
+        if not self.count:
+            return float('nan')
+        rank = q * self.count
+        for bound, total in self.cumulative_counts():
+            if total >= rank:
+                return min(bound, self.max)
+
+        return self.max
+
+
+class Metric:
+    """Everything recorded under one name.
+
+    Args:
+        name: the function or block the metric is for, e.g. 'maths.sma'
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_seconds = Histogram()
+        self.cpu_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, wall_seconds: float, cpu_seconds: float, rows: Optional[int], nbytes: Optional[int],
+               failed: bool) -> None:
+        with self.lock:
+            self.wall_seconds.observe(wall_seconds)
+            self.cpu_seconds += cpu_seconds
+            self.rows += rows or 0
+            self.bytes += nbytes or 0
+            self.errors += failed
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            histogram = self.wall_seconds
+            return {
+                'count': histogram.count,
+                'errors': self.errors,
+                'wall_seconds_total': histogram.sum,
+                'wall_seconds_max': histogram.max,
+                'wall_seconds_p50': histogram.quantile(0.5),
+                'wall_seconds_p90': histogram.quantile(0.9),
+                'wall_seconds_p99': histogram.quantile(0.99),
+                'wall_seconds_buckets': [[bound, total] for bound, total in histogram.cumulative_counts()
+                                         if bound != float('inf')],
+                'cpu_seconds_total': self.cpu_seconds,
+                'rows_total': self.rows,
+                'bytes_total': self.bytes,
+            }
+
+
+class _State:
+    """The process-wide switch, sample rate and metrics."""
+    enabled = os.environ.get('WSBTRADING_INSTRUMENTATION', '0').lower() in ('1', 'true', 'yes', 'on')
+    sample_rate = float(os.environ.get('WSBTRADING_INSTRUMENTATION_SAMPLE_RATE', '1.0'))
+    lock = threading.Lock()
+    metrics: Dict[str, Metric] = {}
+
+
+def enable(sample_rate: Optional[float] = None) -> None:
+    """Switches recording on for the whole process.
+
+    Args:
+        sample_rate: the fraction of calls to record, between 0 and 1; by default the current rate, initially 1
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.instrumentation import profiling
+        profiling.enable(sample_rate=0.1)
+    """
+    if sample_rate is not None:
+        if not 0 <= sample_rate <= 1:
+            raise ValueError(f'sample_rate must be between 0 and 1, got {sample_rate}.')
+        _State.sample_rate = sample_rate
+    _State.enabled = True
+
+
+def disable() -> None:
+    """Switches recording off; what has been recorded so far is kept."""
+    _State.enabled = False
+
+
+def is_enabled() -> bool:
+    return _State.enabled
+
+
+def reset() -> None:
+    """Forgets everything recorded so far."""
+    with _State.lock:
+        _State.metrics = {}
+
+
+def get_metric(name: str) -> Metric:
+    """Returns the metric recorded under ``name``, creating it if need be."""
+    metric = _State.metrics.get(name)
+    if metric is None:
+        with _State.lock:
+            metric = _State.metrics.setdefault(name, Metric(name=name))
+
+    return metric
+
+
+def _skip() -> bool:
+    """Whether to leave a call unrecorded, because recording is off or the call is not in the sample."""
+    return not _State.enabled or (_State.sample_rate < 1 and random.random() >= _State.sample_rate)
+
+
+def measure(result: Any) -> Tuple[Optional[int], Optional[int]]:
+    """Works out the rows and bytes of a function's result, for when none were given.
+
+    Dataframes, series, arrays and Arrow tables count their rows and bytes, a dictionary of arrays (e.g. from
+    :func:`wsbtrading.maths.squeeze_indicators`) its arrays' rows and bytes, an integer is taken as a row count (e.g.
+    from :func:`wsbtrading.data_io.copy_csv`), and a list counts its items as rows.
+
+    Returns:
+        the rows and bytes, either None where they can't be told
+    """
+    if isinstance(result, bool) or result is None:
+        return None, None
+    if isinstance(result, int):
+        return result, None
+    if hasattr(result, 'memory_usage') and hasattr(result, 'shape'):
+        usage = result.memory_usage(index=True, deep=False)
+        return result.shape[0], int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if hasattr(result, 'nbytes') and hasattr(result, 'shape'):
+        return (result.shape[0] if result.shape else 1), int(result.nbytes)
+    if isinstance(result, dict):
+        arrays = [value for value in result.values() if hasattr(value, 'nbytes') and hasattr(value, 'shape')]
+        if arrays:
+            return arrays[0].shape[0], sum(int(array.nbytes) for array in arrays)
+        return None, None
+    if isinstance(result, (list, tuple)) and not hasattr(result, '_fields'):
+        return len(result), None
+
+    return None, None
+
+
+class Span:
+    """A block being timed by :func:`timed`; set ``rows`` and ``nbytes`` on it to record them."""
+    __slots__ = ('name', 'rows', 'nbytes', '_wall_start', '_cpu_start')
+
+    def __init__(self, name: str, rows: Optional[int] = None, nbytes: Optional[int] = None):
+        self.name = name
+        self.rows = rows
+        self.nbytes = nbytes
+
+    def __enter__(self) -> 'Span':
+        self._cpu_start = _cpu_time()
+        self._wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        wall_seconds = time.perf_counter() - self._wall_start
+        cpu_seconds = _cpu_time() - self._cpu_start
+        get_metric(self.name).record(wall_seconds=wall_seconds, cpu_seconds=cpu_seconds, rows=self.rows,
+                                     nbytes=self.nbytes, failed=exc_type is not None)
+
+
+class _NullSpan:
+    """Stands in for a :class:`Span` when the block is not being recorded."""
+    __slots__ = ('rows', 'nbytes')
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+def timed(name: str, rows: Optional[int] = None, nbytes: Optional[int] = None):
+    """Records the wall and CPU time of a block under ``name``.
+
+    CPU time is that of the calling thread, so work handed to other threads or processes is not counted in it (on
+    Python 3.6 it is the whole process's, which does count other threads).
+
+    Args:
+        name: what to record the block as
+        rows: the rows the block processes, if known up front; otherwise set ``span.rows`` inside the block
+        nbytes: the bytes the block moves, likewise
+
+    Returns:
+        a context manager yielding the span being recorded
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.instrumentation import profiling
+        with profiling.timed('jobs.scan_universe') as span:
+            flags = maths.is_in_squeeze_panel(panel=panel)
+            span.rows = len(flags)
+    """
+    if _skip():
+        return _NullSpan()
+
+    return Span(name=name, rows=rows, nbytes=nbytes)
+
+
+def _default_name(func: Callable) -> str:
+    return f'{func.__module__.rsplit(".", 1)[-1]}.{func.__qualname__}'
+
+
+def instrument(func: Optional[Callable] = None, name: Optional[str] = None,
+               rows: Optional[Union[str, Callable[..., Optional[int]]]] = None,
+               nbytes: Optional[Union[str, Callable[..., Optional[int]]]] = None) -> Callable:
+    """Decorates a function, or coroutine function, so its calls are recorded while instrumentation is enabled.
+
+    Args:
+        func: the function to decorate; leave it out to pass the other arguments, as in ``@instrument(name=...)``
+        name: what to record the calls as; by default the function's module and name, e.g. 'maths.sma'
+        rows: the name of the argument whose length is the rows a call processes, e.g. 'df', or a function working
+              them out, called as ``rows(result, *args, **kwargs)``; by default they are read off the result, see
+              :func:`measure`
+        nbytes: the name of the argument whose ``nbytes`` is the bytes a call moved, or a function working them out,
+                likewise
+
+    Returns:
+        the decorated function
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.instrumentation import profiling
+
+        @profiling.instrument(rows='df')
+        def score(df):
+            ...
+    """
+    if func is None:
+        return functools.partial(instrument, name=name, rows=rows, nbytes=nbytes)
+    metric_name = name or _default_name(func)
+    signature = inspect.signature(func)
+
+    def count(counter: Union[str, Callable], size: Callable[[Any], int], result: Any, args: tuple,
+              kwargs: dict) -> Optional[int]:
+        if callable(counter):
+            return counter(result, *args, **kwargs)
+        argument = signature.bind(*args, **kwargs).arguments.get(counter)
+        return None if argument is None else size(argument)
+
+    def finish(result: Any, args: tuple, kwargs: dict, wall_start: float, cpu_start: float, failed: bool) -> None:
+        wall_seconds = time.perf_counter() - wall_start
+        cpu_seconds = _cpu_time() - cpu_start
+        n_rows, n_bytes = (None, None) if failed else measure(result)
+        if not failed and rows is not None:
+            n_rows = count(rows, len, result, args, kwargs)
+        if not failed and nbytes is not None:
+            n_bytes = count(nbytes, lambda argument: int(argument.nbytes), result, args, kwargs)
+        get_metric(metric_name).record(wall_seconds=wall_seconds, cpu_seconds=cpu_seconds, rows=n_rows,
+                                       nbytes=n_bytes, failed=failed)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if not _State.enabled or _skip():
+                return await func(*args, **kwargs)
+            cpu_start = _cpu_time()
+            wall_start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException:
+                finish(None, args, kwargs, wall_start, cpu_start, failed=True)
+                raise
+            finish(result, args, kwargs, wall_start, cpu_start, failed=False)
+            return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _State.enabled or _skip():
+            return func(*args, **kwargs)
+        cpu_start = _cpu_time()
+        wall_start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            finish(None, args, kwargs, wall_start, cpu_start, failed=True)
+            raise
+        finish(result, args, kwargs, wall_start, cpu_start, failed=False)
+        return result
+
+    return wrapper
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Returns what has been recorded so far.
+
+    Returns:
+        per name, the ``count`` of recorded calls and how many raised (``errors``), the total, largest and estimated
+        50th, 90th and 99th percentile wall time, the cumulative wall time histogram, the total CPU time, and the
+        total rows and bytes
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.instrumentation import profiling
+        profiling.snapshot()['maths.is_in_squeeze_panel']['wall_seconds_p99']
+    """
+    with _State.lock:
+        metrics = list(_State.metrics.values())
+
+    return {metric.name: metric.to_dict() for metric in sorted(metrics, key=lambda metric: metric.name)}
+
+
+def export_json(path: str) -> str:
+    """Writes :func:`snapshot` to a JSON file, replacing it in one step so a reader never sees half a file.
+
+    Args:
+        path: the file to write
+
+    Returns:
+        ``path``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.instrumentation import profiling
+        profiling.export_json(path='/tmp/wsbtrading_metrics.json')
+    """
+    report = {
+        'exported_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'sample_rate': _State.sample_rate,
+        'metrics': snapshot(),
+    }
+    staging_path = f'{path}.tmp'
+    with open(staging_path, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+    os.replace(staging_path, path)
+
+    return path
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return '+Inf' if value == float('inf') else repr(float(value))
+
+
+def prometheus_text() -> str:
+    """Renders what has been recorded in the Prometheus text exposition format, one series per name.
+
+    Returns:
+        the ``wsbtrading_call_seconds`` histogram plus the ``wsbtrading_call_errors_total``,
+        ``wsbtrading_call_cpu_seconds_total``, ``wsbtrading_rows_total`` and ``wsbtrading_bytes_total`` counters, all
+        labelled by ``function``
+    """
+    metrics = snapshot()
+    lines = [f'# HELP {PROMETHEUS_PREFIX}_call_seconds Wall time of the sampled calls.',
+             f'# TYPE {PROMETHEUS_PREFIX}_call_seconds histogram']
+    for name, metric in metrics.items():
+        label = _label(name)
+        buckets = metric['wall_seconds_buckets'] + [[float('inf'), metric['count']]]
+        lines += [f'{PROMETHEUS_PREFIX}_call_seconds_bucket{{function="{label}",le="{_number(bound)}"}} {total}'
+                  for bound, total in buckets]
+        lines.append(f'{PROMETHEUS_PREFIX}_call_seconds_sum{{function="{label}"}} '
+                     f'{_number(metric["wall_seconds_total"])}')
+        lines.append(f'{PROMETHEUS_PREFIX}_call_seconds_count{{function="{label}"}} {metric["count"]}')
+
+    for counter, field, help_text in [('call_errors_total', 'errors', 'Sampled calls that raised.'),
+                                      ('call_cpu_seconds_total', 'cpu_seconds_total',
+                                       'CPU time of the sampled calls, on the calling thread.'),
+                                      ('rows_total', 'rows_total', 'Rows processed by the sampled calls.'),
+                                      ('bytes_total', 'bytes_total', 'Bytes moved by the sampled calls.')]:
+        lines += [f'# HELP {PROMETHEUS_PREFIX}_{counter} {help_text}', f'# TYPE {PROMETHEUS_PREFIX}_{counter} counter']
+        lines += [f'{PROMETHEUS_PREFIX}_{counter}{{function="{_label(name)}"}} {_number(metric[field])}'
+                  for name, metric in metrics.items()]
+
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_prometheus(port: int = 9108, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Serves :func:`prometheus_text` at ``/metrics`` from a background thread.
+
+    Args:
+        port: the port to listen on; 0 picks a free one, see ``server.server_address``
+        host: the address to listen on
+
+    Returns:
+        the server; call ``server.shutdown()`` to stop it
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.instrumentation import profiling
+        profiling.enable()
+        profiling.serve_prometheus(port=9108)
+        # curl localhost:9108/metrics
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='wsbtrading_metrics', daemon=True).start()
+
+    return server
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import math
+import os
+import tempfile
+import unittest
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+from wsbtrading import maths
+from wsbtrading.instrumentation import profiling
+
+
+class TestHistogram(unittest.TestCase):
+    def test_observe(self):
+        """Ensures observations are counted into cumulative buckets, with an overflow bucket above them."""
+        histogram = profiling.Histogram(buckets=[0.01, 0.1, 1.0])
+        for value in [0.005, 0.01, 0.05, 0.5, 3.0]:
+            histogram.observe(value)
+
+        assert histogram.cumulative_counts() == [(0.01, 2), (0.1, 3), (1.0, 4), (math.inf, 5)]
+        assert histogram.count == 5
+        assert histogram.sum == 3.565
+        assert histogram.quantile(0.5) == 0.1
+        assert histogram.quantile(1.0) == 3.0
+        assert math.isnan(profiling.Histogram().quantile(0.5))
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self) -> None:
+        profiling.reset()
+        profiling.enable(sample_rate=1.0)
+
+    def tearDown(self) -> None:
+        profiling.disable()
+        profiling.reset()
+
+    def test_instrument(self):
+        """Ensures a call's wall time, CPU time, rows and bytes are recorded under its module and name."""
+        df = pd.DataFrame({'Close': np.arange(100, dtype=np.float64)})
+
+        result = maths.sma(df=df, metric_col='Close', rolling_window=5)
+
+        metric = profiling.snapshot()['maths.sma']
+        assert metric['count'] == 1
+        assert metric['rows_total'] == 100
+        assert metric['bytes_total'] == result.memory_usage(index=True).sum()
+        assert 0 < metric['wall_seconds_total'] == metric['wall_seconds_max']
+        assert metric['cpu_seconds_total'] >= 0
+
+    def test_rows_argument(self):
+        """Ensures rows can be counted off a named argument when the result doesn't say."""
+        df = pd.DataFrame({'Close': np.linspace(10, 12, 50), 'Low': np.linspace(9, 11, 50),
+                           'High': np.linspace(11, 13, 50)})
+
+        maths.is_in_squeeze(df, 'Close', 'Low', 'High')
+
+        assert profiling.snapshot()['maths.is_in_squeeze']['rows_total'] == 50
+
+    def test_errors(self):
+        """Ensures a call that raises is counted as an error and the exception passes through."""
+        @profiling.instrument(name='test.fails')
+        def fails():
+            raise KeyError('boom')
+
+        with self.assertRaises(KeyError):
+            fails()
+
+        assert profiling.snapshot()['test.fails']['errors'] == 1
+
+    def test_async(self):
+        """Ensures coroutine functions are timed until they finish, not until they return a coroutine."""
+        @profiling.instrument(name='test.sleep')
+        async def sleep():
+            await asyncio.sleep(0.02)
+            return [1, 2, 3]
+
+        loop = asyncio.new_event_loop()
+        try:
+            assert loop.run_until_complete(sleep()) == [1, 2, 3]
+        finally:
+            loop.close()
+
+        metric = profiling.snapshot()['test.sleep']
+        assert metric['wall_seconds_total'] >= 0.02
+        assert metric['rows_total'] == 3
+
+    def test_timed(self):
+        """Ensures a block's rows and bytes can be set while it runs."""
+        with profiling.timed('test.block', nbytes=64) as span:
+            span.rows = 8
+
+        metric = profiling.snapshot()['test.block']
+        assert (metric['count'], metric['rows_total'], metric['bytes_total']) == (1, 8, 64)
+
+    def test_disabled(self):
+        """Ensures nothing is recorded while instrumentation is off, or for calls left out of the sample."""
+        profiling.disable()
+        maths.divide(df=pd.DataFrame({'a': [1.0], 'b': [2.0]}), numerator_col='a', denominator_col='b')
+        with profiling.timed('test.block') as span:
+            span.rows = 1
+
+        profiling.enable(sample_rate=0.0)
+        maths.divide(df=pd.DataFrame({'a': [1.0], 'b': [2.0]}), numerator_col='a', denominator_col='b')
+
+        assert profiling.snapshot() == {}
+
+    def test_sampling(self):
+        """Ensures roughly sample_rate of the calls are recorded."""
+        profiling.enable(sample_rate=0.25)
+        recorded = profiling.instrument(name='test.sampled')(lambda: None)
+        for _ in range(4000):
+            recorded()
+
+        assert 800 < profiling.snapshot()['test.sampled']['count'] < 1200
+
+    def test_invalid_sample_rate(self):
+        with self.assertRaises(ValueError):
+            profiling.enable(sample_rate=1.5)
+
+    def test_export_json(self):
+        """Ensures the snapshot is written to a JSON file."""
+        with profiling.timed('test.block'):
+            pass
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = profiling.export_json(path=os.path.join(temp_dir, 'metrics.json'))
+            with open(path) as metrics_file:
+                report = json.load(metrics_file)
+
+        assert report['sample_rate'] == 1.0
+        assert report['metrics']['test.block']['count'] == 1
+
+    def test_prometheus(self):
+        """Ensures the metrics are served in the Prometheus text format."""
+        with profiling.timed('test.block', rows=3):
+            pass
+
+        server = profiling.serve_prometheus(port=0)
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{server.server_address[1]}/metrics') as response:
+                text = response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert '# TYPE wsbtrading_call_seconds histogram' in text
+        assert 'wsbtrading_call_seconds_bucket{function="test.block",le="+Inf"} 1' in text
+        assert 'wsbtrading_call_seconds_count{function="test.block"} 1' in text
+        assert 'wsbtrading_rows_total{function="test.block"} 3' in text
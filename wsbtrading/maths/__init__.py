@@ -1 +1,3 @@
-from wsbtrading.maths.maths import *
\ No newline at end of file
+from wsbtrading.maths.maths import *
+from wsbtrading.maths.streaming import *
+from wsbtrading.maths.feature_store import FeatureStore
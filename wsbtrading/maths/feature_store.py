@@ -0,0 +1,218 @@
+"""An on-disk cache for the indicators in :mod:`wsbtrading.maths`.
+
+Every (ticker, function, parameters) combination gets one entry holding the columns the function appended, saved as
+``.npy`` files and read back memory-mapped, plus a fingerprint of the input prices they were computed from. When the
+same prices come back the cached columns are reused; when new bars have been appended to them, only the new bars (and
+the window of history they depend on) are computed and appended to the entry.
+"""
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROOT_PATH = os.path.join(os.path.expanduser('~'), '.wsbtrading', 'feature_store')
+
+# How many rows of history each output row depends on: a parameter name holding the window, or a fixed number of rows.
+# Functions missing from here (e.g. ``ema``, which is recursive) are recomputed in full whenever their input changes.
+_LOOKBACKS = {
+    'divide': 1,
+    'true_range': 1,
+    'sma': 'rolling_window',
+    'rolling_stddev': 'rolling_window',
+    'lower_band': 'rolling_window',
+    'upper_band': 'rolling_window',
+    'avg_true_range': 'rolling_window',
+    'lower_keltner': 'rolling_window',
+    'upper_keltner': 'rolling_window',
+}
+_META_FILE = 'meta.json'
+
+
+def _fingerprint(df: 'pd.DataFrame', columns: List[str], n_rows: int) -> str:
+    """Hashes the first ``n_rows`` values of the input columns."""
+    digest = hashlib.blake2b(digest_size=20)
+    for column in columns:
+        values = np.ascontiguousarray(df[column].to_numpy()[:n_rows])
+        digest.update(f'{column}:{values.dtype.str}:'.encode())
+        digest.update(values.tobytes() if values.dtype != object else repr(values.tolist()).encode())
+
+    return digest.hexdigest()
+
+
+class FeatureStore:
+    """Memoizes ``wsbtrading.maths`` functions per ticker, with LRU eviction once the cache outgrows ``max_bytes``.
+
+    Args:
+        root_path: the directory to keep the cache in
+        max_bytes: the size the cache is trimmed back to after every write, oldest-used entries first
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        store = maths.FeatureStore(max_bytes=2 * 1024 ** 3)
+        df_mapped = store.compute(maths.sma, df=df, ticker='GME', metric_col='Close', rolling_window=20)
+    """
+    def __init__(self, root_path: str = DEFAULT_ROOT_PATH, max_bytes: int = 1024 ** 3):
+        self.root_path = root_path
+        self.max_bytes = max_bytes
+        os.makedirs(root_path, exist_ok=True)
+
+    @staticmethod
+    def _bind(func: Callable, df: 'pd.DataFrame', params: Dict[str, Any]) -> Dict[str, Any]:
+        bound = inspect.signature(func).bind(df=df, **params)
+        bound.apply_defaults()
+
+        return {name: value for name, value in bound.arguments.items() if name not in ('df', 'inplace')}
+
+    def _entry_path(self, func: Callable, ticker: str, params: Dict[str, Any]) -> str:
+        key = json.dumps({'ticker': ticker, 'function': f'{func.__module__}.{func.__qualname__}', 'params': params},
+                         sort_keys=True, default=str)
+
+        return os.path.join(self.root_path, hashlib.blake2b(key.encode(), digest_size=16).hexdigest())
+
+    @staticmethod
+    def _input_columns(params: Dict[str, Any]) -> List[str]:
+        columns = []
+        for name, value in sorted(params.items()):
+            if name.endswith('_col'):
+                columns.extend([value] if isinstance(value, str) else list(value))
+
+        return columns
+
+    @staticmethod
+    def _lookback(func: Callable, params: Dict[str, Any]) -> Optional[int]:
+        lookback = _LOOKBACKS.get(func.__name__)
+        return params[lookback] if isinstance(lookback, str) else lookback
+
+    def _read(self, entry_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(entry_path, _META_FILE)) as meta_file:
+                meta = json.load(meta_file)
+            meta['arrays'] = [np.load(os.path.join(entry_path, file_name), mmap_mode='r')
+                              for file_name in meta['files']]
+        except (OSError, ValueError, KeyError):
+            return None
+        os.utime(os.path.join(entry_path, _META_FILE))
+
+        return meta
+
+    def _write(self, entry_path: str, columns: List[str], arrays: List[np.ndarray], n_rows: int,
+               fingerprint: str) -> None:
+        os.makedirs(entry_path, exist_ok=True)
+        files = []
+        for array in arrays:
+            file_name = f'{uuid.uuid4().hex}.npy'
+            np.save(os.path.join(entry_path, file_name), array)
+            files.append(file_name)
+
+        old_files = set(os.listdir(entry_path)) - {_META_FILE}
+        temp_meta = os.path.join(entry_path, f'{_META_FILE}.{uuid.uuid4().hex}')
+        with open(temp_meta, 'w') as meta_file:
+            json.dump({'columns': columns, 'files': files, 'n_rows': n_rows, 'fingerprint': fingerprint}, meta_file)
+        os.replace(temp_meta, os.path.join(entry_path, _META_FILE))
+
+        for file_name in old_files - set(files):
+            try:
+                os.remove(os.path.join(entry_path, file_name))
+            except OSError:
+                pass
+        self._evict(keep=entry_path)
+
+    @staticmethod
+    def _entry_size(entry_path: str) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(entry_path) if entry.is_file())
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Removes the least recently used entries until the cache fits in ``max_bytes``."""
+        entries = []
+        for entry in os.scandir(self.root_path):
+            if not entry.is_dir():
+                continue
+            try:
+                last_used = os.stat(os.path.join(entry.path, _META_FILE)).st_mtime_ns
+            except OSError:
+                last_used = 0
+            entries.append((last_used, entry.path, self._entry_size(entry.path)))
+
+        total_bytes = sum(size for _, _, size in entries)
+        for _, entry_path, size in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            if entry_path == keep:
+                continue
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_bytes -= size
+
+    @property
+    def size_bytes(self) -> int:
+        """The size of everything in the cache."""
+        return sum(self._entry_size(entry.path) for entry in os.scandir(self.root_path) if entry.is_dir())
+
+    def clear(self) -> None:
+        """Removes every entry from the cache."""
+        for entry in os.scandir(self.root_path):
+            if entry.is_dir():
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    def compute(self, func: Callable, df: 'pd.DataFrame', ticker: str, **params) -> pd.DataFrame:
+        """Runs ``func(df=df, **params)``, reusing whatever the cache already holds for this ticker.
+
+        Args:
+            func: one of the dataframe functions in :mod:`wsbtrading.maths`, e.g. ``maths.sma``
+            df: the prices to calculate over, oldest bar first
+            ticker: the stock ticker the prices belong to
+            params: the keyword arguments for ``func``
+
+        Returns:
+            a copy of ``df`` with the columns ``func`` appends
+        """
+        params = self._bind(func=func, df=df, params=params)
+        input_columns = self._input_columns(params=params)
+        entry_path = self._entry_path(func=func, ticker=ticker, params=params)
+        n_rows = len(df)
+
+        cached = self._read(entry_path=entry_path)
+        if cached is not None and cached['columns'] and cached['n_rows'] <= n_rows \
+                and cached['fingerprint'] == _fingerprint(df=df, columns=input_columns, n_rows=cached['n_rows']):
+            if cached['n_rows'] == n_rows:
+                result = df.copy()
+                for column, array in zip(cached['columns'], cached['arrays']):
+                    result[column] = np.asarray(array)
+                return result
+
+            lookback = self._lookback(func=func, params=params)
+            if lookback is not None:
+                start = max(0, cached['n_rows'] - lookback + 1)
+                tail = func(df=df.iloc[start:], **params)
+                new_rows = cached['n_rows'] - start
+                arrays = [np.concatenate([array, tail[column].to_numpy()[new_rows:]])
+                          for column, array in zip(cached['columns'], cached['arrays'])]
+                self._write(entry_path=entry_path, columns=cached['columns'], arrays=arrays, n_rows=n_rows,
+                            fingerprint=_fingerprint(df=df, columns=input_columns, n_rows=n_rows))
+
+                result = df.copy()
+                for column, array in zip(cached['columns'], arrays):
+                    result[column] = array
+                return result
+
+        # Run on the inputs alone, so the columns func writes can be told apart even when df already has them
+        inputs = list(dict.fromkeys(input_columns))
+        computed = func(df=df[inputs], **params)
+        new_columns = [column for column in computed.columns if column not in inputs]
+        arrays = [computed[column].to_numpy() for column in new_columns]
+        if new_columns and all(array.dtype != object for array in arrays):
+            self._write(entry_path=entry_path, columns=new_columns, arrays=arrays, n_rows=n_rows,
+                        fingerprint=_fingerprint(df=df, columns=input_columns, n_rows=n_rows))
+
+        result = df.copy()
+        for column, array in zip(new_columns, arrays):
+            result[column] = array
+        return result
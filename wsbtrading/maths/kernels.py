@@ -0,0 +1,767 @@
+"""Array kernels that back the indicators in :mod:`wsbtrading.maths`.
+
+The functions here work on NumPy arrays rather than DataFrames, so an indicator can be computed once per series (or
+once per panel of series, one column per ticker) without building and copying intermediate frames. Rolling results
+follow the pandas convention: a window is ``NaN`` unless it holds at least ``min_periods`` prices (by default all of
+them), so the first ``rolling_window - 1`` rows are ``NaN``, as is any window containing a ``NaN``.
+
+Moving averages and standard deviations are differences of running totals, which are compensated so that they stay
+accurate however long the series is or however far its prices sit from 0; they agree with pandas to about 1e-12.
+"""
+import math
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# The widths of the Bollinger bands, in standard deviations, and of the Keltner channels, in average true ranges
+BAND_MULTIPLIER = 2.0
+KELTNER_MULTIPLIER = 1.5
+
+# The rows that running totals are cut into blocks of, so that no total grows large; see _prefix_sums
+_BLOCK_ROWS = 64
+
+# Window sums have the totals of the blocks before them added this many values at a time at the most
+_CORRECTION_VALUES = 1 << 16
+
+# A moving variance whose sum of squared deviations is this many times smaller than the running totals of squares it is
+# worked out from has lost too many digits to cancellation, and is recomputed from the window's values
+_MAX_CANCELLATION = 1e5
+
+# Moving standard deviations are computed this many rows at a time at the least, each chunk shifted by its own mean
+_STDDEV_CHUNK_ROWS = 1 << 14
+
+# Windows recomputed at once by _direct_stddevs hold at most this many values between them
+_DIRECT_BATCH_VALUES = 1 << 20
+
+# The EMA kernel rescales each block of rows by up to exp(_EMA_MAX_GROWTH), comfortably inside the float64 range
+_EMA_MAX_GROWTH = 300.0
+
+
+def _prefix_sums(values: np.ndarray, is_nan: Optional[np.ndarray] = None) -> np.ndarray:
+    """Sums the rows of an array cumulatively within blocks of rows, so that no running total grows large.
+
+    Args:
+        values: a 1-D array, or a 2-D array with one series per column
+        is_nan: optionally, where ``values`` is NaN, to count those values as 0
+
+    Returns:
+        an array with one more row than ``values``, where row ``i`` holds the sum of ``values[:i]`` since the start of
+        the block of row ``i - 1``, see :func:`_accumulate`
+    """
+    local = np.empty((values.shape[0] + 1,) + values.shape[1:], dtype=np.float64)
+    local[0] = 0.0
+    if is_nan is not None:
+        local[1:] = values
+        local[1:][is_nan] = 0.0
+        values = local[1:]
+
+    return _accumulate(local=local, values=values)
+
+
+def _accumulate(local: np.ndarray, values: Optional[np.ndarray] = None) -> np.ndarray:
+    """Fills the rows of ``local`` after its first, which must be 0, with the running totals of ``values`` within each
+    block of ``_BLOCK_ROWS`` rows, by default in place."""
+    if values is None:
+        values = local[1:]
+    n_rows = local.shape[0] - 1
+    blocks_shape = (n_rows // _BLOCK_ROWS, _BLOCK_ROWS) + local.shape[1:]
+    full_rows = blocks_shape[0] * _BLOCK_ROWS
+    np.add.accumulate(values[:full_rows].reshape(blocks_shape), axis=1,
+                      out=local[1:full_rows + 1].reshape(blocks_shape))
+    np.add.accumulate(values[full_rows:], axis=0, out=local[full_rows + 1:])
+
+    return local
+
+
+def _block_offsets(local: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sums the totals of the blocks before each block as a compensated (Kahan-Babuska) pair.
+
+    The rounding error of each addition is found exactly by Knuth's TwoSum, and the running total of those errors
+    compensates for them, so the sum of the values before block ``b`` is ``high[b] + low[b]``.
+
+    Args:
+        local: the running totals within each block, see :func:`_prefix_sums`
+
+    Returns:
+        ``high`` and ``low``, each with one row per block
+    """
+    n_rows = local.shape[0] - 1
+    n_blocks = max(-(-n_rows // _BLOCK_ROWS), 1)
+    high = np.zeros((n_blocks,) + local.shape[1:], dtype=np.float64)
+    low = np.zeros((n_blocks,) + local.shape[1:], dtype=np.float64)
+    if n_blocks > 1:
+        totals = local[_BLOCK_ROWS:n_rows:_BLOCK_ROWS]
+        np.add.accumulate(totals, axis=0, out=high[1:])
+        previous, running = high[:-1], high[1:]
+        added = running - previous
+        np.add.accumulate((previous - (running - added)) + (totals - added), axis=0, out=low[1:])
+
+    return high, low
+
+
+def _window_sums(local: np.ndarray, rolling_window: int, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Sums the values in the window ending at every row, or in every row so far where a full window doesn't fit yet.
+
+    The error is a few ulps of the sum of the absolute values in the window and the blocks either end of it, however
+    long the series is.
+
+    Args:
+        local: the running totals of the values within each block, see :func:`_prefix_sums`
+        rolling_window: the number of rows per window
+        out: an optional array to write the sums into
+
+    Returns:
+        an array with one row per value
+    """
+    n_rows = local.shape[0] - 1
+    if out is None:
+        out = np.empty((n_rows,) + local.shape[1:], dtype=np.float64)
+    head = min(rolling_window - 1, n_rows)
+    out[:head] = local[1:head + 1]
+    np.subtract(local[rolling_window:], local[:-rolling_window], out=out[head:])
+
+    # Add the totals of the whole blocks each window spans. The window ending at row r starts after the block of row
+    # max(r - rolling_window, 0), which is the same number of blocks back for every row of a block either side of one
+    # offset into it
+    n_full, skipped = n_rows // _BLOCK_ROWS, rolling_window // _BLOCK_ROWS
+    split = rolling_window % _BLOCK_ROWS
+    full = out[:n_full * _BLOCK_ROWS].reshape((n_full, _BLOCK_ROWS) + out.shape[1:])
+    tail = out[n_full * _BLOCK_ROWS:]
+    if skipped == 0:
+        # A window shorter than a block reaches back into the block before at most, whose total is its last local one
+        block_totals = local[_BLOCK_ROWS:n_rows + 1:_BLOCK_ROWS]
+        full[1:, :split] += block_totals[:n_full - 1, np.newaxis]
+        if tail.shape[0] and n_full:
+            tail[:split] += block_totals[n_full - 1]
+        return out
+
+    # The rows of a block before the offset start after block start_blocks[b], the rest after start_blocks[b + 1]
+    high, low = _block_offsets(local)
+    start_blocks = np.arange(-skipped - 1, high.shape[0] - skipped)
+    np.maximum(start_blocks, 0, out=start_blocks)
+    high_before, low_before = high[start_blocks], low[start_blocks]
+    totals = []
+    for before in [slice(0, -1), slice(1, None)]:
+        totals.append(high - high_before[before])
+        totals[-1] += low
+        totals[-1] -= low_before[before]
+
+    # Spread over the rows of a slab of blocks first, since adding them that way is much faster than broadcasting
+    slab_blocks = max(_CORRECTION_VALUES // (_BLOCK_ROWS * max(int(np.prod(out.shape[1:])), 1)), 1)
+    corrections = np.empty((min(slab_blocks, n_full),) + full.shape[1:], dtype=np.float64)
+    for first in range(0, n_full, slab_blocks):
+        slab = corrections[:min(slab_blocks, n_full - first)]
+        slab[:, :split] = totals[0][first:first + slab.shape[0], np.newaxis]
+        slab[:, split:] = totals[1][first:first + slab.shape[0], np.newaxis]
+        full[first:first + slab.shape[0]] += slab
+    if tail.shape[0]:
+        tail[:split] += totals[0][n_full]
+        tail[split:] += totals[1][n_full]
+
+    return out
+
+
+def _rounding_scale(local: np.ndarray, rolling_window: int) -> np.ndarray:
+    """Adds up the two running totals of non-negative values that the sum of each window is the difference of, which
+    bound its rounding error."""
+    scale = np.empty((local.shape[0] - 1,) + local.shape[1:], dtype=np.float64)
+    head = min(rolling_window - 1, scale.shape[0])
+    scale[:head] = local[1:head + 1]
+    np.add(local[rolling_window:], local[:-rolling_window], out=scale[head:])
+
+    return scale
+
+
+def _running_counts(flags: np.ndarray) -> np.ndarray:
+    """Counts the flagged rows before every row, with one more row than ``flags``."""
+    cumulative = np.zeros((flags.shape[0] + 1,) + flags.shape[1:], dtype=np.int32)
+    np.cumsum(flags, axis=0, out=cumulative[1:])
+
+    return cumulative
+
+
+def _window_counts(cumulative: np.ndarray, rolling_window: int) -> np.ndarray:
+    """Counts the flagged rows in the window ending at every row, or in every row so far at the start, from their
+    running counts, see :func:`_running_counts`."""
+    counts = np.empty((cumulative.shape[0] - 1,) + cumulative.shape[1:], dtype=np.int32)
+    head = min(rolling_window - 1, counts.shape[0])
+    counts[:head] = cumulative[1:head + 1]
+    np.subtract(cumulative[rolling_window:], cumulative[:-rolling_window], out=counts[head:])
+
+    return counts
+
+
+def _divide_by_counts(out: np.ndarray, counts: Optional[np.ndarray], rolling_window: int, offset: int = 0) -> None:
+    """Divides ``out`` in place by the number of values in each row's window, less ``offset``.
+
+    Without ``counts`` every window is full but the ones at the start, which are divided by the rows so far.
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if counts is not None:
+            out /= counts - offset
+            return
+        head = min(rolling_window - 1, out.shape[0])
+        out[head:] /= rolling_window - offset
+        out[:head] /= (np.arange(1, head + 1) - offset).reshape((-1,) + (1,) * (out.ndim - 1))
+
+
+def _mask_short(out: np.ndarray, counts: Optional[np.ndarray], min_count: int, fill: float = np.nan) -> None:
+    """Sets the rows of ``out`` whose windows hold fewer than ``min_count`` values to ``fill``."""
+    if counts is None:
+        out[:min_count - 1] = fill
+    else:
+        out[counts < min_count] = fill
+
+
+def _validate_min_periods(min_periods: Optional[int], rolling_window: int) -> int:
+    """Returns the number of values a window needs, by default all of them."""
+    if min_periods is None:
+        return rolling_window
+    if not 0 <= min_periods <= rolling_window:
+        raise ValueError(f'min_periods must be between 0 and rolling_window ({rolling_window}), got {min_periods}.')
+    return min_periods
+
+
+class _MeanSums(NamedTuple):
+    """What the moving averages of a series are computed from, whatever their window."""
+    values: np.ndarray
+    valid_before: Optional[np.ndarray]
+
+
+def _mean_sums(values: np.ndarray) -> _MeanSums:
+    """Sums the values with NaN counted as 0, counting how many values come before each row unless none are NaN."""
+    is_nan = np.isnan(values)
+    if not is_nan.any():
+        return _MeanSums(values=_prefix_sums(values), valid_before=None)
+
+    return _MeanSums(values=_prefix_sums(values, is_nan=is_nan), valid_before=_running_counts(~is_nan))
+
+
+def _mean_from_sums(sums: _MeanSums, rolling_window: int, min_periods: int, out: np.ndarray) -> np.ndarray:
+    """Fills ``out`` with the moving average over one window."""
+    counts = None if sums.valid_before is None else _window_counts(cumulative=sums.valid_before,
+                                                                   rolling_window=rolling_window)
+    _window_sums(local=sums.values, rolling_window=rolling_window, out=out)
+    _divide_by_counts(out=out, counts=counts, rolling_window=rolling_window)
+    _mask_short(out=out, counts=counts, min_count=max(min_periods, 1))
+
+    return out
+
+
+class _VarianceSums(NamedTuple):
+    """What the moving standard deviations of a series are computed from, whatever their window."""
+    values: np.ndarray
+    shifted: np.ndarray
+    squares: np.ndarray
+    run_counts: Optional[np.ndarray]
+    valid_before: Optional[np.ndarray]
+
+
+def _variance_sums(values: np.ndarray) -> _VarianceSums:
+    """Sums the values less their column's mean and their squares, with NaN counted as 0.
+
+    Also counts, unless no value is NaN, how many values come before each row, and, unless every value differs from
+    the last value before it that isn't NaN, how many values at or before each row are equal to it without a different
+    value between them.
+    """
+    is_nan = np.isnan(values)
+    has_nan = is_nan.any()
+    valid_before = _running_counts(~is_nan) if has_nan else None
+
+    changes = np.zeros(values.shape, dtype=bool)
+    if has_nan:
+        previous = values.reshape(values.shape[0], -1).copy()
+        _fill_gaps(values=previous, is_nan=is_nan.reshape(previous.shape))
+        np.not_equal(values[1:], previous[:-1].reshape(values[1:].shape), out=changes[1:])
+        del previous
+        changes[1:] |= is_nan[1:]
+    else:
+        np.not_equal(values[1:], values[:-1], out=changes[1:])
+
+    run_counts = None
+    if not changes[1:].all():
+        if has_nan:
+            changes &= ~is_nan
+        rows = np.arange(values.shape[0], dtype=np.int32).reshape((-1,) + (1,) * (values.ndim - 1))
+        last_change = np.where(changes, rows, np.int32(0))
+        del changes
+        np.maximum.accumulate(last_change, axis=0, out=last_change)
+        if has_nan:
+            run_counts = valid_before[1:] - np.take_along_axis(valid_before, last_change, axis=0)
+        else:
+            run_counts = np.subtract(rows + 1, last_change, out=last_change)
+
+    shifted = np.empty((values.shape[0] + 1,) + values.shape[1:], dtype=np.float64)
+    shifted[0] = 0.0
+    if has_nan:
+        np.copyto(shifted[1:], np.where(is_nan, 0.0, values))
+        shifted[1:] -= shifted[1:].sum(axis=0) / np.maximum(values.shape[0] - is_nan.sum(axis=0), 1)
+        shifted[1:][is_nan] = 0.0
+    else:
+        np.subtract(values, values.mean(axis=0), out=shifted[1:])
+    squares = np.square(shifted)
+
+    return _VarianceSums(values=values, shifted=_accumulate(local=shifted), squares=_accumulate(local=squares),
+                         run_counts=run_counts, valid_before=valid_before)
+
+
+def _stddev_from_sums(sums: _VarianceSums, rolling_window: int, min_periods: int, out: np.ndarray) -> np.ndarray:
+    """Fills ``out`` with the moving standard deviation over one window."""
+    if rolling_window < 2:
+        out[...] = np.nan
+        return out
+
+    counts = None
+    if sums.valid_before is not None:
+        counts = _window_counts(cumulative=sums.valid_before, rolling_window=rolling_window)
+
+    # Like pandas, a window whose values all belong to the run of equal values it ends with is exactly 0
+    constant = None
+    if sums.run_counts is not None:
+        if counts is None:
+            head = min(rolling_window - 1, out.shape[0])
+            constant = np.empty(out.shape, dtype=bool)
+            np.greater_equal(sums.run_counts[head:], rolling_window, out=constant[head:])
+            np.greater_equal(sums.run_counts[:head], np.arange(1, head + 1).reshape((-1,) + (1,) * (out.ndim - 1)),
+                             out=constant[:head])
+        else:
+            constant = sums.run_counts >= counts
+
+    # The sum of squared deviations from the window's mean, from the sums of the values and of their squares
+    window_sums = _window_sums(local=sums.shifted, rolling_window=rolling_window)
+    np.square(window_sums, out=window_sums)
+    _divide_by_counts(out=window_sums, counts=counts, rolling_window=rolling_window)
+    variance = _window_sums(local=sums.squares, rolling_window=rolling_window, out=out)
+    variance -= window_sums
+    del window_sums
+    scale = _rounding_scale(local=sums.squares, rolling_window=rolling_window)
+    scale /= _MAX_CANCELLATION
+    inaccurate = scale > variance
+    del scale
+    _divide_by_counts(out=variance, counts=counts, rolling_window=rolling_window, offset=1)
+    np.maximum(variance, 0.0, out=variance)
+    if constant is not None:
+        variance[constant] = 0.0
+        inaccurate &= ~constant
+
+    np.sqrt(variance, out=out)
+    _mask_short(out=out, counts=counts, min_count=max(min_periods, 2))
+    _mask_short(out=inaccurate, counts=counts, min_count=max(min_periods, 2), fill=False)
+    if inaccurate.any():
+        rows, columns = np.nonzero(inaccurate.reshape(out.shape[0], -1))
+        _direct_stddevs(values=sums.values.reshape(out.shape[0], -1), rows=rows, columns=columns,
+                        rolling_window=rolling_window, out=out.reshape(out.shape[0], -1))
+
+    return out
+
+
+def _chunked_stddevs(values: np.ndarray, periods: Dict[int, int], outs: Dict[int, np.ndarray]) -> None:
+    """Fills ``outs`` with the moving standard deviation over each window, keyed like ``periods``.
+
+    The rows are taken a chunk at a time, each with the rows before it that its first windows reach back to, so that
+    every window is summed relative to the mean of the prices around it rather than of the whole series. They are taken
+    last first, so no chunk reads prices that another has written over when ``outs`` are ``values`` itself.
+    """
+    n_rows = values.shape[0]
+    reach = max(periods) - 1
+    chunk_rows = max(_STDDEV_CHUNK_ROWS, 4 * reach)
+    for start in reversed(range(0, n_rows, chunk_rows)):
+        stop, first = min(start + chunk_rows, n_rows), max(start - reach, 0)
+        sums = _variance_sums(values[first:stop])
+        for rolling_window, min_periods in periods.items():
+            stddevs = _stddev_from_sums(sums=sums, rolling_window=rolling_window, min_periods=min_periods,
+                                        out=np.empty(sums.values.shape))
+            outs[rolling_window][start:stop] = stddevs[start - first:]
+
+
+def _direct_stddevs(values: np.ndarray, rows: np.ndarray, columns: np.ndarray, rolling_window: int,
+                    out: np.ndarray) -> None:
+    """Recomputes the standard deviation of a few windows of a 2-D array from their values, with the corrected two-pass
+    formula, writing them into ``out`` at ``rows`` and ``columns``."""
+    offsets = np.arange(rolling_window)
+    batch = max(_DIRECT_BATCH_VALUES // rolling_window, 1)
+    for start in range(0, rows.shape[0], batch):
+        window_rows = rows[start:start + batch, np.newaxis] - offsets
+        windows = values[np.maximum(window_rows, 0), columns[start:start + batch, np.newaxis]]
+        is_missing = np.isnan(windows)
+        is_missing |= window_rows < 0
+        windows[is_missing] = 0.0
+        counts = rolling_window - np.count_nonzero(is_missing, axis=1)
+        windows -= (windows.sum(axis=1) / counts)[:, np.newaxis]
+        windows[is_missing] = 0.0
+        # The sum of the deviations is 0 but for the rounding error of the mean, which it corrects for
+        variance = np.square(windows).sum(axis=1) - np.square(windows.sum(axis=1)) / counts
+        out[rows[start:start + batch], columns[start:start + batch]] = np.sqrt(np.maximum(variance, 0.0) /
+                                                                               (counts - 1))
+
+
+def _prepare_out(values: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+    """Returns ``out`` once it is checked to fit ``values``, or a new uninitialised array if it is not given."""
+    if out is None:
+        return np.empty(values.shape, dtype=np.float64)
+    if out.shape != values.shape or out.dtype != np.float64:
+        raise ValueError(f'out must be a float64 array of shape {values.shape}, got {out.dtype} {out.shape}.')
+    return out
+
+
+def _validate_window(values: np.ndarray, rolling_window: int) -> None:
+    if rolling_window < 1:
+        raise ValueError(f'rolling_window must be a positive integer, got {rolling_window}.')
+    if values.ndim not in (1, 2):
+        raise ValueError(f'Expected a 1-D or 2-D array, got {values.ndim} dimensions.')
+
+
+def rolling_mean(values: 'np.ndarray', rolling_window: int = 20, out: Optional[np.ndarray] = None,
+                 min_periods: Optional[int] = None) -> np.ndarray:
+    """Calculates the moving average of each column over a given time window.
+
+    Every column is computed in the same vectorised pass over the rows, which matches
+    ``pd.DataFrame(values).rolling(rolling_window, min_periods=min_periods).mean()``.
+
+    Args:
+        values: a 1-D array, or a 2-D array of shape (dates, tickers)
+        rolling_window: the time window to calculate over
+        out: an optional float64 array of the same shape as ``values`` to write the result into
+        min_periods: the number of prices a window needs for a result, by default all of them
+
+    Returns:
+        an array of the same shape as ``values`` holding the moving average (``out`` if given)
+
+    Raises:
+        ValueError: if ``min_periods`` is negative or larger than ``rolling_window``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.maths import kernels
+        kernels.rolling_mean(values=df['Close'].to_numpy(), rolling_window=20)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    _validate_window(values=values, rolling_window=rolling_window)
+    min_periods = _validate_min_periods(min_periods=min_periods, rolling_window=rolling_window)
+
+    return _mean_from_sums(sums=_mean_sums(values), rolling_window=rolling_window, min_periods=min_periods,
+                           out=_prepare_out(values=values, out=out))
+
+
+def rolling_stddev(values: 'np.ndarray', rolling_window: int = 20, out: Optional[np.ndarray] = None,
+                   min_periods: Optional[int] = None) -> np.ndarray:
+    """Calculates the moving (sample) standard deviation of each column over a given time window.
+
+    Note:
+        each column is shifted by its own mean before squaring, which keeps the sum of squares small enough that the
+        single-pass formula stays accurate for price-like series. Windows holding a single repeated value are exactly 0,
+        and windows holding fewer than two prices are ``NaN``, as with
+        ``pd.DataFrame(values).rolling(rolling_window, min_periods=min_periods).std()``.
+
+    Args:
+        values: a 1-D array, or a 2-D array of shape (dates, tickers)
+        rolling_window: the time window to calculate over
+        out: an optional float64 array of the same shape as ``values`` to write the result into
+        min_periods: the number of prices a window needs for a result, by default all of them
+
+    Returns:
+        an array of the same shape as ``values`` holding the moving standard deviation (``out`` if given)
+
+    Raises:
+        ValueError: if ``min_periods`` is negative or larger than ``rolling_window``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.maths import kernels
+        kernels.rolling_stddev(values=df['Close'].to_numpy(), rolling_window=20)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    _validate_window(values=values, rolling_window=rolling_window)
+    min_periods = _validate_min_periods(min_periods=min_periods, rolling_window=rolling_window)
+
+    out = _prepare_out(values=values, out=out)
+    _chunked_stddevs(values=values, periods={rolling_window: min_periods}, outs={rolling_window: out})
+
+    return out
+
+
+def rolling_means(values: 'np.ndarray', rolling_windows: Sequence[int], min_periods: Optional[int] = None) \
+        -> Dict[int, np.ndarray]:
+    """Calculates the moving average of each column over several time windows, from a single cumulative sum.
+
+    Args:
+        values: a 1-D array, or a 2-D array of shape (dates, tickers)
+        rolling_windows: the time windows to calculate over
+        min_periods: the number of prices a window needs for a result, by default all of them
+
+    Returns:
+        an array of the same shape as ``values`` per time window, as :func:`rolling_mean` would calculate it
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.maths import kernels
+        averages = kernels.rolling_means(values=df['Close'].to_numpy(), rolling_windows=[10, 20, 50])
+        averages[50]
+    """
+    values = np.asarray(values, dtype=np.float64)
+    periods = {}
+    for rolling_window in rolling_windows:
+        _validate_window(values=values, rolling_window=rolling_window)
+        periods[rolling_window] = _validate_min_periods(min_periods=min_periods, rolling_window=rolling_window)
+
+    sums = _mean_sums(values)
+    return {rolling_window: _mean_from_sums(sums=sums, rolling_window=rolling_window,
+                                            min_periods=periods[rolling_window], out=np.empty(values.shape))
+            for rolling_window in rolling_windows}
+
+
+def rolling_stddevs(values: 'np.ndarray', rolling_windows: Sequence[int], min_periods: Optional[int] = None) \
+        -> Dict[int, np.ndarray]:
+    """Calculates the moving (sample) standard deviation of each column over several time windows, from a single set
+    of cumulative sums.
+
+    Args:
+        values: a 1-D array, or a 2-D array of shape (dates, tickers)
+        rolling_windows: the time windows to calculate over
+        min_periods: the number of prices a window needs for a result, by default all of them
+
+    Returns:
+        an array of the same shape as ``values`` per time window, as :func:`rolling_stddev` would calculate it
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.maths import kernels
+        stddevs = kernels.rolling_stddevs(values=df['Close'].to_numpy(), rolling_windows=[10, 20, 50])
+        stddevs[50]
+    """
+    values = np.asarray(values, dtype=np.float64)
+    periods = {}
+    for rolling_window in rolling_windows:
+        _validate_window(values=values, rolling_window=rolling_window)
+        periods[rolling_window] = _validate_min_periods(min_periods=min_periods, rolling_window=rolling_window)
+
+    outs = {rolling_window: np.empty(values.shape) for rolling_window in periods}
+    _chunked_stddevs(values=values, periods=periods, outs=outs)
+
+    return {rolling_window: outs[rolling_window] for rolling_window in rolling_windows}
+
+
+def true_range(low: 'np.ndarray', high: 'np.ndarray', out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Calculates the true range (TR) of each bar.
+
+    Args:
+        low: the low prices
+        high: the high prices
+        out: an optional float64 array of the same shape as the prices to write the result into
+
+    Returns:
+        an array holding the absolute distance between the high and the low (``out`` if given)
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.maths import kernels
+        kernels.true_range(low=df['Low'].to_numpy(), high=df['High'].to_numpy())
+    """
+    low = np.asarray(low, dtype=np.float64)
+    out = _prepare_out(values=low, out=out)
+    np.subtract(np.asarray(high, dtype=np.float64), low, out=out)
+
+    return np.abs(out, out=out)
+
+
+def smoothing_factor(span: Optional[float] = None, com: Optional[float] = None, halflife: Optional[float] = None,
+                     alpha: Optional[float] = None) -> float:
+    """Converts one of the usual ways of describing an exponential decay into its smoothing factor.
+
+    Args:
+        span: decay in terms of span, ``alpha = 2 / (span + 1)``, with ``span >= 1``
+        com: decay in terms of center of mass, ``alpha = 1 / (1 + com)``, with ``com >= 0``
+        halflife: decay in terms of half-life, ``alpha = 1 - exp(-ln(2) / halflife)``, with ``halflife > 0``
+        alpha: the smoothing factor itself, with ``0 < alpha <= 1``
+
+    Returns:
+        the smoothing factor alpha
+
+    Raises:
+        ValueError: if not exactly one argument is passed, or if it is out of range
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.maths import kernels
+        kernels.smoothing_factor(span=20)
+        # 0.09523809523809523
+    """
+    passed = {name: value for name, value in [('span', span), ('com', com), ('halflife', halflife), ('alpha', alpha)]
+              if value is not None}
+    if len(passed) != 1:
+        raise ValueError(f'Pass exactly one of span, com, halflife or alpha, got {sorted(passed) or "none"}.')
+
+    if span is not None:
+        if span < 1:
+            raise ValueError(f'span must be at least 1, got {span}.')
+        return 2 / (span + 1)
+    if com is not None:
+        if com < 0:
+            raise ValueError(f'com must be at least 0, got {com}.')
+        return 1 / (1 + com)
+    if halflife is not None:
+        if halflife <= 0:
+            raise ValueError(f'halflife must be positive, got {halflife}.')
+        return 1 - math.exp(-math.log(2) / halflife)
+    if not 0 < alpha <= 1:
+        raise ValueError(f'alpha must satisfy 0 < alpha <= 1, got {alpha}.')
+    return alpha
+
+
+def _fill_gaps(values: np.ndarray, is_nan: np.ndarray) -> np.ndarray:
+    """Forward fills each column of a 2-D array in place, back filling any leading gap with the first price.
+
+    Returns:
+        a mask of the leading gaps, which have no price of their own to report
+    """
+    rows = np.arange(values.shape[0])[:, np.newaxis]
+    source = np.where(is_nan, 0, rows)
+    np.maximum.accumulate(source, axis=0, out=source)
+    first_valid = np.argmax(~is_nan, axis=0)
+    leading = rows < first_valid
+    source[leading] = np.broadcast_to(first_valid, source.shape)[leading]
+
+    values[...] = np.take_along_axis(values, source, axis=0)
+    return leading
+
+
+def ema_kernel(values: 'np.ndarray', alpha: float, min_periods: int = 1, out: Optional[np.ndarray] = None) \
+        -> np.ndarray:
+    """Calculates the exponential moving average ``y[t] = (1 - alpha) * y[t - 1] + alpha * x[t]`` of each column.
+
+    The recursion is seeded with the first price, which matches
+    ``pd.DataFrame(values).ewm(alpha=alpha, adjust=False, ignore_na=True, min_periods=min_periods).mean()``. Rather
+    than looping over rows, the recursion is unrolled into a cumulative sum of rescaled prices, one block of rows at a
+    time, so the whole average is a handful of vectorised passes that work in place on the output array.
+
+    Note:
+        a missing price inside a series is skipped: the average holds its last value across the gap and decays only
+        with the prices that are there, like :class:`wsbtrading.maths.StreamingEma`, and the gap does not count towards
+        ``min_periods``
+
+    Args:
+        values: a 1-D array, or a 2-D array of shape (dates, tickers)
+        alpha: the smoothing factor, see :func:`smoothing_factor`
+        min_periods: the number of prices needed before an average is reported
+        out: an optional C-contiguous float64 array of the same shape as ``values`` to write the average into
+
+    Returns:
+        an array of the same shape as ``values`` holding the exponential moving average (``out`` if given)
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.maths import kernels
+        kernels.ema_kernel(values=df['Close'].to_numpy(), alpha=kernels.smoothing_factor(span=20), min_periods=20)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim not in (1, 2):
+        raise ValueError(f'Expected a 1-D or 2-D array, got {values.ndim} dimensions.')
+    if not 0 < alpha <= 1:
+        raise ValueError(f'alpha must satisfy 0 < alpha <= 1, got {alpha}.')
+    if out is None:
+        out = np.empty(values.shape, dtype=np.float64)
+    elif out.shape != values.shape or out.dtype != np.float64 or not out.flags.c_contiguous:
+        raise ValueError(f'out must be a C-contiguous float64 array of shape {values.shape}.')
+
+    n_rows = values.shape[0]
+    if n_rows == 0:
+        return out
+    work = out.reshape(n_rows, -1)
+    work[...] = values.reshape(n_rows, -1)
+
+    is_nan = np.isnan(work)
+    has_nan = is_nan.any()
+
+    decay = 1 - alpha
+    if decay == 0:
+        # The average is the latest price, held across any gap
+        if has_nan:
+            _fill_gaps(values=work, is_nan=is_nan)
+    else:
+        block_size = int(min(n_rows, max(1, _EMA_MAX_GROWTH // -math.log(decay))))
+        growth = np.power(decay, -np.arange(1, block_size + 1, dtype=np.float64))[:, np.newaxis]
+        # Seeded with each column's first price, which the recursion returns unchanged at that price's row
+        state = work[np.argmax(~is_nan, axis=0), np.arange(work.shape[1])] if has_nan else work[0].copy()
+        if has_nan:
+            work[is_nan] = 0.0
+        for start in range(0, n_rows, block_size):
+            block = work[start:start + block_size]
+            if has_nan:
+                # Each price decays the average once, so a column's rescaling only grows with the prices it has
+                block_growth = np.power(decay, -np.cumsum(~is_nan[start:start + block_size], axis=0))
+            else:
+                block_growth = growth[:block.shape[0]]
+            block *= alpha
+            block *= block_growth
+            np.cumsum(block, axis=0, out=block)
+            block += state
+            block /= block_growth
+            state[...] = block[-1]
+
+    if min_periods > 1 or has_nan:
+        work[np.cumsum(~is_nan, axis=0) < max(min_periods, 1)] = np.nan
+
+    return out
+
+
+def squeeze_kernel(close: 'np.ndarray', low: 'np.ndarray', high: 'np.ndarray', rolling_window: int = 20,
+                   band_multiplier: float = BAND_MULTIPLIER, keltner_multiplier: float = KELTNER_MULTIPLIER) \
+        -> Dict[str, np.ndarray]:
+    """Computes every input of the TTM squeeze in a single pass.
+
+    The moving average, moving standard deviation and average true range are each computed once and shared between the
+    Bollinger bands and the Keltner channels.
+
+    Args:
+        close: the close prices, 1-D or of shape (dates, tickers)
+        low: the low prices, same shape as ``close``
+        high: the high prices, same shape as ``close``
+        rolling_window: the time window to calculate over
+        band_multiplier: the width of the Bollinger bands, in moving standard deviations
+        keltner_multiplier: the width of the Keltner channels, in average true ranges
+
+    Returns:
+        a dictionary of arrays keyed by the column names the DataFrame functions in :mod:`wsbtrading.maths` use, i.e.
+        ``'{rolling_window}sma'``, ``'{rolling_window}stddev'``, ``'true_range'``, ``'ATR'``, ``'lower_band'``,
+        ``'upper_band'``, ``'lower_keltner'`` and ``'upper_keltner'``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.maths import kernels
+        indicators = kernels.squeeze_kernel(close=close, low=low, high=high, rolling_window=20)
+        indicators['lower_band']
+    """
+    moving_average = rolling_mean(values=close, rolling_window=rolling_window)
+    stddev = rolling_stddev(values=close, rolling_window=rolling_window)
+    tr = true_range(low=low, high=high)
+    atr = rolling_mean(values=tr, rolling_window=rolling_window)
+
+    band_width = band_multiplier * stddev
+    keltner_width = atr * keltner_multiplier
+
+    return {
+        f'{rolling_window}sma': moving_average,
+        f'{rolling_window}stddev': stddev,
+        'true_range': tr,
+        'ATR': atr,
+        'lower_band': moving_average - band_width,
+        'upper_band': moving_average + band_width,
+        'lower_keltner': moving_average - keltner_width,
+        'upper_keltner': moving_average + keltner_width,
+    }
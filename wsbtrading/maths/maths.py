@@ -1,8 +1,11 @@
 """Functions to aid in quick maths to calculate for ad-hoc analysis and feature engineering."""
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
 import pandas as pd
 
 from wsbtrading import check_columns
+from wsbtrading.instrumentation import profiling
+from wsbtrading.maths import kernels
 
 
 def divide_kernel(numerator: float, denominator: float) -> float:
@@ -27,13 +30,15 @@ def divide_kernel(numerator: float, denominator: float) -> float:
     return numerator / denominator
 
 
-def divide(df: 'DataFrame', numerator_col: str, denominator_col: str) -> pd.DataFrame:
+@profiling.instrument
+def divide(df: 'DataFrame', numerator_col: str, denominator_col: str, inplace: bool = False) -> pd.DataFrame:
     """Divides one number by another.
 
     Args:
         df: the dataframe to append a column onto
         numerator_col: the name of your numerator column
         denominator_col: the name of your denominator column
+        inplace: whether to append to ``df`` itself instead of to a copy of it
 
     Returns:
         the original dataframe with the division result appended
@@ -45,20 +50,28 @@ def divide(df: 'DataFrame', numerator_col: str, denominator_col: str) -> pd.Data
         from wsbtrading import maths
         df_mapped = maths.divide(df=df)
     """
-    df = df.copy()
+    if not inplace:
+        df = df.copy()
     check_columns(dataframe=df, required_columns=[numerator_col, denominator_col])
 
     df[f'{numerator_col}_perc_{denominator_col}'] = df[numerator_col] / df[denominator_col]
     return df
 
 
-def sma(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] = 20) -> pd.DataFrame:
+@profiling.instrument
+def sma(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] = 20, inplace: bool = False,
+        min_periods: Optional[int] = None) -> pd.DataFrame:
     """Calculates the simple moving average (SMA) over a given time window.
 
+    Matches ``df[metric_col].rolling(window=rolling_window, min_periods=min_periods).mean()``, computed by
+    :func:`wsbtrading.maths.kernels.rolling_mean` without the per-call overhead of pandas rolling.
+
     Args:
         df: the dataframe to append a column onto
         metric_col: the column to calculate over (usually the 'Close' price)
         rolling_window: the time window to calculate over
+        inplace: whether to append to ``df`` itself instead of to a copy of it
+        min_periods: the number of prices a window needs for an average, by default all of them
 
     Returns:
         the original dataframe with the moving average appended
@@ -70,24 +83,41 @@ def sma(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] = 20) ->
         from wsbtrading import maths
         df_mapped = maths.sma(df=df, metric_col='Close', rolling_window=20)
     """
-    df = df.copy()
+    if not inplace:
+        df = df.copy()
     rolling_window_string = str(rolling_window)
 
-    df[f'{rolling_window_string}sma'] = df[metric_col].rolling(window=rolling_window).mean()
+    df[f'{rolling_window_string}sma'] = kernels.rolling_mean(values=df[metric_col].to_numpy(dtype=np.float64),
+                                                             rolling_window=rolling_window, min_periods=min_periods)
     return df
 
 
-def ema(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] = 20) -> pd.DataFrame:
+@profiling.instrument
+def ema(df: 'Dataframe', metric_col: Union[str, List[str]], rolling_window: Optional[int] = 20,
+        com: Optional[float] = None, halflife: Optional[float] = None, alpha: Optional[float] = None,
+        inplace: bool = False) -> pd.DataFrame:
     """Calculates the exponential moving average (EMA) over a given time window.
     For more on ema versus sma, please [see this article](https://www.investopedia.com/ask/answers/122314/what-exponential-moving-average-ema-formula-and-how-ema-calculated.asp)
 
+    By default the decay is set by the time window (``alpha = 2 / (rolling_window + 1)``); pass one of ``com``,
+    ``halflife`` or ``alpha`` to choose it another way. The average is seeded with the first price and reported once
+    ``rolling_window`` prices have been seen, which matches
+    ``df[metric_col].ewm(span=rolling_window, adjust=False, ignore_na=True, min_periods=rolling_window).mean()``; a
+    missing price holds the average until the next one.
+
     Args:
         df: the dataframe to append a column onto
-        metric_col: the column to calculate over (usually the 'Close' price)
+        metric_col: the column to calculate over (usually the 'Close' price), or a list of columns to average together
+                    in a single pass
         rolling_window: the time window to calculate over
+        com: optionally, the decay in terms of center of mass
+        halflife: optionally, the decay in terms of half-life
+        alpha: optionally, the smoothing factor itself
+        inplace: whether to append to ``df`` itself instead of to a copy of it
 
     Returns:
-        the original dataframe with the exponential moving average appended
+        the original dataframe with the exponential moving average appended as ``'{rolling_window}ema'``, or as
+        ``'{metric_col}_{rolling_window}ema'`` for each column when a list is passed
 
     **Example**
 
@@ -95,21 +125,44 @@ def ema(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] = 20) ->
 
         from wsbtrading import maths
         df_mapped = maths.ema(df=df, metric_col='Close', rolling_window=20)
+        df_mapped = maths.ema(df=df, metric_col=['Open', 'Close'], rolling_window=20, halflife=5)
     """
-    df = df.copy()
+    if not inplace:
+        df = df.copy()
+    metric_cols = [metric_col] if isinstance(metric_col, str) else list(metric_col)
+    check_columns(dataframe=df, required_columns=metric_cols)
     rolling_window_string = str(rolling_window)
 
-    df[f'{rolling_window_string}ema'] = df[metric_col].rolling(window=rolling_window).mean()
+    if com is None and halflife is None and alpha is None:
+        smoothing = kernels.smoothing_factor(span=rolling_window)
+    else:
+        smoothing = kernels.smoothing_factor(com=com, halflife=halflife, alpha=alpha)
+
+    if isinstance(metric_col, str):
+        df[f'{rolling_window_string}ema'] = kernels.ema_kernel(values=df[metric_col].to_numpy(dtype=np.float64),
+                                                               alpha=smoothing, min_periods=rolling_window)
+    else:
+        averages = kernels.ema_kernel(values=df[metric_cols].to_numpy(dtype=np.float64), alpha=smoothing,
+                                      min_periods=rolling_window)
+        for position, column in enumerate(metric_cols):
+            df[f'{column}_{rolling_window_string}ema'] = averages[:, position]
     return df
 
 
-def rolling_stddev(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] = 20) -> pd.DataFrame:
+@profiling.instrument
+def rolling_stddev(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] = 20, inplace: bool = False,
+                   min_periods: Optional[int] = None) -> pd.DataFrame:
     """Calculates the moving standard deviation over a given time window.
 
+    Matches ``df[metric_col].rolling(window=rolling_window, min_periods=min_periods).std()``, computed by
+    :func:`wsbtrading.maths.kernels.rolling_stddev` without the per-call overhead of pandas rolling.
+
     Args:
         df: the dataframe to append a column onto
         metric_col: the column to calculate over (usually the 'Close' price)
         rolling_window: the time window to calculate over
+        inplace: whether to append to ``df`` itself instead of to a copy of it
+        min_periods: the number of prices a window needs for a standard deviation, by default all of them
 
     Returns:
         the original dataframe with the moving standard deviation appended
@@ -121,20 +174,27 @@ def rolling_stddev(df: 'Dataframe', metric_col: str, rolling_window: Optional[in
         from wsbtrading import maths
         df_mapped = maths.rolling_stddev(df=df, metric_col='Close', rolling_window=20)
     """
-    df = df.copy()
+    if not inplace:
+        df = df.copy()
     rolling_window_string = str(rolling_window)
 
-    df[f'{rolling_window_string}stddev'] = df[metric_col].rolling(window=rolling_window).std()
+    df[f'{rolling_window_string}stddev'] = kernels.rolling_stddev(values=df[metric_col].to_numpy(dtype=np.float64),
+                                                                  rolling_window=rolling_window,
+                                                                  min_periods=min_periods)
     return df
 
 
-def lower_band(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] = 20) -> pd.DataFrame:
+@profiling.instrument
+def lower_band(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] = 20, inplace: bool = False,
+               band_multiplier: float = kernels.BAND_MULTIPLIER) -> pd.DataFrame:
     """Calculates the lower bound of a stock's price movements.
 
     Args:
         df: the dataframe to append a column onto
         metric_col: the column to calculate over (usually the 'Close' price)
         rolling_window: the time window to calculate over
+        inplace: whether to append to ``df`` itself instead of to a copy of it
+        band_multiplier: how many moving standard deviations below the moving average the band sits
 
     Returns:
         the original dataframe with the lower bound appended
@@ -146,22 +206,28 @@ def lower_band(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] =
         from wsbtrading import maths
         df_mapped = maths.lower_band(df=df, metric_col='Close')
     """
+    if not inplace:
+        df = df.copy()
     rolling_window_string = str(rolling_window)
 
-    df = sma(df=df, metric_col=metric_col, rolling_window=rolling_window)
-    df = rolling_stddev(df=df, metric_col=metric_col, rolling_window=rolling_window)
+    df = sma(df=df, metric_col=metric_col, rolling_window=rolling_window, inplace=True)
+    df = rolling_stddev(df=df, metric_col=metric_col, rolling_window=rolling_window, inplace=True)
 
-    df['lower_band'] = df[f'{rolling_window_string}sma'] - (2 * df[f'{rolling_window_string}stddev'])
+    df['lower_band'] = df[f'{rolling_window_string}sma'] - (band_multiplier * df[f'{rolling_window_string}stddev'])
     return df
 
 
-def upper_band(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] = 20) -> pd.DataFrame:
+@profiling.instrument
+def upper_band(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] = 20, inplace: bool = False,
+               band_multiplier: float = kernels.BAND_MULTIPLIER) -> pd.DataFrame:
     """Calculates the lower bound of a stock's price movements.
 
     Args:
         df: the dataframe to append a column onto
         metric_col: the column to calculate over (usually the 'Close' price)
         rolling_window: the time window to calculate over
+        inplace: whether to append to ``df`` itself instead of to a copy of it
+        band_multiplier: how many moving standard deviations above the moving average the band sits
 
     Returns:
         the original dataframe with the lower bound appended
@@ -173,22 +239,82 @@ def upper_band(df: 'Dataframe', metric_col: str, rolling_window: Optional[int] =
         from wsbtrading import maths
         df_mapped = maths.upper_band(df=df, metric_col='Close')
     """
+    if not inplace:
+        df = df.copy()
     rolling_window_string = str(rolling_window)
 
-    df = sma(df=df, metric_col=metric_col, rolling_window=rolling_window)
-    df = rolling_stddev(df=df, metric_col=metric_col, rolling_window=rolling_window)
+    df = sma(df=df, metric_col=metric_col, rolling_window=rolling_window, inplace=True)
+    df = rolling_stddev(df=df, metric_col=metric_col, rolling_window=rolling_window, inplace=True)
 
-    df['upper_band'] = df[f'{rolling_window_string}sma'] + (2 * df[f'{rolling_window_string}stddev'])
+    df['upper_band'] = df[f'{rolling_window_string}sma'] + (band_multiplier * df[f'{rolling_window_string}stddev'])
     return df
 
 
-def true_range(df: 'Dataframe', low_col: str, high_col: str) -> pd.DataFrame:
+def _band_block(index: pd.Index, names: Tuple[str, str], averages: Dict[int, np.ndarray],
+                widths: Dict[int, np.ndarray], multipliers: Sequence[float]) -> pd.DataFrame:
+    """Lays the lower and upper bounds of every window and multiplier out side by side in a single block of columns."""
+    keys = [(name, rolling_window, multiplier) for name in names for rolling_window in averages
+            for multiplier in dict.fromkeys(multipliers)]
+    values = np.empty((len(index), len(keys)), order='F')
+    for column, (name, rolling_window, multiplier) in enumerate(keys):
+        out = values[:, column]
+        np.multiply(widths[rolling_window], multiplier, out=out)
+        if name == names[0]:
+            np.subtract(averages[rolling_window], out, out=out)
+        else:
+            np.add(averages[rolling_window], out, out=out)
+
+    return pd.DataFrame(values, index=index, copy=False,
+                        columns=pd.MultiIndex.from_tuples(keys, names=['indicator', 'rolling_window', 'multiplier']))
+
+
+@profiling.instrument
+def bollinger_bands(df: 'Dataframe', metric_col: str, rolling_windows: Sequence[int] = (20,),
+                    band_multipliers: Sequence[float] = (kernels.BAND_MULTIPLIER,)) -> pd.DataFrame:
+    """Calculates the lower and upper bounds of a stock's price movements for several time windows and widths at once.
+
+    Note:
+        this gives the values of ``lower_band`` and ``upper_band`` for every combination of window and multiplier, but
+        the moving averages and standard deviations of every window come from one set of cumulative sums, so another
+        window costs a subtraction rather than another pass over the prices
+
+    Args:
+        df: the dataframe to read the prices from
+        metric_col: the column to calculate over (usually the 'Close' price)
+        rolling_windows: the time windows to calculate over
+        band_multipliers: the widths of the bands, in moving standard deviations
+
+    Returns:
+        a dataframe with the index of ``df`` and (indicator, rolling_window, multiplier) columns, e.g.
+        ``('lower_band', 20, 2.0)``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        bands = maths.bollinger_bands(df=df, metric_col='Close', rolling_windows=[10, 20, 50],
+                                      band_multipliers=[1.5, 2.0])
+        bands['upper_band', 50, 2.0]
+    """
+    check_columns(dataframe=df, required_columns=[metric_col])
+    metric = df[metric_col].to_numpy(dtype=np.float64)
+
+    return _band_block(index=df.index, names=('lower_band', 'upper_band'),
+                       averages=kernels.rolling_means(values=metric, rolling_windows=rolling_windows),
+                       widths=kernels.rolling_stddevs(values=metric, rolling_windows=rolling_windows),
+                       multipliers=band_multipliers)
+
+
+@profiling.instrument
+def true_range(df: 'Dataframe', low_col: str, high_col: str, inplace: bool = False) -> pd.DataFrame:
     """Calculates the true range (TR) for a stocks price movement.
 
     Args:
         df: the dataframe to append a column onto
         low_col: the column with the low price
         high_col: the column with the high price
+        inplace: whether to append to ``df`` itself instead of to a copy of it
 
     Returns:
         the original dataframe with the true range appended
@@ -200,12 +326,15 @@ def true_range(df: 'Dataframe', low_col: str, high_col: str) -> pd.DataFrame:
         from wsbtrading import maths
         df_mapped = maths.true_range(df=df, low_col='Low', high_col='High')
     """
-    df = df.copy()
+    if not inplace:
+        df = df.copy()
     df['true_range'] = abs(df[high_col] - df[low_col])
     return df
 
 
-def avg_true_range(df: 'Dataframe', low_col: str, high_col: str, rolling_window: Optional[int] = 20) -> pd.DataFrame:
+@profiling.instrument
+def avg_true_range(df: 'Dataframe', low_col: str, high_col: str, rolling_window: Optional[int] = 20,
+                   inplace: bool = False, min_periods: Optional[int] = None) -> pd.DataFrame:
     """Calculates the true range (TR) for a stocks price movement over a given time window.
 
     Args:
@@ -213,6 +342,8 @@ def avg_true_range(df: 'Dataframe', low_col: str, high_col: str, rolling_window:
         low_col: the column with the low price
         high_col: the column with the high price
         rolling_window: the time window to calculate over
+        inplace: whether to append to ``df`` itself instead of to a copy of it
+        min_periods: the number of true ranges a window needs for an average, by default all of them
 
     Returns:
         the original dataframe with the true range appended
@@ -224,15 +355,18 @@ def avg_true_range(df: 'Dataframe', low_col: str, high_col: str, rolling_window:
         from wsbtrading import maths
         df_mapped = maths.avg_true_range(df=df, low_col='Low', high_col='High', rolling_window=20)
     """
-    df = df.copy()
-    df = true_range(df=df, low_col=low_col, high_col=high_col)
+    if not inplace:
+        df = df.copy()
+    df = true_range(df=df, low_col=low_col, high_col=high_col, inplace=True)
 
-    df['ATR'] = df['true_range'].rolling(window=rolling_window).mean()
+    df['ATR'] = kernels.rolling_mean(values=df['true_range'].to_numpy(dtype=np.float64), rolling_window=rolling_window,
+                                     min_periods=min_periods)
     return df
 
 
-def lower_keltner(df: 'Dataframe', metric_col: str, low_col: str, high_col: str, rolling_window: Optional[int] = 20) \
-        -> pd.DataFrame:
+@profiling.instrument
+def lower_keltner(df: 'Dataframe', metric_col: str, low_col: str, high_col: str, rolling_window: Optional[int] = 20,
+                  inplace: bool = False, keltner_multiplier: float = kernels.KELTNER_MULTIPLIER) -> pd.DataFrame:
     """Calculates the lower Keltner of a stock's price movements.
 
     Args:
@@ -241,6 +375,8 @@ def lower_keltner(df: 'Dataframe', metric_col: str, low_col: str, high_col: str,
         low_col: the column with the low price
         high_col: the column with the high price
         rolling_window: the time window to calculate over
+        inplace: whether to append to ``df`` itself instead of to a copy of it
+        keltner_multiplier: how many average true ranges below the moving average the channel sits
 
     Returns:
         the original dataframe with the lower bound appended
@@ -252,17 +388,20 @@ def lower_keltner(df: 'Dataframe', metric_col: str, low_col: str, high_col: str,
         from wsbtrading import maths
         df_mapped = maths.lower_keltner(df=df, metric_col='Close', low_col='Low', high_col='High', rolling_window=20)
     """
+    if not inplace:
+        df = df.copy()
     rolling_window_string = str(rolling_window)
 
-    df = sma(df=df, metric_col=metric_col, rolling_window=rolling_window)
-    df = avg_true_range(df=df, low_col=low_col, high_col=high_col, rolling_window=rolling_window)
+    df = sma(df=df, metric_col=metric_col, rolling_window=rolling_window, inplace=True)
+    df = avg_true_range(df=df, low_col=low_col, high_col=high_col, rolling_window=rolling_window, inplace=True)
 
-    df['lower_keltner'] = df[f'{rolling_window_string}sma'] - (df['ATR'] * 1.5)
+    df['lower_keltner'] = df[f'{rolling_window_string}sma'] - (df['ATR'] * keltner_multiplier)
     return df
 
 
-def upper_keltner(df: 'Dataframe', metric_col: str, low_col: str, high_col: str, rolling_window: Optional[int] = 20) \
-        -> pd.DataFrame:
+@profiling.instrument
+def upper_keltner(df: 'Dataframe', metric_col: str, low_col: str, high_col: str, rolling_window: Optional[int] = 20,
+                  inplace: bool = False, keltner_multiplier: float = kernels.KELTNER_MULTIPLIER) -> pd.DataFrame:
     """Calculates the upper Keltner of a stock's price movements.
 
     Args:
@@ -271,6 +410,8 @@ def upper_keltner(df: 'Dataframe', metric_col: str, low_col: str, high_col: str,
         low_col: the column with the low price
         high_col: the column with the high price
         rolling_window: the time window to calculate over
+        inplace: whether to append to ``df`` itself instead of to a copy of it
+        keltner_multiplier: how many average true ranges above the moving average the channel sits
 
     Returns:
         the original dataframe with the lower bound appended
@@ -282,17 +423,102 @@ def upper_keltner(df: 'Dataframe', metric_col: str, low_col: str, high_col: str,
         from wsbtrading import maths
         df_mapped = maths.upper_keltner(df=df, metric_col='Close', low_col='Low', high_col='High', rolling_window=20)
     """
+    if not inplace:
+        df = df.copy()
     rolling_window_string = str(rolling_window)
 
-    df = sma(df=df, metric_col=metric_col, rolling_window=rolling_window)
-    df = avg_true_range(df=df, low_col=low_col, high_col=high_col, rolling_window=rolling_window)
+    df = sma(df=df, metric_col=metric_col, rolling_window=rolling_window, inplace=True)
+    df = avg_true_range(df=df, low_col=low_col, high_col=high_col, rolling_window=rolling_window, inplace=True)
 
-    df['upper_keltner'] = df[f'{rolling_window_string}sma'] + (df['ATR'] * 1.5)
+    df['upper_keltner'] = df[f'{rolling_window_string}sma'] + (df['ATR'] * keltner_multiplier)
     return df
 
 
+@profiling.instrument
+def keltner_channels(df: 'Dataframe', metric_col: str, low_col: str, high_col: str,
+                     rolling_windows: Sequence[int] = (20,),
+                     keltner_multipliers: Sequence[float] = (kernels.KELTNER_MULTIPLIER,)) -> pd.DataFrame:
+    """Calculates the lower and upper Keltner channels of a stock for several time windows and widths at once.
+
+    Note:
+        this gives the values of ``lower_keltner`` and ``upper_keltner`` for every combination of window and
+        multiplier, but the moving averages of the price and of the true range come from one cumulative sum each
+
+    Args:
+        df: the dataframe to read the prices from
+        metric_col: the column to calculate over (usually the 'Close' price)
+        low_col: the column with the low price
+        high_col: the column with the high price
+        rolling_windows: the time windows to calculate over
+        keltner_multipliers: the widths of the channels, in average true ranges
+
+    Returns:
+        a dataframe with the index of ``df`` and (indicator, rolling_window, multiplier) columns, e.g.
+        ``('upper_keltner', 20, 1.5)``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        channels = maths.keltner_channels(df=df, metric_col='Close', low_col='Low', high_col='High',
+                                          rolling_windows=[10, 20, 50], keltner_multipliers=[1.0, 1.5, 2.0])
+        channels['lower_keltner', 10, 1.0]
+    """
+    check_columns(dataframe=df, required_columns=[metric_col, low_col, high_col])
+    tr = kernels.true_range(low=df[low_col].to_numpy(dtype=np.float64), high=df[high_col].to_numpy(dtype=np.float64))
+
+    return _band_block(index=df.index, names=('lower_keltner', 'upper_keltner'),
+                       averages=kernels.rolling_means(values=df[metric_col].to_numpy(dtype=np.float64),
+                                                      rolling_windows=rolling_windows),
+                       widths=kernels.rolling_means(values=tr, rolling_windows=rolling_windows),
+                       multipliers=keltner_multipliers)
+
+
+@profiling.instrument
+def squeeze_indicators(df: 'Dataframe', metric_col: str, low_col: str, high_col: str,
+                       rolling_window: Optional[int] = 20, band_multiplier: float = kernels.BAND_MULTIPLIER,
+                       keltner_multiplier: float = kernels.KELTNER_MULTIPLIER) -> Dict[str, np.ndarray]:
+    """Calculates the moving average, Bollinger bands and Keltner channels of a stock in one pass.
+
+    Note:
+        this gives the same values as chaining ``lower_band``, ``upper_band``, ``lower_keltner`` and ``upper_keltner``,
+        but every rolling statistic is computed once over NumPy arrays and the dataframe is never copied
+
+    Args:
+        df: the dataframe to read the prices from
+        metric_col: the column to calculate over (usually the 'Close' price)
+        low_col: the column with the low price
+        high_col: the column with the high price
+        rolling_window: the time window to calculate over
+        band_multiplier: the width of the Bollinger bands, in moving standard deviations
+        keltner_multiplier: the width of the Keltner channels, in average true ranges
+
+    Returns:
+        a dictionary of arrays keyed by the column names the other functions in this module append, e.g. ``'20sma'``,
+        ``'ATR'``, ``'lower_band'`` or ``'upper_keltner'``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        indicators = maths.squeeze_indicators(df=df, metric_col='Close', low_col='Low', high_col='High')
+        indicators['upper_band']
+    """
+    check_columns(dataframe=df, required_columns=[metric_col, low_col, high_col])
+
+    return kernels.squeeze_kernel(close=df[metric_col].to_numpy(dtype=np.float64),
+                                  low=df[low_col].to_numpy(dtype=np.float64),
+                                  high=df[high_col].to_numpy(dtype=np.float64),
+                                  rolling_window=rolling_window, band_multiplier=band_multiplier,
+                                  keltner_multiplier=keltner_multiplier)
+
+
+@profiling.instrument(rows='df')
 def is_in_squeeze(df: 'Dataframe', metric_col: str, low_col: str, high_col: str, look_back_period: Optional[int] = -3,
-                  rolling_window: Optional[int] = 20) -> bool:
+                  rolling_window: Optional[int] = 20, band_multiplier: float = kernels.BAND_MULTIPLIER,
+                  keltner_multiplier: float = kernels.KELTNER_MULTIPLIER) -> bool:
     """Calculates whether a stock's price moments are indicative of an upcoming squeeze (i.e. going to the moon!🚀🚀🚀).
 
     Args:
@@ -302,9 +528,11 @@ def is_in_squeeze(df: 'Dataframe', metric_col: str, low_col: str, high_col: str,
         high_col: the column with the high price
         look_back_period: the number of days to look back
         rolling_window: the time window to calculate over
+        band_multiplier: the width of the Bollinger bands, in moving standard deviations
+        keltner_multiplier: the width of the Keltner channels, in average true ranges
 
     Returns:
-        the original dataframe with the lower bound appended
+        whether the Bollinger bands sit inside the Keltner channels at ``look_back_period``
 
     **Example**
 
@@ -319,14 +547,153 @@ def is_in_squeeze(df: 'Dataframe', metric_col: str, low_col: str, high_col: str,
             rolling_window=20
         )
     """
-    lower_band_df = lower_band(df=df, metric_col=metric_col)
-    upper_band_df = upper_band(df=lower_band_df, metric_col=metric_col)
-    lower_keltner_df = lower_keltner(df=upper_band_df, metric_col=metric_col, low_col=low_col, high_col=high_col,
-                                     rolling_window=rolling_window)
-    upper_keltner_df = upper_keltner(df=lower_keltner_df, metric_col=metric_col, low_col=low_col, high_col=high_col,
-                                     rolling_window=rolling_window)
-
-    return upper_keltner_df['lower_band'].iloc[look_back_period] \
-           > upper_keltner_df['lower_keltner'].iloc[look_back_period] \
-           and upper_keltner_df['upper_band'].iloc[look_back_period] \
-           < upper_keltner_df['upper_keltner'].iloc[look_back_period]
+    indicators = squeeze_indicators(df=df, metric_col=metric_col, low_col=low_col, high_col=high_col,
+                                    rolling_window=rolling_window, band_multiplier=band_multiplier,
+                                    keltner_multiplier=keltner_multiplier)
+
+    return bool(indicators['lower_band'][look_back_period] > indicators['lower_keltner'][look_back_period]
+                and indicators['upper_band'][look_back_period] < indicators['upper_keltner'][look_back_period])
+
+
+def _panel_arrays(panel: Union['DataFrame', np.ndarray, 'OhlcvPanel'], metric_col: str, low_col: str, high_col: str,
+                  tickers: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, pd.Index]:
+    """Splits a price panel into (dates x tickers) arrays of the metric, low and high prices.
+
+    Args:
+        panel: a wide dataframe whose columns are a (field, ticker) MultiIndex, an ndarray of shape (3, dates, tickers)
+               holding the metric, low and high prices in that order, or a
+               :class:`~wsbtrading.data_io.ohlcv_panel.OhlcvPanel`
+        metric_col: the field to calculate over (usually the 'Close' price)
+        low_col: the field with the low price
+        high_col: the field with the high price
+        tickers: the ticker of each column of an ndarray panel; ignored for dataframes
+
+    Returns:
+        the metric, low and high arrays plus the tickers labelling their columns
+    """
+    if hasattr(panel, 'field_names'):
+        # An OhlcvPanel from wsbtrading.data_io.ohlcv_panel; its (possibly memory-mapped) arrays are used as they are
+        check_columns(dataframe=pd.DataFrame(columns=panel.field_names),
+                      required_columns=[metric_col, low_col, high_col])
+
+        return panel[metric_col], panel[low_col], panel[high_col], pd.Index(panel.tickers)
+
+    if isinstance(panel, pd.DataFrame):
+        if not isinstance(panel.columns, pd.MultiIndex):
+            raise ValueError('A dataframe panel needs (field, ticker) MultiIndex columns, e.g. '
+                             "df.pivot(index='Date', columns='ticker', values=['Close', 'High', 'Low']).")
+        check_columns(dataframe=pd.DataFrame(columns=panel.columns.get_level_values(0).unique()),
+                      required_columns=[metric_col, low_col, high_col])
+
+        metric_df = panel[metric_col]
+        ticker_index = metric_df.columns
+        metric = metric_df.to_numpy(dtype=np.float64)
+        low = panel[low_col].reindex(columns=ticker_index).to_numpy(dtype=np.float64)
+        high = panel[high_col].reindex(columns=ticker_index).to_numpy(dtype=np.float64)
+
+        return metric, low, high, pd.Index(ticker_index)
+
+    panel = np.asarray(panel)
+    if panel.ndim != 3 or panel.shape[0] != 3:
+        raise ValueError(f'An ndarray panel must have shape (3, dates, tickers), got {panel.shape}.')
+    ticker_index = pd.Index(tickers if tickers is not None else range(panel.shape[2]))
+    if len(ticker_index) != panel.shape[2]:
+        raise ValueError(f'Got {len(ticker_index)} tickers for a panel with {panel.shape[2]} columns.')
+
+    return panel[0], panel[1], panel[2], ticker_index
+
+
+@profiling.instrument
+def squeeze_panel(panel: Union['DataFrame', np.ndarray, 'OhlcvPanel'], metric_col: str = 'Close', low_col: str = 'Low',
+                  high_col: str = 'High', rolling_window: Optional[int] = 20,
+                  tickers: Optional[Sequence[str]] = None, band_multiplier: float = kernels.BAND_MULTIPLIER,
+                  keltner_multiplier: float = kernels.KELTNER_MULTIPLIER) -> np.ndarray:
+    """Calculates whether every ticker of a price panel is in a squeeze, on every date.
+
+    Args:
+        panel: a wide dataframe whose columns are a (field, ticker) MultiIndex, an ndarray of shape (3, dates, tickers)
+               holding the metric, low and high prices in that order, or a
+               :class:`~wsbtrading.data_io.ohlcv_panel.OhlcvPanel`
+        metric_col: the field to calculate over (usually the 'Close' price)
+        low_col: the field with the low price
+        high_col: the field with the high price
+        rolling_window: the time window to calculate over
+        tickers: the ticker of each column of an ndarray panel; ignored for dataframes
+        band_multiplier: the width of the Bollinger bands, in moving standard deviations
+        keltner_multiplier: the width of the Keltner channels, in average true ranges
+
+    Returns:
+        a boolean array of shape (dates, tickers), True where the Bollinger bands sit inside the Keltner channels
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        panel = prices_df.pivot(index='Date', columns='ticker', values=['Close', 'High', 'Low'])
+        flags = maths.squeeze_panel(panel=panel, rolling_window=20)
+    """
+    metric, low, high, _ = _panel_arrays(panel=panel, metric_col=metric_col, low_col=low_col, high_col=high_col,
+                                         tickers=tickers)
+    indicators = kernels.squeeze_kernel(close=metric, low=low, high=high, rolling_window=rolling_window,
+                                        band_multiplier=band_multiplier, keltner_multiplier=keltner_multiplier)
+
+    return (indicators['lower_band'] > indicators['lower_keltner']) \
+        & (indicators['upper_band'] < indicators['upper_keltner'])
+
+
+@profiling.instrument
+def is_in_squeeze_panel(panel: Union['DataFrame', np.ndarray, 'OhlcvPanel'], metric_col: str = 'Close',
+                        low_col: str = 'Low', high_col: str = 'High', look_back_period: Optional[int] = -3,
+                        rolling_window: Optional[int] = 20, tickers: Optional[Sequence[str]] = None,
+                        band_multiplier: float = kernels.BAND_MULTIPLIER,
+                        keltner_multiplier: float = kernels.KELTNER_MULTIPLIER) -> pd.Series:
+    """Calculates whether each ticker of a whole universe is in a squeeze, all tickers at once.
+
+    Note:
+        only the ``rolling_window`` rows leading up to ``look_back_period`` are read, so scanning a long history costs
+        no more than scanning the last few weeks. Dates are shared by every ticker: a ticker without a full window of
+        prices at ``look_back_period`` (e.g. one that was delisted) is reported as not squeezing.
+
+    Args:
+        panel: a wide dataframe whose columns are a (field, ticker) MultiIndex, an ndarray of shape (3, dates, tickers)
+               holding the metric, low and high prices in that order, or a
+               :class:`~wsbtrading.data_io.ohlcv_panel.OhlcvPanel`
+        metric_col: the field to calculate over (usually the 'Close' price)
+        low_col: the field with the low price
+        high_col: the field with the high price
+        look_back_period: the number of days to look back
+        rolling_window: the time window to calculate over
+        tickers: the ticker of each column of an ndarray panel; ignored for dataframes
+        band_multiplier: the width of the Bollinger bands, in moving standard deviations
+        keltner_multiplier: the width of the Keltner channels, in average true ranges
+
+    Returns:
+        a boolean series indexed by ticker
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        panel = prices_df.pivot(index='Date', columns='ticker', values=['Close', 'High', 'Low'])
+        flags = maths.is_in_squeeze_panel(panel=panel, rolling_window=20)
+        flags[flags].index.tolist()
+        # ['AAPL', 'TSLA']
+    """
+    metric, low, high, ticker_index = _panel_arrays(panel=panel, metric_col=metric_col, low_col=low_col,
+                                                    high_col=high_col, tickers=tickers)
+
+    n_dates = metric.shape[0]
+    row = look_back_period if look_back_period >= 0 else n_dates + look_back_period
+    if not 0 <= row < n_dates:
+        raise IndexError(f'look_back_period {look_back_period} is out of bounds for a panel of {n_dates} dates.')
+    rows = slice(max(0, row - rolling_window + 1), row + 1)
+
+    indicators = kernels.squeeze_kernel(close=metric[rows], low=low[rows], high=high[rows],
+                                        rolling_window=rolling_window, band_multiplier=band_multiplier,
+                                        keltner_multiplier=keltner_multiplier)
+    flags = (indicators['lower_band'][-1] > indicators['lower_keltner'][-1]) \
+        & (indicators['upper_band'][-1] < indicators['upper_keltner'][-1])
+
+    return pd.Series(flags, index=ticker_index, dtype=bool)
@@ -0,0 +1,284 @@
+"""Incremental indicators for live bars.
+
+Each class keeps a fixed-size ring buffer of the latest ``rolling_window`` observations, so ``update(bar)`` costs O(1)
+no matter how much history has been seen. After warm-up the values match the batch functions in
+:mod:`wsbtrading.maths` computed over the same bars; before it they are ``NaN``, like the batch functions.
+
+A bar is anything that can be indexed by column name, e.g. a ``dict`` or a row of a dataframe.
+"""
+import math
+from typing import Dict, Mapping, Optional
+
+from wsbtrading.maths import kernels
+
+
+class RollingWindow:
+    """The mean and sample variance of the latest ``rolling_window`` values, maintained with Welford's algorithm.
+
+    Note:
+        the statistics are rebuilt from the buffer once every ``rolling_window`` updates, which keeps rounding error
+        from accumulating over a long stream at an amortised O(1) cost
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.maths import streaming
+        window = streaming.RollingWindow(rolling_window=20)
+        window.push(31.0)
+        window.mean, window.stddev
+    """
+    def __init__(self, rolling_window: int = 20):
+        if rolling_window < 1:
+            raise ValueError(f'rolling_window must be a positive integer, got {rolling_window}.')
+        self.rolling_window = rolling_window
+        self._buffer = [math.nan] * rolling_window
+        self._position = 0
+        self._seen = 0
+        self._nan_count = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._last_value = math.nan
+        self._same_run = 0
+
+    def _add(self, value: float) -> None:
+        self._count += 1
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+
+    def _remove(self, value: float) -> None:
+        self._count -= 1
+        if self._count == 0:
+            self._mean = 0.0
+            self._m2 = 0.0
+            return
+        old_mean = self._mean
+        self._mean -= (value - old_mean) / self._count
+        self._m2 -= (value - old_mean) * (value - self._mean)
+
+    def _resync(self) -> None:
+        valid = [value for value in self._buffer if not math.isnan(value)]
+        self._count = len(valid)
+        self._mean = math.fsum(valid) / self._count if valid else 0.0
+        self._m2 = math.fsum((value - self._mean) ** 2 for value in valid)
+
+    def push(self, value: float) -> None:
+        """Adds a value to the window, evicting the oldest one once the window is full."""
+        value = float(value)
+        if self._seen >= self.rolling_window:
+            evicted = self._buffer[self._position]
+            if math.isnan(evicted):
+                self._nan_count -= 1
+            else:
+                self._remove(evicted)
+
+        self._buffer[self._position] = value
+        if math.isnan(value):
+            self._nan_count += 1
+        else:
+            self._add(value)
+
+        self._same_run = self._same_run + 1 if value == self._last_value else 1
+        self._last_value = value
+        self._position = (self._position + 1) % self.rolling_window
+        self._seen += 1
+        if self._position == 0 and self._nan_count == 0:
+            self._resync()
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether the window is full and free of NaN."""
+        return self._seen >= self.rolling_window and self._nan_count == 0
+
+    @property
+    def mean(self) -> float:
+        return self._mean if self.is_ready else math.nan
+
+    @property
+    def stddev(self) -> float:
+        if not self.is_ready or self.rolling_window < 2:
+            return math.nan
+        if self._same_run >= self.rolling_window:
+            return 0.0
+        return math.sqrt(max(self._m2, 0.0) / (self.rolling_window - 1))
+
+
+class StreamingSma:
+    """Incremental version of :func:`wsbtrading.maths.sma`.
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        sma = maths.StreamingSma(metric_col='Close', rolling_window=20)
+        sma.update({'Close': 31.0})
+    """
+    def __init__(self, metric_col: str, rolling_window: Optional[int] = 20):
+        self.metric_col = metric_col
+        self._window = RollingWindow(rolling_window=rolling_window)
+
+    def update(self, bar: Mapping[str, float]) -> float:
+        """Adds a bar and returns the latest simple moving average."""
+        self._window.push(bar[self.metric_col])
+        return self._window.mean
+
+
+class StreamingStddev:
+    """Incremental version of :func:`wsbtrading.maths.rolling_stddev`.
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        stddev = maths.StreamingStddev(metric_col='Close', rolling_window=20)
+        stddev.update({'Close': 31.0})
+    """
+    def __init__(self, metric_col: str, rolling_window: Optional[int] = 20):
+        self.metric_col = metric_col
+        self._window = RollingWindow(rolling_window=rolling_window)
+
+    def update(self, bar: Mapping[str, float]) -> float:
+        """Adds a bar and returns the latest moving standard deviation."""
+        self._window.push(bar[self.metric_col])
+        return self._window.stddev
+
+
+class StreamingEma:
+    """Incremental exponential moving average with a smoothing factor of ``2 / (rolling_window + 1)``.
+
+    The average is seeded with the first bar and reported once ``rolling_window`` bars have been seen, which matches
+    ``series.ewm(span=rolling_window, adjust=False, ignore_na=True, min_periods=rolling_window).mean()`` and
+    :func:`wsbtrading.maths.ema`. A bar with a missing price holds the average and does not count as seen.
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        ema = maths.StreamingEma(metric_col='Close', rolling_window=20)
+        ema.update({'Close': 31.0})
+    """
+    def __init__(self, metric_col: str, rolling_window: Optional[int] = 20):
+        if rolling_window < 1:
+            raise ValueError(f'rolling_window must be a positive integer, got {rolling_window}.')
+        self.metric_col = metric_col
+        self.rolling_window = rolling_window
+        self.alpha = 2 / (rolling_window + 1)
+        self._value = math.nan
+        self._seen = 0
+
+    def update(self, bar: Mapping[str, float]) -> float:
+        """Adds a bar and returns the latest exponential moving average."""
+        value = float(bar[self.metric_col])
+        if math.isnan(self._value):
+            self._value = value
+        elif not math.isnan(value):
+            self._value += self.alpha * (value - self._value)
+        if not math.isnan(value):
+            self._seen += 1
+
+        return self._value if self._seen >= self.rolling_window else math.nan
+
+
+class StreamingAvgTrueRange:
+    """Incremental version of :func:`wsbtrading.maths.avg_true_range`.
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        atr = maths.StreamingAvgTrueRange(low_col='Low', high_col='High', rolling_window=20)
+        atr.update({'Low': 20.0, 'High': 32.0})
+    """
+    def __init__(self, low_col: str, high_col: str, rolling_window: Optional[int] = 20):
+        self.low_col = low_col
+        self.high_col = high_col
+        self._window = RollingWindow(rolling_window=rolling_window)
+
+    def update(self, bar: Mapping[str, float]) -> float:
+        """Adds a bar and returns the latest average true range."""
+        self._window.push(abs(float(bar[self.high_col]) - float(bar[self.low_col])))
+        return self._window.mean
+
+
+class StreamingBollingerBands:
+    """Incremental version of :func:`wsbtrading.maths.lower_band` and :func:`wsbtrading.maths.upper_band`.
+
+    Args:
+        metric_col: the column to calculate over (usually the 'Close' price)
+        rolling_window: the number of bars to average over
+        band_multiplier: how many moving standard deviations either side of the moving average the bands sit
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        bands = maths.StreamingBollingerBands(metric_col='Close', rolling_window=20)
+        bands.update({'Close': 31.0})
+        # {'20sma': nan, '20stddev': nan, 'lower_band': nan, 'upper_band': nan}
+    """
+    def __init__(self, metric_col: str, rolling_window: Optional[int] = 20,
+                 band_multiplier: float = kernels.BAND_MULTIPLIER):
+        self.metric_col = metric_col
+        self.rolling_window = rolling_window
+        self.band_multiplier = band_multiplier
+        self._window = RollingWindow(rolling_window=rolling_window)
+
+    def update(self, bar: Mapping[str, float]) -> Dict[str, float]:
+        """Adds a bar and returns the latest moving average, standard deviation and Bollinger bands."""
+        self._window.push(bar[self.metric_col])
+        moving_average = self._window.mean
+        stddev = self._window.stddev
+
+        return {
+            f'{self.rolling_window}sma': moving_average,
+            f'{self.rolling_window}stddev': stddev,
+            'lower_band': moving_average - (self.band_multiplier * stddev),
+            'upper_band': moving_average + (self.band_multiplier * stddev),
+        }
+
+
+class StreamingKeltnerChannels:
+    """Incremental version of :func:`wsbtrading.maths.lower_keltner` and :func:`wsbtrading.maths.upper_keltner`.
+
+    Args:
+        metric_col: the column to calculate over (usually the 'Close' price)
+        low_col: the column holding the low price
+        high_col: the column holding the high price
+        rolling_window: the number of bars to average over
+        keltner_multiplier: how many average true ranges either side of the moving average the channels sit
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading import maths
+        channels = maths.StreamingKeltnerChannels(metric_col='Close', low_col='Low', high_col='High')
+        channels.update({'Close': 31.0, 'Low': 20.0, 'High': 32.0})
+        # {'20sma': nan, 'ATR': nan, 'lower_keltner': nan, 'upper_keltner': nan}
+    """
+    def __init__(self, metric_col: str, low_col: str, high_col: str, rolling_window: Optional[int] = 20,
+                 keltner_multiplier: float = kernels.KELTNER_MULTIPLIER):
+        self.metric_col = metric_col
+        self.rolling_window = rolling_window
+        self.keltner_multiplier = keltner_multiplier
+        self._sma = StreamingSma(metric_col=metric_col, rolling_window=rolling_window)
+        self._atr = StreamingAvgTrueRange(low_col=low_col, high_col=high_col, rolling_window=rolling_window)
+
+    def update(self, bar: Mapping[str, float]) -> Dict[str, float]:
+        """Adds a bar and returns the latest moving average, average true range and Keltner channels."""
+        moving_average = self._sma.update(bar)
+        atr = self._atr.update(bar)
+
+        return {
+            f'{self.rolling_window}sma': moving_average,
+            'ATR': atr,
+            'lower_keltner': moving_average - (atr * self.keltner_multiplier),
+            'upper_keltner': moving_average + (atr * self.keltner_multiplier),
+        }
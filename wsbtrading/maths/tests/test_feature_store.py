@@ -0,0 +1,125 @@
+import functools
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from pandas._testing import assert_frame_equal
+
+from wsbtrading import maths
+
+
+def _counting(func):
+    """Wraps a maths function so the test can see how often, and on how many rows, it really ran."""
+    @functools.wraps(func)
+    def wrapper(df, **params):
+        wrapper.calls.append(len(df))
+        return func(df=df, **params)
+    wrapper.calls = []
+
+    return wrapper
+
+
+class TestFeatureStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = maths.FeatureStore(root_path=self.temp_dir.name)
+
+        rng = np.random.default_rng(seed=23)
+        close = 100 + np.cumsum(rng.normal(size=1200))
+        self.df = pd.DataFrame({'Close': close, 'High': close + 1, 'Low': close - rng.uniform(0, 2, size=1200)})
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def test_hit(self):
+        """Ensures a repeated call is served from the cache."""
+        sma = _counting(maths.sma)
+
+        first = self.store.compute(sma, df=self.df, ticker='GME', metric_col='Close', rolling_window=20)
+        second = self.store.compute(sma, df=self.df, ticker='GME', metric_col='Close', rolling_window=20)
+
+        assert sma.calls == [1200]
+        assert_frame_equal(first, maths.sma(df=self.df, metric_col='Close', rolling_window=20))
+        assert_frame_equal(second, first)
+
+    def test_output_column_in_input(self):
+        """Ensures prices that already hold the output column still cache it, for later calls that don't have it."""
+        sma = _counting(maths.sma)
+        with_sma = maths.sma(df=self.df, metric_col='Close', rolling_window=20)
+        with_sma['20sma'] = 0.0
+
+        first = self.store.compute(sma, df=with_sma, ticker='GME', metric_col='Close', rolling_window=20)
+        second = self.store.compute(sma, df=self.df, ticker='GME', metric_col='Close', rolling_window=20)
+
+        expected = maths.sma(df=self.df, metric_col='Close', rolling_window=20)
+        assert sma.calls == [1200]
+        assert_frame_equal(first, expected)
+        assert_frame_equal(second, expected)
+
+    def test_key(self):
+        """Ensures different tickers and parameters get their own entries."""
+        sma = _counting(maths.sma)
+
+        self.store.compute(sma, df=self.df, ticker='GME', metric_col='Close', rolling_window=20)
+        self.store.compute(sma, df=self.df, ticker='AMC', metric_col='Close', rolling_window=20)
+        self.store.compute(sma, df=self.df, ticker='GME', metric_col='Close', rolling_window=10)
+        self.store.compute(sma, df=self.df, ticker='GME', metric_col='Close')
+
+        assert sma.calls == [1200, 1200, 1200]
+
+    def test_changed_prices(self):
+        """Ensures revised prices are not answered with stale results."""
+        sma = _counting(maths.sma)
+        revised = self.df.copy()
+        revised.loc[10, 'Close'] += 1
+
+        self.store.compute(sma, df=self.df, ticker='GME', metric_col='Close')
+        actual = self.store.compute(sma, df=revised, ticker='GME', metric_col='Close')
+
+        assert sma.calls == [1200, 1200]
+        assert_frame_equal(actual, maths.sma(df=revised, metric_col='Close'))
+
+    def test_appended_bars(self):
+        """Ensures new bars only compute the new rows plus the window of history they depend on."""
+        keltner = _counting(maths.upper_keltner)
+        params = {'metric_col': 'Close', 'low_col': 'Low', 'high_col': 'High', 'rolling_window': 20}
+
+        self.store.compute(keltner, df=self.df.iloc[:1000], ticker='GME', **params)
+        actual = self.store.compute(keltner, df=self.df, ticker='GME', **params)
+
+        assert keltner.calls == [1000, 219]
+        expected = maths.upper_keltner(df=self.df, **params)
+        np.testing.assert_allclose(actual['upper_keltner'], expected['upper_keltner'], rtol=1e-9)
+        assert list(actual.columns) == list(expected.columns)
+
+        again = self.store.compute(keltner, df=self.df, ticker='GME', **params)
+        assert keltner.calls == [1000, 219]
+        assert_frame_equal(again, actual)
+
+    def test_recursive_indicator_is_recomputed(self):
+        """Ensures an indicator without a fixed window of history is recomputed in full when bars are appended."""
+        ema = _counting(maths.ema)
+
+        self.store.compute(ema, df=self.df.iloc[:1000], ticker='GME', metric_col='Close')
+        actual = self.store.compute(ema, df=self.df, ticker='GME', metric_col='Close')
+
+        assert ema.calls == [1000, 1200]
+        assert_frame_equal(actual, maths.ema(df=self.df, metric_col='Close'))
+
+    def test_eviction(self):
+        """Ensures the least recently used entries are dropped once the cache is over its size cap."""
+        entry_bytes = self.df['Close'].to_numpy().nbytes
+        store = maths.FeatureStore(root_path=self.temp_dir.name, max_bytes=int(2.5 * entry_bytes) + 1000)
+        sma = _counting(maths.sma)
+
+        for window in [5, 10, 20]:
+            store.compute(sma, df=self.df, ticker='GME', metric_col='Close', rolling_window=window)
+        assert store.size_bytes <= store.max_bytes
+
+        store.compute(sma, df=self.df, ticker='GME', metric_col='Close', rolling_window=20)
+        store.compute(sma, df=self.df, ticker='GME', metric_col='Close', rolling_window=5)
+        assert sma.calls == [1200, 1200, 1200, 1200]
+
+        store.clear()
+        assert store.size_bytes == 0
@@ -0,0 +1,325 @@
+import math
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from wsbtrading.maths import kernels
+
+
+class TestRollingMean(unittest.TestCase):
+    def test_rolling_mean(self):
+        """Ensures the moving average matches pandas, including NaN handling."""
+        values = np.array([20, 31, np.nan, 51, 60, 62, 70], dtype=np.float64)
+
+        actual = kernels.rolling_mean(values=values, rolling_window=2)
+        expected = pd.Series(values).rolling(window=2).mean().to_numpy()
+
+        np.testing.assert_allclose(actual, expected)
+
+    def test_rolling_mean_2d(self):
+        """Ensures each column of a panel is averaged independently."""
+        rng = np.random.default_rng(seed=7)
+        values = 100 + rng.normal(size=(300, 4)).cumsum(axis=0)
+        values[:25, 1] = np.nan
+
+        actual = kernels.rolling_mean(values=values, rolling_window=20)
+        expected = pd.DataFrame(values).rolling(window=20).mean().to_numpy()
+
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+    def test_window_longer_than_series(self):
+        """Ensures a window longer than the series returns all NaN."""
+        actual = kernels.rolling_mean(values=np.arange(3, dtype=np.float64), rolling_window=5)
+
+        assert np.isnan(actual).all()
+
+    def test_invalid_window(self):
+        """Ensures a non-positive window is rejected."""
+        with self.assertRaises(ValueError):
+            kernels.rolling_mean(values=np.arange(3, dtype=np.float64), rolling_window=0)
+
+
+class TestRollingStddev(unittest.TestCase):
+    def test_rolling_stddev(self):
+        """Ensures the moving standard deviation matches pandas."""
+        rng = np.random.default_rng(seed=3)
+        values = 100 + rng.normal(size=(500, 3)).cumsum(axis=0)
+        values[40, 2] = np.nan
+
+        actual = kernels.rolling_stddev(values=values, rolling_window=20)
+        expected = pd.DataFrame(values).rolling(window=20).std().to_numpy()
+
+        np.testing.assert_allclose(actual, expected, rtol=1e-9)
+
+    def test_constant_window(self):
+        """Ensures a window of one repeated price has a standard deviation of exactly 0."""
+        values = np.array([101.37, 101.37, 101.37, 99.0, 101.37], dtype=np.float64)
+
+        actual = kernels.rolling_stddev(values=values, rolling_window=3)
+
+        assert actual[2] == 0
+        assert actual[3] > 0
+
+
+def _exact_rolling(values: np.ndarray, rolling_window: int, min_periods: int):
+    """The moving average and standard deviation of a series, each window summed exactly with math.fsum."""
+    means = np.full(values.shape, np.nan)
+    stddevs = np.full(values.shape, np.nan)
+    for row in range(values.shape[0]):
+        window = values[max(row - rolling_window + 1, 0):row + 1]
+        window = window[~np.isnan(window)]
+        if window.size >= max(min_periods, 1):
+            means[row] = math.fsum(window) / window.size
+        if window.size >= max(min_periods, 2):
+            # Deviations from the first price are exact, and small enough that their mean rounds harmlessly
+            deviations = window - window[0]
+            deviations -= math.fsum(deviations) / window.size
+            stddevs[row] = math.sqrt(math.fsum(deviations ** 2) / (window.size - 1))
+    return means, stddevs
+
+
+class TestPandasParity(unittest.TestCase):
+    """Property tests: random series, windows and min_periods, checked against pandas rolling to 1e-9."""
+
+    def setUp(self) -> None:
+        self.rng = np.random.default_rng(seed=25)
+
+    def _random_case(self):
+        n_rows = int(self.rng.integers(0, 700))
+        shape = (n_rows,) if self.rng.random() < 0.3 else (n_rows, int(self.rng.integers(1, 5)))
+        values = self.rng.choice([1, 100]) + self.rng.normal(size=shape).cumsum(axis=0)
+        if self.rng.random() < 0.5:
+            values[self.rng.random(shape) < self.rng.uniform(0, 0.4)] = np.nan
+        if self.rng.random() < 0.3 and n_rows:
+            start = int(self.rng.integers(0, n_rows))
+            values[start:start + int(self.rng.integers(1, 40))] = values[start]
+        rolling_window = int(self.rng.integers(1, 90))
+        min_periods = None if self.rng.random() < 0.3 else int(self.rng.integers(0, rolling_window + 1))
+        return values, rolling_window, min_periods
+
+    def test_rolling_mean(self):
+        for _ in range(200):
+            values, rolling_window, min_periods = self._random_case()
+
+            actual = kernels.rolling_mean(values=values, rolling_window=rolling_window, min_periods=min_periods)
+            expected = pd.DataFrame(values).rolling(rolling_window, min_periods=min_periods).mean().to_numpy()
+
+            np.testing.assert_allclose(actual, expected.reshape(values.shape), rtol=1e-9, atol=1e-9,
+                                       err_msg=f'{values.shape}, {rolling_window}, {min_periods}')
+
+    def test_rolling_stddev(self):
+        """Compares variances, as pandas' own rounding error is absolute in the variance; windows of one repeated value
+        must be exactly 0, which pandas misses once a NaN breaks the run."""
+        for _ in range(200):
+            values, rolling_window, min_periods = self._random_case()
+            rolling = pd.DataFrame(values).rolling(rolling_window, min_periods=min_periods)
+            expected = rolling.std().to_numpy().reshape(values.shape)
+            repeated = (rolling.max() == rolling.min()).to_numpy().reshape(values.shape) & ~np.isnan(expected)
+
+            actual = kernels.rolling_stddev(values=values, rolling_window=rolling_window, min_periods=min_periods)
+
+            np.testing.assert_allclose(actual ** 2, expected ** 2, rtol=1e-9, atol=1e-9,
+                                       err_msg=f'{values.shape}, {rolling_window}, {min_periods}')
+            assert (actual[repeated] == 0).all()
+
+    def test_exact(self):
+        """Ensures the same cases are within 1e-9 of exactly summed windows, however small the standard deviation."""
+        for _ in range(40):
+            values, rolling_window, min_periods = self._random_case()
+            values = values if values.ndim == 1 else values[:, 0]
+            means, stddevs = _exact_rolling(values=values, rolling_window=rolling_window,
+                                            min_periods=rolling_window if min_periods is None else min_periods)
+
+            np.testing.assert_allclose(kernels.rolling_mean(values=values, rolling_window=rolling_window,
+                                                            min_periods=min_periods), means, rtol=1e-12, atol=1e-12)
+            np.testing.assert_allclose(kernels.rolling_stddev(values=values, rolling_window=rolling_window,
+                                                              min_periods=min_periods), stddevs, rtol=1e-9)
+
+    def test_batches(self):
+        """Ensures a batch with min_periods matches pandas for every window."""
+        values, _, _ = self._random_case()
+        values = np.vstack([values.reshape(values.shape[0], -1)] * 2)
+
+        means = kernels.rolling_means(values=values, rolling_windows=[5, 30], min_periods=3)
+        stddevs = kernels.rolling_stddevs(values=values, rolling_windows=[5, 30], min_periods=3)
+
+        for rolling_window in [5, 30]:
+            rolling = pd.DataFrame(values).rolling(rolling_window, min_periods=3)
+            np.testing.assert_allclose(means[rolling_window], rolling.mean(), rtol=1e-9, atol=1e-9)
+            np.testing.assert_allclose(stddevs[rolling_window] ** 2, rolling.std() ** 2, rtol=1e-9, atol=1e-9)
+
+    def test_invalid_min_periods(self):
+        for min_periods in [-1, 21]:
+            with self.assertRaises(ValueError):
+                kernels.rolling_mean(values=np.arange(30.0), rolling_window=20, min_periods=min_periods)
+            with self.assertRaises(ValueError):
+                kernels.rolling_stddevs(values=np.arange(30.0), rolling_windows=[5, 20], min_periods=min_periods)
+
+
+class TestStability(unittest.TestCase):
+    """Property tests: the compensated sums stay accurate where naive running totals lose every digit."""
+
+    def test_large_offset(self):
+        """Ensures small moves on a large price are measured to 1e-9, relative to exactly summed windows."""
+        rng = np.random.default_rng(seed=26)
+        for _ in range(20):
+            values = 1e9 + rng.normal(scale=rng.choice([1e-3, 1, 1e3]), size=int(rng.integers(100, 1_500)))
+            values[rng.random(values.shape) < 0.1] = np.nan
+            rolling_window = int(rng.integers(2, 100))
+            min_periods = int(rng.integers(0, rolling_window + 1))
+            means, stddevs = _exact_rolling(values=values, rolling_window=rolling_window, min_periods=min_periods)
+
+            np.testing.assert_allclose(kernels.rolling_mean(values=values, rolling_window=rolling_window,
+                                                            min_periods=min_periods), means, rtol=1e-12)
+            np.testing.assert_allclose(kernels.rolling_stddev(values=values, rolling_window=rolling_window,
+                                                              min_periods=min_periods), stddevs, rtol=1e-9)
+
+    def test_long_series(self):
+        """Ensures a million-row random walk has no drift at its end, where its running total is largest."""
+        rng = np.random.default_rng(seed=27)
+        values = 1e6 + rng.normal(size=1_000_000).cumsum()
+        means, stddevs = _exact_rolling(values=values[-249:], rolling_window=50, min_periods=50)
+
+        np.testing.assert_allclose(kernels.rolling_mean(values=values, rolling_window=50)[-200:], means[-200:],
+                                   rtol=1e-14)
+        np.testing.assert_allclose(kernels.rolling_stddev(values=values, rolling_window=50)[-200:],
+                                   stddevs[-200:], rtol=1e-9)
+
+
+class TestBatches(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(seed=9)
+        self.values = 100 + rng.normal(size=(400, 3)).cumsum(axis=0)
+        self.values[50:53, 0] = np.nan
+        self.values[100:130, 1] = self.values[100, 1]
+
+    def test_rolling_means(self):
+        """Ensures every window of a batch is exactly the single-window moving average."""
+        actual = kernels.rolling_means(values=self.values, rolling_windows=[1, 10, 20, 500])
+
+        assert list(actual) == [1, 10, 20, 500]
+        for rolling_window, averages in actual.items():
+            np.testing.assert_array_equal(averages, kernels.rolling_mean(values=self.values,
+                                                                         rolling_window=rolling_window))
+
+    def test_rolling_stddevs(self):
+        """Ensures every window of a batch is exactly the single-window moving standard deviation."""
+        actual = kernels.rolling_stddevs(values=self.values[:, 1], rolling_windows=[2, 10, 50])
+
+        for rolling_window, stddevs in actual.items():
+            np.testing.assert_array_equal(stddevs, kernels.rolling_stddev(values=self.values[:, 1],
+                                                                          rolling_window=rolling_window))
+        assert actual[10][120] == 0
+
+    def test_invalid_window(self):
+        with self.assertRaises(ValueError):
+            kernels.rolling_stddevs(values=self.values, rolling_windows=[20, 0])
+
+
+class TestSqueezeKernel(unittest.TestCase):
+    def test_squeeze_kernel(self):
+        """Ensures the bands and channels are built from the shared rolling statistics."""
+        close = np.array([20, 31, 40, 51], dtype=np.float64)
+        high = np.array([22, 32, 42, 52], dtype=np.float64)
+        low = np.array([20, 20, 32, 45], dtype=np.float64)
+
+        actual = kernels.squeeze_kernel(close=close, low=low, high=high, rolling_window=2)
+
+        np.testing.assert_allclose(actual['lower_band'], [np.nan, 9.943651, 22.772078, 29.943651], rtol=1e-6)
+        np.testing.assert_allclose(actual['upper_band'], [np.nan, 41.056349, 48.227922, 61.056349], rtol=1e-6)
+        np.testing.assert_allclose(actual['lower_keltner'], [np.nan, 15.00, 19.00, 32.75])
+        np.testing.assert_allclose(actual['upper_keltner'], [np.nan, 36.00, 52.00, 58.25])
+
+
+class TestSmoothingFactor(unittest.TestCase):
+    def test_smoothing_factor(self):
+        """Ensures each way of describing the decay maps onto the same smoothing factor as pandas."""
+        assert kernels.smoothing_factor(span=19) == 0.1
+        assert kernels.smoothing_factor(com=9) == 0.1
+        assert kernels.smoothing_factor(alpha=0.1) == 0.1
+        assert abs(kernels.smoothing_factor(halflife=1) - 0.5) < 1e-15
+
+    def test_invalid_decay(self):
+        """Ensures missing, repeated or out of range decays are rejected."""
+        for decay in [{}, {'span': 10, 'com': 2}, {'span': 0.5}, {'com': -1}, {'halflife': 0}, {'alpha': 1.5}]:
+            with self.assertRaises(ValueError):
+                kernels.smoothing_factor(**decay)
+
+
+class TestEmaKernel(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(seed=13)
+        self.values = 100 + rng.normal(size=(20000, 3)).cumsum(axis=0)
+
+    def test_ema_kernel(self):
+        """Ensures the unrolled recursion matches pandas over many rescaled blocks, for slow and fast decays."""
+        for alpha in [1.0, 0.5, 2 / 21, 1e-3, 1e-7]:
+            actual = kernels.ema_kernel(values=self.values, alpha=alpha, min_periods=20)
+            expected = pd.DataFrame(self.values).ewm(alpha=alpha, adjust=False, min_periods=20).mean().to_numpy()
+
+            np.testing.assert_allclose(actual, expected, rtol=1e-12, err_msg=str(alpha))
+
+    def test_leading_nan(self):
+        """Ensures each column is seeded with its own first price."""
+        values = self.values[:300].copy()
+        values[:40, 1] = np.nan
+        values[:, 2] = np.nan
+
+        actual = kernels.ema_kernel(values=values, alpha=0.1, min_periods=5)
+        expected = pd.DataFrame(values).ewm(alpha=0.1, adjust=False, min_periods=5).mean().to_numpy()
+
+        np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+    def test_gap(self):
+        """Ensures a missing price inside a series holds the average rather than decaying it."""
+        values = np.array([1, 2, 3, np.nan, np.nan, 10], dtype=np.float64)
+
+        actual = kernels.ema_kernel(values=values, alpha=0.5)
+
+        np.testing.assert_allclose(actual, [1, 1.5, 2.25, 2.25, 2.25, 6.125])
+
+    def test_gaps(self):
+        """Ensures scattered missing prices match pandas' ``ignore_na`` average over many rescaled blocks."""
+        rng = np.random.default_rng(seed=17)
+        values = self.values.copy()
+        values[rng.random(size=values.shape) < 0.2] = np.nan
+        values[:40, 1] = np.nan
+
+        for alpha in [1.0, 0.5, 2 / 21, 1e-3]:
+            actual = kernels.ema_kernel(values=values, alpha=alpha, min_periods=5)
+            expected = pd.DataFrame(values).ewm(alpha=alpha, adjust=False, ignore_na=True, min_periods=5).mean()
+
+            np.testing.assert_allclose(actual, expected.to_numpy(), rtol=1e-12, atol=1e-12, err_msg=str(alpha))
+
+    def test_out(self):
+        """Ensures the average is written into a preallocated array without another allocation."""
+        out = np.empty(self.values.shape)
+
+        actual = kernels.ema_kernel(values=self.values, alpha=0.1, out=out)
+
+        assert actual is out
+        with self.assertRaises(ValueError):
+            kernels.ema_kernel(values=self.values, alpha=0.1, out=np.empty(5))
+
+
+class TestOut(unittest.TestCase):
+    def test_out(self):
+        """Ensures the rolling kernels write into a preallocated array and return it."""
+        rng = np.random.default_rng(seed=21)
+        values = 100 + rng.normal(size=(500, 2)).cumsum(axis=0)
+        out = np.empty((3,) + values.shape)
+
+        mean = kernels.rolling_mean(values=values, rolling_window=20, out=out[0])
+        stddev = kernels.rolling_stddev(values=values, rolling_window=20, out=out[1])
+        tr = kernels.true_range(low=values - 1, high=values + 1, out=out[2])
+
+        assert np.shares_memory(mean, out[0]) and np.shares_memory(stddev, out[1]) and np.shares_memory(tr, out[2])
+        np.testing.assert_allclose(out[0], kernels.rolling_mean(values=values, rolling_window=20))
+        np.testing.assert_allclose(out[1], kernels.rolling_stddev(values=values, rolling_window=20))
+        np.testing.assert_allclose(out[2], 2)
+
+    def test_out_wrong_shape(self):
+        """Ensures an output array that does not fit is rejected."""
+        with self.assertRaises(ValueError):
+            kernels.rolling_mean(values=np.arange(10, dtype=np.float64), rolling_window=2, out=np.empty(9))
@@ -1,9 +1,11 @@
 import unittest
 import math
+import tracemalloc
+import numpy as np
 import pandas as pd
-from pandas._testing import assert_frame_equal
+from pandas._testing import assert_frame_equal, assert_series_equal
 
-from wsbtrading import maths
+from wsbtrading import maths, MissingColumnError
 
 
 class TestDivision(unittest.TestCase):
@@ -60,6 +62,68 @@ class TestSma(unittest.TestCase):
         assert_frame_equal(actual, self.expected_df, check_dtype=True)
 
 
+class TestEma(unittest.TestCase):
+    def setUp(self) -> None:
+        # yapf: disable
+        schema = ['Date', 'High', 'Low', 'Close', '2ema']
+        data = [
+            ('2017-01-03', 22, 20, 20, None),
+            ('2017-01-04', 32, 20, 30, 26.666667),
+            ('2017-01-05', 42, 32, 40, 35.555556),
+            ('2017-01-06', 52, 45, 50, 45.185185),
+        ]
+        # yapf: enable
+        self.expected_df = pd.DataFrame(data=data, columns=schema)
+
+        rng = np.random.default_rng(seed=9)
+        self.prices = pd.DataFrame({'Open': 100 + np.cumsum(rng.normal(size=1000)),
+                                    'Close': 100 + np.cumsum(rng.normal(size=1000))})
+
+    def test_ema(self):
+        """Ensures we correctly calculate the exponential moving average (EMA)."""
+        mock_df = self.expected_df[['Date', 'High', 'Low', 'Close']]
+
+        actual = maths.ema(df=mock_df, metric_col='Close', rolling_window=2)
+
+        assert_frame_equal(actual, self.expected_df, check_dtype=True)
+
+    def test_ema_matches_pandas(self):
+        """Ensures every way of choosing the decay matches pandas."""
+        close = self.prices['Close']
+        cases = [
+            ({}, close.ewm(span=20, adjust=False, min_periods=20)),
+            ({'com': 4}, close.ewm(com=4, adjust=False, min_periods=20)),
+            ({'halflife': 7.5}, close.ewm(halflife=7.5, adjust=False, min_periods=20)),
+            ({'alpha': 0.3}, close.ewm(alpha=0.3, adjust=False, min_periods=20)),
+        ]
+        for decay, expected in cases:
+            actual = maths.ema(df=self.prices, metric_col='Close', rolling_window=20, **decay)
+
+            np.testing.assert_allclose(actual['20ema'], expected.mean(), rtol=1e-12, err_msg=str(decay))
+
+    def test_ema_multiple_columns(self):
+        """Ensures a list of columns is averaged in one pass, one output column per input."""
+        actual = maths.ema(df=self.prices, metric_col=['Open', 'Close'], rolling_window=10)
+
+        for column in ['Open', 'Close']:
+            expected = self.prices[column].ewm(span=10, adjust=False, min_periods=10).mean()
+            np.testing.assert_allclose(actual[f'{column}_10ema'], expected, rtol=1e-12)
+
+    def test_ema_matches_streaming(self):
+        """Ensures the batch EMA agrees with the incremental one."""
+        indicator = maths.StreamingEma(metric_col='Close', rolling_window=20)
+        expected = [indicator.update(bar) for bar in self.prices.to_dict(orient='records')]
+
+        actual = maths.ema(df=self.prices, metric_col='Close', rolling_window=20)
+
+        np.testing.assert_allclose(actual['20ema'], expected, rtol=1e-12)
+
+    def test_ema_rejects_two_decays(self):
+        """Ensures the decay cannot be given twice."""
+        with self.assertRaises(ValueError):
+            maths.ema(df=self.prices, metric_col='Close', com=4, halflife=2)
+
+
 class TestStandardDeviation(unittest.TestCase):
     def setUp(self) -> None:
         # yapf: disable
@@ -239,6 +303,208 @@ class TestIsInSqueeze(unittest.TestCase):
         self.assertFalse(actual)
 
 
+class TestInplace(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(seed=17)
+        close = 100 + np.cumsum(rng.normal(size=200_000))
+        self.df = pd.DataFrame({'Open': close + rng.normal(size=close.size), 'Close': close, 'High': close + 1,
+                                'Low': close - 1})
+
+    @staticmethod
+    def _chain(df: pd.DataFrame, inplace: bool) -> pd.DataFrame:
+        df = maths.sma(df=df, metric_col='Close', inplace=inplace)
+        df = maths.ema(df=df, metric_col='Close', inplace=inplace)
+        df = maths.rolling_stddev(df=df, metric_col='Close', inplace=inplace)
+        df = maths.avg_true_range(df=df, low_col='Low', high_col='High', inplace=inplace)
+        df = maths.divide(df=df, numerator_col='Close', denominator_col='Open', inplace=inplace)
+        return df
+
+    def test_inplace(self):
+        """Ensures inplace appends to the caller's dataframe and gives the same values as the default copy."""
+        expected = self._chain(df=self.df, inplace=False)
+        assert list(self.df.columns) == ['Open', 'Close', 'High', 'Low']
+
+        df = self.df.copy()
+        actual = self._chain(df=df, inplace=True)
+
+        assert actual is df
+        assert_frame_equal(actual, expected)
+
+    def test_inplace_composite(self):
+        """Ensures the band and channel functions append all their columns in place."""
+        df = self.df.copy()
+
+        maths.lower_band(df=df, metric_col='Close', inplace=True)
+        maths.upper_keltner(df=df, metric_col='Close', low_col='Low', high_col='High', inplace=True)
+
+        assert {'20sma', '20stddev', 'lower_band', 'true_range', 'ATR', 'upper_keltner'} <= set(df.columns)
+
+    def test_inplace_peak_memory(self):
+        """Ensures the peak memory of a chain of inplace indicators stays close to the columns it adds."""
+        frame_bytes = self.df.memory_usage(index=False).sum()
+        column_bytes = frame_bytes / len(self.df.columns)
+        peaks = {}
+        for inplace in [False, True]:
+            df = self.df.copy()
+            tracemalloc.start()
+            result = self._chain(df=df, inplace=inplace)
+            _, peaks[inplace] = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        added_bytes = column_bytes * (len(result.columns) - len(self.df.columns))
+
+        assert peaks[True] < added_bytes + 2 * column_bytes
+        assert peaks[True] * 3 < peaks[False]
+
+
+class TestSqueezeIndicators(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(seed=42)
+        close = 100 + np.cumsum(rng.normal(size=5040))
+        spread = rng.uniform(0.5, 3, size=5040)
+        self.df = pd.DataFrame({'Close': close, 'High': close + spread, 'Low': close - spread})
+
+    def test_squeeze_indicators(self):
+        """Ensures the fused engine matches chaining the individual indicator functions."""
+        expected = maths.upper_keltner(df=maths.lower_keltner(df=maths.upper_band(df=maths.lower_band(
+            df=self.df, metric_col='Close'), metric_col='Close'), metric_col='Close', low_col='Low', high_col='High'),
+            metric_col='Close', low_col='Low', high_col='High')
+
+        actual = maths.squeeze_indicators(df=self.df, metric_col='Close', low_col='Low', high_col='High')
+
+        for column, values in actual.items():
+            np.testing.assert_allclose(values, expected[column].to_numpy(), rtol=1e-9, atol=1e-9,
+                                       err_msg=column)
+
+    def test_squeeze_indicators_multipliers(self):
+        """Ensures the bands and channels are as wide as their multipliers, and squeeze wherever they nest."""
+        actual = maths.squeeze_indicators(df=self.df, metric_col='Close', low_col='Low', high_col='High',
+                                          band_multiplier=1.0, keltner_multiplier=3.0)
+
+        np.testing.assert_allclose(actual['upper_band'] - actual['20sma'], actual['20stddev'])
+        np.testing.assert_allclose(actual['20sma'] - actual['lower_keltner'], 3 * actual['ATR'])
+        flags = (actual['lower_band'] > actual['lower_keltner']) & (actual['upper_band'] < actual['upper_keltner'])
+        assert maths.is_in_squeeze(df=self.df, metric_col='Close', low_col='Low', high_col='High',
+                                   band_multiplier=1.0, keltner_multiplier=3.0) == flags[-3]
+
+    def test_band_multipliers(self):
+        """Ensures the bands and channels are as many standard deviations and average true ranges wide as asked."""
+        df = maths.upper_keltner(df=maths.lower_band(df=self.df, metric_col='Close', band_multiplier=1.0),
+                                 metric_col='Close', low_col='Low', high_col='High', keltner_multiplier=3.0)
+
+        np.testing.assert_allclose(df['20sma'] - df['lower_band'], df['20stddev'])
+        np.testing.assert_allclose(df['upper_keltner'] - df['20sma'], 3 * df['ATR'])
+
+    def test_bollinger_bands(self):
+        """Ensures every window and multiplier of the batch matches the single-window band functions."""
+        actual = maths.bollinger_bands(df=self.df, metric_col='Close', rolling_windows=[10, 20, 50],
+                                       band_multipliers=[1.5, 2.0])
+
+        assert actual.shape == (len(self.df), 12)
+        assert actual.columns.names == ['indicator', 'rolling_window', 'multiplier']
+        assert actual.index.equals(self.df.index)
+        for (name, rolling_window, multiplier), values in actual.items():
+            function = maths.lower_band if name == 'lower_band' else maths.upper_band
+            expected = function(df=self.df, metric_col='Close', rolling_window=rolling_window,
+                                band_multiplier=multiplier)[name]
+            np.testing.assert_allclose(values, expected, rtol=1e-9, atol=1e-9,
+                                       err_msg=str((name, rolling_window, multiplier)))
+
+    def test_keltner_channels(self):
+        """Ensures every window and multiplier of the batch matches the single-window Keltner functions."""
+        actual = maths.keltner_channels(df=self.df, metric_col='Close', low_col='Low', high_col='High',
+                                        rolling_windows=[5, 20], keltner_multipliers=[1.0, 1.5, 2.0])
+
+        assert actual.shape == (len(self.df), 12)
+        for (name, rolling_window, multiplier), values in actual.items():
+            function = maths.lower_keltner if name == 'lower_keltner' else maths.upper_keltner
+            expected = function(df=self.df, metric_col='Close', low_col='Low', high_col='High',
+                                rolling_window=rolling_window, keltner_multiplier=multiplier)[name]
+            np.testing.assert_allclose(values, expected, rtol=1e-9, atol=1e-9,
+                                       err_msg=str((name, rolling_window, multiplier)))
+
+    def test_squeeze_indicators_leaves_df_untouched(self):
+        """Ensures the fused engine does not append columns to the caller's dataframe."""
+        _ = maths.squeeze_indicators(df=self.df, metric_col='Close', low_col='Low', high_col='High')
+
+        assert list(self.df.columns) == ['Close', 'High', 'Low']
+
+    def test_is_in_squeeze_matches_indicator_functions(self):
+        """Ensures the squeeze flag agrees with the dataframe indicator functions at every look back period."""
+        df = maths.upper_keltner(df=maths.lower_keltner(df=maths.upper_band(df=maths.lower_band(
+            df=self.df, metric_col='Close', rolling_window=10), metric_col='Close', rolling_window=10),
+            metric_col='Close', low_col='Low', high_col='High', rolling_window=10),
+            metric_col='Close', low_col='Low', high_col='High', rolling_window=10)
+        expected = (df['lower_band'] > df['lower_keltner']) & (df['upper_band'] < df['upper_keltner'])
+        assert expected.any()
+
+        for look_back_period in range(-1, -200, -1):
+            actual = maths.is_in_squeeze(df=self.df, metric_col='Close', low_col='Low', high_col='High',
+                                         look_back_period=look_back_period, rolling_window=10)
+            assert actual == expected.iloc[look_back_period]
+
+
+class TestSqueezePanel(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(seed=11)
+        dates = pd.date_range('2000-01-03', periods=600, freq='B')
+        self.tickers = ['AAPL', 'GME', 'TSLA', 'AMC', 'BB']
+        self.frames = {}
+        for ticker in self.tickers:
+            close = 50 + np.cumsum(rng.normal(size=len(dates)))
+            spread = rng.uniform(0.2, 2, size=len(dates))
+            self.frames[ticker] = pd.DataFrame({'Close': close, 'High': close + spread, 'Low': close - spread},
+                                               index=dates)
+        self.panel = pd.concat(self.frames, axis=1).swaplevel(axis=1).sort_index(axis=1)
+
+    def test_is_in_squeeze_panel(self):
+        """Ensures the panel scan agrees with checking each ticker on its own."""
+        for look_back_period in [-1, -3, -50, 25]:
+            actual = maths.is_in_squeeze_panel(panel=self.panel, look_back_period=look_back_period,
+                                               rolling_window=10)
+            expected = pd.Series({ticker: maths.is_in_squeeze(df=df, metric_col='Close', low_col='Low',
+                                                              high_col='High', look_back_period=look_back_period,
+                                                              rolling_window=10)
+                                  for ticker, df in self.frames.items()})
+
+            assert_series_equal(actual.sort_index(), expected.sort_index(), check_names=False)
+
+    def test_is_in_squeeze_panel_ndarray(self):
+        """Ensures a (3, dates, tickers) array gives the same flags as the dataframe panel."""
+        array_panel = np.stack([self.panel['Close'].to_numpy(), self.panel['Low'].to_numpy(),
+                                self.panel['High'].to_numpy()])
+
+        actual = maths.is_in_squeeze_panel(panel=array_panel, tickers=list(self.panel['Close'].columns),
+                                           rolling_window=10)
+        expected = maths.is_in_squeeze_panel(panel=self.panel, rolling_window=10)
+
+        assert_series_equal(actual, expected, check_names=False)
+
+    def test_squeeze_panel(self):
+        """Ensures the full history of flags matches the per-ticker indicator functions."""
+        actual = maths.squeeze_panel(panel=self.panel, rolling_window=10)
+
+        for column, ticker in enumerate(self.panel['Close'].columns):
+            indicators = maths.squeeze_indicators(df=self.frames[ticker], metric_col='Close', low_col='Low',
+                                                  high_col='High', rolling_window=10)
+            expected = (indicators['lower_band'] > indicators['lower_keltner']) \
+                & (indicators['upper_band'] < indicators['upper_keltner'])
+            np.testing.assert_array_equal(actual[:, column], expected)
+
+    def test_missing_history(self):
+        """Ensures a ticker without prices at the look back period is reported as not squeezing."""
+        panel = self.panel.copy()
+        panel.loc[panel.index[-5]:, ('Close', 'GME')] = np.nan
+
+        actual = maths.is_in_squeeze_panel(panel=panel, look_back_period=-3, rolling_window=10)
+
+        assert not actual['GME']
+
+    def test_missing_field(self):
+        """Ensures a panel without one of the price fields is rejected."""
+        with self.assertRaises(MissingColumnError):
+            maths.is_in_squeeze_panel(panel=self.panel.drop(columns='High', level=0))
+
+
 
 import math
 import pandas as pd
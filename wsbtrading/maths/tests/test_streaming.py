@@ -0,0 +1,156 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from wsbtrading import maths
+from wsbtrading.maths import kernels
+
+
+def _stream(indicator, df: pd.DataFrame) -> list:
+    return [indicator.update(bar) for bar in df.to_dict(orient='records')]
+
+
+class StreamingTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(seed=5)
+        close = 100 + np.cumsum(rng.normal(size=3000))
+        spread = rng.uniform(0.5, 3, size=3000)
+        self.df = pd.DataFrame({'Close': close, 'High': close + spread, 'Low': close - spread})
+
+    def assert_matches(self, actual, expected) -> None:
+        np.testing.assert_allclose(np.asarray(actual, dtype=np.float64), np.asarray(expected, dtype=np.float64),
+                                   rtol=1e-9, atol=1e-9)
+
+
+class TestStreamingSma(StreamingTestCase):
+    def test_update(self):
+        """Ensures the streaming SMA matches the batch SMA bar for bar."""
+        actual = _stream(maths.StreamingSma(metric_col='Close', rolling_window=20), self.df)
+        expected = maths.sma(df=self.df, metric_col='Close', rolling_window=20)['20sma']
+
+        self.assert_matches(actual, expected)
+
+    def test_nan_bar(self):
+        """Ensures a missing price blanks out every window it is part of, like pandas."""
+        df = self.df.copy()
+        df.loc[100, 'Close'] = np.nan
+
+        actual = _stream(maths.StreamingSma(metric_col='Close', rolling_window=20), df)
+        expected = maths.sma(df=df, metric_col='Close', rolling_window=20)['20sma']
+
+        self.assert_matches(actual, expected)
+
+
+class TestStreamingStddev(StreamingTestCase):
+    def test_update(self):
+        """Ensures the streaming standard deviation matches the batch one."""
+        actual = _stream(maths.StreamingStddev(metric_col='Close', rolling_window=20), self.df)
+        expected = maths.rolling_stddev(df=self.df, metric_col='Close', rolling_window=20)['20stddev']
+
+        self.assert_matches(actual, expected)
+
+    def test_flat_prices(self):
+        """Ensures a window of one repeated price has a standard deviation of exactly 0."""
+        df = self.df.copy()
+        df.loc[500:540, 'Close'] = df.loc[500, 'Close']
+
+        actual = _stream(maths.StreamingStddev(metric_col='Close', rolling_window=20), df)
+        expected = kernels.rolling_stddev(values=df['Close'].to_numpy(), rolling_window=20)
+
+        self.assert_matches(actual, expected)
+        assert actual[530] == 0
+
+
+class TestStreamingEma(StreamingTestCase):
+    def test_update(self):
+        """Ensures the streaming EMA is a true exponential moving average."""
+        actual = _stream(maths.StreamingEma(metric_col='Close', rolling_window=20), self.df)
+        expected = self.df['Close'].ewm(span=20, adjust=False, min_periods=20).mean()
+
+        self.assert_matches(actual, expected)
+
+    def test_gaps(self):
+        """Ensures missing prices, including leading ones, hold the streaming EMA exactly as they hold the batch one."""
+        df = self.df.copy()
+        df.loc[:4, 'Close'] = np.nan
+        df.loc[100:103, 'Close'] = np.nan
+        df.loc[np.random.default_rng(seed=7).random(size=len(df)) < 0.1, 'Close'] = np.nan
+
+        actual = _stream(maths.StreamingEma(metric_col='Close', rolling_window=20), df)
+        expected = maths.ema(df=df, metric_col='Close', rolling_window=20)['20ema']
+
+        self.assert_matches(actual, expected)
+        self.assert_matches(actual, df['Close'].ewm(span=20, adjust=False, ignore_na=True, min_periods=20).mean())
+
+
+class TestStreamingAvgTrueRange(StreamingTestCase):
+    def test_update(self):
+        """Ensures the streaming ATR matches the batch ATR."""
+        actual = _stream(maths.StreamingAvgTrueRange(low_col='Low', high_col='High', rolling_window=14), self.df)
+        expected = maths.avg_true_range(df=self.df, low_col='Low', high_col='High', rolling_window=14)['ATR']
+
+        self.assert_matches(actual, expected)
+
+
+class TestStreamingBollingerBands(StreamingTestCase):
+    def test_update(self):
+        """Ensures the streaming Bollinger bands match the batch bands."""
+        actual = pd.DataFrame(_stream(maths.StreamingBollingerBands(metric_col='Close', rolling_window=20), self.df))
+        expected = maths.upper_band(df=maths.lower_band(df=self.df, metric_col='Close'), metric_col='Close')
+
+        for column in ['20sma', '20stddev', 'lower_band', 'upper_band']:
+            self.assert_matches(actual[column], expected[column])
+
+    def test_band_multiplier(self):
+        """Ensures the bands sit as many standard deviations out as the batch bands with the same multiplier."""
+        indicator = maths.StreamingBollingerBands(metric_col='Close', rolling_window=20, band_multiplier=2.5)
+        actual = pd.DataFrame(_stream(indicator, self.df))
+        expected = maths.upper_band(df=maths.lower_band(df=self.df, metric_col='Close', band_multiplier=2.5),
+                                    metric_col='Close', band_multiplier=2.5)
+
+        for column in ['lower_band', 'upper_band']:
+            self.assert_matches(actual[column], expected[column])
+
+
+class TestStreamingKeltnerChannels(StreamingTestCase):
+    def test_update(self):
+        """Ensures the streaming Keltner channels match the batch channels."""
+        indicator = maths.StreamingKeltnerChannels(metric_col='Close', low_col='Low', high_col='High')
+        actual = pd.DataFrame(_stream(indicator, self.df))
+        expected = maths.upper_keltner(df=maths.lower_keltner(df=self.df, metric_col='Close', low_col='Low',
+                                                              high_col='High'),
+                                       metric_col='Close', low_col='Low', high_col='High')
+
+        for column in ['20sma', 'ATR', 'lower_keltner', 'upper_keltner']:
+            self.assert_matches(actual[column], expected[column])
+
+    def test_keltner_multiplier(self):
+        """Ensures the channels sit as many average true ranges out as the batch channels with the same multiplier."""
+        indicator = maths.StreamingKeltnerChannels(metric_col='Close', low_col='Low', high_col='High',
+                                                   keltner_multiplier=2.0)
+        actual = pd.DataFrame(_stream(indicator, self.df))
+        expected = maths.upper_keltner(df=maths.lower_keltner(df=self.df, metric_col='Close', low_col='Low',
+                                                              high_col='High', keltner_multiplier=2.0),
+                                       metric_col='Close', low_col='Low', high_col='High', keltner_multiplier=2.0)
+
+        for column in ['lower_keltner', 'upper_keltner']:
+            self.assert_matches(actual[column], expected[column])
+
+
+class TestRollingWindow(unittest.TestCase):
+    def test_invalid_window(self):
+        """Ensures a non-positive window is rejected."""
+        with self.assertRaises(ValueError):
+            maths.RollingWindow(rolling_window=0)
+
+    def test_warm_up(self):
+        """Ensures nothing is reported until the window is full."""
+        window = maths.RollingWindow(rolling_window=3)
+        window.push(1)
+        window.push(2)
+        assert np.isnan(window.mean)
+
+        window.push(3)
+        assert window.mean == 2
+        assert window.stddev == 1
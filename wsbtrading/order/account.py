@@ -1,17 +1,19 @@
-import requests
-import json
-import alpaca_trade_api as tradeapi
-
 from typing import Dict
 
-from wsbtrading.instrumentation import Alpaca as iAlpaca
+from wsbtrading.data_io import data_io
+from wsbtrading.instrumentation import profiling
 
 
-def get_account(trading_type: str) -> Dict[str, str]:
+@profiling.instrument
+def get_account(trading_type: str, max_age: float = 5.0) -> Dict[str, str]:
     """Returns a JSON blog of open order.
 
+    The account is cached for ``max_age`` seconds, see :func:`wsbtrading.data_io.alpaca_account`, so polling it in a
+    loop doesn't hit the API on every pass.
+
     Args:
         trading_type: denotes live versus paper trading
+        max_age: the most seconds to reuse a fetched account for; 0 always fetches it
 
     Returns:
         a dictionary of account information, such as cash on hand, account value, etc.
@@ -56,10 +58,4 @@ def get_account(trading_type: str) -> Dict[str, str]:
         from wsbtrading.order import account
         account.get_account(trading_type='paper_trading')
     """
-    base_url = iAlpaca.api_call[trading_type]['base_url']
-    api_key = iAlpaca.api_key
-    api_secret = iAlpaca.api_secret
-
-    api = tradeapi.REST(api_key, api_secret, base_url, api_version='v2')
-
-    return api.get_account()
+    return data_io.alpaca_account(trading_type=trading_type, max_age=max_age)
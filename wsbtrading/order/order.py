@@ -3,8 +3,10 @@ import json
 from typing import Dict, Any
 
 from wsbtrading.instrumentation import Alpaca as iAlpaca
+from wsbtrading.instrumentation import profiling
 
 
+@profiling.instrument
 def execute_order(stock_ticker: str, qty: int, side: str, type: str, time_in_force: str, trading_type: str) \
         -> Dict[str, Any]:
     """Configures and executes an order.
@@ -51,6 +53,7 @@ def execute_order(stock_ticker: str, qty: int, side: str, type: str, time_in_for
     return json.loads(r.content)
 
 
+@profiling.instrument
 def get_orders(trading_type: str) -> Dict[str, Any]:
     """Returns a JSON blog of open order(s).
 
@@ -0,0 +1,311 @@
+"""An asynchronous Alpaca order client, for sending a batch of orders at once over one keep-alive session.
+
+:func:`wsbtrading.order.order.execute_order` opens a new connection, and TLS handshake, per order and waits for each
+reply before sending the next. :class:`OrderClient` keeps one ``aiohttp`` session open for all of them, sends up to
+``max_concurrency`` at a time, keeps under Alpaca's limit of 200 requests a minute on the client side, and retries
+throttled, failed or dropped requests with jittered exponential backoff.
+
+Every order is given a ``client_order_id`` before it is first sent, so a retried order that had in fact gone through is
+rejected as a duplicate by Alpaca instead of being placed twice, and the order placed the first time is looked up and
+returned in its place.
+"""
+import asyncio
+import collections
+import json
+import random
+import time
+import uuid
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import aiohttp
+
+from wsbtrading.instrumentation import Alpaca as iAlpaca
+from wsbtrading.instrumentation import profiling
+
+RATE_LIMIT = 200
+RATE_PERIOD = 60.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+DUPLICATE_STATUS = 422
+
+
+class OrderResult(NamedTuple):
+    """The outcome of one order of a batch.
+
+    Args:
+        order: the order as sent, including its ``client_order_id``
+        status: the HTTP status of the last attempt, or None if no reply ever came
+        response: the decoded reply, e.g. the order Alpaca accepted
+        error: why the order was not accepted, if it wasn't
+        attempts: the number of times the order was sent
+    """
+    order: Dict[str, Any]
+    status: Optional[int]
+    response: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int = 1
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and 200 <= self.status < 300
+
+
+class RateLimiter:
+    """Lets at most ``max_requests`` through in any ``period`` seconds, making the rest wait their turn.
+
+    Args:
+        max_requests: the most requests per period
+        period: the length of the sliding window, in seconds
+    """
+    def __init__(self, max_requests: int = RATE_LIMIT, period: float = RATE_PERIOD):
+        if max_requests < 1:
+            raise ValueError(f'max_requests must be at least 1, got {max_requests}.')
+        self.max_requests = max_requests
+        self.period = period
+        self._sent: Deque[float] = collections.deque()
+        # Made on the loop that first waits on it, and again on any later loop, since a lock belongs to one loop
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def acquire(self) -> None:
+        """Waits until a request can be sent without going over the limit, and counts it as sent."""
+        loop = asyncio.get_event_loop()
+        if self._lock_loop is not loop:
+            self._lock, self._lock_loop = asyncio.Lock(), loop
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._sent and self._sent[0] <= now - self.period:
+                    self._sent.popleft()
+                if len(self._sent) < self.max_requests:
+                    self._sent.append(now)
+                    return
+                await asyncio.sleep(self._sent[0] + self.period - now)
+
+
+def build_order(stock_ticker: str, qty: int, side: str, type: str, time_in_force: str,
+                client_order_id: Optional[str] = None) -> Dict[str, Any]:
+    """Builds the body of an order, as :func:`wsbtrading.order.order.execute_order` sends it.
+
+    Args:
+        stock_ticker: the company's stock ticker
+        qty: the number of shares to purchase
+        side: allows you to choose 'buy', 'sell' side (i.e. buying shares or selling them)
+        type: possible values for ``type`` are 'market', 'limit', 'stop', 'stop_limit', 'trailing_stop'
+        time_in_force: possible values are 'day', 'gtc', 'opg', 'cls', 'ioc', 'fok'
+        client_order_id: a unique id for the order; by default a random UUID
+
+    Returns:
+        the order
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.order import order_client
+        order_client.build_order(stock_ticker='TSLA', qty=10, side='buy', type='market', time_in_force='gtc')
+    """
+    return {
+        'symbol': stock_ticker,
+        'qty': qty,
+        'side': side,
+        'type': type,
+        'time_in_force': time_in_force,
+        'client_order_id': client_order_id or str(uuid.uuid4()),
+    }
+
+
+class OrderClient:
+    """Submits orders to Alpaca over one shared session, concurrently, rate limited and with retries.
+
+    Use it as an async context manager, so the session is closed once the orders are in.
+
+    Args:
+        trading_type: denotes live versus paper trading
+        base_url: the API root to send orders to; by default the one for ``trading_type``, e.g. a mock server in tests
+        headers: the authentication headers; by default the Alpaca keys
+        max_concurrency: the most orders in flight at once, which is also the most connections kept open
+        rate_limit: the most requests to send per ``rate_period`` seconds
+        rate_period: the window ``rate_limit`` applies to, in seconds
+        max_retries: the most times to resend an order after a throttled, failed or dropped request
+        backoff: the base of the exponential backoff between retries, in seconds
+        max_backoff: the longest to wait between retries, in seconds
+        timeout: the most seconds to wait for one reply
+
+    **Example**
+
+    .. code-block:: python
+
+        import asyncio
+        from wsbtrading.order import order_client
+
+        async def main():
+            async with order_client.OrderClient(trading_type='paper_trading') as client:
+                return await client.submit_orders([
+                    order_client.build_order(stock_ticker='GME', qty=10, side='buy', type='market',
+                                             time_in_force='gtc'),
+                    order_client.build_order(stock_ticker='AMC', qty=10, side='buy', type='market',
+                                             time_in_force='gtc'),
+                ])
+
+        asyncio.get_event_loop().run_until_complete(main())
+    """
+    def __init__(self,
+                 trading_type: str = 'paper_trading',
+                 base_url: Optional[str] = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 max_concurrency: int = 10,
+                 rate_limit: int = RATE_LIMIT,
+                 rate_period: float = RATE_PERIOD,
+                 max_retries: int = 3,
+                 backoff: float = 0.25,
+                 max_backoff: float = 8.0,
+                 timeout: float = 10.0):
+        base_url = base_url or iAlpaca.api_call[trading_type]['base_url']
+        self.order_url = f'{base_url}/v2/orders'
+        self.headers = headers if headers is not None else iAlpaca.headers
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(max_requests=rate_limit, period=rate_period)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> 'OrderClient':
+        # Made here rather than in __init__, so it belongs to the event loop the orders are sent on
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                              timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._session.close()
+        self._session = None
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full jitter: a random wait up to the exponential backoff, so retries from a batch don't arrive together.
+
+        A ``Retry-After`` the server sent with a 429 or 503 is waited out in full.
+        """
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        try:
+            return max(delay, float(retry_after)) if retry_after else delay
+        except ValueError:
+            return delay
+
+    async def _request(self, method: str, url: str, order: Dict[str, Any], attempt: int,
+                       **kwargs) -> Tuple[OrderResult, Optional[str]]:
+        """Makes one request about an order, returning the outcome and any ``Retry-After`` the server asked for."""
+        async with self._session.request(method, url, **kwargs) as response:
+            text = await response.text()
+            try:
+                body = json.loads(text) if text else None
+            except ValueError:
+                body = text
+            error = None
+            if not response.ok:
+                error = body.get('message', response.reason) if isinstance(body, dict) else response.reason
+
+            return OrderResult(order=order, status=response.status, response=body, error=error,
+                               attempts=attempt + 1), response.headers.get('Retry-After')
+
+    async def _post(self, order: Dict[str, Any], attempt: int) -> Tuple[OrderResult, Optional[str]]:
+        """Sends an order once."""
+        return await self._request('POST', self.order_url, order=order, attempt=attempt, json=order)
+
+    async def _find_placed(self, order: Dict[str, Any], attempt: int) -> Optional[OrderResult]:
+        """Looks up the order already placed under ``order``'s ``client_order_id``, or None if it can't be found."""
+        await self.rate_limiter.acquire()
+        try:
+            result, _ = await self._request('GET', f'{self.order_url}:by_client_order_id', order=order,
+                                            attempt=attempt, params={'client_order_id': order['client_order_id']})
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            return None
+
+        return result if result.ok else None
+
+    @profiling.instrument
+    async def submit_order(self, order: Dict[str, Any]) -> OrderResult:
+        """Sends one order, retrying throttled (429), failed (5xx) and dropped requests.
+
+        Args:
+            order: the order body, see :func:`build_order`; a ``client_order_id`` is added if it has none
+
+        Returns:
+            the outcome; other client errors, e.g. 403 for insufficient buying power, are returned without a retry. A
+            resend rejected as a duplicate (422) means an earlier attempt was placed, whose reply never came; that
+            order is fetched and returned instead
+        """
+        if self._session is None:
+            raise RuntimeError('OrderClient must be used as "async with OrderClient(...) as client".')
+        order = {**order, 'client_order_id': order.get('client_order_id') or str(uuid.uuid4())}
+
+        async with self._slots:
+            result, retry_after = None, None
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    await asyncio.sleep(self._retry_delay(attempt=attempt - 1, retry_after=retry_after))
+                await self.rate_limiter.acquire()
+                try:
+                    result, retry_after = await self._post(order=order, attempt=attempt)
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    result, retry_after = OrderResult(order=order, status=None, error=repr(e),
+                                                      attempts=attempt + 1), None
+                    continue
+                if result.status not in RETRY_STATUSES:
+                    break
+
+            if attempt and result.status == DUPLICATE_STATUS:
+                result = await self._find_placed(order=order, attempt=attempt) or result
+
+            return result
+
+    @profiling.instrument
+    async def submit_orders(self, orders: Sequence[Dict[str, Any]]) -> List[OrderResult]:
+        """Sends a batch of orders concurrently.
+
+        Args:
+            orders: the order bodies, see :func:`build_order`
+
+        Returns:
+            the outcome of each order, in the same order as ``orders``
+        """
+        return list(await asyncio.gather(*(self.submit_order(order) for order in orders)))
+
+
+def submit_orders(orders: Sequence[Dict[str, Any]], trading_type: str, **kwargs) -> List[OrderResult]:
+    """Sends a batch of orders from synchronous code, over one session; see :class:`OrderClient`.
+
+    Args:
+        orders: the order bodies, see :func:`build_order`
+        trading_type: denotes live versus paper trading
+        kwargs: any other :class:`OrderClient` setting
+
+    Returns:
+        the outcome of each order, in the same order as ``orders``
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.order import order_client
+        results = order_client.submit_orders(
+            orders=[order_client.build_order(stock_ticker=ticker, qty=100, side='buy', type='market',
+                                             time_in_force='gtc') for ticker in ['GME', 'AMC', 'BB']],
+            trading_type='paper_trading'
+        )
+        [result.error for result in results if not result.ok]
+    """
+    async def submit() -> List[OrderResult]:
+        async with OrderClient(trading_type=trading_type, **kwargs) as client:
+            return await client.submit_orders(orders)
+
+    # A loop of its own, which asyncio.run would make but needs Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(submit())
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
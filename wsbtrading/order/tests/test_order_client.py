@@ -0,0 +1,285 @@
+import asyncio
+import functools
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from wsbtrading.order import order_client
+
+HEADERS = {'APCA-API-KEY-ID': 'key', 'APCA-API-SECRET-KEY': 'secret'}
+
+
+class MockAlpaca:
+    """A stand-in for the Alpaca orders endpoint, which can be told to fail a ticker's first few attempts, or to place
+    its first order and then drop the connection instead of replying."""
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.failures = {}
+        self.dropped = set()
+        self.placed = {}
+        self.lookups = 0
+        self.attempts = {}
+        self.client_order_ids = {}
+        self.sent_at = []
+        self.peers = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def post_order(self, request: web.Request) -> web.Response:
+        if request.headers.get('APCA-API-KEY-ID') != 'key':
+            return web.json_response({'code': 40110000, 'message': 'request is not authorized'}, status=401)
+        order = await request.json()
+        symbol = order['symbol']
+        self.sent_at.append(time.monotonic())
+        self.peers.add(request.transport.get_extra_info('peername'))
+        self.attempts[symbol] = self.attempts.get(symbol, 0) + 1
+        self.client_order_ids.setdefault(symbol, set()).add(order['client_order_id'])
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+        failures = self.failures.get(symbol, [])
+        if self.attempts[symbol] <= len(failures):
+            status = failures[self.attempts[symbol] - 1]
+            if status == 502:
+                return web.Response(text='<html>Bad Gateway</html>', status=502, content_type='text/html')
+            return web.json_response({'message': f'failed with {status}'}, status=status,
+                                     headers={'Retry-After': '0'} if status == 429 else None)
+        if order['qty'] > 1000:
+            return web.json_response({'code': 40310000, 'message': 'insufficient buying power'}, status=403)
+        if order['client_order_id'] in self.placed:
+            return web.json_response({'code': 40010001, 'message': 'client_order_id must be unique'}, status=422)
+
+        placed = {'id': f'order-{symbol}', 'client_order_id': order['client_order_id'], 'symbol': symbol,
+                  'qty': str(order['qty']), 'status': 'accepted'}
+        self.placed[order['client_order_id']] = placed
+        if symbol in self.dropped:
+            self.dropped.discard(symbol)
+            request.transport.close()
+        return web.json_response(placed)
+
+    async def get_order(self, request: web.Request) -> web.Response:
+        self.lookups += 1
+        placed = self.placed.get(request.query.get('client_order_id'))
+        if placed is None:
+            return web.json_response({'code': 40410000, 'message': 'order not found'}, status=404)
+
+        return web.json_response(placed)
+
+
+class LoopTestCase(unittest.TestCase):
+    """Gives every test an event loop of its own, as unittest.IsolatedAsyncioTestCase does from Python 3.8."""
+    def setUp(self) -> None:
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self) -> None:
+        self.loop.close()
+
+
+def _in_loop(test):
+    """Runs a coroutine test method to completion on the test case's event loop."""
+    @functools.wraps(test)
+    def wrapper(self):
+        return self.loop.run_until_complete(test(self))
+
+    return wrapper
+
+
+class TestOrderClient(LoopTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.alpaca = MockAlpaca()
+        app = web.Application()
+        app.router.add_post('/v2/orders', self.alpaca.post_order)
+        app.router.add_get('/v2/orders:by_client_order_id', self.alpaca.get_order)
+        self.server = TestServer(app, loop=self.loop)
+        self.loop.run_until_complete(self.server.start_server())
+        self.base_url = str(self.server.make_url('')).rstrip('/')
+
+    def tearDown(self) -> None:
+        self.loop.run_until_complete(self.server.close())
+        super().tearDown()
+
+    def _client(self, **kwargs) -> order_client.OrderClient:
+        return order_client.OrderClient(base_url=self.base_url, headers=HEADERS, backoff=0.001, **kwargs)
+
+    def _orders(self, n: int, qty: int = 10):
+        return [order_client.build_order(stock_ticker=f'T{i:03d}', qty=qty, side='buy', type='market',
+                                         time_in_force='gtc') for i in range(n)]
+
+    @_in_loop
+    async def test_submit_orders(self):
+        """Ensures every order is accepted, results keep the batch's order, and connections are reused."""
+        self.alpaca.delay = 0.01
+        orders = self._orders(50)
+
+        async with self._client(max_concurrency=5) as client:
+            results = await client.submit_orders(orders)
+
+        assert [result.order['symbol'] for result in results] == [order['symbol'] for order in orders]
+        assert all(result.ok and result.attempts == 1 for result in results)
+        assert results[7].response['id'] == 'order-T007'
+        assert self.alpaca.max_in_flight == 5
+        assert len(self.alpaca.peers) <= 5
+
+    @_in_loop
+    async def test_retry(self):
+        """Ensures throttled and failed requests are retried with the same client_order_id, and rejections are not."""
+        self.alpaca.failures = {'T000': [429, 500], 'T001': [502]}
+        orders = self._orders(3)
+        orders.append(order_client.build_order(stock_ticker='BIG', qty=5000, side='buy', type='market',
+                                               time_in_force='gtc'))
+
+        async with self._client() as client:
+            results = await client.submit_orders(orders)
+
+        assert [result.attempts for result in results] == [3, 2, 1, 1]
+        assert [result.ok for result in results] == [True, True, True, False]
+        assert results[3].status == 403
+        assert results[3].error == 'insufficient buying power'
+        assert all(len(ids) == 1 for ids in self.alpaca.client_order_ids.values())
+
+    @_in_loop
+    async def test_dropped_then_duplicate(self):
+        """Ensures an order placed on an attempt whose reply was dropped is fetched when its resend is a duplicate."""
+        self.alpaca.dropped = {'T000'}
+        order = self._orders(1)[0]
+
+        async with self._client() as client:
+            result = await client.submit_order(order)
+
+        assert result.ok
+        assert result.attempts == self.alpaca.attempts['T000'] == 2
+        assert result.response == self.alpaca.placed[order['client_order_id']]
+        assert len(self.alpaca.placed) == 1
+        assert self.alpaca.lookups == 1
+
+    @_in_loop
+    async def test_retries_exhausted(self):
+        """Ensures an order that keeps failing is given up on after max_retries resends."""
+        self.alpaca.failures = {'T000': [503] * 5}
+
+        async with self._client(max_retries=2) as client:
+            result = await client.submit_order(self._orders(1)[0])
+
+        assert not result.ok
+        assert result.status == 503
+        assert result.attempts == self.alpaca.attempts['T000'] == 3
+
+    @_in_loop
+    async def test_rate_limit(self):
+        """Ensures requests over rate_limit wait for the next rate_period."""
+        start = time.monotonic()
+        async with self._client(rate_limit=4, rate_period=0.2) as client:
+            results = await client.submit_orders(self._orders(10))
+
+        assert all(result.ok for result in results)
+        assert time.monotonic() - start >= 0.4
+
+    @_in_loop
+    async def test_connection_error(self):
+        """Ensures a server that can't be reached is reported per order, after the retries."""
+        await self.server.close()
+
+        async with self._client(max_retries=1) as client:
+            result = await client.submit_order(self._orders(1)[0])
+
+        assert result.status is None
+        assert result.attempts == 2
+        assert 'Connect' in result.error
+
+    @_in_loop
+    async def test_not_entered(self):
+        """Ensures using the client outside ``async with`` fails clearly."""
+        with self.assertRaises(RuntimeError):
+            await self._client().submit_order(self._orders(1)[0])
+
+
+class TestRateLimiter(LoopTestCase):
+    @_in_loop
+    async def test_sliding_window(self):
+        """Ensures no more than max_requests are let through in any window of period seconds."""
+        limiter = order_client.RateLimiter(max_requests=3, period=0.1)
+        acquired_at = []
+
+        async def acquire():
+            await limiter.acquire()
+            acquired_at.append(time.monotonic())
+
+        await asyncio.gather(*(acquire() for _ in range(10)))
+
+        acquired_at.sort()
+        assert all(acquired_at[i + 3] - acquired_at[i] >= 0.1 - 0.01 for i in range(len(acquired_at) - 3))
+        assert acquired_at[-1] - acquired_at[0] >= 0.3 - 0.01
+
+    def test_invalid_limit(self):
+        with self.assertRaises(ValueError):
+            order_client.RateLimiter(max_requests=0)
+
+
+class TestRetryDelay(unittest.TestCase):
+    def test_retry_delay(self):
+        """Ensures the backoff is jittered, capped, and never shorter than a Retry-After."""
+        client = order_client.OrderClient(base_url='http://localhost', backoff=1.0, max_backoff=4.0)
+
+        with patch.object(order_client.random, 'uniform', side_effect=lambda low, high: high):
+            assert client._retry_delay(attempt=0) == 1.0
+            assert client._retry_delay(attempt=5) == 4.0
+            assert client._retry_delay(attempt=0, retry_after='7') == 7.0
+            assert client._retry_delay(attempt=0, retry_after='Wed, 21 Oct 2015 07:28:00 GMT') == 1.0
+
+
+class TestSubmitOrders(unittest.TestCase):
+    def setUp(self) -> None:
+        # The mock server gets an event loop of its own, in a thread, since submit_orders runs one in this thread
+        self.alpaca = MockAlpaca()
+        app = web.Application()
+        app.router.add_post('/v2/orders', self.alpaca.post_order)
+        self.loop = asyncio.new_event_loop()
+        self.server = TestServer(app, loop=self.loop)
+        self.loop.run_until_complete(self.server.start_server())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self) -> None:
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def test_submit_orders(self):
+        """Ensures the synchronous wrapper sends the batch on an event loop of its own."""
+        orders = [order_client.build_order(stock_ticker=ticker, qty=10, side='buy', type='market', time_in_force='gtc')
+                  for ticker in ['GME', 'AMC']]
+
+        results = order_client.submit_orders(orders=orders, trading_type='paper_trading', headers=HEADERS,
+                                             base_url=str(self.server.make_url('')).rstrip('/'))
+
+        assert [result.response['symbol'] for result in results] == ['GME', 'AMC']
+
+    def test_reuse_across_loops(self):
+        """Ensures a client made outside any event loop can send batches on one loop after another."""
+        client = order_client.OrderClient(base_url=str(self.server.make_url('')).rstrip('/'), headers=HEADERS,
+                                          max_concurrency=3, rate_limit=2, rate_period=0.05)
+
+        async def submit():
+            async with client:
+                return await client.submit_orders([
+                    order_client.build_order(stock_ticker=f'T{i}', qty=10, side='buy', type='market',
+                                             time_in_force='gtc') for i in range(6)])
+
+        for _ in range(2):
+            loop = asyncio.new_event_loop()
+            try:
+                results = loop.run_until_complete(submit())
+            finally:
+                loop.close()
+            assert all(result.ok for result in results)
@@ -0,0 +1,32 @@
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from wsbtrading.order import utils
+
+
+def _epoch(timestamp: str) -> float:
+    return pd.Timestamp(timestamp, tz='US/Eastern').timestamp()
+
+
+class TestMarketClock(unittest.TestCase):
+    def test_time_to_market_close(self):
+        assert utils.time_to_market_close(now=_epoch('2021-02-10 15:00')) == 3600.0
+        # The day after Thanksgiving closes at 1pm
+        assert utils.time_to_market_close(now=_epoch('2020-11-27 12:00')) == 3600.0
+
+    @patch.object(utils, 'sleep')
+    @patch.object(utils.time, 'time', return_value=_epoch('2021-02-12 17:00'))
+    def test_wait_for_market_open(self, TimeMock, SleepMock):
+        """Ensures a Friday evening waits out the weekend and Presidents' Day."""
+        utils.wait_for_market_open()
+
+        SleepMock.assert_called_once_with(round(_epoch('2021-02-16 09:30') - _epoch('2021-02-12 17:00')))
+
+    @patch.object(utils, 'sleep')
+    @patch.object(utils.time, 'time', return_value=_epoch('2021-02-10 10:00'))
+    def test_market_already_open(self, TimeMock, SleepMock):
+        utils.wait_for_market_open()
+
+        SleepMock.assert_not_called()
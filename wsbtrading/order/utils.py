@@ -1,26 +1,26 @@
-import logging
+import time
 from time import sleep
+from typing import Optional
 
-import alpaca_trade_api as tradeapi
-import pandas as pd
+from wsbtrading.data_io import data_io
+from wsbtrading.utils import dates
 
-from wsbtrading.instrumentation import Alpaca as iAlpaca
 
+def api_start(trading_type: str = 'live_trading'):
+    """Returns the shared Alpaca client, see :func:`wsbtrading.data_io.alpaca_rest_api_conn`."""
+    return data_io.alpaca_rest_api_conn(trading_type=trading_type)
 
-def api_start():
-    api_key = iAlpaca.api_key
-    api_secret = iAlpaca.api_secret
-    base_url = iAlpaca.live_trading_url
-    api = tradeapi.REST(api_key, api_secret, base_url, api_version='v2')
 
-    return api
-
-
-def time_to_market_close() -> float:
+def time_to_market_close(now: Optional[float] = None) -> float:
     """Calculate the time (seconds) until the market closes
 
     Note:
-        this is mostly to be used to stop ourselves from making orders to soon before the bell closes.
+        this is mostly to be used to stop ourselves from making orders to soon before the bell closes. It reads the
+        local NYSE calendar (see :func:`wsbtrading.utils.dates.seconds_to_market_close`), so it needs no network and
+        is cheap to call in a loop.
+
+    Args:
+        now: the moment to measure from, in seconds since the epoch; by default now
 
     **Example**
 
@@ -29,24 +29,20 @@ def time_to_market_close() -> float:
         from wsbtrading.order import utils
         utils.time_to_market_close()
     """
-    api = api_start()
-    clock = api.get_clock()
-
-    return (clock.next_close - clock.timestamp).total_seconds()
+    return dates.seconds_to_market_close(now=now)
 
 
 def wait_for_market_open():
-    """Function to make ourselves wait for the market to open.
+    """Function to make ourselves wait for the market to open, according to the local NYSE calendar.
 
     **Example**
 
     .. code-block:: python
 
         from wsbtrading.order import utils
-        utils.time_to_market_close()
+        utils.wait_for_market_open()
     """
-    api = api_start()
-    clock = api.get_clock()
-    if not clock.is_open:
-        time_to_open = (clock.next_open - clock.timestamp).total_seconds()
+    now = time.time()
+    if not dates.is_market_open(now=now):
+        time_to_open = dates.next_market_open(now=now) - now
         sleep(round(time_to_open))
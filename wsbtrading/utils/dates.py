@@ -1,7 +1,18 @@
-"""Functions to wrangle dates."""
+"""Functions to wrangle dates, and the NYSE trading calendar.
+
+The calendar holds every NYSE session from 1990 through 2040, with its open and close (early closes included), as
+sorted lists built once when the module is imported. Queries are a binary search over those lists, so they take well
+under a microsecond and never touch the network.
+"""
+import bisect
+import functools
+import time
+from datetime import date as Date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Union
 
-from datetime import datetime, timedelta
-from typing import List
+import numpy as np
+import pandas as pd
+from dateutil.easter import easter
 
 
 def convert_unix_timestamp_to_date_kernel(timestamp: int, output_time: bool = False) -> str:
@@ -75,11 +86,12 @@ def build_date_range(start_date: str, end_date: str) -> List[str]:
     return [(start_date + timedelta(days=+x)).strftime('%Y-%m-%d') for x in range(0, (end_date - start_date).days + 1)]
 
 
-def date_range_to_unix_range(date_range: List[str]) -> str:
+def date_range_to_unix_range(date_range: Union[List[str], 'np.ndarray', 'pd.Index']) -> str:
     """Formats an array of dates to a string that can be used in file paths names.
 
     Args:
-        date_range: a list of dates, formatted as YYYY-MM-DD
+        date_range: a list of dates, formatted as YYYY-MM-DD, or an array or index of dates, e.g. from
+            :func:`build_date_range_array`, which are formatted in one pass
 
     Returns:
         a string that looks like a dict filled with dates
@@ -92,6 +104,9 @@ def date_range_to_unix_range(date_range: List[str]) -> str:
         dates.date_range_to_unix_range(['2020-04-01', '2020-04-02', '2020-04-03'])
         # '{2020-04-01,2020-04-02,2020-04-03}'
     """
+    if not isinstance(date_range, list):
+        date_range = dates_to_strings(date_range)
+
     return '{%s}' % ','.join(date_range)
 
 
@@ -119,40 +134,483 @@ def date_slider(date: str, days_to_add: int) -> str:
     return (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=days_to_add)).strftime('%Y-%m-%d')
 
 
-import datetime
-import pandas as pd
-import time
+# ----------------
+# NYSE calendar  |
+# ----------------
+CALENDAR_START_YEAR = 1990
+CALENDAR_END_YEAR = 2040
+EXCHANGE_TIMEZONE = 'America/New_York'
+REGULAR_OPEN = timedelta(hours=9, minutes=30)
+REGULAR_CLOSE = timedelta(hours=16)
+EARLY_CLOSE = timedelta(hours=13)
+
+# Closures outside the regular holiday rules: presidential funerals and days of mourning, 9/11, Hurricane Sandy
+SPECIAL_CLOSURES = [
+    Date(1994, 4, 27), Date(2001, 9, 11), Date(2001, 9, 12), Date(2001, 9, 13), Date(2001, 9, 14), Date(2004, 6, 11),
+    Date(2007, 1, 2), Date(2012, 10, 29), Date(2012, 10, 30), Date(2018, 12, 5), Date(2025, 1, 9),
+]
+SPECIAL_EARLY_CLOSES = [Date(1997, 12, 26), Date(1999, 12, 31), Date(2003, 12, 26)]
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> Date:
+    """The ``n``-th ``weekday`` (Monday is 0) of a month, or the last one when ``n`` is -1."""
+    if n > 0:
+        first = Date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = Date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: Date) -> Date:
+    """Moves a holiday falling on a Saturday to the Friday before, and one falling on a Sunday to the Monday after."""
+    return day + timedelta(days={5: -1, 6: 1}.get(day.weekday(), 0))
+
+
+def nyse_holidays(year: int) -> List[Date]:
+    """Lists the weekdays the NYSE is closed for a holiday in a year, by its current rules.
+
+    Args:
+        year: the year
+
+    Returns:
+        the holidays, in date order; special closures such as days of mourning are in ``SPECIAL_CLOSURES``
+
+    **Example**
+
+    .. code-block:: python
 
-def is_business_day(date):
-    """Tells us whether a given date is a business day or note
+        from wsbtrading.utils import dates
+        dates.nyse_holidays(2021)[:2]
+        # [datetime.date(2021, 1, 1), datetime.date(2021, 1, 18)]
+    """
+    holidays = [
+        _nth_weekday(year, 2, 0, 3),                        # Washington's Birthday
+        easter(year) - timedelta(days=2),                   # Good Friday
+        _nth_weekday(year, 5, 0, -1),                       # Memorial Day
+        _observed(Date(year, 7, 4)),                        # Independence Day
+        _nth_weekday(year, 9, 0, 1),                        # Labor Day
+        _nth_weekday(year, 11, 3, 4),                       # Thanksgiving
+        _observed(Date(year, 12, 25)),                      # Christmas
+    ]
+    # A New Year's Day on a Saturday is not made up for on the Friday before
+    if Date(year, 1, 1).weekday() != 5:
+        holidays.append(_observed(Date(year, 1, 1)))
+    if year >= 1998:
+        holidays.append(_nth_weekday(year, 1, 0, 3))        # Martin Luther King Jr. Day
+    if year >= 2022:
+        holidays.append(_observed(Date(year, 6, 19)))       # Juneteenth
+
+    return sorted(holidays)
+
+
+def _early_closes(year: int) -> Dict[Date, timedelta]:
+    """The sessions of a year that close early, and the time they close at."""
+    close = EARLY_CLOSE if year >= 1993 else timedelta(hours=14)
+    closes = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1): close}    # the day after Thanksgiving
+    christmas_eve = Date(year, 12, 24)
+    if christmas_eve.weekday() < 4:
+        closes[christmas_eve] = close
+    july_3 = Date(year, 7, 3)
+    if july_3.weekday() in (0, 1, 3) and year >= 1995 or july_3.weekday() == 2 and year >= 2013:
+        closes[july_3] = EARLY_CLOSE
+    closes.update({day: EARLY_CLOSE for day in SPECIAL_EARLY_CLOSES if day.year == year})
+
+    return closes
+
+
+def _build_sessions(first_year: int, last_year: int) -> 'pd.DataFrame':
+    """Lists every session between two years, with its open and close in UTC."""
+    closed, early_closes = set(SPECIAL_CLOSURES), {}
+    for year in range(first_year, last_year + 1):
+        closed.update(nyse_holidays(year))
+        early_closes.update(_early_closes(year))
+
+    calendar_days = np.arange(f'{first_year}-01-01', f'{last_year + 1}-01-01', dtype='datetime64[D]')
+    # The epoch was a Thursday, so this is the weekday with Monday as 0
+    weekdays = (calendar_days.astype(np.int64) + 3) % 7
+    days = calendar_days[(weekdays < 5) & ~np.isin(calendar_days, np.array(sorted(closed), dtype='datetime64[D]'))]
+    days = pd.DatetimeIndex(days)
+    closes = pd.Series(REGULAR_CLOSE, index=days)
+    early = pd.Series(early_closes)
+    early.index = pd.DatetimeIndex(early.index)
+    closes.update(early[early.index.isin(days)])
+
+    return pd.DataFrame({
+        'open': (days + REGULAR_OPEN).tz_localize(EXCHANGE_TIMEZONE).tz_convert('UTC'),
+        'close': (days + pd.TimedeltaIndex(closes)).tz_localize(EXCHANGE_TIMEZONE).tz_convert('UTC'),
+    }, index=pd.Index(days, name='date'))
+
+
+def _epoch_seconds(timestamps: 'pd.Series') -> List[float]:
+    return ((timestamps - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)).tolist()
+
+
+SESSIONS = _build_sessions(first_year=CALENDAR_START_YEAR, last_year=CALENDAR_END_YEAR)
+# Plain sorted lists, which ``bisect`` searches faster than numpy can for a single value
+_SESSION_OPENS = _epoch_seconds(SESSIONS['open'])
+_SESSION_CLOSES = _epoch_seconds(SESSIONS['close'])
+# Whole days are looked up by hash instead, as a date and as its YYYY-MM-DD string, which skips parsing the string;
+# the strings of the days the exchange is closed are kept too, so those skip parsing as well
+_SESSION_DATES = frozenset(SESSIONS.index.date)
+_SESSION_STRINGS = frozenset(SESSIONS.index.strftime('%Y-%m-%d').tolist())
+_CLOSED_STRINGS = frozenset(pd.date_range(f'{CALENDAR_START_YEAR}-01-01', f'{CALENDAR_END_YEAR}-12-31')
+                            .strftime('%Y-%m-%d').tolist()) - _SESSION_STRINGS
+_FIRST_DATE, _LAST_DATE = Date(CALENDAR_START_YEAR, 1, 1), Date(CALENDAR_END_YEAR, 12, 31)
+_FIRST_DAY, _LAST_DAY = _FIRST_DATE.isoformat(), _LAST_DATE.isoformat()
+_bisect_right = bisect.bisect_right
+
+
+def _past_calendar_end(now: float) -> ValueError:
+    return ValueError(f'{datetime.utcfromtimestamp(now)} is past the end of the trading calendar '
+                      f'({CALENDAR_END_YEAR}).')
+
+
+def is_business_day(date: Union[str, Date, datetime]) -> bool:
+    """Tells us whether the NYSE trades on a given date.
 
     Note:
         useful for when we want to see if trading is possible on some given day
 
     Args:
-        date: the date to be query
+        date: the date to query, as a date, datetime, ``numpy.datetime64`` or string pandas can parse, fastest as
+            YYYY-MM-DD; for a datetime only its date is looked at
 
     Returns:
-        0 for weekends, 1 for weekdays
+        False for weekends, holidays and other closures, True for trading days
+
+    Raises:
+        ValueError: if the date can't be parsed, or is outside the calendar, 1990 through 2040
 
     **Example**
 
     .. code-block:: python
 
         from wsbtrading.utils import dates
-        dates.is_business_day(date='2020-01-01', '2020-01-01)
-        # '2020-01-08'
+        dates.is_business_day(date='2020-01-01')
+        # False
     """
-    return bool(len(pd.bdate_range(date, date)))
+    if isinstance(date, str):
+        if date in _SESSION_STRINGS:
+            return True
+        if date in _CLOSED_STRINGS:
+            return False
+    if isinstance(date, datetime):
+        day = date.date()
+    elif isinstance(date, Date):
+        day = date
+    else:
+        # Anything else, e.g. a non-ISO string or a numpy datetime64, is left to pandas to parse
+        timestamp = pd.Timestamp(date)
+        if timestamp is pd.NaT:
+            raise ValueError(f'{date!r} is not a date.')
+        day = timestamp.date()
+    if day in _SESSION_DATES:
+        return True
+    if not _FIRST_DATE <= day <= _LAST_DATE:
+        raise ValueError(f'{date} is outside the trading calendar ({CALENDAR_START_YEAR}-{CALENDAR_END_YEAR}).')
+
+    return False
+
+
+def is_market_open(now: Optional[float] = None) -> bool:
+    """Tells us whether the NYSE is in a session at a moment.
+
+    Args:
+        now: the moment, in seconds since the epoch; by default now
 
-    date.isin(holidays)
+    Returns:
+        whether the market is open
 
-import pandas as pd
-from pandas.tseries.holiday import USFederalHolidayCalendar as calendar
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.utils import dates
+        dates.is_market_open()
+    """
+    if now is None:
+        now = time.time()
+    position = _bisect_right(_SESSION_OPENS, now) - 1
+
+    return position >= 0 and now < _SESSION_CLOSES[position]
+
+
+def next_market_open(now: Optional[float] = None) -> float:
+    """Finds the first session open after a moment.
+
+    Args:
+        now: the moment, in seconds since the epoch; by default now
+
+    Returns:
+        the open, in seconds since the epoch
+
+    Raises:
+        ValueError: if there is no session after ``now`` in the calendar
+
+    **Example**
+
+    .. code-block:: python
+
+        from datetime import datetime
+        from wsbtrading.utils import dates
+        datetime.utcfromtimestamp(dates.next_market_open())
+    """
+    if now is None:
+        now = time.time()
+    try:
+        return _SESSION_OPENS[_bisect_right(_SESSION_OPENS, now)]
+    except IndexError:
+        raise _past_calendar_end(now) from None
+
+
+def next_market_close(now: Optional[float] = None) -> float:
+    """Finds the first session close after a moment, i.e. today's close during a session.
+
+    Args:
+        now: the moment, in seconds since the epoch; by default now
+
+    Returns:
+        the close, in seconds since the epoch
+
+    Raises:
+        ValueError: if there is no session after ``now`` in the calendar
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.utils import dates
+        dates.next_market_close() - time.time()
+    """
+    if now is None:
+        now = time.time()
+    try:
+        return _SESSION_CLOSES[_bisect_right(_SESSION_CLOSES, now)]
+    except IndexError:
+        raise _past_calendar_end(now) from None
+
+
+def seconds_to_market_close(now: Optional[float] = None) -> float:
+    """Calculates the seconds from a moment until the next session close.
+
+    Args:
+        now: the moment, in seconds since the epoch; by default now
+
+    Returns:
+        the seconds left until the close; outside a session, until the close of the next one
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.utils import dates
+        dates.seconds_to_market_close()
+    """
+    if now is None:
+        now = time.time()
+    try:
+        return _SESSION_CLOSES[_bisect_right(_SESSION_CLOSES, now)] - now
+    except IndexError:
+        raise _past_calendar_end(now) from None
+
+
+# ---------------------------------------------------------------
+# Array versions, for whole columns of dates at once            |
+# ---------------------------------------------------------------
+_SESSION_DAYS64 = SESSIONS.index.values.astype('datetime64[D]')
+# For every calendar day, the position of the first session on or after it, so arrays of dates are placed among the
+# sessions with one gather instead of a binary search each
+_CALENDAR_DAYS64 = np.arange(f'{CALENDAR_START_YEAR}-01-01', f'{CALENDAR_END_YEAR + 1}-01-01', dtype='datetime64[D]')
+_NEXT_SESSION = np.searchsorted(_SESSION_DAYS64, _CALENDAR_DAYS64, side='left')
+
+DateArray = Union['np.ndarray', 'pd.Index', 'pd.Series', Sequence]
 
-date='2020-01-01'
-cal = calendar()
-holidays = cal.holidays(start=date, end=date)
-date == holidays
 
-is_business_day(date='2020-01-01')
\ No newline at end of file
+def _to_datetime64(dates: DateArray, unit: str = 'D') -> 'np.ndarray':
+    """Reads dates, datetimes or YYYY-MM-DD strings as a ``datetime64`` array; tz-aware values keep their local date."""
+    if isinstance(dates, pd.Series):
+        dates = pd.Index(dates)
+    if isinstance(dates, pd.DatetimeIndex) and dates.tz is not None:
+        dates = dates.tz_localize(None)
+
+    return np.asarray(dates, dtype=f'datetime64[{unit}]')
+
+
+@functools.lru_cache(maxsize=1)
+def _times_of_day() -> 'np.ndarray':
+    """Every time of day to the second, formatted ' HH:MM:SS', in order."""
+    return np.array([f' {hour:02d}:{minute:02d}:{second:02d}'
+                     for hour in range(24) for minute in range(60) for second in range(60)], dtype='U9')
+
+
+def dates_to_strings(dates: DateArray, output_time: bool = False) -> 'np.ndarray':
+    """Formats an array of dates as YYYY-MM-DD strings, or YYYY-MM-DD HH:MM:SS with ``output_time``.
+
+    Each distinct day is formatted once and the rest is table lookups, so this runs at tens of millions of dates a
+    second rather than one ``strftime`` per date. Missing dates come out as empty strings.
+
+    Args:
+        dates: the dates, e.g. a ``datetime64`` array or ``DatetimeIndex``
+        output_time: a flag whether to include time in the conversion
+
+    Returns:
+        an array of strings
+
+    **Example**
+
+    .. code-block:: python
+
+        import numpy as np
+        from wsbtrading.utils import dates
+        dates.dates_to_strings(np.array(['2021-02-10T15:30'], dtype='datetime64[m]'), output_time=True)
+        # array(['2021-02-10 15:30:00'], dtype='<U19')
+    """
+    values = _to_datetime64(dates, unit='s').astype(np.int64).ravel()
+    missing = values == np.iinfo(np.int64).min
+    width = 19 if output_time else 10
+    if missing.all():
+        return np.full(len(values), '', dtype=f'U{width}')
+    if missing.any():
+        values = np.where(missing, values[~missing][0], values)
+
+    days = np.floor_divide(values, 86_400)
+    first_day = days.min()
+    day_strings = np.datetime_as_string(np.arange(first_day, days.max() + 1).astype('datetime64[D]')).astype('U10')
+    if output_time:
+        formatted = np.empty(len(values), dtype=[('date', 'U10'), ('time', 'U9')])
+        formatted['date'] = day_strings[days - first_day]
+        formatted['time'] = _times_of_day()[values - days * 86_400]
+        formatted = formatted.view('U19')
+    else:
+        formatted = day_strings[days - first_day]
+    if missing.any():
+        formatted[missing] = ''
+
+    return formatted
+
+
+def convert_unix_timestamps_to_dates(timestamps: Union['np.ndarray', Sequence[int]], output_time: bool = False,
+                                     as_strings: bool = False) -> 'np.ndarray':
+    """Converts integer timestamps (in ms) into dates, a whole array at a time.
+
+    The array version of :func:`convert_unix_timestamp_to_date_kernel`; see ``benchmarks/bench_dates.py`` for its
+    throughput.
+
+    Args:
+        timestamps: the timestamps (in ms) to convert
+        output_time: a flag whether to keep the time of day, to the second
+        as_strings: whether to format the dates as the kernel does, instead of returning ``datetime64`` values
+
+    Returns:
+        a ``datetime64[D]`` array, or ``datetime64[s]`` with ``output_time``, or an array of strings
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.utils import dates
+        dates.convert_unix_timestamps_to_dates(df['timestamp'].to_numpy(), as_strings=True)
+        # array(['2020-06-30', '2020-06-23', ...], dtype='<U10')
+    """
+    values = np.asarray(timestamps, dtype=np.int64).astype('datetime64[ms]')
+    if as_strings:
+        return dates_to_strings(values, output_time=output_time)
+
+    return values.astype('datetime64[s]' if output_time else 'datetime64[D]')
+
+
+def parse_dates_from_strings(dates: Union['np.ndarray', Sequence[str]]) -> 'np.ndarray':
+    """Converts YYYY-MM-DD strings to dates, a whole array at a time.
+
+    Args:
+        dates: the dates to parse
+
+    Returns:
+        a ``datetime64[D]`` array
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.utils import dates
+        dates.parse_dates_from_strings(['2020-04-20', '2020-04-21'])
+    """
+    return np.asarray(dates, dtype='datetime64[D]')
+
+
+def _sessions_at(positions: 'np.ndarray') -> 'np.ndarray':
+    if positions.size and (positions.min() < 0 or positions.max() >= len(_SESSION_DAYS64)):
+        raise ValueError(f'Some dates are outside the trading calendar ({CALENDAR_START_YEAR}-{CALENDAR_END_YEAR}).')
+
+    return _SESSION_DAYS64[positions]
+
+
+def build_date_range_array(start_date: Union[str, Date], end_date: Union[str, Date],
+                           trading_days: bool = False) -> 'np.ndarray':
+    """Creates an array of dates, both ends included, optionally only the NYSE trading days.
+
+    Args:
+        start_date: the date to start with
+        end_date: the date to end with
+        trading_days: whether to keep only the days the NYSE trades, see :func:`is_business_day`
+
+    Returns:
+        a ``datetime64[D]`` array; pass it to :func:`dates_to_strings` or :func:`date_range_to_unix_range` for strings
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.utils import dates
+        dates.build_date_range_array(start_date='2021-02-12', end_date='2021-02-17', trading_days=True)
+        # array(['2021-02-12', '2021-02-16', '2021-02-17'], dtype='datetime64[D]')
+    """
+    start, end = np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D')
+    if not trading_days:
+        return np.arange(start, end + 1, dtype='datetime64[D]')
+    if start < _SESSION_DAYS64[0] - 7 or end > _SESSION_DAYS64[-1] + 7:
+        raise ValueError(f'{start_date} to {end_date} is outside the trading calendar '
+                         f'({CALENDAR_START_YEAR}-{CALENDAR_END_YEAR}).')
+
+    return _SESSION_DAYS64[np.searchsorted(_SESSION_DAYS64, start, side='left'):
+                           np.searchsorted(_SESSION_DAYS64, end, side='right')]
+
+
+def slide_dates(dates: DateArray, days_to_add: Union[int, 'np.ndarray'], trading_days: bool = False) -> 'np.ndarray':
+    """Shifts an array of dates, by calendar days or by NYSE trading days.
+
+    Note:
+        with ``trading_days``, a date the market is closed on counts as lying between the sessions around it, so +1
+        is the next session and -1 the one before; a shift of 0 moves it forward to the next session
+
+    Args:
+        dates: the dates to shift
+        days_to_add: the number of days to shift by, one for all dates or one per date
+        trading_days: whether to count only the days the NYSE trades
+
+    Returns:
+        a ``datetime64[D]`` array of the shifted dates
+
+    Raises:
+        ValueError: with ``trading_days``, if a date lands outside the calendar, 1990 through 2040
+
+    **Example**
+
+    .. code-block:: python
+
+        from wsbtrading.utils import dates
+        dates.slide_dates(['2021-02-12', '2021-02-13'], days_to_add=1, trading_days=True)
+        # array(['2021-02-16', '2021-02-16'], dtype='datetime64[D]')
+    """
+    days = _to_datetime64(dates, unit='D')
+    shifts = np.asarray(days_to_add, dtype=np.int64)
+    if not trading_days:
+        return days + shifts.astype('timedelta64[D]')
+
+    offsets = (days - _CALENDAR_DAYS64[0]).astype(np.int64)
+    if offsets.size and (offsets.min() < 0 or offsets.max() >= len(_CALENDAR_DAYS64)):
+        raise ValueError(f'Some dates are outside the trading calendar ({CALENDAR_START_YEAR}-{CALENDAR_END_YEAR}).')
+    positions = _NEXT_SESSION[offsets]
+    is_session = _SESSION_DAYS64[np.minimum(positions, len(_SESSION_DAYS64) - 1)] == days
+
+    return _sessions_at(positions=positions + shifts - ((shifts > 0) & ~is_session))
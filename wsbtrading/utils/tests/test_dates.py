@@ -1,5 +1,6 @@
 import unittest
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from pandas._testing import assert_frame_equal
 
@@ -147,3 +148,128 @@ class TestDateSlider(unittest.TestCase):
         expected = '2019-12-30'
 
         assert actual == expected
+
+
+class TestTradingCalendar(unittest.TestCase):
+    @staticmethod
+    def _epoch(timestamp: str) -> float:
+        return pd.Timestamp(timestamp, tz='America/New_York').timestamp()
+
+    def test_sessions_per_year(self):
+        """Session counts match the NYSE's, special closures included."""
+        counts = dates.SESSIONS.groupby(dates.SESSIONS.index.year).size()
+
+        assert {year: counts[year] for year in [2001, 2012, 2018, 2020, 2021, 2022]} == \
+            {2001: 248, 2012: 250, 2018: 251, 2020: 253, 2021: 252, 2022: 251}
+
+    def test_is_business_day(self):
+        """Weekends, holidays and special closures are not business days, in any of the accepted input types."""
+        assert dates.is_business_day(date='2021-02-10')
+        assert not dates.is_business_day(date='2021-02-13')
+        assert not dates.is_business_day(date='2020-01-01')
+        assert not dates.is_business_day(date='2021-04-02')
+        assert not dates.is_business_day(date='2022-06-20')
+        assert not dates.is_business_day(date='2012-10-29')
+        assert dates.is_business_day(date=datetime(2021, 12, 31, 15, 0))
+        assert not dates.is_business_day(date=datetime(2021, 12, 24).date())
+        assert dates.is_business_day(date=pd.Timestamp('2021-02-10'))
+
+        with self.assertRaises(ValueError):
+            dates.is_business_day(date='1989-12-29')
+
+    def test_is_business_day_parsed(self):
+        """Dates in any other form pandas can parse are looked up like ISO strings, and anything else is an error."""
+        assert dates.is_business_day(date=np.datetime64('2020-01-02'))
+        assert not dates.is_business_day(date=np.datetime64('2020-01-01'))
+        assert dates.is_business_day(date='2020-1-2')
+        assert dates.is_business_day(date='20200102')
+        assert dates.is_business_day(date='2021-02-10 15:00')
+        assert not dates.is_business_day(date='2021-2-13')
+
+        for date in ['2021-02-10x', '2021-02-13 garbage', 'not a date', None]:
+            with self.assertRaises(ValueError):
+                dates.is_business_day(date=date)
+
+    def test_early_close(self):
+        """Early closes end the session at 1pm."""
+        closes = dates.SESSIONS['close'].dt.tz_convert('America/New_York')
+
+        assert closes['2019-07-03'].hour == 13
+        assert closes['2020-11-27'].hour == 13
+        assert closes['2020-12-24'].hour == 13
+        assert closes['2020-12-23'].hour == 16
+
+    def test_market_clock(self):
+        """Opens and closes are found across weekends, holidays and daylight saving changes."""
+        friday_evening = self._epoch('2021-03-12 17:00')
+
+        assert not dates.is_market_open(now=friday_evening)
+        assert dates.is_market_open(now=self._epoch('2021-03-15 09:30'))
+        assert not dates.is_market_open(now=self._epoch('2021-03-15 16:00'))
+        assert dates.next_market_open(now=friday_evening) == self._epoch('2021-03-15 09:30')
+        assert dates.next_market_close(now=friday_evening) == self._epoch('2021-03-15 16:00')
+        assert dates.seconds_to_market_close(now=self._epoch('2020-12-24 12:30')) == 1800
+
+        with self.assertRaises(ValueError):
+            dates.next_market_open(now=self._epoch('2041-01-01 00:00'))
+
+
+class TestArrayDates(unittest.TestCase):
+    def setUp(self) -> None:
+        self.timestamps = np.array([1593556445000, 1592951645000, 1592778845000, 1593641161682, 1583715763996,
+                                    1593640898412, -1])
+
+    def test_convert_unix_timestamps_to_dates(self):
+        """Matches the per-timestamp kernel, with and without time, as strings or datetime64."""
+        for output_time in [False, True]:
+            expected = [dates.convert_unix_timestamp_to_date_kernel(timestamp=int(timestamp), output_time=output_time)
+                        for timestamp in self.timestamps]
+
+            actual = dates.convert_unix_timestamps_to_dates(self.timestamps, output_time=output_time, as_strings=True)
+
+            assert actual.tolist() == expected
+
+        actual = dates.convert_unix_timestamps_to_dates(self.timestamps)
+        assert actual.dtype == np.dtype('datetime64[D]')
+        assert str(actual[0]) == '2020-06-30'
+
+    def test_dates_to_strings(self):
+        """Missing dates become empty strings and tz-aware dates keep their local date."""
+        index = pd.DatetimeIndex(['2021-02-10 23:30', None]).tz_localize('US/Eastern')
+
+        assert dates.dates_to_strings(index).tolist() == ['2021-02-10', '']
+        assert dates.dates_to_strings(index, output_time=True).tolist() == ['2021-02-10 23:30:00', '']
+
+    def test_parse_dates_from_strings(self):
+        actual = dates.parse_dates_from_strings(['2020-04-20', '2020-02-29'])
+
+        assert actual.tolist() == [dates.parse_date_from_string('2020-04-20').date(),
+                                   dates.parse_date_from_string('2020-02-29').date()]
+
+    def test_build_date_range_array(self):
+        """Matches build_date_range, and keeps only sessions with trading_days."""
+        actual = dates.build_date_range_array(start_date='2020-02-28', end_date='2020-03-02')
+        assert dates.dates_to_strings(actual).tolist() == dates.build_date_range(start_date='2020-02-28',
+                                                                                end_date='2020-03-02')
+
+        actual = dates.build_date_range_array(start_date='2021-02-12', end_date='2021-02-17', trading_days=True)
+        assert dates.dates_to_strings(actual).tolist() == ['2021-02-12', '2021-02-16', '2021-02-17']
+
+    def test_slide_dates(self):
+        """Matches date_slider, and counts sessions with trading_days."""
+        actual = dates.slide_dates(['2020-01-01', '2020-01-01', '2020-01-01'], days_to_add=np.array([7, 0, -2]))
+        assert dates.dates_to_strings(actual).tolist() == [dates.date_slider(date='2020-01-01', days_to_add=days)
+                                                           for days in [7, 0, -2]]
+
+        actual = dates.slide_dates(['2021-02-12', '2021-02-13', '2021-02-13', '2021-02-16'], days_to_add=[1, 1, -1, 0],
+                                   trading_days=True)
+        assert dates.dates_to_strings(actual).tolist() == ['2021-02-16', '2021-02-16', '2021-02-12', '2021-02-16']
+
+        with self.assertRaises(ValueError):
+            dates.slide_dates(['2040-12-31'], days_to_add=1, trading_days=True)
+
+    def test_date_range_to_unix_range(self):
+        actual = dates.date_range_to_unix_range(dates.build_date_range_array(start_date='2020-04-01',
+                                                                             end_date='2020-04-03'))
+
+        assert actual == '{2020-04-01,2020-04-02,2020-04-03}'